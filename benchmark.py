@@ -0,0 +1,370 @@
+#!/usr/bin/python3
+
+"""
+Benchmarks indexing and searching of a DocFetcher build. The benchmark builds a
+synthetic corpus from the sample documents in dev/test-files, starts a headless
+DocFetcher instance with the Python API enabled, and then measures:
+
+- the indexing throughput in documents and megabytes per second, with one
+  index per file type, so that the throughput of each parser can be compared;
+- the latency of a mix of queries sent through the Python API, as reported by
+  the functions in dist/search.py;
+- the heap usage of the Java VM after each phase;
+- the internal timings of each phase, as reported by the getMetrics method of
+  the Python API.
+
+The results are written to a JSON file with sorted keys, so that the results of
+two runs, e.g. before and after a change, can be compared with a diff tool.
+
+The benchmark runs against a portable build, i.e. the output of build.py, by
+default the most recent one in the build folder. The indexes are created in a
+temporary folder, so the user's indexes are left untouched. Example:
+
+	python3 benchmark.py --docs-per-type 200 --rounds 20 -o before.json
+
+Run with --help to see all options. Like search.py, this script requires the
+py4j folder in the dist folder.
+"""
+
+import argparse, glob, json, os, os.path as osp, platform, shutil, socket
+import subprocess, sys, tempfile, time
+
+os.chdir(osp.dirname(osp.abspath(sys.argv[0])))
+sys.path.insert(0, osp.abspath("dist"))
+
+# Queries replayed in each round; the sample documents are mostly lorem ipsum
+default_queries = [
+	"lorem",
+	"ipsum dolor",
+	"\"lorem ipsum\"",
+	"lorem AND NOT amet",
+	"consectetur OR adipiscing",
+	"lor*",
+	"dolr~",
+	"sed AND (magna OR aliqua)",
+	"doesnotexist",
+]
+
+# Sample files that can't be indexed without user interaction or that aren't
+# handled by file indexes
+excluded_patterns = ["*password=*", "*.exe", "*.pst"]
+
+main_class = "net.sourceforge.docfetcher.gui.Application"
+
+def main():
+	parser = argparse.ArgumentParser(
+		description="Benchmarks indexing and searching of a DocFetcher build.")
+	parser.add_argument("--app-dir",
+		help="folder of the portable build to benchmark "
+		"(default: most recent build in the build folder)")
+	parser.add_argument("--docs-per-type", type=int, default=100,
+		help="number of documents per file type in the corpus (default: 100)")
+	parser.add_argument("--types",
+		help="comma-separated list of file extensions to include "
+		"(default: all types found in dev/test-files)")
+	parser.add_argument("--parse-threads", type=int, default=1,
+		help="number of text extraction threads; 0 means one per "
+		"processor core (default: 1)")
+	parser.add_argument("--queries",
+		help="file with one query per line (default: built-in query mix)")
+	parser.add_argument("--rounds", type=int, default=10,
+		help="number of times the query mix is replayed (default: 10)")
+	parser.add_argument("--port", type=int, default=28835,
+		help="port of the headless DocFetcher instance (default: 28835)")
+	parser.add_argument("--max-heap", default="1g",
+		help="maximum heap size of the Java VM (default: 1g)")
+	parser.add_argument("--keep-temp", action="store_true",
+		help="don't delete the corpus, the indexes and the log file")
+	parser.add_argument("-o", "--output", default="benchmark-results.json",
+		help="output file (default: benchmark-results.json)")
+	args = parser.parse_args()
+	if args.docs_per_type < 1 or args.rounds < 1:
+		parser.error("--docs-per-type and --rounds must be at least 1")
+
+	app_dir = args.app_dir or find_app_dir()
+	if not app_dir:
+		print("No portable build found in the build folder. Run build.py first.")
+		sys.exit(1)
+	types = args.types.lower().split(",") if args.types else None
+	queries = read_queries(args.queries) if args.queries else default_queries
+
+	temp_dir = tempfile.mkdtemp(prefix="docfetcher-benchmark-")
+	try:
+		print("Generating corpus...")
+		corpus = generate_corpus(
+			"dev/test-files", osp.join(temp_dir, "corpus"), args.docs_per_type,
+			types)
+
+		print("Starting DocFetcher instance...")
+		log_path = osp.join(temp_dir, "docfetcher.log")
+		with open(log_path, "w") as log_file:
+			process = start_instance(
+				app_dir, args.port, osp.join(temp_dir, "indexes"),
+				args.max_heap, log_file)
+			try:
+				wait_for_port(args.port, process)
+				results = run_benchmark(args, corpus, queries)
+			finally:
+				process.terminate()
+				process.wait()
+		results["app_dir"] = osp.basename(osp.abspath(app_dir))
+	finally:
+		if args.keep_temp:
+			print("Temporary files kept in " + temp_dir)
+		else:
+			shutil.rmtree(temp_dir, ignore_errors=True)
+
+	with open(args.output, "w", encoding="utf-8") as f:
+		json.dump(results, f, indent="\t", sort_keys=True)
+		f.write("\n")
+	print("Results written to " + args.output)
+
+# -> string | None
+def find_app_dir():
+	candidates = [
+		path for path in glob.glob("build/DocFetcher-*")
+		if osp.isdir(osp.join(path, "lib"))
+	]
+	if not candidates:
+		return None
+	return max(candidates, key=osp.getmtime)
+
+# string -> [string]
+def read_queries(path):
+	with open(path, encoding="utf-8") as f:
+		return [line.strip() for line in f if line.strip()]
+
+# string -> string
+def get_type(filename):
+	return filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+
+# string, string, int, [string] | None -> {string: {string: ...}}
+def generate_corpus(sample_dir, corpus_dir, docs_per_type, types):
+	"""Creates one folder per file type in the given corpus folder and fills it
+	with the given number of documents by repeatedly copying the sample files
+	of that type. Returns the folder, document count and total size of each
+	file type.
+	"""
+	import fnmatch
+
+	samples = {}
+	for root, dirs, files in os.walk(sample_dir):
+		dirs.sort()
+		for filename in sorted(files):
+			if any(fnmatch.fnmatch(filename, p) for p in excluded_patterns):
+				continue
+			type = get_type(filename)
+			if not type or (types is not None and type not in types):
+				continue
+			samples.setdefault(type, []).append(osp.join(root, filename))
+
+	corpus = {}
+	for type, paths in sorted(samples.items()):
+		type_dir = osp.join(corpus_dir, type)
+		os.makedirs(type_dir)
+		size = 0
+		for i in range(docs_per_type):
+			src = paths[i % len(paths)]
+			dst = osp.join(type_dir, "doc-%05d.%s" % (i + 1, type))
+			shutil.copyfile(src, dst)
+			size += osp.getsize(dst)
+		corpus[type] = {
+			"dir": osp.abspath(type_dir),
+			"docs": docs_per_type,
+			"bytes": size,
+			"samples": len(paths),
+		}
+	return corpus
+
+# string -> [string]
+def get_classpath(app_dir):
+	"""Returns the same classpath as the one built by the Main class of the
+	portable build, but with absolute paths.
+	"""
+	lib_dir = osp.join(app_dir, "lib")
+	paths = sorted(glob.glob(osp.join(lib_dir, "*.jar")))
+	system = platform.system().lower()
+	if "windows" in system:
+		swt_pattern = "swt-*-win32-win32-x86_64.jar"
+	elif "darwin" in system:
+		swt_pattern = "swt-*-cocoa-macosx-x86_64.jar"
+	else:
+		swt_pattern = "swt-*-gtk-linux-x86_64.jar"
+	paths += sorted(glob.glob(osp.join(lib_dir, "swt", swt_pattern)))[-1:]
+	paths.append(osp.join(app_dir, "lang"))
+	return [osp.abspath(path) for path in paths]
+
+# string, int, string, string, file -> Popen
+def start_instance(app_dir, port, index_dir, max_heap, log_file):
+	classpath_sep = ";" if "windows" in platform.system().lower() else ":"
+	cmd = [
+		"java",
+		"-Xmx" + max_heap,
+		"-Xss2m",
+		"-cp", classpath_sep.join(get_classpath(app_dir)),
+		"-Djava.library.path=lib",
+		main_class,
+		"--python-api-server",
+		"--port=%d" % port,
+		"--index-dir=" + osp.abspath(index_dir),
+	]
+	return subprocess.Popen(
+		cmd, cwd=app_dir, stdout=log_file, stderr=subprocess.STDOUT)
+
+# int, Popen, float -> None
+def wait_for_port(port, process, timeout=60):
+	end = time.time() + timeout
+	while time.time() < end:
+		if process.poll() is not None:
+			raise RuntimeError(
+				"DocFetcher instance exited with code %d." % process.returncode)
+		try:
+			socket.create_connection(("127.0.0.1", port), 1).close()
+			return
+		except OSError:
+			time.sleep(0.2)
+	raise RuntimeError("DocFetcher instance did not open port %d." % port)
+
+# JavaGateway -> {string: int}
+def get_heap_usage(gateway, collect=True):
+	"""Returns the current and peak heap usage of the Java VM in bytes. If
+	collect is true, a garbage collection is requested first, so that the
+	current usage approximates the live heap.
+	"""
+	jvm = gateway.jvm
+	if collect:
+		jvm.java.lang.System.gc()
+	factory = jvm.java.lang.management.ManagementFactory
+	usage = factory.getMemoryMXBean().getHeapMemoryUsage()
+	peak = 0
+	for pool in factory.getMemoryPoolMXBeans():
+		if pool.getType().toString() == "Heap memory":
+			peak += pool.getPeakUsage().getUsed()
+	return {
+		"used": usage.getUsed(),
+		"committed": usage.getCommitted(),
+		"max": usage.getMax(),
+		"peak": peak,
+	}
+
+# [float], float -> float
+def percentile(values, p):
+	"""Returns the p-th percentile of the given values, using the nearest-rank
+	method.
+	"""
+	import math
+
+	values = sorted(values)
+	rank = max(1, int(math.ceil(p / 100.0 * len(values))))
+	return values[rank - 1]
+
+# [float] -> {string: float}
+def summarize_latencies(latencies):
+	millis = [latency * 1000 for latency in latencies]
+	return {
+		"count": len(millis),
+		"mean_ms": round(sum(millis) / len(millis), 3),
+		"p50_ms": round(percentile(millis, 50), 3),
+		"p95_ms": round(percentile(millis, 95), 3),
+		"p99_ms": round(percentile(millis, 99), 3),
+		"max_ms": round(max(millis), 3),
+	}
+
+# Namespace, {string: {string: ...}}, [string] -> {string: ...}
+def run_benchmark(args, corpus, queries):
+	from py4j.java_gateway import JavaGateway, GatewayParameters
+	from search import search_columns, get_cache_stats, get_metrics
+
+	gateway = JavaGateway(gateway_parameters=GatewayParameters(port=args.port))
+	try:
+		entry_point = gateway.entry_point
+		system = gateway.jvm.java.lang.System
+		entry_point.setParseThreads(args.parse_threads)
+		results = {
+			"environment": {
+				"java_version": system.getProperty("java.version"),
+				"java_vm": system.getProperty("java.vm.name"),
+				"os": platform.platform(),
+				"python_version": platform.python_version(),
+				"processors": os.cpu_count(),
+			},
+			"parameters": {
+				"docs_per_type": args.docs_per_type,
+				"parse_threads": entry_point.getParseThreads(),
+				"rounds": args.rounds,
+				"max_heap": args.max_heap,
+			},
+			"heap": {"startup": get_heap_usage(gateway)},
+		}
+
+		# Indexing, one index per file type
+		entry_point.resetMetrics()
+		indexing = {}
+		total_docs = total_bytes = total_seconds = 0
+		for type, info in sorted(corpus.items()):
+			print("Indexing %d %s files..." % (info["docs"], type))
+			start = time.perf_counter()
+			registered = entry_point.createIndex(info["dir"])
+			seconds = time.perf_counter() - start
+			indexing[type] = {
+				"docs": info["docs"],
+				"bytes": info["bytes"],
+				"samples": info["samples"],
+				"registered": registered,
+				"seconds": round(seconds, 3),
+				"docs_per_sec": round(info["docs"] / seconds, 2),
+				"mb_per_sec": round(info["bytes"] / seconds / 1024 ** 2, 3),
+			}
+			total_docs += info["docs"]
+			total_bytes += info["bytes"]
+			total_seconds += seconds
+		if total_seconds > 0:
+			indexing["total"] = {
+				"docs": total_docs,
+				"bytes": total_bytes,
+				"seconds": round(total_seconds, 3),
+				"docs_per_sec": round(total_docs / total_seconds, 2),
+				"mb_per_sec": round(
+					total_bytes / total_seconds / 1024 ** 2, 3),
+			}
+		results["indexing"] = indexing
+		results["heap"]["after_indexing"] = get_heap_usage(gateway)
+		results["metrics"] = {"indexing": get_metrics(args.port)}
+		entry_point.resetMetrics()
+
+		# Searching; the first round runs with an empty result cache, the
+		# remaining rounds may be answered from the cache
+		print("Replaying %d queries %d times..." % (len(queries), args.rounds))
+		first_round = []
+		later_rounds = []
+		per_query = {query: [] for query in queries}
+		hit_counts = {}
+		for i in range(args.rounds):
+			for query in queries:
+				start = time.perf_counter()
+				records = search_columns(query, args.port, ("path",))
+				latency = time.perf_counter() - start
+				(first_round if i == 0 else later_rounds).append(latency)
+				per_query[query].append(latency)
+				hit_counts[query] = len(records)
+		searching = {
+			"all": summarize_latencies(first_round + later_rounds),
+			"first_round": summarize_latencies(first_round),
+			"queries": {
+				query: dict(summarize_latencies(per_query[query]),
+					hits=hit_counts[query])
+				for query in queries
+			},
+			"cache": get_cache_stats(args.port),
+		}
+		if later_rounds:
+			searching["later_rounds"] = summarize_latencies(later_rounds)
+		results["searching"] = searching
+		results["heap"]["after_searching"] = get_heap_usage(gateway)
+		results["metrics"]["searching"] = get_metrics(args.port)
+		return results
+	finally:
+		gateway.close()
+
+if __name__ == "__main__":
+	main()
@@ -23,7 +23,7 @@ from py4j.java_gateway import (
     DEFAULT_PYTHON_PROXY_PORT, DEFAULT_ACCEPT_TIMEOUT_PLACEHOLDER,
     server_connection_stopped, do_client_auth)
 from py4j import protocol as proto
-from py4j.compat import Queue
+from py4j.compat import Empty, Queue
 from py4j.protocol import (
     Py4JError, Py4JNetworkError, smart_decode, get_command_part,
     get_return_value, Py4JAuthenticationError)
@@ -36,20 +36,37 @@ SHUTDOWN_FINALIZER_WORKER = "__shutdown__"
 
 
 class FinalizerWorker(Thread):
+    """Sends the garbage collection requests queued by JavaClient instances.
+    All requests queued since the last run are coalesced into one release per
+    client.
+    """
 
-    def __init__(self, queue):
+    def __init__(self, queue, max_batch=1000):
         self.queue = queue
+        self.max_batch = max_batch
         super(FinalizerWorker, self).__init__()
 
     def run(self):
-        while(True):
+        shutdown = False
+        while not shutdown:
             task = self.queue.get()
-            if task == SHUTDOWN_FINALIZER_WORKER:
-                break
-            else:
+            batches = {}
+            count = 0
+            while True:
+                if task == SHUTDOWN_FINALIZER_WORKER:
+                    shutdown = True
+                    break
                 (java_client, target_id) = task
-                java_client.garbage_collect_object(
-                    target_id, False)
+                batches.setdefault(java_client, []).append(target_id)
+                count += 1
+                if count >= self.max_batch:
+                    break
+                try:
+                    task = self.queue.get_nowait()
+                except Empty:
+                    break
+            for java_client, target_ids in batches.items():
+                java_client.release_objects(target_ids)
 
 
 class JavaParameters(GatewayParameters):
@@ -230,7 +247,7 @@ class JavaClient(GatewayClient):
         if enqueue:
             self.finalizer_queue.put((self, target_id))
         else:
-            super(JavaClient, self).garbage_collect_object(target_id)
+            self.release_objects([target_id])
 
     def set_thread_connection(self, connection):
         """Associates a ClientServerConnection with the current thread.
@@ -52,6 +52,18 @@ class ThreadSafeFinalizer(object):
         with cls.lock:
             cls.finalizers.pop(id, None)
 
+    @classmethod
+    def remove_finalizers(cls, ids):
+        """Removes the finalizers associated with these ids, acquiring the
+        lock only once.
+
+        :param ids: The ids of the objects for which the finalizers will be
+            deleted.
+        """
+        with cls.lock:
+            for id in ids:
+                cls.finalizers.pop(id, None)
+
     @classmethod
     def clear_finalizers(cls, clear_all=False):
         """Removes all registered finalizers.
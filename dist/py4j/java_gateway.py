@@ -23,7 +23,7 @@ from subprocess import Popen, PIPE
 import subprocess
 import sys
 import traceback
-from threading import Thread, RLock
+from threading import Event, Thread, RLock, local
 import weakref
 
 from py4j.compat import (
@@ -618,10 +618,6 @@ def do_client_auth(command, input_stream, sock, auth_token):
 
 def _garbage_collect_object(gateway_client, target_id):
     try:
-        ThreadSafeFinalizer.remove_finalizer(
-            smart_decode(gateway_client.address) +
-            smart_decode(gateway_client.port) +
-            target_id)
         gateway_client.garbage_collect_object(target_id)
     except Exception:
         logger.debug("Exception while garbage collecting an object",
@@ -703,7 +699,7 @@ class GatewayParameters(object):
             self, address=DEFAULT_ADDRESS, port=DEFAULT_PORT, auto_field=False,
             auto_close=True, auto_convert=False, eager_load=False,
             ssl_context=None, enable_memory_management=True,
-            read_timeout=None, auth_token=None):
+            read_timeout=None, auth_token=None, unix_socket=None):
         """
         :param address: the address to which the client will request a
             connection. If you're assing a `SSLContext` with
@@ -744,9 +740,14 @@ class GatewayParameters(object):
 
         :param auth_token: if provided, an authentication that token clients
             must provide to the server when connecting.
+
+        :param unix_socket: if provided, the path of a Unix domain socket on
+            which the Java side listens. The client connects to this socket
+            instead of `address` and `port`.
         """
         self.address = address
         self.port = port
+        self.unix_socket = unix_socket
         self.auto_field = auto_field
         self.auto_close = auto_close
         self.auto_convert = auto_convert
@@ -863,6 +864,236 @@ class GatewayConnectionGuard(object):
             self._connection.close()
 
 
+class JavaFuture(object):
+    """The result of a :class:`JavaMember` call that was queued in a
+    :class:`CommandBatch`. The result becomes available once the batch has
+    been flushed.
+    """
+
+    def __init__(self):
+        self._done = False
+        self._value = None
+        self._exception = None
+
+    def done(self):
+        """Returns `True` if the batch containing the call has been flushed.
+        """
+        return self._done
+
+    def result(self):
+        """Returns the return value of the call, or raises the exception that
+        the call raised.
+
+        :raises Py4JError: if the batch has not been flushed yet.
+        """
+        if not self._done:
+            raise Py4JError("The command batch has not been flushed yet.")
+        if self._exception is not None:
+            raise self._exception
+        return self._value
+
+    def exception(self):
+        """Returns the exception raised by the call, or `None`.
+        """
+        if not self._done:
+            raise Py4JError("The command batch has not been flushed yet.")
+        return self._exception
+
+    def _set_result(self, value):
+        self._value = value
+        self._done = True
+
+    def _set_exception(self, exception):
+        self._exception = exception
+        self._done = True
+
+
+class CommandBatch(object):
+    """Context manager that pipelines :class:`JavaMember` calls: While the
+    batch is active, calls made by the current thread are queued and return a
+    :class:`JavaFuture` instead of the return value. When the batch is
+    flushed, the queued commands are written to a single connection at once
+    and the answers are read back in order, so that the calls cost one
+    round-trip instead of one round-trip per call.
+
+    The batch is flushed when the `with` block exits, and automatically
+    whenever `max_pending` commands are queued. If the `with` block raises an
+    exception, the commands that are still queued are discarded.
+
+    Calls depending on the results of other calls in the same batch are not
+    possible, since the results are only available after the flush.
+    """
+
+    def __init__(self, gateway_client, max_pending=1000):
+        """
+        :param gateway_client: the gateway client to send the commands with.
+
+        :param max_pending: the maximum number of queued commands. Keeping
+            this bounded prevents both sides from blocking on full socket
+            buffers.
+        """
+        self.gateway_client = gateway_client
+        self.max_pending = max_pending
+        self._pending = []
+
+    def __enter__(self):
+        self.gateway_client._push_batch(self)
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.gateway_client._pop_batch(self)
+        if value is None:
+            self.flush()
+        else:
+            self._discard()
+
+    def add(self, command, target_id, name, temp_args):
+        """Queues the given command. This method is not intended to be called
+        directly by Py4J users.
+
+        :rtype: a :class:`JavaFuture` for the return value of the command.
+        """
+        future = JavaFuture()
+        self._pending.append((command, future, target_id, name, temp_args))
+        if len(self._pending) >= self.max_pending:
+            self.flush()
+        return future
+
+    def flush(self):
+        """Sends all queued commands and resolves their futures.
+        """
+        pending = self._pending
+        self._pending = []
+        if not pending:
+            return
+        answers = self.gateway_client.send_commands(
+            [command for (command, _, _, _, _) in pending])
+        for (command, future, target_id, name, temp_args), answer in zip(
+                pending, answers):
+            try:
+                future._set_result(get_return_value(
+                    answer, self.gateway_client, target_id, name))
+            except Py4JError as e:
+                future._set_exception(e)
+            for temp_arg in temp_args:
+                temp_arg._detach()
+
+    def _discard(self):
+        pending = self._pending
+        self._pending = []
+        for (_, future, _, _, temp_args) in pending:
+            future._set_exception(Py4JError("The command batch was aborted."))
+            for temp_arg in temp_args:
+                temp_arg._detach()
+
+
+class ReleaseWorker(Thread):
+    """Daemon thread that tells the Java side which objects are no longer
+    referenced on the Python side. Python objects tend to be garbage collected
+    in bursts, e.g. when a list of results goes out of scope, so the worker
+    sends all ids queued since its last run at once with
+    :meth:`GatewayClient.release_objects`, which costs one round-trip instead
+    of one round-trip per object.
+
+    Queuing an id never blocks on the network, so it is safe to do it from a
+    weak reference callback. The worker exits after `idle_timeout` seconds
+    without work and is restarted by the gateway client when needed, so that
+    short-lived gateways don't leave threads behind.
+    """
+
+    def __init__(self, gateway_client, max_batch=1000, idle_timeout=5.0):
+        """
+        :param gateway_client: the gateway client to send the releases with.
+
+        :param max_batch: the maximum number of ids sent at once.
+
+        :param idle_timeout: the number of seconds without work after which
+            the worker exits.
+        """
+        super(ReleaseWorker, self).__init__()
+        self.daemon = True
+        self.gateway_client = gateway_client
+        self.max_batch = max_batch
+        self.idle_timeout = idle_timeout
+        self.pending = deque()
+        self.event = Event()
+
+    def enqueue(self, target_id):
+        """Queues the id of an object that is no longer referenced.
+        """
+        self.pending.append(target_id)
+        if not self.event.is_set():
+            self.event.set()
+
+    def flush(self):
+        """Sends all queued ids from the calling thread.
+        """
+        while self.pending:
+            target_ids = []
+            try:
+                while len(target_ids) < self.max_batch:
+                    target_ids.append(self.pending.popleft())
+            except IndexError:
+                pass
+            self.gateway_client.release_objects(target_ids)
+
+    def run(self):
+        while True:
+            self.event.wait(self.idle_timeout)
+            if not self.event.is_set():
+                if self.gateway_client._stop_release_worker(self):
+                    return
+                continue
+            self.event.clear()
+            self.flush()
+
+
+class ReferenceSession(object):
+    """Context manager that records the Java objects received by the current
+    thread while it is active, and releases all of them on the Java side when
+    the `with` block exits, with a single batch of delete commands::
+
+        with gateway.session():
+            results = entry_point.search(query)
+            names = [doc.getFilename() for doc in results]
+
+    This spares the Java side from keeping the objects until the Python
+    garbage collector gets around to them, and avoids one round-trip per
+    object. The objects received in the session must not be used after the
+    session has ended. If sessions are nested, only the innermost session
+    records the received objects.
+    """
+
+    def __init__(self, gateway_client):
+        """
+        :param gateway_client: the gateway client whose objects are recorded.
+        """
+        self.gateway_client = gateway_client
+        self._target_ids = []
+
+    def __enter__(self):
+        self.gateway_client._push_session(self)
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.gateway_client._pop_session(self)
+        self.release()
+
+    def add(self, target_id):
+        """Records the id of a received object. This method is not intended
+        to be called directly by Py4J users.
+        """
+        self._target_ids.append(target_id)
+
+    def release(self):
+        """Releases the objects recorded so far.
+        """
+        target_ids = self._target_ids
+        self._target_ids = []
+        if target_ids:
+            self.gateway_client.release_objects(target_ids)
+
+
 class GatewayClient(object):
     """Responsible for managing connections to the JavaGateway.
 
@@ -904,23 +1135,71 @@ class GatewayClient(object):
         self.gateway_property = gateway_property
         self.ssl_context = gateway_parameters.ssl_context
         self.deque = deque()
+        self._batches = local()
+        self._sessions = local()
+        self._release_worker = None
+        self._release_lock = RLock()
 
     def garbage_collect_object(self, target_id):
         """Tells the Java side that there is no longer a reference to this
-        JavaObject on the Python side.
+        JavaObject on the Python side. The request is queued and sent by a
+        :class:`ReleaseWorker`, together with the other queued requests.
         """
         if target_id != proto.ENTRY_POINT_OBJECT_ID and\
                 target_id != proto.GATEWAY_SERVER_OBJECT_ID and\
                 self.is_connected:
-            try:
-                self.send_command(
-                    proto.MEMORY_COMMAND_NAME +
-                    proto.MEMORY_DEL_SUBCOMMAND_NAME +
-                    target_id +
-                    "\ne\n")
-            except Exception:
-                logger.debug("Exception while garbage collecting an object",
-                             exc_info=True)
+            # Reentrant lock: The weak reference callback calling this method
+            # may run on a thread that already holds the lock.
+            with self._release_lock:
+                worker = self._release_worker
+                if worker is None:
+                    worker = self._release_worker = ReleaseWorker(self)
+                    worker.start()
+                worker.enqueue(target_id)
+
+    def release_objects(self, target_ids):
+        """Tells the Java side that there is no longer a reference to the
+        JavaObjects with the given ids on the Python side. The delete commands
+        are pipelined on one connection, so that they cost a single
+        round-trip. This method is not intended to be called directly by Py4J
+        users. It is usually called by :class:`ReleaseWorker` and
+        :class:`ReferenceSession` instances.
+
+        :param target_ids: the list of ids of the objects to release.
+        """
+        target_ids = [
+            target_id for target_id in target_ids
+            if target_id != proto.ENTRY_POINT_OBJECT_ID and
+            target_id != proto.GATEWAY_SERVER_OBJECT_ID]
+        prefix = smart_decode(self.address) + smart_decode(self.port)
+        ThreadSafeFinalizer.remove_finalizers(
+            [prefix + target_id for target_id in target_ids])
+        if not target_ids or not self.is_connected:
+            return
+        try:
+            self.send_commands([
+                proto.MEMORY_COMMAND_NAME +
+                proto.MEMORY_DEL_SUBCOMMAND_NAME +
+                target_id +
+                "\ne\n" for target_id in target_ids])
+        except Exception:
+            logger.debug("Exception while garbage collecting objects",
+                         exc_info=True)
+
+    def _flush_releases(self):
+        with self._release_lock:
+            worker = self._release_worker
+        if worker is not None:
+            worker.flush()
+
+    def _stop_release_worker(self, worker):
+        # Called by an idle worker; returns whether the worker may exit.
+        with self._release_lock:
+            if worker.pending:
+                return False
+            if self._release_worker is worker:
+                self._release_worker = None
+            return True
 
     def _get_connection(self):
         if not self.is_connected:
@@ -1005,6 +1284,72 @@ class GatewayClient(object):
 
         return response
 
+    def send_commands(self, commands):
+        """Sends several commands to the JVM on one connection, writing all
+           of them before reading the answers. This method is not intended to
+           be called directly by Py4J users. It is usually called by
+           :class:`CommandBatch` instances.
+
+           Unlike :meth:`send_command`, this method does not retry, since
+           some of the commands may already have been executed.
+
+        :param commands: the list of `string` commands to send to the JVM.
+
+        :rtype: the list of `string` answers received from the JVM, in the
+         same order as the commands.
+        """
+        connection = self._get_connection()
+        try:
+            if hasattr(connection, "send_commands"):
+                answers = connection.send_commands(commands)
+            else:
+                # Connections that may receive callbacks while waiting for an
+                # answer (ClientServerConnection) cannot be pipelined.
+                answers = [connection.send_command(command)
+                           for command in commands]
+        except Py4JNetworkError as pne:
+            reset = isinstance(pne.cause, socket.timeout)
+            connection.close(reset)
+            logging.exception("Exception while sending commands.")
+            raise
+        if any(is_fatal_error(answer) for answer in answers):
+            connection.close(False)
+        else:
+            self._give_back_connection(connection)
+        return answers
+
+    def _get_batch(self):
+        batches = getattr(self._batches, "stack", None)
+        if batches:
+            return batches[-1]
+        return None
+
+    def _push_batch(self, batch):
+        batches = getattr(self._batches, "stack", None)
+        if batches is None:
+            batches = self._batches.stack = []
+        batches.append(batch)
+
+    def _pop_batch(self, batch):
+        batches = self._batches.stack
+        batches.remove(batch)
+
+    def _get_session(self):
+        sessions = getattr(self._sessions, "stack", None)
+        if sessions:
+            return sessions[-1]
+        return None
+
+    def _push_session(self, session):
+        sessions = getattr(self._sessions, "stack", None)
+        if sessions is None:
+            sessions = self._sessions.stack = []
+        sessions.append(session)
+
+    def _pop_session(self, session):
+        sessions = self._sessions.stack
+        sessions.remove(session)
+
     def _create_connection_guard(self, connection):
         return GatewayConnectionGuard(self, connection)
 
@@ -1018,8 +1363,10 @@ class GatewayClient(object):
         to close active connections.
 
         All connections are guaranteed to be closed only if no other thread
-        is accessing the client and no call is pending.
+        is accessing the client and no call is pending. Queued releases of
+        Java objects are sent before the connections are closed.
         """
+        self._flush_releases()
         size = len(self.deque)
         for _ in range(0, size):
             try:
@@ -1044,8 +1391,12 @@ class GatewayConnection(object):
         self.gateway_parameters = gateway_parameters
         self.address = gateway_parameters.address
         self.port = gateway_parameters.port
-        af_type = socket.getaddrinfo(self.address, self.port)[0][0]
-        self.socket = socket.socket(af_type, socket.SOCK_STREAM)
+        self.unix_socket = gateway_parameters.unix_socket
+        if self.unix_socket:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            af_type = socket.getaddrinfo(self.address, self.port)[0][0]
+            self.socket = socket.socket(af_type, socket.SOCK_STREAM)
         if gateway_parameters.read_timeout:
             self.socket.settimeout(gateway_parameters.read_timeout)
         if gateway_parameters.ssl_context:
@@ -1064,7 +1415,10 @@ class GatewayConnection(object):
         """Starts the connection by connecting to the `address` and the `port`
         """
         try:
-            self.socket.connect((self.address, self.port))
+            if self.unix_socket:
+                self.socket.connect(self.unix_socket)
+            else:
+                self.socket.connect((self.address, self.port))
             self.stream = self.socket.makefile("rb")
             self.is_connected = True
 
@@ -1073,8 +1427,12 @@ class GatewayConnection(object):
             logger.exception("Cannot authenticate with gateway server.")
             raise
         except Exception as e:
-            msg = "An error occurred while trying to connect to the Java "\
-                "server ({0}:{1})".format(self.address, self.port)
+            if self.unix_socket:
+                msg = "An error occurred while trying to connect to the "\
+                    "Java server ({0})".format(self.unix_socket)
+            else:
+                msg = "An error occurred while trying to connect to the "\
+                    "Java server ({0}:{1})".format(self.address, self.port)
             logger.exception(msg)
             raise Py4JNetworkError(msg, e)
 
@@ -1138,6 +1496,19 @@ class GatewayConnection(object):
         :rtype: the `string` answer received from the JVM (The answer follows
          the Py4J protocol).
         """
+        return self.send_commands([command])[0]
+
+    def send_commands(self, commands):
+        """Sends several commands to the JVM with a single write and then
+           reads the answers in order. This method is not intended to be
+           called directly by Py4J users: it is usually called by
+           CommandBatch instances.
+
+        :param commands: the list of `string` commands to send to the JVM.
+
+        :rtype: the list of `string` answers received from the JVM.
+        """
+        command = "".join(commands)
         logger.debug("Command to send: {0}".format(command))
         try:
             # Write will only fail if remote is closed for large payloads or
@@ -1149,15 +1520,18 @@ class GatewayConnection(object):
                 "Error while sending", e, proto.ERROR_ON_SEND)
 
         try:
-            answer = smart_decode(self.stream.readline()[:-1])
-            logger.debug("Answer received: {0}".format(answer))
-            if answer.startswith(proto.RETURN_MESSAGE):
-                answer = answer[1:]
-            # Happens when a the other end is dead. There might be an empty
-            # answer before the socket raises an error.
-            if answer.strip() == "":
-                raise Py4JNetworkError("Answer from Java side is empty")
-            return answer
+            answers = []
+            for _ in range(len(commands)):
+                answer = smart_decode(self.stream.readline()[:-1])
+                logger.debug("Answer received: {0}".format(answer))
+                if answer.startswith(proto.RETURN_MESSAGE):
+                    answer = answer[1:]
+                # Happens when a the other end is dead. There might be an
+                # empty answer before the socket raises an error.
+                if answer.strip() == "":
+                    raise Py4JNetworkError("Answer from Java side is empty")
+                answers.append(answer)
+            return answers
         except Exception as e:
             logger.info("Error while receiving.", exc_info=True)
             raise Py4JNetworkError(
@@ -1252,6 +1626,11 @@ class JavaMember(object):
             args_command +\
             proto.END_COMMAND_PART
 
+        get_batch = getattr(self.gateway_client, "_get_batch", None)
+        batch = get_batch() if get_batch else None
+        if batch is not None:
+            return batch.add(command, self.target_id, self.name, temp_args)
+
         answer = self.gateway_client.send_command(command)
         return_value = get_return_value(
             answer, self.gateway_client, self.target_id, self.name)
@@ -1294,6 +1673,11 @@ class JavaObject(object):
 
             ThreadSafeFinalizer.add_finalizer(key, value)
 
+        get_session = getattr(self._gateway_client, "_get_session", None)
+        session = get_session() if get_session else None
+        if session is not None:
+            session.add(self._target_id)
+
     def _detach(self):
         _garbage_collect_object(self._gateway_client, self._target_id)
 
@@ -1986,6 +2370,34 @@ class JavaGateway(object):
         elif close_callback_server_connections:
             self.close_callback_server()
 
+    def batch(self, max_pending=1000):
+        """Returns a :class:`CommandBatch` context manager. Within the `with`
+           block, method calls made by the current thread on Java objects of
+           this gateway are pipelined and return :class:`JavaFuture`
+           instances, which are resolved when the block exits::
+
+            with gateway.batch():
+                futures = [doc.getFilename() for doc in docs]
+            filenames = [future.result() for future in futures]
+
+        :param max_pending: the maximum number of queued calls; when it is
+            reached, the queued calls are sent immediately.
+        """
+        return CommandBatch(self._gateway_client, max_pending)
+
+    def session(self):
+        """Returns a :class:`ReferenceSession` context manager. Java objects
+           received by the current thread within the `with` block are
+           released on the Java side when the block exits, all at once::
+
+            with gateway.session():
+                results = gateway.entry_point.search(query)
+                names = [doc.getFilename() for doc in results]
+
+           The received objects must not be used after the block.
+        """
+        return ReferenceSession(self._gateway_client)
+
     def detach(self, java_object):
         """Makes the Java Gateway dereference this object.
 
@@ -21,18 +21,29 @@ the py4j folder there, or install Py4J separately.
 
 Note that only the main DocFetcher program instance supports scripting, not the
 DocFetcher daemon.
+
+If the DocFetcher instance listens on a Unix domain socket (setting
+"PythonApiSocket" in program-conf.txt), pass the path of the socket file instead
+of the port to the functions below, or run this script with the argument
+"--socket=PATH" before the query. Scripts that call the functions below many
+times should call set_persistent first, so that the connection to the
+DocFetcher instance is reused across calls.
 """
 
 def main():
 	import sys
-	if len(sys.argv) <= 1:
+	args = sys.argv[1:]
+	port = 28834
+	if args and args[0].startswith("--socket="):
+		port = args.pop(0)[len("--socket="):]
+	if not args:
 		print("No query specified.")
 		return
-	query = " ".join(sys.argv[1:])
+	query = " ".join(args)
 	try:
-		result_docs = search(query, 28834)
-		for doc in result_docs:
-			print(doc.getFilename() + "\t" + doc.getPathStr())
+		records = search_columns(query, port, ("filename", "path"))
+		for record in records:
+			print(record.filename + "\t" + record.path)
 	except:
 		print("ERROR: " + str(sys.exc_info()[1]))
 
@@ -58,10 +69,9 @@ def search(query, port):
 	This method will throw an error if communication with the DocFetcher
 	instance fails.
 	"""
-	from py4j.java_gateway import JavaGateway, GatewayParameters
 	from py4j.java_gateway import java_import
 	
-	gateway = JavaGateway(gateway_parameters=GatewayParameters(port=port))
+	gateway = _open_gateway(port)
 	java_import(gateway.jvm, "net.sourceforge.docfetcher.gui.Application")
 	application = gateway.jvm.net.sourceforge.docfetcher.gui.Application
 	
@@ -70,5 +80,620 @@ def search(query, port):
 	results = searcher.search(query)
 	return results
 
+# All column keys understood by search_columns
+COLUMNS = (
+	"title", "filename", "path", "type", "authors", "sender", "lastModified",
+	"date", "parser", "score", "size", "isEmail", "uid")
+
+# string, int, [string] -> [ResultRecord]
+def search_columns(query, port, columns=COLUMNS):
+	"""Like the search function, but fetches the given result attributes of all
+	results at once and returns them as a list of named tuples, e.g. the
+	attribute "path" can be accessed via record.path.
+	
+	This is much faster than calling the getter methods of the result objects
+	returned by the search function, since the latter requires a round-trip to
+	the DocFetcher instance for each call. The available attributes are listed
+	in COLUMNS; "lastModified" and "date" correspond to getLastModifiedStr and
+	getDateStr, and "size" is the file size in KB.
+	
+	This method will throw an error if communication with the DocFetcher
+	instance fails.
+	"""
+	gateway = _open_gateway(port)
+	try:
+		return _fetch_columns(
+			gateway.entry_point.searchColumns, query, ",".join(columns))
+	finally:
+		_close_gateway(gateway)
+
+# [string], int, [string] -> [[ResultRecord]]
+def search_many(queries, port, columns=COLUMNS):
+	"""Sends all given queries at once to the running DocFetcher instance at the
+	given port, which runs them in parallel. Returns one list of records per
+	query, in the same order as the queries. The records are the same as those
+	returned by the search_columns function.
+	
+	This method will throw an error if communication with the DocFetcher
+	instance fails, or if one of the queries fails.
+	"""
+	import struct
+	from py4j.java_collections import ListConverter
+	
+	gateway = _open_gateway(port)
+	try:
+		queries = list(queries)
+		with gateway.session():
+			java_queries = ListConverter().convert(
+				queries, gateway._gateway_client)
+			search_many = gateway.entry_point.searchManyColumns
+			with search_many.stream(java_queries, ",".join(columns)) as stream:
+				results = []
+				for i in range(len(queries)):
+					length = struct.unpack(">i", _read_fully(stream, 4))[0]
+					results.append(decode_columns(_read_fully(stream, length)))
+		return results
+	finally:
+		_close_gateway(gateway)
+
+# string, int, int, [string] -> generator of ResultRecord
+def iter_search(query, port, page_size=50, columns=COLUMNS):
+	"""Like the search_columns function, but returns a generator that fetches
+	the results from a server-side cursor in chunks of the given size. Only the
+	results of the chunks actually fetched are loaded by the DocFetcher
+	instance, so this is the cheapest way to retrieve only the top results of a
+	query, and it avoids holding all results in memory at once.
+	
+	The cursor is closed when the generator is exhausted, closed or garbage-
+	collected. The DocFetcher instance also closes the cursor if the generator
+	isn't advanced for longer than the setting "CursorIdleTimeout" allows, or
+	if one of the searched indexes is removed or rebuilt; fetching the next
+	chunk then fails. This method will throw an error if communication with the
+	DocFetcher instance fails.
+	"""
+	gateway = _open_gateway(port)
+	try:
+		entry_point = gateway.entry_point
+		cursor = entry_point.openCursor(query)
+		try:
+			column_str = ",".join(columns)
+			while True:
+				records = _fetch_columns(
+					entry_point.fetchColumns, cursor, page_size, column_str)
+				for record in records:
+					yield record
+				if not records or len(records) < page_size:
+					break
+		finally:
+			cursor.close()
+	finally:
+		_close_gateway(gateway)
+
+# string, int, [string] -> generator of ExportRecord
+def export_texts(query, port, columns=COLUMNS):
+	"""Runs the given query on the running DocFetcher instance at the given port
+	and returns a generator of named tuples with the fields "uid", "record",
+	"text" and "error", one per result. The record holds the given result
+	attributes as in the search_columns function. The text is the extracted
+	text of the document, or None if the text could not be extracted, in which
+	case the error field holds the error message.
+	
+	All documents are sent over a single stream, and DocFetcher extracts the
+	texts while the stream is being read, so that exporting many documents
+	neither needs one call per document nor holds all texts in memory. The
+	text extraction pauses if the consumer of the generator falls behind. For
+	indexes created with the "StoreOffsets" setting, the texts are read from the
+	index instead of parsing the files again.
+	
+	Like the other search functions, this exports at most as many results as
+	given by the "MaxResultsTotal" setting in the advanced settings file.
+	"""
+	gateway = _open_gateway(port)
+	try:
+		for record in _iter_export(
+				gateway.entry_point.exportTexts, query, ",".join(columns)):
+			yield record
+	finally:
+		_close_gateway(gateway)
+
+# [string], int, [string] -> generator of ExportRecord
+def export_texts_by_uid(uids, port, columns=COLUMNS):
+	"""Like the export_texts function, but exports the documents with the given
+	unique IDs, which can be obtained via the "uid" result attribute. Unknown
+	IDs are skipped.
+	"""
+	from py4j.java_collections import ListConverter
+	
+	gateway = _open_gateway(port)
+	try:
+		java_uids = ListConverter().convert(list(uids), gateway._gateway_client)
+		for record in _iter_export(
+				gateway.entry_point.exportTextsByUid, java_uids, ",".join(columns)):
+			yield record
+	finally:
+		_close_gateway(gateway)
+
+# string, int, int, int, int, [string] -> [(ResultRecord, [Snippet])]
+def search_snippets(query, port, max_results=20, max_snippets=3,
+		context_chars=80, columns=COLUMNS):
+	"""Like the search_columns function, but only returns the top results, each
+	paired with a list of up to max_snippets highlighted snippets of its text.
+	Each snippet is a named tuple with the attributes "text" and "ranges", the
+	latter being a list of (start, length) tuples that mark the matches in the
+	text. The snippets contain at most context_chars characters before the
+	first and after the last match.
+	
+	Snippets are created from the texts stored in the indexes, so the original
+	files need not be available. However, the texts are only stored in indexes
+	created with the setting "StoreOffsets" enabled in the advanced settings
+	file (program-conf.txt). Results from other indexes have no snippets.
+	
+	This method will throw an error if communication with the DocFetcher
+	instance fails.
+	"""
+	import struct
+	
+	gateway = _open_gateway(port)
+	try:
+		search_snippets = gateway.entry_point.searchSnippets
+		with search_snippets.stream(query, ",".join(columns), max_results,
+				max_snippets, context_chars) as stream:
+			length = struct.unpack(">i", _read_fully(stream, 4))[0]
+			records = decode_columns(_read_fully(stream, length))
+			length = struct.unpack(">i", _read_fully(stream, 4))[0]
+			snippets = decode_snippets(_read_fully(stream, length))
+		return list(zip(records, snippets))
+	finally:
+		_close_gateway(gateway)
+
+# int -> {string: int}
+def get_cache_stats(port):
+	"""Returns the counters of the result cache of the running DocFetcher
+	instance at the given port as a dictionary with the keys "hits", "misses",
+	"evictions", "size", "capacity" and "generation". The capacity of the cache
+	can be changed via the setting "SearchCacheCapacity" in the advanced
+	settings file (program-conf.txt).
+	"""
+	gateway = _open_gateway(port)
+	try:
+		stats = gateway.entry_point.getCacheStats()
+		return dict(stats)
+	finally:
+		_close_gateway(gateway)
+
+# int -> {string: number}
+def get_parse_cache_stats(port):
+	"""Returns the counters of the cache of extracted texts of the running
+	DocFetcher instance at the given port as a dictionary with the keys "hits",
+	"misses", "evictions", "size", "bytes" and "capacity", plus the key
+	"hit_rate" with the fraction of lookups that were answered from the cache.
+	The dictionary is empty if the cache is disabled. The size of the cache can
+	be changed via the setting "ParseCacheSize" in the advanced settings file
+	(program-conf.txt).
+	"""
+	gateway = _open_gateway(port)
+	try:
+		stats = dict(gateway.entry_point.getParseCacheStats())
+		if stats:
+			lookups = stats["hits"] + stats["misses"]
+			stats["hit_rate"] = float(stats["hits"]) / lookups if lookups else 0.0
+		return stats
+	finally:
+		_close_gateway(gateway)
+
+# string, int, int -> [string]
+def extract_files(query, port, max_results=20):
+	"""Runs the given query on the running DocFetcher instance at the given port
+	and returns the paths of the files of the top max_results hits, so that
+	they can be opened or read directly. Hits inside archives are unpacked,
+	with all hits inside the same 7z or rar archive being unpacked in a single
+	pass. The list contains None for emails and for files that could not be
+	unpacked. Files unpacked from 7z and rar archives are kept across sessions
+	if the setting "ExtractionCacheSize" in the advanced settings file
+	(program-conf.txt) is greater than 0.
+	"""
+	gateway = _open_gateway(port)
+	try:
+		return list(gateway.entry_point.extractFiles(query, max_results))
+	finally:
+		_close_gateway(gateway)
+
+# int -> {string: number}
+def get_extraction_cache_stats(port):
+	"""Returns the counters of the cache of files unpacked from archives of the
+	running DocFetcher instance at the given port as a dictionary with the keys
+	"hits", "misses", "evictions", "size", "bytes" and "capacity", plus the key
+	"hit_rate" with the fraction of lookups that were answered from the cache.
+	The dictionary is empty if the cache is disabled.
+	"""
+	gateway = _open_gateway(port)
+	try:
+		stats = dict(gateway.entry_point.getExtractionCacheStats())
+		if stats:
+			lookups = stats["hits"] + stats["misses"]
+			stats["hit_rate"] = float(stats["hits"]) / lookups if lookups else 0.0
+		return stats
+	finally:
+		_close_gateway(gateway)
+
+# int -> {string: {string: int}}
+def get_metrics(port):
+	"""Returns the performance metrics of the running DocFetcher instance at the
+	given port as a dictionary of dictionaries, keyed by metric name. Timing
+	metrics such as "search.collect" or "parse.PdfParser" contain the keys
+	"count", "total_us", "mean_us", "max_us", "p50_us", "p95_us" and "p99_us",
+	with durations in microseconds. Counters contain the key "count", and gauges
+	such as "index.queue_depth" contain the key "value". To write the metrics to
+	a file periodically, set "MetricsDumpInterval" in the advanced settings file
+	(program-conf.txt).
+	"""
+	gateway = _open_gateway(port)
+	try:
+		# The nested maps are released on the Java side all at once
+		with gateway.session():
+			metrics = gateway.entry_point.getMetrics()
+			return {name: dict(values) for name, values in metrics.items()}
+	finally:
+		_close_gateway(gateway)
+
+# int -> int
+def get_change_sequence(port):
+	"""Returns the sequence number of the last batch of index changes in the
+	running DocFetcher instance at the given port. Pass this number to
+	get_changes_since or subscribe_changes to receive only subsequent changes.
+	"""
+	gateway = _open_gateway(port)
+	try:
+		return gateway.entry_point.getChangeSequence()
+	finally:
+		_close_gateway(gateway)
+
+# int, int -> ChangeBatches
+def get_changes_since(sequence, port):
+	"""Returns the batches of index changes that the running DocFetcher
+	instance at the given port made after the given sequence number, as a named
+	tuple with the following attributes:
+	- gap: True if some of the requested batches are no longer available. In
+	  this case, no batches are returned, and the caller must find out the
+	  current state of the indexes by other means, e.g. by searching them.
+	- sequence: the sequence number to pass on the next call
+	- batches: list of named tuples with the attributes sequence, type, index,
+	  root, added, updated and removed.
+	
+	The batch type is one of "UPDATE", "RESET" and "INDEX_REMOVED". A "RESET"
+	batch means that the index was created or rebuilt, and that its documents
+	are exactly the added ones. The attribute "index" identifies the index,
+	"root" is the indexed file or folder, and "added", "updated" and "removed"
+	are lists of document UIDs. At most 100 batches are returned per call.
+	
+	The number of batches the DocFetcher instance keeps in memory can be
+	changed via the setting "ChangeFeedCapacity" in the advanced settings file
+	(program-conf.txt).
+	"""
+	import struct
+	
+	gateway = _open_gateway(port)
+	try:
+		get_changes = gateway.entry_point.getChangesSince
+		with get_changes.stream(sequence) as stream:
+			length = struct.unpack(">i", _read_fully(stream, 4))[0]
+			return decode_changes(_read_fully(stream, length))
+	finally:
+		_close_gateway(gateway)
+
+class ChangeSubscription(object):
+	"""A subscription to the index changes of the running DocFetcher instance,
+	as returned by subscribe_changes.
+	"""
+	
+	def __init__(self, gateway, callback):
+		self._gateway = gateway
+		self._callback = callback
+		self._subscription_id = None
+		self.sequence = None
+	
+	def changesPublished(self, data):
+		changes = decode_changes(bytes(data)[4:])
+		self._callback(changes)
+		self.sequence = changes.sequence
+	
+	def close(self):
+		"""Ends the subscription and shuts down the callback server."""
+		try:
+			if self._subscription_id is not None:
+				self._gateway.entry_point.unsubscribeChanges(
+					self._subscription_id)
+		finally:
+			self._gateway.shutdown()
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, type, value, traceback):
+		self.close()
+	
+	class Java:
+		implements = ["net.sourceforge.docfetcher.Py4jHandler$ChangeListener"]
+
+# int, function, int -> ChangeSubscription
+def subscribe_changes(port, callback, sequence=None):
+	"""Subscribes to the index changes of the running DocFetcher instance at
+	the given port. The given callback is called with the same named tuples as
+	returned by get_changes_since, starting with the batches published after
+	the given sequence number, or with the next batch if no sequence number is
+	given. The callback is called from a separate thread, and at most 100
+	batches are passed per call. If the callback receives a tuple whose "gap"
+	attribute is True, some changes were lost, and the caller must find out
+	the current state of the indexes by other means.
+	
+	The changes are pushed to a Py4J callback server that is started by this
+	function on a free port. Call close on the returned subscription object, or
+	use it in a with statement, to end the subscription. The attribute
+	"sequence" of the subscription object holds the sequence number from which
+	a new subscription can resume later.
+	
+	Note that the DocFetcher instance can only push changes to one subscription
+	at a time. This method will throw an error if another subscription is
+	active, or if communication with the DocFetcher instance fails.
+	"""
+	from py4j.java_gateway import JavaGateway
+	from py4j.java_gateway import CallbackServerParameters
+	
+	gateway = JavaGateway(
+		gateway_parameters=_gateway_parameters(port),
+		callback_server_parameters=CallbackServerParameters(port=0))
+	subscription = ChangeSubscription(gateway, callback)
+	try:
+		entry_point = gateway.entry_point
+		if sequence is None:
+			sequence = entry_point.getChangeSequence()
+		subscription.sequence = sequence
+		subscription._subscription_id = entry_point.subscribeChanges(
+			subscription, sequence,
+			gateway.get_callback_server().get_listening_port())
+	except:
+		gateway.shutdown()
+		raise
+	return subscription
+
+def decode_changes(data):
+	"""Decodes the change data sent by the DocFetcher instance, minus the
+	leading length field. See ChangeFeed.encodeBatchesSince in the Java sources
+	for a description of the format.
+	"""
+	import struct
+	from collections import namedtuple
+	
+	ChangeBatches = namedtuple("ChangeBatches", ("gap", "sequence", "batches"))
+	ChangeBatch = namedtuple("ChangeBatch", (
+		"sequence", "type", "index", "root", "added", "updated", "removed"))
+	
+	def read_string(offset):
+		length = struct.unpack_from(">i", data, offset)[0]
+		offset += 4
+		return data[offset:offset + length].decode("utf-8"), offset + length
+	
+	def read_strings(offset):
+		count = struct.unpack_from(">i", data, offset)[0]
+		offset += 4
+		values = []
+		for i in range(count):
+			value, offset = read_string(offset)
+			values.append(value)
+		return values, offset
+	
+	gap, sequence, batch_count = struct.unpack_from(">?qi", data, 0)
+	offset = 13
+	batches = []
+	for i in range(batch_count):
+		batch_sequence = struct.unpack_from(">q", data, offset)[0]
+		offset += 8
+		type, offset = read_string(offset)
+		index, offset = read_string(offset)
+		root, offset = read_string(offset)
+		added, offset = read_strings(offset)
+		updated, offset = read_strings(offset)
+		removed, offset = read_strings(offset)
+		batches.append(ChangeBatch(
+			batch_sequence, type, index, root, added, updated, removed))
+	return ChangeBatches(gap, sequence, batches)
+
+# int, int -> None
+def set_parse_threads(count, port):
+	"""Sets the number of threads that the running DocFetcher instance at the
+	given port uses for extracting text from files during indexing, starting
+	with the next indexing task. The value 0 means: Use as many threads as there
+	are processor cores. The change is not saved; the default value is given by
+	the setting "ParseThreads" in the advanced settings file (program-conf.txt).
+	"""
+	gateway = _open_gateway(port)
+	try:
+		gateway.entry_point.setParseThreads(count)
+	finally:
+		_close_gateway(gateway)
+
+# bool -> None
+def set_persistent(enabled=True):
+	"""Enables or disables the persistent connection mode. In this mode, the
+	functions of this module keep one gateway per port or socket path open
+	across calls, so that only the first call to a DocFetcher instance pays for
+	connecting to it. Broken connections are reopened automatically. Disabling
+	the mode closes the kept connections.
+	"""
+	global _persistent
+	_persistent = enabled
+	if not enabled:
+		gateways = list(_gateways.values())
+		_gateways.clear()
+		for gateway in gateways:
+			gateway.close()
+
+def decode_columns(data):
+	"""Decodes the columnar result data sent by the DocFetcher instance, minus
+	the leading length field, into a list of named tuples. See the Java class
+	ResultColumns for a description of the format.
+	"""
+	import struct
+	from collections import namedtuple
+	
+	row_count, column_count = struct.unpack_from(">ii", data, 0)
+	offset = 8
+	names = []
+	types = []
+	for i in range(column_count):
+		length = struct.unpack_from(">i", data, offset)[0]
+		offset += 4
+		names.append(data[offset:offset + length].decode("utf-8"))
+		offset += length
+		types.append(data[offset:offset + 1].decode("ascii"))
+		offset += 1
+	
+	columns = []
+	for type in types:
+		if type == "s":
+			values = []
+			for i in range(row_count):
+				length = struct.unpack_from(">i", data, offset)[0]
+				offset += 4
+				values.append(data[offset:offset + length].decode("utf-8"))
+				offset += length
+		elif type == "i":
+			values = struct.unpack_from(">%dq" % row_count, data, offset)
+			offset += 8 * row_count
+		elif type == "b":
+			values = [v != 0 for v in struct.unpack_from(
+				">%dB" % row_count, data, offset)]
+			offset += row_count
+		else:
+			raise ValueError("Unknown column type: " + type)
+		columns.append(values)
+	
+	ResultRecord = namedtuple("ResultRecord", names)
+	return [ResultRecord(*row) for row in zip(*columns)]
+
+def decode_snippets(data):
+	"""Decodes the snippet data sent by the DocFetcher instance, minus the
+	leading length field, into one list of snippets per result. See the method
+	encodeSnippets in the Java class ResultColumns for a description of the
+	format.
+	"""
+	import struct
+	from collections import namedtuple
+	
+	Snippet = namedtuple("Snippet", ("text", "ranges"))
+	result_count = struct.unpack_from(">i", data, 0)[0]
+	offset = 4
+	results = []
+	for i in range(result_count):
+		snippet_count = struct.unpack_from(">i", data, offset)[0]
+		offset += 4
+		snippets = []
+		for j in range(snippet_count):
+			length = struct.unpack_from(">i", data, offset)[0]
+			offset += 4
+			text = data[offset:offset + length].decode("utf-8")
+			offset += length
+			range_count = struct.unpack_from(">i", data, offset)[0]
+			offset += 4
+			values = struct.unpack_from(">%di" % (2 * range_count), data, offset)
+			offset += 8 * range_count
+			ranges = list(zip(values[0::2], values[1::2]))
+			snippets.append(Snippet(text, ranges))
+		results.append(snippets)
+	return results
+
+# Gateways kept open in persistent mode, keyed by port or socket path
+_gateways = {}
+_persistent = False
+
+def _gateway_parameters(port):
+	from py4j.java_gateway import GatewayParameters
+	if isinstance(port, int):
+		return GatewayParameters(port=port)
+	return GatewayParameters(unix_socket=port)
+
+def _open_gateway(port):
+	from py4j.java_gateway import JavaGateway
+	gateway = _gateways.get(port)
+	if gateway is None:
+		gateway = JavaGateway(gateway_parameters=_gateway_parameters(port))
+		if _persistent:
+			kept = _gateways.setdefault(port, gateway)
+			if kept is not gateway:
+				gateway.close()
+				gateway = kept
+	return gateway
+
+def _close_gateway(gateway):
+	if not any(gateway is kept for kept in _gateways.values()):
+		gateway.close()
+
+def _fetch_columns(java_method, *args):
+	import struct
+	with java_method.stream(*args) as stream:
+		length = struct.unpack(">i", _read_fully(stream, 4))[0]
+		data = _read_fully(stream, length)
+	return decode_columns(data)
+
+def _iter_export(java_method, *args):
+	"""Decodes the records of the text export stream one at a time. See the
+	Java class TextExportChannel for a description of the format.
+	"""
+	import struct
+	from collections import namedtuple
+	
+	ExportRecord = namedtuple("ExportRecord", ("uid", "record", "text", "error"))
+	with java_method.stream(*args) as stream:
+		column_count = struct.unpack(">i", _read_fully(stream, 4))[0]
+		names = []
+		types = []
+		for i in range(column_count):
+			length = struct.unpack(">i", _read_fully(stream, 4))[0]
+			names.append(_read_fully(stream, length).decode("utf-8"))
+			types.append(_read_fully(stream, 1).decode("ascii"))
+		ResultRecord = namedtuple("ResultRecord", names)
+		
+		while True:
+			length = struct.unpack(">i", _read_fully(stream, 4))[0]
+			if length < 0:
+				break
+			data = _read_fully(stream, length)
+			uid, offset = _unpack_string(data, 0)
+			values = []
+			for type in types:
+				if type == "s":
+					value, offset = _unpack_string(data, offset)
+				elif type == "i":
+					value = struct.unpack_from(">q", data, offset)[0]
+					offset += 8
+				elif type == "b":
+					value = data[offset:offset + 1] != b"\x00"
+					offset += 1
+				else:
+					raise ValueError("Unknown column type: " + type)
+				values.append(value)
+			success = data[offset:offset + 1] != b"\x00"
+			text, offset = _unpack_string(data, offset + 1)
+			if success:
+				yield ExportRecord(uid, ResultRecord(*values), text, None)
+			else:
+				yield ExportRecord(uid, ResultRecord(*values), None, text)
+
+def _unpack_string(data, offset):
+	import struct
+	length = struct.unpack_from(">i", data, offset)[0]
+	offset += 4
+	return data[offset:offset + length].decode("utf-8"), offset + length
+
+def _read_fully(stream, length):
+	chunks = []
+	while length > 0:
+		chunk = stream.read(length)
+		if not chunk:
+			raise EOFError("Connection closed by DocFetcher instance.")
+		chunks.append(chunk)
+		length -= len(chunk)
+	return b"".join(chunks)
+
 if __name__ == "__main__":
 	main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+An asyncio-based client for scripting the running DocFetcher instance. Unlike
+the functions in search.py, which use Py4J's blocking sockets, this client
+speaks the Py4J protocol over asyncio streams, so that a single event loop can
+run many searches concurrently without a thread per search.
+
+Example:
+
+	import asyncio
+	from search_async import AsyncSearchClient
+
+	async def main():
+		async with AsyncSearchClient(28834) as client:
+			results = await asyncio.gather(
+				client.search("foo"), client.search("bar"))
+			for records in results:
+				for record in records:
+					print(record.filename + "\t" + record.path)
+
+	asyncio.run(main())
+
+Cancelling a pending search (e.g. via asyncio.wait_for with a timeout) also
+stops the search in the DocFetcher instance.
+
+As with search.py, the Python API must be enabled in the advanced settings file
+(program-conf.txt) by setting "PythonApiEnabled" to "true". This module
+requires Python 3.7 or later and the py4j folder shipped with DocFetcher, which
+must be in the same folder as this module.
+"""
+
+import asyncio
+import struct
+import uuid
+
+from py4j import protocol as proto
+from search import COLUMNS, decode_columns
+
+class AsyncSearchClient(object):
+	"""A pool of asyncio connections to the DocFetcher instance at the given
+	port. At most max_connections commands are sent concurrently; further
+	commands wait until a connection becomes available. Connections are opened
+	on demand and reused afterwards.
+	"""
+
+	def __init__(self, port, address="127.0.0.1", max_connections=16):
+		self.port = port
+		self.address = address
+		self._semaphore = asyncio.Semaphore(max_connections)
+		self._idle = []
+		self._background = set()
+		self._closed = False
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, type, value, traceback):
+		await self.close()
+
+	# string, [string] -> [ResultRecord]
+	async def search(self, query, columns=COLUMNS):
+		"""Sends the given query to the DocFetcher instance and returns the
+		given result attributes of all results as a list of named tuples, same
+		as the search_columns function in search.py.
+
+		If the returned coroutine is cancelled, the search is stopped in the
+		DocFetcher instance as well.
+		"""
+		search_id = uuid.uuid4().hex
+		try:
+			data = await self._stream(
+				proto.ENTRY_POINT_OBJECT_ID, "searchColumns",
+				search_id, query, ",".join(columns))
+		except asyncio.CancelledError:
+			# If this overtakes the search request, the DocFetcher instance
+			# stops the search as soon as it starts
+			self._run_in_background(self._call(
+				proto.ENTRY_POINT_OBJECT_ID, "cancelSearch", search_id))
+			raise
+		return decode_columns(data)
+
+	async def stop_search(self):
+		"""Stops all searches currently running in the DocFetcher instance,
+		including those of other clients.
+		"""
+		await self._call(proto.ENTRY_POINT_OBJECT_ID, "stopSearch")
+
+	async def close(self):
+		"""Waits for pending search cancellations and closes all connections.
+		"""
+		self._closed = True
+		if self._background:
+			await asyncio.gather(*self._background, return_exceptions=True)
+		while self._idle:
+			await self._idle.pop().close()
+
+	def _run_in_background(self, coroutine):
+		task = asyncio.ensure_future(coroutine)
+		self._background.add(task)
+		task.add_done_callback(self._background.discard)
+
+	async def _call(self, target_id, name, *args):
+		command = _build_command(proto.CALL_COMMAND_NAME, target_id, name, args)
+		async with self._semaphore:
+			connection = await self._get_connection()
+			try:
+				answer = await connection.send_command(command)
+				await self._check_answer(connection, answer, target_id, name)
+			except BaseException:
+				await connection.close()
+				raise
+			self._give_back_connection(connection)
+		return _get_return_value(answer)
+
+	async def _stream(self, target_id, name, *args):
+		command = _build_command(
+			proto.STREAM_COMMAND_NAME, target_id, name, args)
+		async with self._semaphore:
+			connection = await self._get_connection()
+			try:
+				answer = await connection.send_command(command)
+				await self._check_answer(connection, answer, target_id, name)
+				length = struct.unpack(
+					">i", await connection.reader.readexactly(4))[0]
+				data = await connection.reader.readexactly(length)
+			except BaseException:
+				# Closing the connection discards any unread data
+				await connection.close()
+				raise
+			self._give_back_connection(connection)
+		return data
+
+	async def _check_answer(self, connection, answer, target_id, name):
+		if not proto.is_error(answer)[0]:
+			return
+		message = "An error occurred while calling {0}.{1}".format(
+			target_id, name)
+		if answer[1:2] == proto.REFERENCE_TYPE:
+			# Fetch the Java stack trace and release the exception object
+			exception_id = answer[2:]
+			trace = await connection.send_command(
+				proto.EXCEPTION_COMMAND_NAME + proto.REFERENCE_TYPE +
+				exception_id + "\n" + proto.END_COMMAND_PART)
+			await connection.send_command(
+				proto.MEMORY_COMMAND_NAME + proto.MEMORY_DEL_SUBCOMMAND_NAME +
+				exception_id + "\n" + proto.END_COMMAND_PART)
+			if not proto.is_error(trace)[0]:
+				message += ":\n" + _get_return_value(trace)
+		raise proto.Py4JError(message)
+
+	async def _get_connection(self):
+		if self._closed:
+			raise proto.Py4JNetworkError("Client has been closed.")
+		if self._idle:
+			return self._idle.pop()
+		try:
+			reader, writer = await asyncio.open_connection(
+				self.address, self.port)
+		except OSError as e:
+			msg = "An error occurred while trying to connect to the Java "\
+				"server ({0}:{1})".format(self.address, self.port)
+			raise proto.Py4JNetworkError(msg, e)
+		return _AsyncConnection(reader, writer)
+
+	def _give_back_connection(self, connection):
+		if self._closed:
+			self._run_in_background(connection.close())
+		else:
+			self._idle.append(connection)
+
+class _AsyncConnection(object):
+
+	def __init__(self, reader, writer):
+		self.reader = reader
+		self.writer = writer
+
+	async def send_command(self, command):
+		try:
+			self.writer.write(command.encode("utf-8"))
+			await self.writer.drain()
+		except OSError as e:
+			raise proto.Py4JNetworkError(
+				"Error while sending", e, proto.ERROR_ON_SEND)
+		try:
+			answer = (await self.reader.readline())[:-1].decode("utf-8")
+		except OSError as e:
+			raise proto.Py4JNetworkError(
+				"Error while receiving", e, proto.ERROR_ON_RECEIVE)
+		if answer.startswith(proto.RETURN_MESSAGE):
+			answer = answer[1:]
+		if answer.strip() == "":
+			raise proto.Py4JNetworkError(
+				"Answer from Java side is empty", when=proto.ERROR_ON_RECEIVE)
+		return answer
+
+	async def close(self):
+		self.writer.close()
+		try:
+			await self.writer.wait_closed()
+		except OSError:
+			pass
+
+def _build_command(command_name, target_id, name, args):
+	return command_name + target_id + "\n" + name + "\n" +\
+		"".join(proto.get_command_part(arg) for arg in args) +\
+		proto.END_COMMAND_PART
+
+def _get_return_value(answer):
+	# Only primitive return values are supported, since this client doesn't
+	# manage references to Java objects
+	type = answer[1]
+	if type == proto.VOID_TYPE:
+		return None
+	if type == proto.REFERENCE_TYPE:
+		raise proto.Py4JError("Unexpected object reference: " + answer)
+	return proto.OUTPUT_CONVERTER[type](answer[2:], None)
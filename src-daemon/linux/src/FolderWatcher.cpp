@@ -39,7 +39,7 @@
  * constructor
  *
  */
-FolderWatcher::FolderWatcher():CHAR_MODIFIED('#') {
+FolderWatcher::FolderWatcher():CHAR_MODIFIED('#'),MAX_CHANGES(10000) {
 }
 
 /**
@@ -98,6 +98,9 @@ bool FolderWatcher::startWatch() {
 
 	_fd = inotify_init();
 
+	// the changes file is put next to the indexes file
+	_changes_file_path = _indexes_file_path.substr(0, _indexes_file_path.rfind('/') + 1) + ".changes.txt";
+
 
 	std::string file_name;
 
@@ -115,10 +118,12 @@ bool FolderWatcher::startWatch() {
 								//|IN_OPEN				//File was opened (*)
 								;
 
+	_notify_filter = notifyFilter;
 
 
 	WatchedFolder aWatchedFolder;
 	aWatchedFolder._modified = false;
+	aWatchedFolder._change_count = 0;
 
 	int watchId = 0;
 
@@ -161,6 +166,7 @@ bool FolderWatcher::addWatchRecursive(const bool isRoot, const int watchId, cons
 			return false;
 		}else{
 			_inotify2id.insert(std::make_pair(inotifyId, watchId));
+			_inotify2path[inotifyId] = folder_name;
 			log("watch added for root=%s", folder_name.c_str());
 		}
 	}
@@ -200,6 +206,7 @@ bool FolderWatcher::addWatchRecursive(const bool isRoot, const int watchId, cons
 				continue;
 			}else{
 				_inotify2id.insert(std::make_pair(inotifyId, watchId));
+				_inotify2path[inotifyId] = sub_folder_name;
 				log("watch added for sub_dir=%s", sub_folder_name.c_str());
 
 				addWatchRecursive(false, watchId, sub_folder_name, notifyFilter);
@@ -225,6 +232,7 @@ bool FolderWatcher::stopWatch() {
 
 	_indexed_folders.clear();
 	_inotify2id.clear();
+	_inotify2path.clear();
 
 	close(_fd);
 	_fd = -1;
@@ -238,33 +246,93 @@ bool FolderWatcher::stopWatch() {
 /**
  * Watches' callback
  *
- * Removes the watch and updates the indexes file
+ * Appends the changed path to the changes file and updates the indexes file.
+ * If there are too many changes in an indexed folder, the whole folder is
+ * marked as changed and its watches are removed.
  *
  */
-void FolderWatcher::callback(int inotifyId, int action) {
+void FolderWatcher::callback(int inotifyId, int action, const char *name) {
 	log("callback : inotifyId=%d,action=%d", inotifyId, action);
 
+	// events were lost, so all indexed folders must be rescanned
+	if(action & IN_Q_OVERFLOW) {
+		folders_container_type::iterator itFolder;
+		for(itFolder = _indexed_folders.begin() ; itFolder != _indexed_folders.end() ; ++itFolder) {
+			if(itFolder->second._change_count < MAX_CHANGES) {
+				itFolder->second._change_count = MAX_CHANGES;
+				itFolder->second._modified = true;
+				appendChange('M', itFolder->second._path);
+				removeWatches(itFolder->first);
+			}
+		}
+		updateIndexesFile();
+		return;
+	}
+
 	if(_inotify2id.find(inotifyId) == _inotify2id.end()) {
 		log("id unknown ???");
 		return;
 	}
 
+	// the watch was removed, either by us or because the folder is gone
+	if(action & IN_IGNORED) {
+		_inotify2id.erase(inotifyId);
+		_inotify2path.erase(inotifyId);
+		return;
+	}
+
 	const int watchId = _inotify2id[inotifyId];
+	WatchedFolder &aWatchedFolder = _indexed_folders[watchId];
 
-	if(_indexed_folders[watchId]._modified == true){
+	if(aWatchedFolder._change_count >= MAX_CHANGES){
 		log("already done...");
 		return;
 
 	}
 
-	for(inotify2id_container_type::const_iterator it = _inotify2id.begin() ; it != _inotify2id.end() ; ++it) {
-		if(it->second == watchId) {
-			inotify_rm_watch(_fd, it->first);
+	std::string path = _inotify2path[inotifyId];
+	if(name != NULL && name[0] != 0) {
+		path += "/";
+		path += name;
+	}
+
+	char type;
+	if(action & IN_CREATE) {
+		type = 'C';
+	}else if(action & IN_MOVED_TO) {
+		type = 'R';
+	}else if(action & (IN_DELETE | IN_DELETE_SELF | IN_MOVED_FROM | IN_MOVE_SELF)) {
+		type = 'D';
+	}else{
+		type = 'M';
+	}
+
+	// folders created in or moved into a watched folder must be watched too
+	if((action & IN_ISDIR) && (action & (IN_CREATE | IN_MOVED_TO))) {
+		int newInotifyId = inotify_add_watch(_fd, path.c_str(), _notify_filter);
+		if(newInotifyId == -1) {
+			log("error inotify_add_watch for new_dir=%s", path.c_str());
+		}else{
+			_inotify2id[newInotifyId] = watchId;
+			_inotify2path[newInotifyId] = path;
+			addWatchRecursive(false, watchId, path, _notify_filter);
 		}
+	}
 
+	aWatchedFolder._change_count++;
+	if(aWatchedFolder._change_count >= MAX_CHANGES) {
+		log("too many changes : %s", aWatchedFolder._path.c_str());
+		appendChange('M', aWatchedFolder._path);
+		removeWatches(watchId);
+	}else{
+		appendChange(type, path);
+	}
+
+	if(aWatchedFolder._modified == true){
+		return;
 	}
 
-	_indexed_folders[watchId]._modified = true;
+	aWatchedFolder._modified = true;
 
 	if(!updateIndexesFile()){
 		log("updateIndexesFile failed");
@@ -274,6 +342,37 @@ void FolderWatcher::callback(int inotifyId, int action) {
 }
 
 
+/**
+ * Removes all watches of an indexed folder
+ *
+ */
+void FolderWatcher::removeWatches(const int watchId) {
+	for(inotify2id_container_type::const_iterator it = _inotify2id.begin() ; it != _inotify2id.end() ; ++it) {
+		if(it->second == watchId) {
+			inotify_rm_watch(_fd, it->first);
+		}
+
+	}
+}
+
+
+/**
+ * Appends a line to the changes file
+ *
+ * The line consists of the type of the change, a space and the changed path.
+ *
+ */
+bool FolderWatcher::appendChange(const char type, const std::string &path) {
+	std::ofstream out(_changes_file_path.c_str(), std::ios::app);
+	if(!out) {
+		log("Cannot open changes file (%s)", _changes_file_path.c_str());
+		return false;
+	}
+	out << type << ' ' << path << std::endl;
+	return true;
+}
+
+
 
 /**
  * Writes the indexes file
@@ -316,7 +415,7 @@ void FolderWatcher::run()
 	    while (i < len)
 	    {
 	        struct inotify_event *event = (struct inotify_event *) &buf[i];
-	       	callback(event->wd, event->mask);
+	       	callback(event->wd, event->mask, event->len > 0 ? event->name : NULL);
 
 	        i += sizeof (struct inotify_event) + event->len;
 	    }
@@ -15,12 +15,14 @@
 struct WatchedFolder {
 	std::string _path;
 	bool _modified;
+	int _change_count;
 };
 
 class FolderWatcher {
 public:
 	typedef std::map<int,WatchedFolder> folders_container_type;
 	typedef std::map<int,int> 			inotify2id_container_type;
+	typedef std::map<int,std::string>	inotify2path_container_type;
 
 	FolderWatcher();
 	virtual ~FolderWatcher();
@@ -37,18 +39,24 @@ public:
 
 private:
 	bool updateIndexesFile();
+	bool appendChange(const char, const std::string &);
+	void removeWatches(const int);
 	bool addWatchRecursive(const bool, const int, const std::string &, const long);
 
 
 
-	void callback(int watchID, int action);
+	void callback(int inotifyId, int action, const char *name);
 
 	std::string _indexes_file_path;
+	std::string _changes_file_path;
 	const char CHAR_MODIFIED;
+	const int MAX_CHANGES;
+	long _notify_filter;
 
 
 	folders_container_type _indexed_folders;
 	inotify2id_container_type   _inotify2id;
+	inotify2path_container_type _inotify2path;
 
 	int _fd;
 };
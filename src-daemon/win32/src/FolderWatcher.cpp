@@ -49,7 +49,7 @@ extern HWND _hwndMain;
  * constructor
  *
  */
-FolderWatcher::FolderWatcher():CHAR_MODIFIED('#') {
+FolderWatcher::FolderWatcher():CHAR_MODIFIED('#'),MAX_CHANGES(10000) {
 	_this = this;
 }
 
@@ -79,6 +79,9 @@ bool FolderWatcher::startWatch() {
 		return false;
 	}
 
+	// the changes file is put next to the indexes file
+	_changes_file_path = _indexes_file_path.substr(0, _indexes_file_path.rfind('\\') + 1) + ".changes.txt";
+
 	WCHAR  file_name [MAX_PATH * MB_CUR_MAX];
 	DWORD error;
 
@@ -102,6 +105,7 @@ bool FolderWatcher::startWatch() {
 
 	WatchedFolder aWatchedFolder;
 	aWatchedFolder._modified = false;
+	aWatchedFolder._change_count = 0;
 
 	log("locking");
 	RaiiLocker aLock(_lock);
@@ -164,7 +168,9 @@ bool FolderWatcher::stopWatch() {
 /**
  * Watches' callback
  *
- * Removes the watch and updates the indexes file
+ * Appends the changed path to the changes file and updates the indexes file.
+ * If there are too many changes in an indexed folder, the whole folder is
+ * marked as changed and the watch is removed.
  *
  */
 void FolderWatcher::callback(int watchID, int action, const WCHAR* rootPath, const WCHAR* filePath) {
@@ -181,16 +187,47 @@ void FolderWatcher::callback(int watchID, int action, const WCHAR* rootPath, con
 		return;
 	}
 
-	// impossible to remove here, we tell the main thread to do it
-	::PostMessage(_hwndMain, WM_REMOVE_WATCH, 0, watchID);
+	WatchedFolder &aWatchedFolder = _this->_indexed_folders[watchID];
 
-	if(_this->_indexed_folders[watchID]._modified == true){
+	if(aWatchedFolder._change_count >= _this->MAX_CHANGES){
 		log("already done...");
 		return;
 
 	}
 
-	_this->_indexed_folders[watchID]._modified = true;
+	char type;
+	switch(action) {
+	case FILE_ACTION_ADDED:
+		type = 'C';
+		break;
+	case FILE_ACTION_REMOVED:
+	case FILE_ACTION_RENAMED_OLD_NAME:
+		type = 'D';
+		break;
+	case FILE_ACTION_RENAMED_NEW_NAME:
+		type = 'R';
+		break;
+	default:
+		type = 'M';
+		break;
+	}
+
+	aWatchedFolder._change_count++;
+	if(aWatchedFolder._change_count >= _this->MAX_CHANGES) {
+		log("too many changes : %s", aWatchedFolder._path.c_str());
+		_this->appendChange('M', toUtf8(rootPath));
+
+		// impossible to remove here, we tell the main thread to do it
+		::PostMessage(_hwndMain, WM_REMOVE_WATCH, 0, watchID);
+	}else{
+		_this->appendChange(type, toUtf8(rootPath) + "\\" + toUtf8(filePath));
+	}
+
+	if(aWatchedFolder._modified == true){
+		return;
+	}
+
+	aWatchedFolder._modified = true;
 
 	if(!_this->updateIndexesFile()){
 		log("updateIndexesFile failed");
@@ -242,6 +279,38 @@ bool FolderWatcher::findIndexesFile() {
 	}
 }
 
+/**
+ * Appends a line to the changes file
+ *
+ * The line consists of the type of the change, a space and the changed path.
+ *
+ */
+bool FolderWatcher::appendChange(const char type, const std::string &path) {
+	std::ofstream out(_changes_file_path.c_str(), std::ios::app);
+	if(!out) {
+		log("Cannot open changes file (%s)", _changes_file_path.c_str());
+		return false;
+	}
+	out << type << ' ' << path << std::endl;
+	return true;
+}
+
+/**
+ * Converts a wide string to UTF-8, the encoding of the changes file
+ *
+ */
+std::string FolderWatcher::toUtf8(const WCHAR* str) {
+	int size = ::WideCharToMultiByte(CP_UTF8, 0, str, -1, NULL, 0, NULL, NULL);
+	if(size <= 0) {
+		log("Cannot convert path to UTF-8, error=%d", ::GetLastError());
+		return std::string();
+	}
+	std::string result(size, '\0');
+	::WideCharToMultiByte(CP_UTF8, 0, str, -1, &result[0], size, NULL, NULL);
+	result.resize(size - 1); // without the terminating null character
+	return result;
+}
+
 /**
  * Writes the indexes file
  *
@@ -22,6 +22,7 @@
 struct WatchedFolder {
 	std::string _path;
 	bool _modified;
+	int _change_count;
 };
 
 class FolderWatcher {
@@ -40,11 +41,15 @@ public:
 
 private:
 	std::string _indexes_file_path;
+	std::string _changes_file_path;
 	const char CHAR_MODIFIED;
+	const int MAX_CHANGES;
 
 	static void callback(int watchID, int action, const WCHAR* rootPath, const WCHAR* filePath);
 
 	bool updateIndexesFile();
+	bool appendChange(const char, const std::string &);
+	static std::string toUtf8(const WCHAR*);
 
 	folders_container_type _indexed_folders;
 
@@ -11,25 +11,590 @@
 
 package net.sourceforge.docfetcher;
 
+import java.io.ByteArrayInputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.File;
+import java.io.FileNotFoundException;
+import java.nio.channels.Channels;
+import java.nio.channels.ReadableByteChannel;
+import java.util.ArrayList;
+import java.util.Iterator;
+import java.util.LinkedHashSet;
+import java.util.List;
+import java.util.Map;
+import java.util.UUID;
+import java.util.concurrent.ConcurrentHashMap;
+import java.util.concurrent.CountDownLatch;
+import java.util.concurrent.atomic.AtomicBoolean;
+
 import net.sourceforge.docfetcher.enums.ProgramConf;
+import net.sourceforge.docfetcher.gui.Application;
+import net.sourceforge.docfetcher.model.Cancelable;
+import net.sourceforge.docfetcher.model.ExtractionCache;
+import net.sourceforge.docfetcher.model.FileResource;
+import net.sourceforge.docfetcher.model.IndexRegistry;
+import net.sourceforge.docfetcher.model.LuceneIndex;
+import net.sourceforge.docfetcher.model.index.ChangeFeed;
+import net.sourceforge.docfetcher.model.index.ChangeFeed.EncodedBatches;
+import net.sourceforge.docfetcher.model.index.IndexingQueue;
+import net.sourceforge.docfetcher.model.index.IndexingQueue.Rejection;
+import net.sourceforge.docfetcher.model.index.Task;
+import net.sourceforge.docfetcher.model.index.Task.IndexAction;
+import net.sourceforge.docfetcher.model.index.file.FileIndex;
+import net.sourceforge.docfetcher.model.parse.ParseCache;
+import net.sourceforge.docfetcher.model.parse.ParseException;
+import net.sourceforge.docfetcher.model.parse.ParseService;
+import net.sourceforge.docfetcher.model.search.HighlightedString;
+import net.sourceforge.docfetcher.model.search.ResultColumns;
+import net.sourceforge.docfetcher.model.search.ResultDocument;
+import net.sourceforge.docfetcher.model.search.SearchCursor;
+import net.sourceforge.docfetcher.model.search.SearchException;
+import net.sourceforge.docfetcher.model.search.Searcher;
+import net.sourceforge.docfetcher.model.search.TextExportChannel;
+import net.sourceforge.docfetcher.util.CheckedOutOfMemoryError;
+import net.sourceforge.docfetcher.util.Event;
+import net.sourceforge.docfetcher.util.Metrics;
+import net.sourceforge.docfetcher.util.UnixServerSocket;
+import net.sourceforge.docfetcher.util.Util;
+import py4j.CallbackClient;
 import py4j.GatewayServer;
 
 /**
  * Created by huzhengmian on 2018/5/5.
+ * <p>
+ * The public instance methods of this class are available to scripting
+ * clients as the gateway's entry point.
  */
 public class Py4jHandler {
 
+    /**
+     * Callback interface for change feed subscriptions, to be implemented by
+     * scripting clients via Py4J's callback server. The given data has the
+     * format described in {@link ChangeFeed#encodeBatchesSince(long, int)}.
+     */
+    public interface ChangeListener {
+        public void changesPublished(byte[] data);
+    }
+
+    private static final int MAX_CHANGE_BATCHES = 100;
+
+    /*
+     * How long the IDs of searches canceled before they were started are
+     * remembered, in milliseconds. The cancel request is sent over another
+     * connection, so it may overtake the search request.
+     */
+    private static final long CANCELED_SEARCH_RETENTION = 60 * 1000;
+
     private static GatewayServer server;
+    private final Map<String, AtomicBoolean> runningSearches = new ConcurrentHashMap<String, AtomicBoolean>();
+    private final Map<String, Long> canceledSearches = new ConcurrentHashMap<String, Long>();
+    private final Map<String, Thread> changeSubscriptions = new ConcurrentHashMap<String, Thread>();
     private static synchronized GatewayServer getServer(){
+        String socketPath = ProgramConf.Str.PythonApiSocket.get().trim();
+        if (!socketPath.isEmpty() && !Util.IS_WINDOWS)
+            return getServer(new File(socketPath));
+        return getServer(ProgramConf.Int.PythonApiPort.get());
+    }
+    private static synchronized GatewayServer getServer(int port){
+        if(server==null){
+            server = new GatewayServer(new Py4jHandler(), port);
+        }
+        return server;
+    }
+
+    /**
+     * Returns a gateway server that listens on the given Unix domain socket
+     * file instead of a TCP port, see {@link UnixServerSocket}. The callback
+     * client for pushing changes to Python clients still uses TCP.
+     */
+    private static synchronized GatewayServer getServer(File socketFile){
         if(server==null){
-            server = new GatewayServer(new Py4jHandler(), ProgramConf.Int.PythonApiPort.get());
+            server = new GatewayServer(
+                new Py4jHandler(), 0, GatewayServer.defaultAddress(),
+                GatewayServer.DEFAULT_CONNECT_TIMEOUT,
+                GatewayServer.DEFAULT_READ_TIMEOUT, null,
+                new CallbackClient(GatewayServer.DEFAULT_PYTHON_PORT),
+                UnixServerSocket.createFactory(socketFile));
         }
         return server;
     }
     public static void openGatewayServer(){
         getServer().start();
     }
+    public static void openGatewayServer(int port){
+        getServer(port).start();
+    }
+    public static void openGatewayServer(File socketFile){
+        getServer(socketFile).start();
+    }
     public static void shutdownGatewayServer(){
         getServer().shutdown();
     }
+
+    /**
+     * Runs the given query and returns the requested result attributes of all
+     * hits as one binary payload, to be read via Py4J's stream protocol. The
+     * columns are given as a comma-separated list of keys, see
+     * {@link ResultColumns.Column}. An empty string selects all columns.
+     */
+    public ReadableByteChannel searchColumns(String query, String columns)
+            throws SearchException, CheckedOutOfMemoryError {
+        List<ResultColumns.Column> columnList = ResultColumns.parseColumns(columns);
+        List<ResultDocument> results = getSearcher().search(query);
+        byte[] bytes = ResultColumns.encode(results, columnList);
+        return Channels.newChannel(new ByteArrayInputStream(bytes));
+    }
+
+    /**
+     * Runs the given query and returns the requested result attributes of the
+     * top <tt>maxResults</tt> hits, followed by up to <tt>maxSnippets</tt>
+     * highlighted snippets per hit, as one binary payload. The result
+     * attributes are encoded as in {@link #searchColumns(String, String)}, the
+     * snippets as described in {@link ResultColumns#encodeSnippets(List)}.
+     * Snippets are only available for indexes that store the extracted texts,
+     * see {@link Searcher#getSnippets(List, int, int)}.
+     */
+    public ReadableByteChannel searchSnippets(String query, String columns,
+                                              int maxResults, int maxSnippets,
+                                              int contextChars)
+            throws SearchException, CheckedOutOfMemoryError {
+        List<ResultColumns.Column> columnList = ResultColumns.parseColumns(columns);
+        Searcher searcher = getSearcher();
+        List<ResultDocument> results = searcher.search(query);
+        if (results.size() > maxResults)
+            results = results.subList(0, maxResults);
+        List<List<HighlightedString>> snippets = searcher.getSnippets(
+            results, maxSnippets, contextChars);
+        ByteArrayOutputStream out = new ByteArrayOutputStream();
+        byte[] bytes = ResultColumns.encode(results, columnList);
+        out.write(bytes, 0, bytes.length);
+        bytes = ResultColumns.encodeSnippets(snippets);
+        out.write(bytes, 0, bytes.length);
+        return Channels.newChannel(new ByteArrayInputStream(out.toByteArray()));
+    }
+
+    /**
+     * Same as {@link #searchColumns(String, String)}, but the search can be
+     * stopped from another connection by passing the given client-chosen ID
+     * to {@link #cancelSearch(String)}.
+     */
+    public ReadableByteChannel searchColumns(String searchId, String query, String columns)
+            throws SearchException, CheckedOutOfMemoryError {
+        List<ResultColumns.Column> columnList = ResultColumns.parseColumns(columns);
+        final AtomicBoolean canceled = new AtomicBoolean(false);
+        runningSearches.put(searchId, canceled);
+        if (canceledSearches.remove(searchId) != null)
+            canceled.set(true);
+        List<ResultDocument> results;
+        try {
+            results = getSearcher().search(query, new Cancelable() {
+                public boolean isCanceled() {
+                    return canceled.get();
+                }
+            });
+        }
+        finally {
+            runningSearches.remove(searchId);
+        }
+        byte[] bytes = ResultColumns.encode(results, columnList);
+        return Channels.newChannel(new ByteArrayInputStream(bytes));
+    }
+
+    /**
+     * Stops the search with the given ID, if it's still running. Unlike
+     * {@link #stopSearch()}, this does not affect any other searches. If the
+     * search hasn't been started yet, it is stopped as soon as it starts,
+     * provided that this happens within a minute.
+     */
+    public void cancelSearch(String searchId) {
+        AtomicBoolean canceled = runningSearches.get(searchId);
+        if (canceled != null) {
+            canceled.set(true);
+            return;
+        }
+        long now = System.currentTimeMillis();
+        Iterator<Long> it = canceledSearches.values().iterator();
+        while (it.hasNext())
+            if (now - it.next() > CANCELED_SEARCH_RETENTION)
+                it.remove();
+        canceledSearches.put(searchId, now);
+
+        // The search may have been started in the meantime
+        canceled = runningSearches.get(searchId);
+        if (canceled != null)
+            canceled.set(true);
+    }
+
+    /**
+     * Stops all running searches, see {@link Searcher#stopSearch()}.
+     */
+    public void stopSearch() throws SearchException {
+        getSearcher().stopSearch();
+    }
+
+    /**
+     * Runs the given queries in parallel and returns their results as one
+     * binary payload, consisting of one chunk per query in the same format as
+     * {@link #searchColumns}, in the order of the given queries.
+     */
+    public ReadableByteChannel searchManyColumns(List<String> queries, String columns)
+            throws SearchException, CheckedOutOfMemoryError {
+        List<ResultColumns.Column> columnList = ResultColumns.parseColumns(columns);
+        List<List<ResultDocument>> resultLists = getSearcher().searchMany(queries);
+        ByteArrayOutputStream out = new ByteArrayOutputStream();
+        for (List<ResultDocument> results : resultLists) {
+            byte[] bytes = ResultColumns.encode(results, columnList);
+            out.write(bytes, 0, bytes.length);
+        }
+        return Channels.newChannel(new ByteArrayInputStream(out.toByteArray()));
+    }
+
+    /**
+     * Opens a server-side cursor for the given query. Results are fetched
+     * from the cursor in chunks via {@link #fetchColumns}. The cursor must be
+     * closed by the client after usage. Cursors from which no results have
+     * been fetched for the time given by the program setting
+     * "CursorIdleTimeout" are closed automatically, and so are cursors over
+     * indexes that are being removed or rebuilt. Fetching from such a cursor
+     * fails.
+     */
+    public SearchCursor openCursor(String query)
+            throws SearchException, CheckedOutOfMemoryError {
+        return getSearcher().openCursor(query);
+    }
+
+    /**
+     * Fetches the next chunk of at most <tt>count</tt> results from the given
+     * cursor, in the same binary format as {@link #searchColumns}. An empty
+     * chunk indicates that the cursor is exhausted.
+     */
+    public ReadableByteChannel fetchColumns(SearchCursor cursor, int count, String columns)
+            throws SearchException, CheckedOutOfMemoryError {
+        List<ResultColumns.Column> columnList = ResultColumns.parseColumns(columns);
+        List<ResultDocument> results = cursor.next(count);
+        byte[] bytes = ResultColumns.encode(results, columnList);
+        return Channels.newChannel(new ByteArrayInputStream(bytes));
+    }
+
+    /**
+     * Returns the counters of the searcher's result cache, see
+     * {@link Searcher#getCacheStats()}.
+     */
+    public Map<String, Long> getCacheStats() throws SearchException {
+        return getSearcher().getCacheStats();
+    }
+
+    /**
+     * Runs the given query and streams the unique IDs, the requested result
+     * attributes and the extracted texts of all hits, to be read via Py4J's
+     * stream protocol. The format is described in {@link TextExportChannel}.
+     * The columns are given as in {@link #searchColumns(String, String)}.
+     * <p>
+     * The hits are fetched from a {@link SearchCursor} and their texts are
+     * extracted one document at a time while the client reads the stream, so
+     * exporting many documents needs neither one call per document nor memory
+     * for all texts at once. Texts stored in the index are used instead of
+     * parsing the files again. As with {@link #openCursor(String)}, at most
+     * as many hits as given by the program setting "MaxResultsTotal" are
+     * exported.
+     */
+    public ReadableByteChannel exportTexts(String query, String columns)
+            throws SearchException, CheckedOutOfMemoryError {
+        List<ResultColumns.Column> columnList = ResultColumns.parseColumns(columns);
+        Searcher searcher = getSearcher();
+        return new TextExportChannel(searcher, searcher.openCursor(query), columnList);
+    }
+
+    /**
+     * Same as {@link #exportTexts(String, String)}, but exports the documents
+     * with the given unique IDs, as accepted by {@link Searcher#list(java.util.Set)}.
+     * Unknown IDs are skipped.
+     */
+    public ReadableByteChannel exportTextsByUid(List<String> uids, String columns)
+            throws SearchException, CheckedOutOfMemoryError {
+        List<ResultColumns.Column> columnList = ResultColumns.parseColumns(columns);
+        Searcher searcher = getSearcher();
+        List<ResultDocument> results = searcher.list(
+            new LinkedHashSet<String>(uids));
+        return new TextExportChannel(searcher, results, columnList);
+    }
+
+    /**
+     * Runs the given query and returns the paths of the files of the top
+     * <tt>maxResults</tt> hits, so that clients can open or read them. Hits
+     * inside archives are unpacked, with all hits inside the same 7z or rar
+     * archive being unpacked in a single pass. The returned list contains null
+     * for e-mails and for files that couldn't be unpacked.
+     * <p>
+     * Files unpacked from 7z and rar archives are kept in the extraction cache
+     * if it is enabled via "ExtractionCacheSize" in the advanced settings
+     * file. Other unpacked files are temporary and may be deleted once more
+     * than "UnpackCacheCapacity" files have been unpacked.
+     */
+    public List<String> extractFiles(String query, int maxResults)
+            throws SearchException, CheckedOutOfMemoryError {
+        Searcher searcher = getSearcher();
+        List<ResultDocument> results = searcher.search(query);
+        if (results.size() > maxResults)
+            results = results.subList(0, maxResults);
+        searcher.prefetchFiles(results);
+        List<String> paths = new ArrayList<String>(results.size());
+        for (ResultDocument result : results) {
+            if (result.isEmail()) {
+                paths.add(null);
+                continue;
+            }
+            FileResource fileResource = null;
+            try {
+                fileResource = result.getFileResource();
+                paths.add(Util.getSystemAbsPath(fileResource.getFile()));
+            } catch (ParseException e) {
+                paths.add(null);
+            } catch (FileNotFoundException e) {
+                paths.add(null);
+            } finally {
+                if (fileResource != null)
+                    fileResource.dispose();
+            }
+        }
+        return paths;
+    }
+
+    /**
+     * Returns the counters of the cache of files unpacked from archives, see
+     * {@link ExtractionCache#getStats()}. The returned map is empty if the
+     * cache is disabled.
+     */
+    public Map<String, Long> getExtractionCacheStats() throws SearchException {
+        return getSearcher().getExtractionCacheStats();
+    }
+
+    /**
+     * Returns the counters of the cache of extracted texts, see
+     * {@link ParseCache#getStats()}. The returned map is empty if the cache is
+     * disabled.
+     */
+    public Map<String, Long> getParseCacheStats() {
+        return ParseService.getCacheStats();
+    }
+
+    /**
+     * Returns the current values of the performance metrics of searching and
+     * indexing, keyed by metric name, see {@link Metrics#getSnapshot()}.
+     * Timings are given in microseconds. The metrics include:
+     * <ul>
+     * <li>search.parse_query, search.collect, search.load,
+     * search.create_result, search.encode and search.total: The stages of a
+     * search, i.e. query parsing, collecting the hits, loading the stored
+     * fields of each hit, creating the result objects, encoding the results
+     * for scripting clients, and the whole search.</li>
+     * <li>search.cache_hits: The number of searches answered from the result
+     * cache.</li>
+     * <li>search.snippets: The time spent creating the snippets for a list of
+     * results.</li>
+     * <li>parse.&lt;parser name&gt;: The text extraction time per file and
+     * parser.</li>
+     * <li>parse.cache_hash, parse.cache_hits and parse.cache_misses: The time
+     * spent computing the keys of the cache of extracted texts, and the number
+     * of texts that were and weren't found in the cache.</li>
+     * <li>export.text: The time spent extracting the text of each exported
+     * document.</li>
+     * <li>unpack.cache_hits and unpack.cache_misses: The number of archive
+     * entries that were and weren't found in the extraction cache.</li>
+     * <li>index.add, index.update, index.delete and index.commit: The time
+     * spent writing to the Lucene index.</li>
+     * <li>index.queue_depth: The number of indexing tasks in the queue.</li>
+     * </ul>
+     */
+    public Map<String, Map<String, Long>> getMetrics() {
+        return Metrics.getSnapshot();
+    }
+
+    /**
+     * Resets all timings and counters of the performance metrics.
+     */
+    public void resetMetrics() {
+        Metrics.reset();
+    }
+
+    /**
+     * Returns the sequence number of the last change batch published to the
+     * change feed. Clients that haven't seen any changes yet can start
+     * following the change feed from this sequence number.
+     */
+    public long getChangeSequence() {
+        return getChangeFeed().getLastSequence();
+    }
+
+    /**
+     * Returns the change batches published after the given sequence number,
+     * in the format described in {@link ChangeFeed#encodeBatchesSince(long,
+     * int)}, to be read via Py4J's stream protocol.
+     */
+    public ReadableByteChannel getChangesSince(long sequence) {
+        byte[] bytes = getChangeFeed().encodeBatchesSince(
+            sequence, MAX_CHANGE_BATCHES).getData();
+        return Channels.newChannel(new ByteArrayInputStream(bytes));
+    }
+
+    /**
+     * Pushes all change batches published after the given sequence number to
+     * the given listener, starting with those that are already available. The
+     * listener is called from a separate thread, one call at a time. The
+     * subscription ends when {@link #unsubscribeChanges(String)} is called
+     * with the returned subscription ID, or when the listener cannot be
+     * reached anymore.
+     * <p>
+     * The listener is called through the gateway's callback client, which is
+     * redirected to the given port of the client's callback server. Since
+     * the gateway has only one callback client, only one subscription can be
+     * active at a time. If another one is active, an
+     * {@link IllegalStateException} is thrown.
+     */
+    public String subscribeChanges(final ChangeListener listener, final long sequence, int callbackPort) {
+        synchronized (changeSubscriptions) {
+            if (!changeSubscriptions.isEmpty())
+                throw new IllegalStateException(
+                    "Another client is already subscribed to the index changes.");
+            server.resetCallbackClient(
+                server.getCallbackClient().getAddress(), callbackPort);
+            return startChangeSubscription(listener, sequence);
+        }
+    }
+
+    private String startChangeSubscription(final ChangeListener listener, final long sequence) {
+        final ChangeFeed feed = getChangeFeed();
+        final String subscriptionId = UUID.randomUUID().toString();
+        Thread thread = new Thread(Py4jHandler.class.getName() + " (Change feed)") {
+            public void run() {
+                long lastSequence = sequence;
+                try {
+                    while (changeSubscriptions.get(subscriptionId) == this) {
+                        // Report gaps right away, otherwise wait for changes
+                        if (feed.isAvailable(lastSequence)
+                                && !feed.awaitChangesSince(lastSequence, 1000))
+                            continue;
+                        EncodedBatches encoded = feed.encodeBatchesSince(
+                            lastSequence, MAX_CHANGE_BATCHES);
+                        listener.changesPublished(encoded.getData());
+                        lastSequence = encoded.getNextSequence();
+                    }
+                }
+                catch (InterruptedException e) {
+                    // Unsubscribed
+                }
+                catch (RuntimeException e) {
+                    // The client is probably gone
+                    Util.printErr(e);
+                }
+                finally {
+                    changeSubscriptions.remove(subscriptionId);
+                }
+            }
+        };
+        thread.setDaemon(true);
+        changeSubscriptions.put(subscriptionId, thread);
+        thread.start();
+        return subscriptionId;
+    }
+
+    public void unsubscribeChanges(String subscriptionId) {
+        Thread thread = changeSubscriptions.remove(subscriptionId);
+        if (thread != null)
+            thread.interrupt();
+    }
+
+    /**
+     * Returns the number of threads used for text extraction during indexing,
+     * see {@link IndexingQueue#getParseThreads()}.
+     */
+    public int getParseThreads() {
+        return getIndexRegistry().getQueue().getParseThreads();
+    }
+
+    /**
+     * Sets the number of threads used for text extraction during indexing,
+     * starting with the next indexing task. The value 0 means: As many
+     * threads as there are processor cores. The setting is not saved; the
+     * default is given by "ParseThreads" in the advanced settings file.
+     */
+    public void setParseThreads(int parseThreads) {
+        getIndexRegistry().getQueue().setParseThreads(parseThreads);
+    }
+
+    /**
+     * Creates an index for the given folder with the default indexing
+     * settings and waits until the indexing task has finished, e.g. for
+     * benchmarks and for setting up indexes in headless mode. Returns whether
+     * the index was added to the index registry; this is not the case if the
+     * task was canceled. Throws an {@link IllegalStateException} if the
+     * indexing queue rejected the task, for example because the folder
+     * overlaps with an existing index.
+     */
+    public boolean createIndex(String rootPath) throws InterruptedException {
+        IndexRegistry indexRegistry = getIndexRegistry();
+        IndexingQueue queue = indexRegistry.getQueue();
+        final LuceneIndex index = new FileIndex(
+            indexRegistry.getIndexParentDir(), new File(rootPath));
+        final CountDownLatch done = new CountDownLatch(1);
+
+        /*
+         * New creation tasks wait for the indexing settings to be confirmed,
+         * so the task must be set ready as soon as it has been added. The task
+         * is done when it has finished or has been removed from the queue,
+         * whichever comes first.
+         */
+        final Event.Listener<Boolean> finishedListener = new Event.Listener<Boolean>() {
+            public void update(Boolean hasErrors) {
+                done.countDown();
+            }
+        };
+        Event.Listener<Task> addedListener = new Event.Listener<Task>() {
+            public void update(Task task) {
+                if (task.getLuceneIndex() != index)
+                    return;
+                task.evtFinished.add(finishedListener);
+                task.setReady();
+            }
+        };
+        Event.Listener<Task> removedListener = new Event.Listener<Task>() {
+            public void update(Task task) {
+                if (task.getLuceneIndex() == index)
+                    done.countDown();
+            }
+        };
+        queue.addListeners(new IndexingQueue.ExistingTasksHandler() {
+            public void handleExistingTasks(List<Task> tasks) {
+            }
+        }, addedListener, removedListener);
+        try {
+            Rejection rejection = queue.addTask(index, IndexAction.CREATE);
+            if (rejection != null)
+                throw new IllegalStateException("Indexing task rejected: " + rejection);
+            done.await();
+        }
+        finally {
+            queue.removeListeners(addedListener, removedListener);
+        }
+        return indexRegistry.getIndexes().contains(index);
+    }
+
+    private static ChangeFeed getChangeFeed() {
+        return getIndexRegistry().getChangeFeed();
+    }
+
+    private static IndexRegistry getIndexRegistry() {
+        IndexRegistry indexRegistry = Application.getIndexRegistry();
+        if (indexRegistry == null)
+            throw new IllegalStateException("Index registry not available.");
+        return indexRegistry;
+    }
+
+    private static Searcher getSearcher() throws SearchException {
+        IndexRegistry indexRegistry = Application.getIndexRegistry();
+        Searcher searcher = indexRegistry == null ? null : indexRegistry.getSearcher();
+        if (searcher == null)
+            throw new SearchException("Searcher not available."); // TODO i18n
+        return searcher;
+    }
 }
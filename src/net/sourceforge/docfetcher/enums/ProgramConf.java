@@ -57,6 +57,7 @@ public final class ProgramConf {
 		ReportObsoleteIndexFiles (true),
 		IndexExcelFormulas (true),
 		SkipTarArchives (false),
+		StoreOffsets (false),
 		IgnoreJunctionsAndSymlinks (true),
 		SaveSettings (true),
 		TextPreviewEnabled (true),
@@ -90,6 +91,15 @@ public final class ProgramConf {
 		OpenLimit (10, 1),
 		PatternTableHeight (4, 1),
 		UnpackCacheCapacity (20, 1),
+		ExtractionCacheSize (0, 0),
+		SearchCacheCapacity (20, 0),
+		SearchThreads (0, 0),
+		CursorIdleTimeout (600, 0),
+		ChangeFeedCapacity (1000, 0),
+		ChangeJournalCapacity (10000, 1),
+		ParseThreads (1, 0),
+		ParseCacheSize (0, 0),
+		MetricsDumpInterval (0, 0),
 		InitialSorting (0),
 		PythonApiPort (28834),
 		;
@@ -124,6 +134,7 @@ public final class ProgramConf {
 	public static enum Str implements Storable {
 		AppName ("DocFetcher"),
 		TextEncodingOverride (""),
+		PythonApiSocket (""),
 		;
 
 		private String value;
@@ -163,7 +174,8 @@ public final class ProgramConf {
 	}
 
 	public static enum StrList implements Storable {
-		HtmlExtensions ("html", "htm", "xhtml", "shtml", "shtm")
+		HtmlExtensions ("html", "htm", "xhtml", "shtml", "shtm"),
+		SearcherWarmingQueries (),
 		;
 
 		private List<String> value;
@@ -94,6 +94,7 @@ import net.sourceforge.docfetcher.util.CharsetDetectorHelper;
 import net.sourceforge.docfetcher.util.ConfLoader;
 import net.sourceforge.docfetcher.util.ConfLoader.Loadable;
 import net.sourceforge.docfetcher.util.Event;
+import net.sourceforge.docfetcher.util.Metrics;
 import net.sourceforge.docfetcher.util.Util;
 import net.sourceforge.docfetcher.util.UtilGui;
 import net.sourceforge.docfetcher.util.annotations.NotNull;
@@ -251,11 +252,24 @@ public final class Application {
 		programConfFile = loadProgramConf(confPathOverride);
 		settingsConfFile = loadSettingsConf(confPathOverride);
 		
+		// Periodically write performance metrics to disk, if enabled
+		int metricsDumpInterval = ProgramConf.Int.MetricsDumpInterval.get();
+		if (metricsDumpInterval > 0) {
+			File metricsFile = new File(AppUtil.getAppDataDir(), "metrics.json");
+			Metrics.startDump(metricsFile, metricsDumpInterval);
+		}
+		
 		// Update indexes in headless mode
 		if (args.length >= 1 && args[0].equals("--update-indexes")) {
 			loadIndexRegistryHeadless(getIndexParentDir(IndexRegistry.indexPathOverride));
 			return;
 		}
+		
+		// Run the Python API server in headless mode
+		if (args.length >= 1 && args[0].equals("--python-api-server")) {
+			runPythonApiServerHeadless(args);
+			return;
+		}
 
 		// Check single instance
 		if (ProgramConf.Bool.CheckSingleInstance.get() && !AppUtil.checkSingleInstance())
@@ -680,6 +694,68 @@ public final class Application {
 		}
 	}
 	
+	/**
+	 * Loads the index registry and opens the Python API gateway server without
+	 * creating a GUI. The gateway server is opened regardless of the
+	 * "PythonApiEnabled" setting, and it keeps the program running until the
+	 * process is terminated. Supported arguments after "--python-api-server":
+	 * "--port=N" overrides the "PythonApiPort" setting, "--socket=PATH"
+	 * overrides the "PythonApiSocket" setting, and "--index-dir=PATH"
+	 * overrides the index folder, e.g. for benchmarks that shouldn't touch the
+	 * user's indexes.
+	 */
+	private static void runPythonApiServerHeadless(@NotNull String[] args) {
+		int port = ProgramConf.Int.PythonApiPort.get();
+		String socketPath = ProgramConf.Str.PythonApiSocket.get().trim();
+		File indexParentDir = null;
+		for (int i = 1; i < args.length; i++) {
+			String arg = args[i];
+			try {
+				if (arg.startsWith("--port="))
+					port = Integer.parseInt(arg.substring("--port=".length()));
+				else if (arg.startsWith("--socket="))
+					socketPath = arg.substring("--socket=".length());
+				else if (arg.startsWith("--index-dir="))
+					indexParentDir = new File(arg.substring("--index-dir=".length()));
+				else
+					throw new IllegalArgumentException();
+			}
+			catch (IllegalArgumentException e) {
+				Util.printErr("Invalid argument: " + arg);
+				return;
+			}
+		}
+		if (indexParentDir == null) {
+			indexParentDir = getIndexParentDir(IndexRegistry.indexPathOverride);
+		}
+		else {
+			indexParentDir.mkdirs();
+		}
+		
+		int cacheCapacity = ProgramConf.Int.UnpackCacheCapacity.get();
+		int reporterCapacity = ProgramConf.Int.MaxLinesInProgressPanel.get();
+		indexRegistry = new IndexRegistry(
+			indexParentDir, cacheCapacity, reporterCapacity);
+		try {
+			indexRegistry.load(Cancelable.nullCancelable);
+		}
+		catch (IOException e) {
+			Util.printErr(e);
+			return;
+		}
+		
+		// The gateway server runs in a non-daemon thread
+		if (!socketPath.isEmpty() && !Util.IS_WINDOWS) {
+			File socketFile = new File(socketPath);
+			Py4jHandler.openGatewayServer(socketFile);
+			Util.println("Python API server listening on " + socketFile.getAbsolutePath());
+		}
+		else {
+			Py4jHandler.openGatewayServer(port);
+			Util.println("Python API server listening on port " + port);
+		}
+	}
+	
 	private static void reportObsoleteIndexFiles(	@NotNull Shell mainShell,
 	                                             	@NotNull File indexDir,
 													@NotNull List<File> filesToDelete) {
@@ -0,0 +1,338 @@
+/*******************************************************************************
+ * Copyright (c) 2021 Tran Nam Quang.
+ * All rights reserved. This program and the accompanying materials
+ * are made available under the terms of the Eclipse Public License v1.0
+ * which accompanies this distribution, and is available at
+ * http://www.eclipse.org/legal/epl-v10.html
+ *
+ * Contributors:
+ *    Tran Nam Quang - initial API and implementation
+ *******************************************************************************/
+
+package net.sourceforge.docfetcher.model;
+
+import java.io.File;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.OutputStreamWriter;
+import java.io.Writer;
+import java.util.Collections;
+import java.util.Iterator;
+import java.util.List;
+import java.util.Map;
+import java.util.Map.Entry;
+import java.util.TreeMap;
+
+import net.sourceforge.docfetcher.util.Util;
+import net.sourceforge.docfetcher.util.annotations.NotNull;
+import net.sourceforge.docfetcher.util.annotations.Nullable;
+import net.sourceforge.docfetcher.util.annotations.ThreadSafe;
+
+import com.google.common.base.Charsets;
+import com.google.common.io.Closeables;
+import com.google.common.io.Files;
+
+/**
+ * A persistent record of the files and folders that have changed inside the
+ * indexed folders, so that index updates only need to rescan the affected
+ * parts of the folder trees. Changes are recorded by the folder watcher while
+ * the program is running and by the daemon while it isn't, and they are kept
+ * until an index update has processed them.
+ * <p>
+ * The journal is deduplicated: Each path is stored at most once, and a path is
+ * not stored if one of its parent folders is already stored, since rescanning
+ * the parent folder also covers the path. If the number of stored paths
+ * exceeds the capacity, paths are replaced by their parent folders.
+ * <p>
+ * The journal file is a UTF-8 text file with one change per line, consisting
+ * of a change type character, a space and an absolute path. Lines starting
+ * with "//" are ignored. New changes are appended to the file, and the file is
+ * compacted whenever changes are removed.
+ *
+ * @author Tran Nam Quang
+ */
+@ThreadSafe
+public final class ChangeJournal {
+
+	public enum ChangeType {
+		CREATED ('C'),
+		MODIFIED ('M'),
+		DELETED ('D'),
+		RENAMED ('R'),
+		;
+
+		private final char code;
+
+		private ChangeType(char code) {
+			this.code = code;
+		}
+
+		@Nullable
+		private static ChangeType fromCode(char code) {
+			for (ChangeType type : values())
+				if (type.code == code)
+					return type;
+			return null;
+		}
+	}
+
+	/**
+	 * An immutable snapshot of the changes recorded inside a particular file or
+	 * folder. A changed path must be rescanned entirely, including all files
+	 * and folders below it.
+	 */
+	public static final class Changes {
+		private final boolean rootChanged;
+		private final Map<String, Long> sequences;
+
+		private Changes(boolean rootChanged, @NotNull Map<String, Long> sequences) {
+			this.rootChanged = rootChanged;
+			this.sequences = Collections.unmodifiableMap(sequences);
+		}
+
+		public boolean isEmpty() {
+			return !rootChanged && sequences.isEmpty();
+		}
+
+		public int size() {
+			return sequences.size();
+		}
+
+		/**
+		 * Returns true if the given file or folder or one of its parent folders
+		 * has changed, which means the given file or folder must be rescanned
+		 * entirely.
+		 */
+		public boolean isChanged(@NotNull File file) {
+			if (rootChanged)
+				return true;
+			for (String path = getKey(file); path != null; path = getParent(path))
+				if (sequences.containsKey(path))
+					return true;
+			return false;
+		}
+
+		/**
+		 * Returns true if any files or folders below the given folder have
+		 * changed.
+		 */
+		public boolean containsChanges(@NotNull File dir) {
+			if (rootChanged)
+				return true;
+			String prefix = getPrefix(getKey(dir));
+			for (String path : sequences.keySet())
+				if (path.startsWith(prefix))
+					return true;
+			return false;
+		}
+	}
+
+	private static final class Change {
+		private ChangeType type;
+		private long sequence;
+
+		private Change(@NotNull ChangeType type, long sequence) {
+			this.type = type;
+			this.sequence = sequence;
+		}
+	}
+
+	public static final String FILENAME = ".changes.txt";
+
+	private final File file;
+	private final int capacity;
+	private final TreeMap<String, Change> changes = new TreeMap<String, Change>(); // guarded by 'this' lock
+	private long lastSequence = 0; // guarded by 'this' lock
+
+	/**
+	 * Creates a journal that is stored in the given file, loading the changes
+	 * that were previously stored in it.
+	 */
+	public ChangeJournal(@NotNull File file, int capacity) {
+		Util.checkNotNull(file);
+		Util.checkThat(capacity > 0);
+		this.file = file;
+		this.capacity = capacity;
+		if (!file.isFile())
+			return;
+		try {
+			List<String> lines = Files.readLines(file, Charsets.UTF_8);
+			for (String line : lines) {
+				if (line.length() < 3 || line.startsWith("//") || line.charAt(1) != ' ')
+					continue;
+				ChangeType type = ChangeType.fromCode(line.charAt(0));
+				if (type != null)
+					add(getKey(new File(line.substring(2))), type);
+			}
+			if (lines.size() > changes.size())
+				save();
+		}
+		catch (IOException e) {
+			Util.printErr(e);
+		}
+	}
+
+	/**
+	 * Records a change of the given file or folder.
+	 */
+	public synchronized void record(@NotNull File file,
+									@NotNull ChangeType type) {
+		Util.checkNotNull(file, type);
+		int size = changes.size();
+		String path = getKey(file);
+		if (!add(path, type))
+			return;
+		if (changes.size() > size && changes.size() > capacity) {
+			collapse();
+			save();
+			return;
+		}
+		try {
+			Files.append(type.code + " " + path + Util.LS, this.file, Charsets.UTF_8);
+		}
+		catch (IOException e) {
+			Util.printErr(e);
+		}
+	}
+
+	/**
+	 * Returns the changes recorded inside the given root file or folder. If
+	 * the root itself or one of its parent folders has changed, all files and
+	 * folders inside the root are reported as changed.
+	 */
+	@NotNull
+	public synchronized Changes getChanges(@NotNull File rootFile) {
+		String rootPath = getKey(rootFile);
+		boolean rootChanged = false;
+		for (String path = getParent(rootPath); path != null; path = getParent(path))
+			rootChanged |= changes.containsKey(path);
+		Map<String, Long> sequences = new TreeMap<String, Long>();
+		Change rootChange = changes.get(rootPath);
+		if (rootChange != null)
+			sequences.put(rootPath, rootChange.sequence);
+		String prefix = getPrefix(rootPath);
+		for (Entry<String, Change> entry : changes.tailMap(prefix).entrySet()) {
+			if (!entry.getKey().startsWith(prefix))
+				break;
+			sequences.put(entry.getKey(), entry.getValue().sequence);
+		}
+		return new Changes(rootChanged, sequences);
+	}
+
+	/**
+	 * Removes the given changes from the receiver after they have been
+	 * processed. Changes that were recorded again after the given snapshot was
+	 * taken are kept.
+	 */
+	public synchronized void remove(@NotNull Changes processed) {
+		boolean removed = false;
+		for (Entry<String, Long> entry : processed.sequences.entrySet()) {
+			Change change = changes.get(entry.getKey());
+			if (change != null && change.sequence == entry.getValue()) {
+				changes.remove(entry.getKey());
+				removed = true;
+			}
+		}
+		if (removed)
+			save();
+	}
+
+	/*
+	 * Adds the given change, or updates the entry covering it. Returns true if
+	 * the journal file needs to be updated.
+	 */
+	private boolean add(@NotNull String path, @NotNull ChangeType type) {
+		long sequence = ++lastSequence;
+		for (String parent = path; parent != null; parent = getParent(parent)) {
+			Change change = changes.get(parent);
+			if (change == null)
+				continue;
+			/*
+			 * Bump the sequence number, so that the change won't be removed by
+			 * an index update that is currently running.
+			 */
+			change.sequence = sequence;
+			if (!parent.equals(path) || change.type == type)
+				return false;
+			change.type = type;
+			return true;
+		}
+		// Remove changes that are covered by the new one
+		String prefix = getPrefix(path);
+		Iterator<String> it = changes.tailMap(prefix).keySet().iterator();
+		while (it.hasNext() && it.next().startsWith(prefix))
+			it.remove();
+		changes.put(path, new Change(type, sequence));
+		return true;
+	}
+
+	// Replaces paths by their parent folders until the capacity is not exceeded
+	private void collapse() {
+		while (changes.size() > capacity / 2) {
+			TreeMap<String, Change> oldChanges = new TreeMap<String, Change>(changes);
+			changes.clear();
+			for (Entry<String, Change> entry : oldChanges.entrySet()) {
+				String parent = getParent(entry.getKey());
+				if (parent == null)
+					add(entry.getKey(), entry.getValue().type);
+				else
+					add(parent, ChangeType.MODIFIED);
+			}
+			if (changes.size() == oldChanges.size())
+				break; // Only top-level paths left
+		}
+	}
+
+	// Rewrites the journal file with the current changes
+	private void save() {
+		if (changes.isEmpty()) {
+			file.delete();
+			return;
+		}
+		File tempFile = new File(file.getPath() + ".tmp");
+		Writer writer = null;
+		try {
+			writer = new OutputStreamWriter(
+				new FileOutputStream(tempFile), Charsets.UTF_8);
+			for (Entry<String, Change> entry : changes.entrySet()) {
+				writer.write(entry.getValue().type.code);
+				writer.write(' ');
+				writer.write(entry.getKey());
+				writer.write(Util.LS);
+			}
+			writer.close();
+			if (!tempFile.renameTo(file)) {
+				file.delete();
+				if (!tempFile.renameTo(file))
+					throw new IOException("Cannot write file: " + file);
+			}
+		}
+		catch (IOException e) {
+			Closeables.closeQuietly(writer);
+			Util.printErr(e);
+		}
+	}
+
+	// Paths are compared case-insensitively on Windows
+	@NotNull
+	private static String getKey(@NotNull File file) {
+		String path = Util.getAbsPath(file);
+		if (path.length() > 1 && path.endsWith("/"))
+			path = path.substring(0, path.length() - 1);
+		return Util.IS_WINDOWS ? path.toUpperCase() : path;
+	}
+
+	@Nullable
+	private static String getParent(@NotNull String path) {
+		int index = path.lastIndexOf('/');
+		if (index < 0 || path.length() == 1)
+			return null;
+		return index == 0 ? "/" : path.substring(0, index);
+	}
+
+	@NotNull
+	private static String getPrefix(@NotNull String dirPath) {
+		return dirPath.endsWith("/") ? dirPath : dirPath + "/";
+	}
+
+}
@@ -0,0 +1,97 @@
+/*******************************************************************************
+ * Copyright (c) 2021 Tran Nam Quang.
+ * All rights reserved. This program and the accompanying materials
+ * are made available under the terms of the Eclipse Public License v1.0
+ * which accompanies this distribution, and is available at
+ * http://www.eclipse.org/legal/epl-v10.html
+ *
+ * Contributors:
+ *    Tran Nam Quang - initial API and implementation
+ *******************************************************************************/
+
+package net.sourceforge.docfetcher.model;
+
+import static org.junit.Assert.assertEquals;
+import static org.junit.Assert.assertFalse;
+import static org.junit.Assert.assertTrue;
+
+import java.io.File;
+
+import net.sourceforge.docfetcher.model.ChangeJournal.ChangeType;
+import net.sourceforge.docfetcher.model.ChangeJournal.Changes;
+import net.sourceforge.docfetcher.util.Util;
+
+import org.junit.Test;
+
+/**
+ * @author Tran Nam Quang
+ */
+public final class ChangeJournalTest {
+
+	@Test
+	public void testRecordAndRemove() throws Exception {
+		File tempDir = Util.createTempDir();
+		try {
+			File journalFile = new File(tempDir, ChangeJournal.FILENAME);
+			File root = new File(tempDir, "root");
+			File dir = new File(root, "dir");
+			File file1 = new File(dir, "file1.txt");
+			File file2 = new File(root, "file2.txt");
+
+			ChangeJournal journal = new ChangeJournal(journalFile, 100);
+			journal.record(file1, ChangeType.MODIFIED);
+			journal.record(file1, ChangeType.MODIFIED);
+			journal.record(file2, ChangeType.CREATED);
+			Changes changes = journal.getChanges(root);
+			assertEquals(2, changes.size());
+			assertTrue(changes.isChanged(file1));
+			assertFalse(changes.isChanged(dir));
+			assertTrue(changes.containsChanges(dir));
+
+			// Recording a folder replaces the changes inside it
+			journal.record(dir, ChangeType.RENAMED);
+			changes = journal.getChanges(root);
+			assertEquals(2, changes.size());
+			assertTrue(changes.isChanged(new File(dir, "other.txt")));
+
+			// The journal survives a restart
+			journal = new ChangeJournal(journalFile, 100);
+			assertEquals(2, journal.getChanges(root).size());
+
+			// Changes recorded after the snapshot are kept
+			changes = journal.getChanges(root);
+			journal.record(file2, ChangeType.DELETED);
+			journal.remove(changes);
+			Changes remaining = journal.getChanges(root);
+			assertEquals(1, remaining.size());
+			assertTrue(remaining.isChanged(file2));
+			journal.remove(remaining);
+			assertTrue(journal.getChanges(root).isEmpty());
+			assertFalse(journalFile.exists());
+		}
+		finally {
+			Util.deleteRecursively(tempDir);
+		}
+	}
+
+	@Test
+	public void testCapacity() throws Exception {
+		File tempDir = Util.createTempDir();
+		try {
+			File root = new File(tempDir, "root");
+			ChangeJournal journal = new ChangeJournal(
+				new File(tempDir, ChangeJournal.FILENAME), 4);
+			for (int i = 0; i < 5; i++)
+				journal.record(new File(root, "dir/file" + i), ChangeType.CREATED);
+
+			// The changes were replaced by their parent folder
+			Changes changes = journal.getChanges(root);
+			assertEquals(1, changes.size());
+			assertTrue(changes.isChanged(new File(root, "dir")));
+		}
+		finally {
+			Util.deleteRecursively(tempDir);
+		}
+	}
+
+}
@@ -16,6 +16,8 @@ import java.io.FileNotFoundException;
 import java.io.FileOutputStream;
 import java.io.FileWriter;
 import java.io.IOException;
+import java.util.HashSet;
+import java.util.Set;
 
 import net.sourceforge.docfetcher.model.index.IndexingQueue;
 import net.sourceforge.docfetcher.model.index.Task.IndexAction;
@@ -66,14 +68,32 @@ public final class Daemon {
 	}
 	
 	/**
-	 * Checks if the daemon has detected changes in the indexed folders and runs
-	 * index updates on all changed folders.
+	 * Runs index updates on all indexes for which changes were recorded while
+	 * the program wasn't running, or while the indexes weren't updated yet.
+	 * Indexes with changes in the registry's change journal are updated by
+	 * rescanning only the changed files and folders. Indexes that the daemon
+	 * merely marked as modified are rescanned entirely.
 	 */
 	public void enqueueUpdateTasks() {
+		IndexingQueue queue = indexRegistry.getQueue();
+		ChangeJournal changeJournal = indexRegistry.getChangeJournal();
+		Set<LuceneIndex> modifiedIndexes = getModifiedIndexes();
+		for (LuceneIndex index : indexRegistry.getIndexes()) {
+			File rootFile = index.getCanonicalRootFile();
+			if (!changeJournal.getChanges(rootFile).isEmpty())
+				queue.addJournaledUpdate(index);
+			else if (modifiedIndexes.contains(index))
+				queue.addTask(index, IndexAction.UPDATE);
+		}
+	}
+	
+	// Returns the indexes the daemon has detected changes in
+	@NotNull
+	private Set<LuceneIndex> getModifiedIndexes() {
+		final Set<LuceneIndex> modifiedIndexes = new HashSet<LuceneIndex>();
 		if (!indexesFile.exists())
-			return; // Happens if we're inside the IDE
+			return modifiedIndexes; // Happens if we're inside the IDE
 		
-		final IndexingQueue queue = indexRegistry.getQueue();
 		try {
 			Files.readLines(indexesFile, Charsets.UTF_8, new LineProcessor<Void>() {
 				public boolean processLine(String line) throws IOException {
@@ -92,7 +112,7 @@ public final class Daemon {
 					if (index == null)
 						return true; // Unknown directory?
 					
-					queue.addTask(index, IndexAction.UPDATE);
+					modifiedIndexes.add(index);
 					return true;
 				}
 				public Void getResult() {
@@ -104,6 +124,7 @@ public final class Daemon {
 			// Don't show stacktrace window here, GUI might not be available
 			Util.printErr(e);
 		}
+		return modifiedIndexes;
 	}
 	
 	@Nullable
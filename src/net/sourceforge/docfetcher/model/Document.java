@@ -42,7 +42,17 @@ public abstract class Document<D extends Document<D, F>, F extends Folder<D, F>>
 	}
 	
 	public final void setLastModified(long lastModified) {
+		if (this.lastModified == lastModified)
+			return;
 		this.lastModified = lastModified;
+		markChanged();
+	}
+	
+	// Documents are stored as part of their parent's record
+	protected final void markChanged() {
+		F parent = this.parent;
+		if (parent != null)
+			parent.markChanged();
 	}
 
 	@NotNull
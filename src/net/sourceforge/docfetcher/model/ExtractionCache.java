@@ -0,0 +1,186 @@
+/*******************************************************************************
+ * Copyright (c) 2021 Tran Nam Quang.
+ * All rights reserved. This program and the accompanying materials
+ * are made available under the terms of the Eclipse Public License v1.0
+ * which accompanies this distribution, and is available at
+ * http://www.eclipse.org/legal/epl-v10.html
+ *
+ * Contributors:
+ *    Tran Nam Quang - initial API and implementation
+ *******************************************************************************/
+
+package net.sourceforge.docfetcher.model;
+
+import java.io.File;
+import java.io.IOException;
+import java.security.MessageDigest;
+import java.security.NoSuchAlgorithmException;
+import java.util.Map;
+
+import net.sourceforge.docfetcher.util.Util;
+import net.sourceforge.docfetcher.util.annotations.NotNull;
+import net.sourceforge.docfetcher.util.annotations.Nullable;
+import net.sourceforge.docfetcher.util.annotations.ThreadSafe;
+
+import com.google.common.base.Charsets;
+import com.google.common.io.Files;
+
+/**
+ * A persistent cache of files unpacked from archives, so that archive entries
+ * don't have to be unpacked again each time they are opened or previewed. This
+ * matters most for solid archives, where unpacking a single entry requires
+ * decompressing all entries preceding it.
+ * <p>
+ * The cache keys are hashes of the archive path, the archive's size and
+ * last-modified date and the path of the entry inside the archive, so that
+ * entries of modified archives are not reused. Each cache entry is a folder in
+ * the cache folder that contains the unpacked file under its original name.
+ * The total size of the unpacked files is limited by the capacity of the cache;
+ * if it is exceeded, the least recently used entries are deleted. The usage
+ * order is kept across program sessions via the modification dates of the
+ * entry folders.
+ * <p>
+ * In contrast to the {@link HotColdFileCache}, the files returned by this
+ * cache are not protected from deletion while they are in use, so the capacity
+ * should be chosen large enough to hold all files that may be open at the same
+ * time.
+ *
+ * @see LruFileStore
+ * @author Tran Nam Quang
+ */
+@ThreadSafe
+public final class ExtractionCache {
+
+	public static final String DIRNAME = ".extractcache";
+
+	private final LruFileStore store;
+
+	/**
+	 * Creates a cache that is stored in the given folder, with the given
+	 * capacity in bytes. Entries that were previously stored in the folder
+	 * are kept, up to the capacity.
+	 */
+	public ExtractionCache(@NotNull File dir, long capacity) {
+		store = new LruFileStore(dir, capacity, "unpack.cache", new LruFileStore.SizeReader() {
+			public long getSize(File entryDir) {
+				// Incomplete entries are left behind by a terminated program
+				File file = getEntryFile(entryDir);
+				return file == null ? -1 : file.length();
+			}
+		});
+	}
+
+	/**
+	 * Returns the unpacked file of the given archive entry, or null if the
+	 * entry is not in the cache. The given archive file must be an ordinary
+	 * file, and the entry path must be relative to the archive root.
+	 */
+	@Nullable
+	public File get(@NotNull File archiveFile, @NotNull String entryPath) {
+		String key = createKey(archiveFile, entryPath);
+		if (store.touch(key)) {
+			File file = getEntryFile(store.getEntry(key));
+			if (file != null) {
+				store.countHit(key);
+				return file;
+			}
+			// The entry was deleted in the meantime
+			store.remove(key);
+		}
+		store.countMiss();
+		return null;
+	}
+
+	/**
+	 * Returns whether the given archive entry is in the cache. Unlike
+	 * {@link #get(File, String)}, this neither updates the usage order nor the
+	 * cache counters.
+	 */
+	public boolean contains(@NotNull File archiveFile,
+							@NotNull String entryPath) {
+		return store.contains(createKey(archiveFile, entryPath));
+	}
+
+	/**
+	 * Moves the given unpacked file of the given archive entry into the cache
+	 * and returns its new location, which has the filename of the entry.
+	 * Returns null if the file couldn't be stored, e.g. because it is larger
+	 * than the capacity of the cache. In that case, the given file is left
+	 * untouched.
+	 */
+	@Nullable
+	public File put(@NotNull File archiveFile,
+					@NotNull String entryPath,
+					@NotNull File unpackedFile) {
+		long size = unpackedFile.length();
+		if (!unpackedFile.isFile() || size > store.getCapacity())
+			return null;
+		String key = createKey(archiveFile, entryPath);
+		File entryDir = store.getEntry(key);
+		String filename = entryPath.substring(entryPath.lastIndexOf('/') + 1);
+		File file = new File(entryDir, filename);
+		synchronized (store) {
+			store.remove(key);
+			try {
+				entryDir.mkdirs();
+				Files.move(unpackedFile, file);
+			}
+			catch (IOException e) {
+				Util.printErr(e);
+				deleteQuietly(entryDir);
+				return null;
+			}
+			store.add(key, size);
+			return file;
+		}
+	}
+
+	/**
+	 * Returns the current values of the cache counters, keyed by "hits",
+	 * "misses", "evictions", "size", "bytes" and "capacity". The size is the
+	 * number of entries, the capacity is given in bytes.
+	 */
+	@NotNull
+	public Map<String, Long> getStats() {
+		return store.getStats();
+	}
+
+	@NotNull
+	private static String createKey(@NotNull File archiveFile,
+									@NotNull String entryPath) {
+		try {
+			MessageDigest digest = MessageDigest.getInstance("SHA-1");
+			String header = Util.getAbsPath(archiveFile) + "|"
+					+ archiveFile.length() + "|"
+					+ archiveFile.lastModified() + "|"
+					+ entryPath;
+			byte[] bytes = digest.digest(header.getBytes(Charsets.UTF_8));
+			StringBuilder sb = new StringBuilder(40);
+			for (byte b : bytes)
+				sb.append(String.format("%02x", b & 0xff));
+			return sb.toString();
+		}
+		catch (NoSuchAlgorithmException e) {
+			throw new IllegalStateException(e);
+		}
+	}
+
+	// Returns the unpacked file inside the given entry folder, or null
+	@Nullable
+	private static File getEntryFile(@NotNull File entryDir) {
+		File[] files = Util.listFiles(entryDir);
+		if (files.length != 1 || !files[0].isFile())
+			return null;
+		return files[0];
+	}
+
+	private static void deleteQuietly(@NotNull File file) {
+		try {
+			Util.deleteRecursively(file);
+		}
+		catch (IOException e) {
+			Util.printErr(e);
+		}
+	}
+
+}
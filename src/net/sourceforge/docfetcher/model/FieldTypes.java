@@ -13,6 +13,7 @@ package net.sourceforge.docfetcher.model;
 
 import org.apache.lucene.document.FieldType;
 import org.apache.lucene.document.TextField;
+import org.apache.lucene.index.IndexOptions;
 
 /**
  * Created by huzhengmian on 2018/5/7.
@@ -20,6 +21,7 @@ import org.apache.lucene.document.TextField;
 public class FieldTypes {
     public static final FieldType TYPE_TEXT_WITH_POSITIONS_OFFSETS_STORED=new FieldType(TextField.TYPE_STORED);
     public static final FieldType TYPE_TEXT_WITH_POSITIONS_OFFSETS_NOT_STORED=new FieldType(TextField.TYPE_STORED);
+    public static final FieldType TYPE_TEXT_WITH_POSTINGS_OFFSETS_STORED=new FieldType(TextField.TYPE_STORED);
 
     static {
         TYPE_TEXT_WITH_POSITIONS_OFFSETS_NOT_STORED.setStoreTermVectors(true);
@@ -28,6 +30,8 @@ public class FieldTypes {
         TYPE_TEXT_WITH_POSITIONS_OFFSETS_STORED.setStoreTermVectors(true);
         TYPE_TEXT_WITH_POSITIONS_OFFSETS_STORED.setStoreTermVectorOffsets(true);
         TYPE_TEXT_WITH_POSITIONS_OFFSETS_STORED.setStoreTermVectorPositions(true);
+        // Offsets in the postings are much smaller than term vectors
+        TYPE_TEXT_WITH_POSTINGS_OFFSETS_STORED.setIndexOptions(IndexOptions.DOCS_AND_FREQS_AND_POSITIONS_AND_OFFSETS);
     }
 
 }
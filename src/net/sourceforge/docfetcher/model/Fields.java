@@ -45,6 +45,7 @@ public enum Fields {
 	UID (StringField.TYPE_STORED),
 	CONTENT (TextField.TYPE_NOT_STORED),
 	CONTENT_WITH_OFFSET (FieldTypes.TYPE_TEXT_WITH_POSITIONS_OFFSETS_STORED,Fields.CONTENT.name()),
+	CONTENT_STORED (FieldTypes.TYPE_TEXT_WITH_POSTINGS_OFFSETS_STORED,Fields.CONTENT.name()),
 	TYPE (StringField.TYPE_STORED), // file extension or email type (outlook, imap, etc.)
 	// The following must be stored as a numeric field in order to enable
 	// filtering and sorting for the web interface
@@ -124,5 +125,20 @@ public enum Fields {
 		else
 			return CONTENT.create(new CharSequenceReader().setInput(fieldValue));
 	}
+	
+	/**
+	 * Creates a content field for adding a document to an index. If
+	 * <tt>storeOffsets</tt> is true, the text is stored in the index along with
+	 * the offsets of its tokens, so that snippets can be created without
+	 * reading the original file. Otherwise, this is equivalent to
+	 * {@link #createContent(CharSequence)}.
+	 */
+	@NotNull
+	public static Field createIndexedContent(	@NotNull CharSequence fieldValue,
+												boolean storeOffsets) {
+		if (storeOffsets)
+			return CONTENT_STORED.create(fieldValue.toString());
+		return createContent(fieldValue);
+	}
 
 }
@@ -11,6 +11,8 @@
 
 package net.sourceforge.docfetcher.model;
 
+import java.io.IOException;
+import java.io.ObjectOutputStream;
 import java.util.ArrayList;
 import java.util.Arrays;
 import java.util.Collection;
@@ -32,6 +34,7 @@ import net.sourceforge.docfetcher.util.annotations.RecursiveMethod;
 import net.sourceforge.docfetcher.util.annotations.ThreadSafe;
 import net.sourceforge.docfetcher.util.annotations.VisibleForPackageGroup;
 
+import com.google.common.base.Objects;
 import com.google.common.base.Predicate;
 import com.google.common.collect.Maps;
 
@@ -105,6 +108,39 @@ public abstract class Folder
 
 	protected boolean isChecked = true;
 
+	/**
+	 * A hash of this folder's record as last written or read by
+	 * {@link TreeIndexStore}, or zero if the record hasn't been stored yet.
+	 */
+	transient long storedHash;
+
+	/**
+	 * The hash of this folder's position in the tree as of the last time its
+	 * record was written or read by {@link TreeIndexStore}. If it differs from
+	 * the current one, the folder has been moved.
+	 */
+	transient long storedKeyHash;
+
+	/**
+	 * Whether this folder or any folder below it may have changed since the
+	 * last time its record was written or read by {@link TreeIndexStore}.
+	 */
+	transient volatile boolean changed;
+
+	/**
+	 * For folders attached to a document, the folder containing the document
+	 * as last seen by {@link TreeIndexStore}, so that changes can be
+	 * propagated to it. Null for other folders.
+	 */
+	@Nullable transient Folder<?, ?> owner;
+
+	/**
+	 * The stored record from which {@link TreeIndexStore} creates the children
+	 * of this folder on first access, or null if the children have already
+	 * been created.
+	 */
+	@Nullable transient TreeIndexStore.PendingChildren pendingChildren;
+
 	@SuppressWarnings("unchecked")
 	protected Folder(	@NotNull F parent,
 						@NotNull String name,
@@ -123,6 +159,15 @@ public abstract class Folder
 		this.lastModified = lastModified;
 		updatePathHashCode();
 	}
+
+	/**
+	 * Creates a folder that has neither a parent nor a path. Used by
+	 * {@link TreeIndexStore}, which either attaches the folder to a parent via
+	 * {@link #attachSubFolder(Folder)} or sets its path right afterwards.
+	 */
+	protected Folder(@NotNull String name) {
+		super(name);
+	}
 	
 	public final synchronized int getParentCount() {
 		int count = 0;
@@ -196,6 +241,7 @@ public abstract class Folder
 		this.path = path;
 		parent = null;
 		updatePathHashCode();
+		markChanged();
 	}
 
 	@Nullable
@@ -204,56 +250,73 @@ public abstract class Folder
 	}
 
 	public synchronized final void setLastModified(@Nullable Long lastModified) {
+		if (Objects.equal(this.lastModified, lastModified))
+			return;
 		this.lastModified = lastModified;
+		markChanged();
 	}
 
 	// will replace document with identical name;
 	// will detach document from previous parent if there is one
 	@SuppressWarnings("unchecked")
 	public synchronized final void putDocument(@NotNull D doc) {
+		loadChildren();
 		if (documents == null)
 			documents = Maps.newHashMap();
 		documents.put(doc.getName(), doc);
 		if (doc.parent != null && doc.parent != this)
 			doc.parent.removeDocument(doc);
 		doc.parent = (F) this;
+		markChanged();
 	}
 
 	// will replace folder with identical name
-	@SuppressWarnings("unchecked")
 	public final void putSubFolder(@NotNull F subFolder) {
 		evtFolderAdding.fire(new FolderEvent(this, subFolder));
-		synchronized (this) {
-			if (subFolders == null)
-				subFolders = Maps.newHashMap();
-			if (subFolder.parent != null)
-				subFolder.parent.subFolders.remove(subFolder.getName());
-			subFolder.parent = (F) this;
-			subFolder.path = null;
-			subFolder.updatePathHashCode();
-			subFolders.put(subFolder.getName(), subFolder);
-		}
+		attachSubFolder(subFolder);
 		evtFolderAdded.fire(new FolderEvent(this, subFolder));
 	}
 
+	// Same as putSubFolder, but without firing any events
+	@SuppressWarnings("unchecked")
+	synchronized final void attachSubFolder(@NotNull F subFolder) {
+		loadChildren();
+		if (subFolders == null)
+			subFolders = Maps.newHashMap();
+		if (subFolder.parent != null) {
+			subFolder.parent.subFolders.remove(subFolder.getName());
+			subFolder.parent.markChanged();
+		}
+		subFolder.parent = (F) this;
+		subFolder.path = null;
+		subFolder.updatePathHashCode();
+		subFolders.put(subFolder.getName(), subFolder);
+		markChanged();
+	}
+
 	/**
 	 * Removes the given document from the receiver. Does nothing if the given
 	 * document is null.
 	 */
 	public synchronized final void removeDocument(@Nullable D doc) {
+		loadChildren();
 		if (documents == null || doc == null) return;
 		D candidate = documents.remove(doc.getName());
 		Util.checkThat(candidate == doc);
 		doc.parent = null;
 		if (documents.isEmpty())
 			documents = null;
+		markChanged();
 	}
 
 	public final void removeChildren() {
+		loadChildren();
 		Collection<F> toNotify = subFolders == null
 			? Collections.<F>emptyList()
 			: subFolders.values();
 		synchronized (this) {
+			if (documents == null && subFolders == null)
+				return;
 			if (documents != null) {
 				for (D doc : documents.values())
 					doc.parent = null;
@@ -267,6 +330,7 @@ public abstract class Folder
 					subFolder.parent = null;
 				}
 			}
+			markChanged();
 		}
 		for (F subFolder : toNotify)
 			evtFolderRemoved.fire(new FolderEvent(this, subFolder));
@@ -281,6 +345,7 @@ public abstract class Folder
 		if (subFolder == null)
 			return;
 		synchronized (this) {
+			loadChildren();
 			if (subFolders == null)
 				return;
 			F candidate = subFolders.remove(subFolder.getName());
@@ -296,11 +361,13 @@ public abstract class Folder
 
 			if (subFolders.isEmpty())
 				subFolders = null;
+			markChanged();
 		}
 		evtFolderRemoved.fire(new FolderEvent(this, subFolder));
 	}
 
 	public synchronized final void removeDocuments(@NotNull Predicate<D> predicate) {
+		loadChildren();
 		if (documents == null) return;
 		Iterator<D> docIt = documents.values().iterator();
 		while (docIt.hasNext()) {
@@ -308,6 +375,7 @@ public abstract class Folder
 			if (predicate.apply(doc)) {
 				docIt.remove();
 				doc.parent = null;
+				markChanged();
 			}
 		}
 		if (documents.isEmpty())
@@ -320,6 +388,7 @@ public abstract class Folder
 	 * obtained via {@link #getPath()}.
 	 */
 	public synchronized final void removeSubFolders(@NotNull Predicate<F> predicate) {
+		loadChildren();
 		List<F> toNotify = new ArrayList<F>(subFolders == null ? 0 : subFolders.size());
 		synchronized (this) {
 			if (subFolders == null) return;
@@ -335,6 +404,8 @@ public abstract class Folder
 			}
 			if (subFolders.isEmpty())
 				subFolders = null;
+			if (!toNotify.isEmpty())
+				markChanged();
 		}
 		for (F subFolder : toNotify)
 			evtFolderRemoved.fire(new FolderEvent(this, subFolder));
@@ -342,11 +413,13 @@ public abstract class Folder
 
 	@Nullable
 	public synchronized final D getDocument(String name) {
+		loadChildren();
 		if (documents == null) return null;
 		return documents.get(name);
 	}
 
 	public synchronized final int getDocumentCount() {
+		loadChildren();
 		if (documents == null) return 0;
 		return documents.size();
 	}
@@ -354,12 +427,14 @@ public abstract class Folder
 	@ImmutableCopy
 	@NotNull
 	public synchronized final List<D> getDocuments() {
+		loadChildren();
 		return UtilModel.nullSafeImmutableList(documents);
 	}
 
 	@ImmutableCopy
 	@NotNull
 	public synchronized final Map<String, D> getDocumentMap() {
+		loadChildren();
 		return UtilModel.nullSafeImmutableMap(documents);
 	}
 
@@ -378,12 +453,14 @@ public abstract class Folder
 
 	@Nullable
 	public synchronized final F getSubFolder(String name) {
+		loadChildren();
 		if (subFolders == null)
 			return null;
 		return subFolders.get(name);
 	}
 
 	public synchronized final int getSubFolderCount() {
+		loadChildren();
 		if (subFolders == null)
 			return 0;
 		return subFolders.size();
@@ -392,16 +469,19 @@ public abstract class Folder
 	@ImmutableCopy
 	@NotNull
 	public synchronized final List<F> getSubFolders() {
+		loadChildren();
 		return UtilModel.nullSafeImmutableList(subFolders);
 	}
 
 	@ImmutableCopy
 	@NotNull
 	public synchronized final Map<String, F> getSubFolderMap() {
+		loadChildren();
 		return UtilModel.nullSafeImmutableMap(subFolders);
 	}
 
 	public synchronized final int getChildCount() {
+		loadChildren();
 		int count = 0;
 		if (documents != null)
 			count += documents.size();
@@ -422,7 +502,44 @@ public abstract class Folder
 	}
 
 	public synchronized final void setChecked(boolean isChecked) {
+		if (this.isChecked == isChecked)
+			return;
 		this.isChecked = isChecked;
+		markChanged();
+	}
+
+	/**
+	 * Creates the children of the receiver from its stored record if this
+	 * hasn't been done yet. Called by all methods that access the children.
+	 * If the record can't be read, the children are left out and the
+	 * last-modified field is cleared, so that the next index update will
+	 * rescan the folder.
+	 */
+	final synchronized void loadChildren() {
+		TreeIndexStore.PendingChildren pending = pendingChildren;
+		if (pending == null)
+			return;
+		pendingChildren = null;
+		try {
+			pending.load(this);
+		}
+		catch (IOException e) {
+			Util.printErr(e);
+			storedHash = 0;
+			setLastModified(null);
+		}
+	}
+
+	/**
+	 * Marks the receiver and its ancestors as changed, including the folders
+	 * containing the documents that attached folders belong to.
+	 */
+	protected final void markChanged() {
+		Folder<?, ?> current = this;
+		while (current != null && !current.changed) {
+			current.changed = true;
+			current = current.parent != null ? current.parent : current.owner;
+		}
 	}
 
 	@NotNull
@@ -445,6 +562,7 @@ public abstract class Folder
 	@ImmutableCopy
 	@NotNull
 	public synchronized final List<String> getDocumentIds() {
+		loadChildren();
 		if (documents == null)
 			return Collections.emptyList();
 		String[] uids = new String[documents.size()];
@@ -487,6 +605,7 @@ public abstract class Folder
 		 * dynamically, this search algorithm is somewhat inefficient. Maybe
 		 * improve it? (Consider making use of the path hashcode.)
 		 */
+		loadChildren();
 		if (documents != null) {
 			for (D document : documents.values()) {
 				Path path = document.getPath();
@@ -506,7 +625,32 @@ public abstract class Folder
 		return null;
 	}
 
+	/*
+	 * When the tree index is written by TreeIndexStore, the children are
+	 * stored separately as folder records, so they're left out here.
+	 */
+	private synchronized void writeObject(@NotNull ObjectOutputStream out)
+			throws IOException {
+		if (!TreeIndexStore.isWritingShell()) {
+			loadChildren();
+			out.defaultWriteObject();
+			return;
+		}
+		HashMap<String, D> documents = this.documents;
+		HashMap<String, F> subFolders = this.subFolders;
+		this.documents = null;
+		this.subFolders = null;
+		try {
+			out.defaultWriteObject();
+		}
+		finally {
+			this.documents = documents;
+			this.subFolders = subFolders;
+		}
+	}
+
 	public synchronized final boolean hasErrorsDeep() {
+		loadChildren();
 		if (hasErrors())
 			return true;
 		if (documents != null)
@@ -20,10 +20,10 @@ import java.util.concurrent.locks.Lock;
 import net.contentobjects.jnotify.JNotify;
 import net.sourceforge.docfetcher.enums.Msg;
 import net.sourceforge.docfetcher.gui.ManualLocator;
+import net.sourceforge.docfetcher.model.ChangeJournal.ChangeType;
 import net.sourceforge.docfetcher.model.IndexRegistry.ExistingIndexesHandler;
 import net.sourceforge.docfetcher.model.index.IndexingConfig;
 import net.sourceforge.docfetcher.model.index.PatternAction;
-import net.sourceforge.docfetcher.model.index.Task.IndexAction;
 import net.sourceforge.docfetcher.model.index.file.FileDocument;
 import net.sourceforge.docfetcher.model.index.file.FileFolder;
 import net.sourceforge.docfetcher.model.index.file.FileIndex;
@@ -298,18 +298,44 @@ public final class FolderWatcher {
 			if (!accept(targetFile, eventType))
 				return;
 			
+			/*
+			 * Record the change right away, so that it won't get lost if the
+			 * program terminates before the index update has run. Changes
+			 * outside the root are possible if the parent folder of a file
+			 * is watched instead of the file itself.
+			 */
+			File rootFile = watchedIndex.getCanonicalRootFile();
+			if (targetFile.equals(rootFile) || Util.contains(rootFile, targetFile))
+				indexRegistry.getChangeJournal().record(
+					targetFile, getChangeType(eventType));
+			
 			/*
 			 * JNotify can fire many events in rapid succession, so we'll add a
 			 * small delay here in order to let the file system "cool down".
 			 */
 			delayedExecutor.schedule(new Runnable() {
 				public void run() {
-					indexRegistry.getQueue().addTask(
-						watchedIndex, IndexAction.UPDATE);
+					indexRegistry.getQueue().addJournaledUpdate(watchedIndex);
 				}
 			});
 		}
 		
+		@NotNull
+		private ChangeType getChangeType(@NotNull EventType eventType) {
+			switch (eventType) {
+			case CREATED:
+				return ChangeType.CREATED;
+			case DELETED:
+				return ChangeType.DELETED;
+			case MODIFIED:
+				return ChangeType.MODIFIED;
+			case RENAMED:
+				return ChangeType.RENAMED;
+			default:
+				throw new IllegalStateException();
+			}
+		}
+		
 		private boolean accept(	@NotNull File target,
 								@NotNull EventType eventType) {
 			String name = target.getName();
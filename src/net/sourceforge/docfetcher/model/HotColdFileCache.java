@@ -35,6 +35,9 @@ import com.google.common.annotations.VisibleForTesting;
  * for a while, so as to avoid the nasty surprise of deleting files which are
  * currently open in an external application.
  * 
+ * If enabled, the persistent {@link ExtractionCache} takes the place of this
+ * cache for files unpacked from 7z and rar archives.
+ * 
  * @author Tran Nam Quang
  */
 @VisibleForPackageGroup
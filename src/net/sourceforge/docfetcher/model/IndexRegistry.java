@@ -11,20 +11,12 @@
 
 package net.sourceforge.docfetcher.model;
 
-import java.io.BufferedInputStream;
-import java.io.BufferedOutputStream;
 import java.io.BufferedWriter;
 import java.io.File;
-import java.io.FileInputStream;
 import java.io.FileOutputStream;
 import java.io.IOException;
-import java.io.ObjectInputStream;
-import java.io.ObjectOutputStream;
 import java.io.OutputStreamWriter;
 import java.io.Writer;
-import java.nio.channels.FileLock;
-import java.nio.file.Files;
-import java.nio.file.StandardCopyOption;
 import java.util.ArrayList;
 import java.util.Collection;
 import java.util.Collections;
@@ -51,7 +43,6 @@ import org.apache.lucene.util.Version;
 
 import com.google.common.collect.ImmutableList;
 import com.google.common.collect.Maps;
-import com.google.common.io.Closeables;
 import com.google.common.primitives.Longs;
 
 import net.contentobjects.jnotify.JNotify;
@@ -61,9 +52,12 @@ import net.sourceforge.docfetcher.enums.ProgramConf;
 import net.sourceforge.docfetcher.enums.SettingsConf;
 import net.sourceforge.docfetcher.model.IndexLoadingProblems.CorruptedIndex;
 import net.sourceforge.docfetcher.model.IndexLoadingProblems.OverflowIndex;
+import net.sourceforge.docfetcher.model.index.ChangeFeed;
 import net.sourceforge.docfetcher.model.index.IndexingQueue;
 import net.sourceforge.docfetcher.model.index.file.FileFactory;
 import net.sourceforge.docfetcher.model.index.outlook.OutlookMailFactory;
+import net.sourceforge.docfetcher.model.parse.ParseCache;
+import net.sourceforge.docfetcher.model.parse.ParseService;
 import net.sourceforge.docfetcher.model.search.Searcher;
 import net.sourceforge.docfetcher.util.AppUtil;
 import net.sourceforge.docfetcher.util.CharsetDetectorHelper;
@@ -102,7 +96,6 @@ public final class IndexRegistry {
 	@Nullable
 	public static volatile File indexPathOverride = null;
 
-	private static final String SER_FILENAME = "tree-index.ser";
 	private static final String NAME_FILENAME = "index-name.txt";
 	
 	/*
@@ -142,6 +135,9 @@ public final class IndexRegistry {
 	private final FileFactory fileFactory;
 	private final OutlookMailFactory outlookMailFactory;
 	private final BlockingWrapper<Searcher> searcher = new BlockingWrapper<Searcher>();
+	private final ChangeFeed changeFeed = new ChangeFeed(
+		ProgramConf.Int.ChangeFeedCapacity.get());
+	private final ChangeJournal changeJournal;
 
 	@NotNull
 	public static Analyzer getAnalyzer() {
@@ -172,8 +168,23 @@ public final class IndexRegistry {
 		Util.checkNotNull(indexParentDir);
 		this.indexParentDir = indexParentDir;
 		this.unpackCache = new HotColdFileCache(cacheSize);
-		this.fileFactory = new FileFactory(unpackCache);
+		int extractionCacheSize = ProgramConf.Int.ExtractionCacheSize.get();
+		ExtractionCache extractionCache = null;
+		if (extractionCacheSize > 0)
+			extractionCache = new ExtractionCache(
+				new File(indexParentDir, ExtractionCache.DIRNAME),
+				extractionCacheSize * 1024L * 1024L);
+		this.fileFactory = new FileFactory(unpackCache, extractionCache);
 		this.outlookMailFactory = new OutlookMailFactory(unpackCache);
+		this.changeJournal = new ChangeJournal(
+			new File(indexParentDir, ChangeJournal.FILENAME),
+			ProgramConf.Int.ChangeJournalCapacity.get());
+
+		int parseCacheSize = ProgramConf.Int.ParseCacheSize.get();
+		if (parseCacheSize > 0)
+			ParseService.setCache(new ParseCache(
+				new File(indexParentDir, ParseCache.DIRNAME),
+				parseCacheSize * 1024L * 1024L));
 
 		/*
 		 * Giving out a reference to the IndexRegistry before it is fully
@@ -194,6 +205,18 @@ public final class IndexRegistry {
 		return queue;
 	}
 
+	@NotNull
+	@ThreadSafe
+	public ChangeFeed getChangeFeed() {
+		return changeFeed;
+	}
+
+	@NotNull
+	@ThreadSafe
+	public ChangeJournal getChangeJournal() {
+		return changeJournal;
+	}
+
 	// Will block until the searcher is available (i.e. after load(...) has finished)
 	// do not call this from the GUI thread, otherwise the application might hang
 	// May return null if the calling thread was interrupted
@@ -266,6 +289,7 @@ public final class IndexRegistry {
 				if (deleteFiles)
 					deletions.add(new PendingDeletion(index));
 				removed.add(index);
+				changeFeed.publishRemoval(index);
 			}
 
 			/*
@@ -367,32 +391,32 @@ public final class IndexRegistry {
 			if (cancelable.isCanceled())
 				break;
 			if (file.isDirectory()) {
-				File serFile = new File(file, SER_FILENAME);
-				if (serFile.isFile()) {
+				if (TreeIndexStore.exists(file)) {
 					/*
-					 * Try to load the tree-index.ser. If this fails, we're
-					 * probably dealing with a tree-index.ser from DocFetcher
-					 * 1.1 beta 1 through DocFetcher 1.1 beta 6, because the
-					 * serialization version UID was changed after 1.1 beta 6.
+					 * Try to load the tree index. If this fails, we're probably
+					 * dealing with a tree-index.ser from DocFetcher 1.1 beta 1
+					 * through DocFetcher 1.1 beta 6, because the serialization
+					 * version UID was changed after 1.1 beta 6.
 					 */
 					try {
-						if (!loadIndex(serFile)) {
+						if (!loadIndex(file)) {
 							loadingProblems.addObsoleteFile(file);
 						}
 					} catch (StackOverflowError e) {
 						loadingProblems.addOverflowIndex(new OverflowIndex(file, e));
 					}
 				}
-				else if (!serFile.exists()) {
+				else if (!new File(file, TreeIndexStore.SNAPSHOT_FILENAME).exists()
+						&& !new File(file, TreeIndexStore.LEGACY_FILENAME).exists()) {
 					/*
-					 * If no tree-index.ser exists and the containing folder has
-					 * a name that ends with a timestamp, it's probably an index
+					 * If no tree index exists and the containing folder has a
+					 * name that ends with a timestamp, it's probably an index
 					 * folder from DocFetcher 1.0.3 or earlier.
 					 */
 					if (file.getName().matches(".*?_\\d+"))
 						loadingProblems.addObsoleteFile(file);
 				}
-				// Ignore if tree-index.ser is a directory
+				// Ignore if the tree index file is a directory
 			}
 			else if (file.isFile()) {
 				/*
@@ -417,7 +441,7 @@ public final class IndexRegistry {
 
 			final int watchId = new SimpleJNotifyListener() {
 				protected void handleEvent(File targetFile, EventType eventType) {
-					if (!targetFile.getName().equals(SER_FILENAME))
+					if (!TreeIndexStore.isStoreFile(targetFile.getName()))
 						return;
 					executor.schedule(new Runnable() {
 						public void run() {
@@ -446,39 +470,22 @@ public final class IndexRegistry {
 	}
 
 	/**
-	 * Load the given tree index file. Returns whether the file was successfully
-	 * loaded.
+	 * Load the tree index in the given index folder. Returns whether the index
+	 * was successfully loaded.
 	 */
 	@ThreadSafe
-	private boolean loadIndex(@NotNull File serFile) {
-		ObjectInputStream in = null;
+	private boolean loadIndex(@NotNull File indexDir) {
 		try {
-			FileInputStream fin = new FileInputStream(serFile);
-			FileLock lock = fin.getChannel().lock(0, Long.MAX_VALUE, true);
-			LuceneIndex index;
-			try {
-				/*
-				 * Without this BufferedInputStream, there can be noticeable
-				 * performance problems if the index resides on a network drive.
-				 */
-				in = new ObjectInputStream(new BufferedInputStream(fin));
-				index = (LuceneIndex) in.readObject();
-			}
-			finally {
-				lock.release();
-			}
+			LuceneIndex index = TreeIndexStore.load(indexDir);
 			//If index can be loaded, load the index name from file
 			index.getRootFolder().setDisplayName(loadIndexName(index.getIndexDirPath()));
-			addIndex(index, serFile.lastModified());
+			addIndex(index, TreeIndexStore.getLastModified(indexDir));
 			return true;
 		}
 		catch (Exception e) {
 			e.printStackTrace();
 			return false;
 		}
-		finally {
-			Closeables.closeQuietly(in);
-		}
 	}
 
 	private void reload() {
@@ -498,20 +505,19 @@ public final class IndexRegistry {
 			for (File indexDir : Util.listFiles(indexParentDir)) {
 				if (!indexDir.isDirectory())
 					continue;
-				File serFile = new File(indexDir, SER_FILENAME);
-				if (!serFile.isFile())
+				if (!TreeIndexStore.exists(indexDir))
 					continue;
 
 				LuceneIndex index = indexDirMap.remove(Util.getAbsFile(indexDir));
 
 				// New index found
 				if (index == null) {
-					loadIndex(serFile);
+					loadIndex(indexDir);
 				}
 				// Existing index; may have been modified
 				else {
 					Long oldLM = indexes.get(index);
-					long newLM = serFile.lastModified();
+					long newLM = TreeIndexStore.getLastModified(indexDir);
 					if (oldLM != null && oldLM.longValue() != newLM) {
 						/*
 						 * Remove the old version of the index and add the new
@@ -519,7 +525,7 @@ public final class IndexRegistry {
 						 * searched in right now.
 						 */
 						removeIndexes(Collections.singletonList(index), false);
-						loadIndex(serFile);
+						loadIndex(indexDir);
 					}
 				}
 			}
@@ -539,42 +545,24 @@ public final class IndexRegistry {
 		try {
 			File indexDir = index.getIndexDirPath().getCanonicalFile();
 			indexDir.mkdirs();
-			File serFile = new File(indexDir, SER_FILENAME);
 			
 			/*
 			 * DocFetcher might have been burned onto a CD-ROM; if so, then just
 			 * ignore it.
 			 */
-			if (serFile.exists() && !serFile.canWrite())
+			if (TreeIndexStore.isReadOnly(indexDir))
 				return;
 			
 			/*
-			 * Instead of writing to the tree file directly, we'll write to a
-			 * temporary file and then rename it to the tree file, provided that
-			 * no errors occurred. This prevents the creation of broken tree
-			 * files.
+			 * The tree index store writes new snapshots to a temporary file
+			 * and renames it afterwards, and discards incomplete journal
+			 * entries on loading, so that errors while saving can't break the
+			 * tree index files.
 			 */
-			File tempFile = new File(indexDir, SER_FILENAME + ".temp");
-			
 			boolean success = false;
-			ObjectOutputStream out = null;
 			try {
-				tempFile.createNewFile();
-				FileOutputStream fout = new FileOutputStream(tempFile);
-				FileLock lock = fout.getChannel().lock();
-				try {
-					/*
-					 * Without this BufferedOutputStream, there can be
-					 * noticeable performance problems if the index resides on a
-					 * network drive.
-					 */
-					out = new ObjectOutputStream(new BufferedOutputStream(fout));
-					out.writeObject(index);
-					success = true;
-				}
-				finally {
-					lock.release();
-				}
+				TreeIndexStore.save((TreeIndex<?, ?>) index, indexDir);
+				success = true;
 			}
 			catch (StackOverflowError e) {
 				AppUtil.showError("Couldn't save index '" + index.getDisplayName() + "': Folder hierarchy "
@@ -583,25 +571,8 @@ public final class IndexRegistry {
 			catch (IOException e) {
 				e.printStackTrace(); // The average user doesn't need to know
 			}
-			finally {
-				Closeables.closeQuietly(out);
-			}
 			
 			if (success) {
-				try {
-					/*
-					 * Don't use the old File.renameTo method here, it's not
-					 * reliable. Also, note that this file moving must be done
-					 * *after* the object output stream is closed.
-					 */
-					Files.move(
-						tempFile.toPath(), serFile.toPath(),
-						StandardCopyOption.REPLACE_EXISTING);
-				}
-				catch (IOException e) {
-					e.printStackTrace();
-				}
-				
 				if (ProgramConf.Bool.AllowIndexRenaming.get()) {
 					/*
 					 * If saving the index succeeded, save the indexName in a
@@ -613,7 +584,7 @@ public final class IndexRegistry {
 				}
 				
 				// Update cached last-modified value of index
-				indexes.put(index, serFile.lastModified());
+				indexes.put(index, TreeIndexStore.getLastModified(indexDir));
 			}
 		}
 		finally {
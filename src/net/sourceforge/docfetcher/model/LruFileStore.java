@@ -0,0 +1,216 @@
+/*******************************************************************************
+ * Copyright (c) 2021 Tran Nam Quang.
+ * All rights reserved. This program and the accompanying materials
+ * are made available under the terms of the Eclipse Public License v1.0
+ * which accompanies this distribution, and is available at
+ * http://www.eclipse.org/legal/epl-v10.html
+ *
+ * Contributors:
+ *    Tran Nam Quang - initial API and implementation
+ *******************************************************************************/
+
+package net.sourceforge.docfetcher.model;
+
+import java.io.File;
+import java.io.IOException;
+import java.util.Arrays;
+import java.util.Comparator;
+import java.util.Iterator;
+import java.util.LinkedHashMap;
+import java.util.Map;
+
+import net.sourceforge.docfetcher.util.Metrics;
+import net.sourceforge.docfetcher.util.Util;
+import net.sourceforge.docfetcher.util.annotations.NotNull;
+import net.sourceforge.docfetcher.util.annotations.ThreadSafe;
+
+import com.google.common.primitives.Longs;
+
+/**
+ * The bookkeeping shared by the persistent caches
+ * {@link net.sourceforge.docfetcher.model.parse.ParseCache ParseCache} and
+ * {@link ExtractionCache}: Each cache entry is a file or folder in the store
+ * folder, named after its key. The total size of the entries is limited by the
+ * capacity of the store; if it is exceeded, the least recently used entries
+ * are deleted. The usage order is kept across program sessions via the
+ * modification dates of the entry files.
+ * <p>
+ * The store only keeps track of the entries, reading and writing them is left
+ * to the caches. Compound operations, such as replacing an entry, can be made
+ * atomic by synchronizing on the store.
+ *
+ * @author Tran Nam Quang
+ */
+@ThreadSafe
+public final class LruFileStore {
+
+	public interface SizeReader {
+		/**
+		 * Returns the size in bytes of the given entry file or folder, or -1
+		 * if the entry is incomplete, e.g. because it was left behind by a
+		 * terminated program. Incomplete entries are deleted.
+		 */
+		public long getSize(@NotNull File entry);
+	}
+
+	private final File dir;
+	private final long capacity;
+	private final String counterPrefix;
+	private final Map<String, Long> entrySizes; // guarded by 'this' lock
+	private long totalSize = 0; // guarded by 'this' lock
+	private long hits = 0; // guarded by 'this' lock
+	private long misses = 0; // guarded by 'this' lock
+	private long evictions = 0; // guarded by 'this' lock
+
+	/**
+	 * Creates a store in the given folder, with the given capacity in bytes.
+	 * Entries that were previously stored in the folder are kept, up to the
+	 * capacity. The hits and misses are also reported to the {@link Metrics}
+	 * counters whose names start with the given prefix.
+	 */
+	public LruFileStore(@NotNull File dir,
+						long capacity,
+						@NotNull String counterPrefix,
+						@NotNull SizeReader sizeReader) {
+		Util.checkNotNull(dir, counterPrefix, sizeReader);
+		Util.checkThat(capacity > 0);
+		this.dir = dir;
+		this.capacity = capacity;
+		this.counterPrefix = counterPrefix;
+		entrySizes = new LinkedHashMap<String, Long>(16, 0.75f, true);
+		dir.mkdirs();
+
+		// Load the existing entries, least recently used first
+		File[] entries = Util.listFiles(dir);
+		Arrays.sort(entries, new Comparator<File>() {
+			public int compare(File f1, File f2) {
+				return Longs.compare(f1.lastModified(), f2.lastModified());
+			}
+		});
+		for (File entry : entries) {
+			long size = sizeReader.getSize(entry);
+			if (size < 0) {
+				deleteQuietly(entry);
+				continue;
+			}
+			entrySizes.put(entry.getName(), size);
+			totalSize += size;
+		}
+		evict();
+	}
+
+	public long getCapacity() {
+		return capacity;
+	}
+
+	/**
+	 * Returns the location of the entry file or folder with the given key,
+	 * regardless of whether the entry exists.
+	 */
+	@NotNull
+	public File getEntry(@NotNull String key) {
+		return new File(dir, key);
+	}
+
+	/**
+	 * Returns whether there is an entry with the given key. Unlike
+	 * {@link #touch(String)}, this doesn't update the usage order.
+	 */
+	public synchronized boolean contains(@NotNull String key) {
+		return entrySizes.containsKey(key);
+	}
+
+	/**
+	 * Returns whether there is an entry with the given key, and if so, marks
+	 * it as the most recently used entry. The cache counters are not updated;
+	 * the caller should do so via {@link #countHit(String)} or
+	 * {@link #countMiss()} once it knows whether the entry could be read.
+	 */
+	public synchronized boolean touch(@NotNull String key) {
+		return entrySizes.get(key) != null;
+	}
+
+	/**
+	 * Counts a cache hit on the entry with the given key and updates the
+	 * modification date of the entry file, so that the usage order is kept
+	 * across program sessions.
+	 */
+	public void countHit(@NotNull String key) {
+		getEntry(key).setLastModified(System.currentTimeMillis());
+		synchronized (this) {
+			hits++;
+		}
+		Metrics.counter(counterPrefix + "_hits").increment();
+	}
+
+	public void countMiss() {
+		synchronized (this) {
+			misses++;
+		}
+		Metrics.counter(counterPrefix + "_misses").increment();
+	}
+
+	/**
+	 * Registers the entry with the given key and size, which the caller must
+	 * already have written to the location returned by
+	 * {@link #getEntry(String)}, and deletes the least recently used entries
+	 * if the capacity is exceeded.
+	 */
+	public synchronized void add(@NotNull String key, long size) {
+		Long oldSize = entrySizes.put(key, size);
+		if (oldSize != null)
+			totalSize -= oldSize;
+		totalSize += size;
+		evict();
+	}
+
+	/**
+	 * Deletes the entry with the given key, if there is one.
+	 */
+	public synchronized void remove(@NotNull String key) {
+		Long size = entrySizes.remove(key);
+		if (size == null)
+			return;
+		deleteQuietly(getEntry(key));
+		totalSize -= size;
+	}
+
+	/**
+	 * Returns the current values of the cache counters, keyed by "hits",
+	 * "misses", "evictions", "size", "bytes" and "capacity". The size is the
+	 * number of entries, the capacity is given in bytes.
+	 */
+	@NotNull
+	public synchronized Map<String, Long> getStats() {
+		Map<String, Long> stats = new LinkedHashMap<String, Long>();
+		stats.put("hits", hits);
+		stats.put("misses", misses);
+		stats.put("evictions", evictions);
+		stats.put("size", (long) entrySizes.size());
+		stats.put("bytes", totalSize);
+		stats.put("capacity", capacity);
+		return stats;
+	}
+
+	// Deletes the least recently used entries until the capacity is not exceeded
+	private void evict() {
+		Iterator<Map.Entry<String, Long>> it = entrySizes.entrySet().iterator();
+		while (totalSize > capacity && it.hasNext()) {
+			Map.Entry<String, Long> entry = it.next();
+			deleteQuietly(getEntry(entry.getKey()));
+			totalSize -= entry.getValue();
+			evictions++;
+			it.remove();
+		}
+	}
+
+	private static void deleteQuietly(@NotNull File file) {
+		try {
+			Util.deleteRecursively(file);
+		}
+		catch (IOException e) {
+			Util.printErr(e);
+		}
+	}
+
+}
@@ -61,6 +61,27 @@ public interface LuceneIndex extends ViewNode, Serializable {
 	public IndexingResult update(	@Nullable IndexingReporter reporter,
 	                             	@Nullable Cancelable cancelable);
 	
+	/**
+	 * Same as {@link #update(IndexingReporter, Cancelable)}, but the text
+	 * extraction may run in up to the given number of threads in parallel.
+	 */
+	@NotNull
+	public IndexingResult update(	@Nullable IndexingReporter reporter,
+	                             	@Nullable Cancelable cancelable,
+	                             	int parseThreads);
+	
+	/**
+	 * Same as {@link #update(IndexingReporter, Cancelable, int)}, but if the
+	 * given changes are not null, the update may be restricted to the changed
+	 * files and folders, assuming that everything else hasn't changed since the
+	 * last update.
+	 */
+	@NotNull
+	public IndexingResult update(	@Nullable IndexingReporter reporter,
+	                             	@Nullable Cancelable cancelable,
+	                             	int parseThreads,
+	                             	@Nullable ChangeJournal.Changes changes);
+	
 	@NotNull
 	public Directory getLuceneDir() throws IOException;
 	
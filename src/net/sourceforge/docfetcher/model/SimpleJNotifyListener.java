@@ -43,10 +43,12 @@ abstract class SimpleJNotifyListener {
 			handleEvent(rootPath, name, EventType.MODIFIED);
 		}
 
+		// Reported as a deletion of the old file and a renaming to the new file
 		public final void fileRenamed(	int wd,
 		                              	String rootPath,
 		                              	String oldName,
 		                              	String newName) {
+			handleEvent(rootPath, oldName, EventType.DELETED);
 			handleEvent(rootPath, newName, EventType.RENAMED);
 		}
 	};
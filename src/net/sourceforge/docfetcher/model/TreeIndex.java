@@ -111,6 +111,48 @@ public abstract class TreeIndex <
 	@NotNull
 	protected abstract F createRootFolder(@NotNull Path path);
 
+	/*
+	 * The following methods are used by TreeIndexStore for reading and
+	 * writing the folder and document tree.
+	 */
+
+	/**
+	 * Creates a folder with the given name that has neither a parent nor a
+	 * path. See {@link Folder#Folder(String)}.
+	 */
+	@NotNull
+	protected abstract F createDetachedFolder(@NotNull String name);
+
+	@NotNull
+	protected abstract D createDocument(@NotNull F parent,
+										@NotNull String name,
+										long lastModified);
+
+	/**
+	 * Returns the folder attached to the given document, if any, such as the
+	 * folder of an HTML pair.
+	 */
+	@Nullable
+	protected F getAttachedFolder(@NotNull D document) {
+		return null;
+	}
+
+	protected void setAttachedFolder(	@NotNull D document,
+										@Nullable F folder) {
+		throw new UnsupportedOperationException();
+	}
+
+	/**
+	 * Returns flags holding the fields that the folders of this index have in
+	 * addition to those of the {@link Folder} class.
+	 */
+	protected int getFolderFlags(@NotNull F folder) {
+		return 0;
+	}
+
+	protected void setFolderFlags(@NotNull F folder, int flags) {
+	}
+
 	@NotNull
 	public final IndexingConfig getConfig() {
 		return config;
@@ -139,18 +181,37 @@ public abstract class TreeIndex <
 	@NotNull
 	public final IndexingResult update(	@Nullable IndexingReporter reporter,
 										@Nullable Cancelable cancelable) {
+		return update(reporter, cancelable, 1);
+	}
+	
+	@NotNull
+	public final IndexingResult update(	@Nullable IndexingReporter reporter,
+										@Nullable Cancelable cancelable,
+										int parseThreads) {
+		return update(reporter, cancelable, parseThreads, null);
+	}
+	
+	@NotNull
+	public final IndexingResult update(	@Nullable IndexingReporter reporter,
+										@Nullable Cancelable cancelable,
+										int parseThreads,
+										@Nullable ChangeJournal.Changes changes) {
+		Util.checkThat(parseThreads > 0);
 		if (reporter == null)
 			reporter = IndexingReporter.nullReporter;
 		if (cancelable == null)
 			cancelable = Cancelable.nullCancelable;
 		if (cancelable.isCanceled())
 			return IndexingResult.SUCCESS_UNCHANGED;
-		return doUpdate(reporter, cancelable);
+		return doUpdate(reporter, cancelable, parseThreads, changes);
 	}
 	
+	// Subclasses may ignore the changes and rescan the entire index
 	@NotNull
 	protected abstract IndexingResult doUpdate(	@NotNull IndexingReporter reporter,
-												@NotNull Cancelable cancelable);
+												@NotNull Cancelable cancelable,
+												int parseThreads,
+												@Nullable ChangeJournal.Changes changes);
 	
 	@NotNull
 	public final Directory getLuceneDir() throws IOException {
@@ -0,0 +1,1380 @@
+/*******************************************************************************
+ * Copyright (c) 2021 Tran Nam Quang.
+ * All rights reserved. This program and the accompanying materials
+ * are made available under the terms of the Eclipse Public License v1.0
+ * which accompanies this distribution, and is available at
+ * http://www.eclipse.org/legal/epl-v10.html
+ *
+ * Contributors:
+ *    Tran Nam Quang - initial API and implementation
+ *******************************************************************************/
+
+package net.sourceforge.docfetcher.model;
+
+import java.io.BufferedInputStream;
+import java.io.BufferedOutputStream;
+import java.io.ByteArrayInputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.DataOutputStream;
+import java.io.EOFException;
+import java.io.File;
+import java.io.FileInputStream;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.ObjectInputStream;
+import java.io.ObjectOutputStream;
+import java.io.RandomAccessFile;
+import java.nio.ByteBuffer;
+import java.nio.channels.FileChannel;
+import java.nio.channels.FileLock;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.nio.file.StandardCopyOption;
+import java.util.ArrayDeque;
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.Deque;
+import java.util.HashMap;
+import java.util.LinkedHashMap;
+import java.util.LinkedList;
+import java.util.List;
+import java.util.Map;
+import java.util.Random;
+import java.util.zip.CRC32;
+
+import net.sourceforge.docfetcher.model.index.IndexingError;
+import net.sourceforge.docfetcher.model.index.IndexingError.ErrorType;
+import net.sourceforge.docfetcher.util.Util;
+import net.sourceforge.docfetcher.util.annotations.NotNull;
+import net.sourceforge.docfetcher.util.annotations.Nullable;
+
+import com.google.common.io.Closeables;
+
+/**
+ * Reads and writes the folder and document trees of tree indexes. Instead of
+ * serializing the entire tree with Java serialization, each folder is stored
+ * as a flat, length-prefixed record containing the folder's fields, its
+ * documents and the names of its subfolders. The records are written and read
+ * iteratively, so that deep folder hierarchies can't cause stack overflows.
+ * Only the rest of the index (the indexing config and the root folder without
+ * its children) is still written with Java serialization.
+ * <p>
+ * The records are stored in two files in the index folder:
+ * <ul>
+ * <li>A snapshot file containing the records of all folders.</li>
+ * <li>A journal file to which the records of the folders that changed since
+ * the last save are appended. When the journal grows larger than half the
+ * snapshot (and larger than a minimum size), it is compacted into a new
+ * snapshot.</li>
+ * </ul>
+ * Both files consist of a header and a sequence of entries. Each entry holds a
+ * string table, which is used to store each distinct name only once per entry,
+ * and a list of folder records. Each entry is preceded by its length and a
+ * CRC32 checksum, so that an entry that was only partially written to the
+ * journal, e.g. due to a crash, is detected and discarded on loading.
+ * <p>
+ * When saving, the subtrees in which no folder was modified or moved since
+ * the last save are skipped, based on the change marks set by the
+ * {@link Folder} and {@link Document} setters. When loading, both files are
+ * read into memory, but only the keys of the records are decoded. The
+ * documents and subfolders of a folder are created from its record when they
+ * are first accessed, so that the parts of the tree that are never looked at
+ * stay in their compact encoded form. Operations that walk the entire tree,
+ * such as index updates, compactions of the journal and collecting the
+ * check states of the folders for searches, still create all folders and
+ * documents.
+ * <p>
+ * Index files written by earlier versions of the program with Java
+ * serialization can still be loaded. They're replaced with the new format on
+ * the next save.
+ *
+ * @author Tran Nam Quang
+ */
+final class TreeIndexStore {
+
+	static final String SNAPSHOT_FILENAME = "tree-index.dat";
+	static final String JOURNAL_FILENAME = "tree-index.journal";
+	static final String LEGACY_FILENAME = "tree-index.ser";
+
+	private static final int SNAPSHOT_MAGIC = 0x44465453; // "DFTS"
+	private static final int JOURNAL_MAGIC = 0x4446544A; // "DFTJ"
+	private static final int VERSION = 1;
+	private static final int HEADER_SIZE = 16; // magic, version and snapshot ID
+	private static final int FRAME_HEADER_SIZE = 8; // length and checksum
+
+	/*
+	 * The journal is compacted into a new snapshot when it grows larger than
+	 * half the snapshot, but not before it reaches this size.
+	 */
+	private static final long MIN_COMPACTION_SIZE = 1024 * 1024;
+
+	// Kinds of path segments
+	private static final int SUBFOLDER = 0;
+	private static final int ATTACHED_FOLDER = 1;
+
+	private static final int FLAG_CHECKED = 1;
+
+	// Stored hash of folders whose children haven't been loaded yet
+	private static final long UNLOADED_HASH = 1;
+
+	private static final ThreadLocal<Boolean> writingShell = new ThreadLocal<Boolean>();
+
+	private TreeIndexStore() {
+	}
+
+	/**
+	 * The stored record of a folder whose children haven't been created yet.
+	 * See {@link Folder#loadChildren()}.
+	 */
+	interface PendingChildren {
+		void load(@NotNull Folder<?, ?> folder) throws IOException;
+	}
+
+	/**
+	 * Returns whether the current thread is serializing the part of a tree
+	 * index that is not stored as folder records. If so, folders must leave
+	 * out their children during serialization.
+	 */
+	static boolean isWritingShell() {
+		return writingShell.get() != null;
+	}
+
+	/**
+	 * Returns whether the given index folder contains a tree index file, either
+	 * in the current or in the legacy format.
+	 */
+	static boolean exists(@NotNull File indexDir) {
+		return new File(indexDir, SNAPSHOT_FILENAME).isFile()
+				|| new File(indexDir, LEGACY_FILENAME).isFile();
+	}
+
+	static boolean isStoreFile(@NotNull String filename) {
+		return filename.equals(SNAPSHOT_FILENAME)
+				|| filename.equals(JOURNAL_FILENAME)
+				|| filename.equals(LEGACY_FILENAME);
+	}
+
+	/**
+	 * Returns whether the tree index files in the given index folder exist but
+	 * can't be written to, e.g. because the program was burned onto a CD-ROM.
+	 */
+	static boolean isReadOnly(@NotNull File indexDir) {
+		for (String filename : new String[] { SNAPSHOT_FILENAME, LEGACY_FILENAME }) {
+			File file = new File(indexDir, filename);
+			if (file.exists() && !file.canWrite())
+				return true;
+		}
+		return false;
+	}
+
+	/**
+	 * Returns the latest last-modified value of the tree index files in the
+	 * given index folder, or 0 if there are no such files. This value changes
+	 * whenever the index is saved.
+	 */
+	static long getLastModified(@NotNull File indexDir) {
+		long lastModified = 0;
+		for (String filename : new String[] {
+				SNAPSHOT_FILENAME, JOURNAL_FILENAME, LEGACY_FILENAME }) {
+			lastModified = Math.max(
+				lastModified, new File(indexDir, filename).lastModified());
+		}
+		return lastModified;
+	}
+
+	@NotNull
+	static TreeIndex<?, ?> load(@NotNull File indexDir)
+			throws IOException, ClassNotFoundException {
+		File snapshotFile = new File(indexDir, SNAPSHOT_FILENAME);
+		if (!snapshotFile.isFile())
+			return loadLegacy(new File(indexDir, LEGACY_FILENAME));
+
+		List<Decoder> entries = new ArrayList<Decoder>();
+		byte[] snapshot = readFully(snapshotFile);
+		long snapshotId = readHeader(snapshot, SNAPSHOT_MAGIC);
+		int snapshotEnd = readEntries(snapshot, entries);
+		if (entries.size() != 1 || snapshotEnd != snapshot.length)
+			throw new IOException("Corrupted tree index file: " + snapshotFile);
+
+		File journalFile = new File(indexDir, JOURNAL_FILENAME);
+		if (journalFile.isFile()) {
+			byte[] journal = readFully(journalFile);
+			/*
+			 * A journal that doesn't belong to the snapshot is left over from
+			 * an interrupted compaction and is ignored.
+			 */
+			if (journal.length >= HEADER_SIZE
+					&& readHeader(journal, JOURNAL_MAGIC) == snapshotId) {
+				int journalEnd = readEntries(journal, entries);
+				if (journalEnd < journal.length)
+					truncate(journalFile, journalEnd);
+			}
+		}
+
+		/*
+		 * Each entry starts with the serialized index without its folder
+		 * records. Only the last one is needed, the folder records of all
+		 * entries are then attached to it.
+		 */
+		for (Decoder entry : entries.subList(0, entries.size() - 1))
+			entry.skipBlob();
+		byte[] shell = entries.get(entries.size() - 1).readBlob();
+		TreeIndex<?, ?> index = (TreeIndex<?, ?>) deserialize(shell);
+		loadRecords(index, entries);
+		return index;
+	}
+
+	@SuppressWarnings({ "rawtypes", "unchecked" })
+	private static void loadRecords(@NotNull TreeIndex<?, ?> index,
+									@NotNull List<Decoder> entries)
+			throws IOException {
+		Loader loader = new Loader((TreeIndex) index);
+		for (Decoder entry : entries)
+			loader.addEntry(entry);
+		loader.attachRootFolder();
+	}
+
+	@NotNull
+	private static TreeIndex<?, ?> loadLegacy(@NotNull File serFile)
+			throws IOException, ClassNotFoundException {
+		ObjectInputStream in = null;
+		try {
+			FileInputStream fin = new FileInputStream(serFile);
+			FileLock lock = fin.getChannel().lock(0, Long.MAX_VALUE, true);
+			try {
+				/*
+				 * Without this BufferedInputStream, there can be noticeable
+				 * performance problems if the index resides on a network drive.
+				 */
+				in = new ObjectInputStream(new BufferedInputStream(fin));
+				return (TreeIndex<?, ?>) in.readObject();
+			}
+			finally {
+				lock.release();
+			}
+		}
+		finally {
+			Closeables.closeQuietly(in);
+		}
+	}
+
+	/**
+	 * Saves the given index to the given index folder. If the index was loaded
+	 * from or previously saved to this folder, only the records of the folders
+	 * that have changed since then are written, unless the journal has grown
+	 * too large.
+	 */
+	@SuppressWarnings({ "rawtypes", "unchecked" })
+	static void save(@NotNull TreeIndex<?, ?> index, @NotNull File indexDir)
+			throws IOException {
+		new Saver((TreeIndex) index).save(indexDir);
+	}
+
+	private static final class Saver
+		<D extends Document<D, F>, F extends Folder<D, F>> {
+
+		private final class Node {
+			private final F folder;
+			@Nullable private final Node parent;
+			private final int kind;
+			private final String name;
+			private final long keyHash;
+			private long hash;
+			private int recordIndex = -1;
+
+			private Node(	@NotNull F folder,
+							@Nullable Node parent,
+							int kind,
+							@NotNull String name) {
+				this(folder, parent, kind, name, parent == null
+					? 0
+					: keyHash(parent.keyHash, kind, name));
+			}
+
+			private Node(	@NotNull F folder,
+							@Nullable Node parent,
+							int kind,
+							@NotNull String name,
+							long keyHash) {
+				this.folder = folder;
+				this.parent = parent;
+				this.kind = kind;
+				this.name = name;
+				this.keyHash = keyHash;
+			}
+		}
+
+		private final TreeIndex<D, F> index;
+
+		public Saver(@NotNull TreeIndex<D, F> index) {
+			this.index = index;
+		}
+
+		public void save(@NotNull File indexDir) throws IOException {
+			File snapshotFile = new File(indexDir, SNAPSHOT_FILENAME);
+			File journalFile = new File(indexDir, JOURNAL_FILENAME);
+
+			Long snapshotId = readSnapshotId(snapshotFile);
+			if (snapshotId != null) {
+				List<Node> nodes = traverse(false);
+				boolean success = false;
+				try {
+					List<Node> changedNodes = new ArrayList<Node>();
+					for (Node node : nodes)
+						if (node.hash != node.folder.storedHash)
+							changedNodes.add(node);
+					byte[] entry = encodeEntry(changedNodes);
+					long journalLength = Math.max(journalFile.length(), HEADER_SIZE);
+					long maxJournalLength = Math.max(
+						snapshotFile.length() / 2, MIN_COMPACTION_SIZE);
+					if (journalLength + entry.length <= maxJournalLength) {
+						appendToJournal(journalFile, snapshotId, entry);
+						setStoredHashes(nodes);
+						success = true;
+						return;
+					}
+				}
+				finally {
+					if (!success)
+						setChanged(nodes);
+				}
+			}
+
+			List<Node> nodes = traverse(true);
+			boolean success = false;
+			try {
+				writeSnapshot(indexDir, nodes);
+				success = true;
+			}
+			finally {
+				if (!success)
+					setChanged(nodes);
+			}
+		}
+
+		// Writes a new snapshot and discards the journal
+		private void writeSnapshot(	@NotNull File indexDir,
+									@NotNull List<Node> nodes)
+				throws IOException {
+			File snapshotFile = new File(indexDir, SNAPSHOT_FILENAME);
+			File journalFile = new File(indexDir, JOURNAL_FILENAME);
+			long newSnapshotId = new Random().nextLong();
+			File tempFile = new File(indexDir, SNAPSHOT_FILENAME + ".temp");
+			FileOutputStream fout = new FileOutputStream(tempFile);
+			boolean success = false;
+			try {
+				FileLock lock = fout.getChannel().lock();
+				try {
+					/*
+					 * Without this BufferedOutputStream, there can be
+					 * noticeable performance problems if the index resides on
+					 * a network drive.
+					 */
+					DataOutputStream out = new DataOutputStream(
+						new BufferedOutputStream(fout));
+					writeHeader(out, SNAPSHOT_MAGIC, newSnapshotId);
+					writeFrame(out, encodeEntry(nodes));
+					out.flush();
+					success = true;
+				}
+				finally {
+					lock.release();
+				}
+			}
+			finally {
+				Closeables.close(fout, !success);
+			}
+			Files.move(
+				tempFile.toPath(), snapshotFile.toPath(),
+				StandardCopyOption.REPLACE_EXISTING);
+			journalFile.delete();
+			new File(indexDir, LEGACY_FILENAME).delete();
+			setStoredHashes(nodes);
+		}
+
+		/**
+		 * Returns the hash that {@link #traverse(boolean)} would compute for
+		 * the given folder, given the kind and the key hash of its position in
+		 * the tree.
+		 */
+		public long computeHash(@NotNull F folder, int kind, long keyHash)
+				throws IOException {
+			Node node = new Node(folder, null, kind, folder.getName(), keyHash);
+			return hash(node, new Encoder(null));
+		}
+
+		private void setStoredHashes(@NotNull List<Node> nodes) {
+			for (Node node : nodes) {
+				node.folder.storedHash = node.hash;
+				node.folder.storedKeyHash = node.keyHash;
+			}
+		}
+
+		// Restores the change marks cleared by an unsuccessful save
+		private void setChanged(@NotNull List<Node> nodes) {
+			for (Node node : nodes)
+				node.folder.changed = true;
+		}
+
+		/**
+		 * Returns the folders of the tree, including the folders attached to
+		 * documents, in pre-order, and computes their hashes. The hash of a
+		 * folder covers its position in the tree and the contents of its
+		 * record, but not the contents of its subfolders.
+		 * <p>
+		 * If <tt>all</tt> is false, subtrees that haven't changed since they
+		 * were last stored are skipped, i.e. subtrees whose folders were
+		 * neither modified nor moved. The change marks of the returned folders
+		 * are cleared.
+		 */
+		@NotNull
+		private List<Node> traverse(boolean all) throws IOException {
+			List<Node> nodes = new ArrayList<Node>();
+			Deque<Node> stack = new ArrayDeque<Node>();
+			stack.push(new Node(index.getRootFolder(), null, SUBFOLDER, ""));
+			Encoder hasher = new Encoder(null);
+			while (!stack.isEmpty()) {
+				Node node = stack.pop();
+				F folder = node.folder;
+				/*
+				 * The mark is cleared before the folder is encoded, so that
+				 * changes made in the meantime are picked up by the next save.
+				 * Loading the children may set the mark again, which only
+				 * causes the folder to be hashed once more on the next save.
+				 */
+				folder.loadChildren();
+				folder.changed = false;
+				nodes.add(node);
+				node.hash = hash(node, hasher);
+				for (D doc : folder.getDocuments()) {
+					F attachedFolder = index.getAttachedFolder(doc);
+					if (attachedFolder == null)
+						continue;
+					attachedFolder.owner = folder;
+					Node child = new Node(
+						attachedFolder, node, ATTACHED_FOLDER, doc.getName());
+					if (all || needsVisit(child))
+						stack.push(child);
+				}
+				for (F subFolder : folder.getSubFolders()) {
+					Node child = new Node(
+						subFolder, node, SUBFOLDER, subFolder.getName());
+					if (all || needsVisit(child))
+						stack.push(child);
+				}
+			}
+			return nodes;
+		}
+
+		private long hash(@NotNull Node node, @NotNull Encoder hasher)
+				throws IOException {
+			long hash = mix(node.keyHash, encodeFolder(hasher, node));
+			return hash == 0 ? 1 : hash; // Zero means 'not stored'
+		}
+
+		/*
+		 * Folders whose children haven't been loaded yet are skipped unless
+		 * they were modified or moved, since their records are up to date.
+		 */
+		private boolean needsVisit(@NotNull Node node) {
+			F folder = node.folder;
+			return folder.changed
+				|| folder.storedHash == 0
+				|| folder.storedKeyHash != node.keyHash;
+		}
+
+		/*
+		 * Layout of an entry: the serialized index without folder records, the
+		 * string table, and the folder records, each preceded by its length.
+		 * The given nodes must be in pre-order.
+		 */
+		@NotNull
+		private byte[] encodeEntry(@NotNull List<Node> nodes) throws IOException {
+			Map<String, Integer> strings = new LinkedHashMap<String, Integer>();
+			Encoder record = new Encoder(strings);
+			Encoder records = new Encoder(null, true);
+			for (int i = 0; i < nodes.size(); i++) {
+				Node node = nodes.get(i);
+				record.reset();
+				encodeKey(record, node);
+				encodeFolder(record, node);
+				records.writeVarLong(record.size());
+				records.writeBytes(record.toByteArray());
+				node.recordIndex = i;
+			}
+			for (Node node : nodes)
+				node.recordIndex = -1;
+
+			Encoder entry = new Encoder(null, true);
+			entry.writeBlob(serialize(index));
+			entry.writeVarLong(strings.size());
+			for (String string : strings.keySet())
+				entry.writeString(string);
+			entry.writeVarLong(nodes.size());
+			entry.writeBytes(records.toByteArray());
+			return entry.toByteArray();
+		}
+
+		/*
+		 * The key of a record identifies the folder. It either refers to the
+		 * parent folder's record in the same entry and gives the name of the
+		 * folder, or it gives the full path of names from the root folder.
+		 */
+		private void encodeKey(@NotNull Encoder out, @NotNull Node node) {
+			if (node.parent != null && node.parent.recordIndex >= 0) {
+				out.writeVarLong(node.parent.recordIndex + 1);
+				out.writeByte(node.kind);
+				out.writeString(node.name);
+				return;
+			}
+			LinkedList<Node> path = new LinkedList<Node>();
+			for (Node current = node; current.parent != null; current = current.parent)
+				path.addFirst(current);
+			out.writeVarLong(0);
+			out.writeVarLong(path.size());
+			for (Node segment : path) {
+				out.writeByte(segment.kind);
+				out.writeString(segment.name);
+			}
+		}
+
+		/**
+		 * Encodes the given folder and returns a hash of the encoded contents
+		 * that doesn't depend on the order of the documents and subfolders.
+		 */
+		private long encodeFolder(@NotNull Encoder out, @NotNull Node node)
+				throws IOException {
+			F folder = node.folder;
+			boolean isAttached = node.kind == ATTACHED_FOLDER;
+
+			out.resetHash();
+			out.writeString(isAttached ? folder.getPath().getPath() : null);
+			writeDisplayName(out, folder);
+			Long lastModified = folder.getLastModified();
+			out.writeBoolean(lastModified != null);
+			if (lastModified != null)
+				out.writeSignedVarLong(lastModified);
+			out.writeVarLong(folder.isChecked() ? FLAG_CHECKED : 0);
+			out.writeVarLong(index.getFolderFlags(folder));
+			writeErrors(out, folder);
+			long hash = out.getHash();
+
+			List<D> docs = folder.getDocuments();
+			out.writeVarLong(docs.size());
+			long docsHash = docs.size();
+			for (D doc : docs) {
+				out.resetHash();
+				out.writeString(doc.getName());
+				writeDisplayName(out, doc);
+				out.writeSignedVarLong(doc.getLastModified());
+				out.writeBoolean(index.getAttachedFolder(doc) != null);
+				writeErrors(out, doc);
+				docsHash += out.getHash();
+			}
+
+			List<F> subFolders = folder.getSubFolders();
+			out.writeVarLong(subFolders.size());
+			long subFoldersHash = subFolders.size();
+			for (F subFolder : subFolders) {
+				out.resetHash();
+				out.writeString(subFolder.getName());
+				subFoldersHash += out.getHash();
+			}
+			return mix(mix(hash, docsHash), subFoldersHash);
+		}
+
+		private void writeDisplayName(	@NotNull Encoder out,
+										@NotNull TreeNode treeNode) {
+			String displayName = treeNode.getDisplayName();
+			out.writeString(displayName.equals(treeNode.getName()) ? null : displayName);
+		}
+
+		/*
+		 * If an error refers to another tree node than the one it is attached
+		 * to, which is rare, the other tree node is stored with Java
+		 * serialization. The same goes for the throwable. If they can't be
+		 * serialized, they're replaced with the tree node the error is attached
+		 * to and null, respectively.
+		 */
+		private void writeErrors(	@NotNull Encoder out,
+									@NotNull TreeNode treeNode) {
+			List<IndexingError> errors = treeNode.getErrors();
+			out.writeVarLong(errors.size());
+			for (IndexingError error : errors) {
+				out.writeString(error.getErrorType().name());
+				TreeNode errorNode = error.getTreeNode();
+				out.writeBlob(errorNode == treeNode ? null : serializeQuietly(errorNode));
+				Throwable throwable = error.getThrowable();
+				out.writeBlob(throwable == null ? null : serializeQuietly(throwable));
+			}
+		}
+
+		@Nullable
+		private static byte[] serializeQuietly(@NotNull Object object) {
+			try {
+				return serialize(object);
+			}
+			catch (IOException e) {
+				return null;
+			}
+		}
+	}
+
+	/**
+	 * Creates the folders and documents of a tree index from the folder
+	 * records. The entries are first only scanned for the keys of the records,
+	 * and the root folder is attached to its record. The children of each
+	 * folder are then created from its record when they're first accessed,
+	 * see {@link Folder#loadChildren()}. If a folder has records in several
+	 * entries, only the last one is used, since each record holds all fields
+	 * of the folder.
+	 */
+	private static final class Loader
+		<D extends Document<D, F>, F extends Folder<D, F>> {
+
+		/**
+		 * The last record of a folder, and the record nodes of the folder's
+		 * subfolders and attached folders. The record nodes form the same
+		 * tree as the folders, except that they may also include folders that
+		 * have since been removed or moved elsewhere.
+		 */
+		private final class RecordNode implements PendingChildren {
+			private final int kind;
+			@Nullable private Decoder record; // Positioned after the key
+			@Nullable private Map<String, RecordNode> subFolders;
+			@Nullable private Map<String, RecordNode> attachedFolders;
+
+			private RecordNode(int kind) {
+				this.kind = kind;
+			}
+
+			@NotNull
+			private RecordNode getOrAddChild(int kind, @NotNull String name)
+					throws IOException {
+				Map<String, RecordNode> children;
+				if (kind == SUBFOLDER) {
+					if (subFolders == null)
+						subFolders = new HashMap<String, RecordNode>();
+					children = subFolders;
+				}
+				else if (kind == ATTACHED_FOLDER) {
+					if (attachedFolders == null)
+						attachedFolders = new HashMap<String, RecordNode>();
+					children = attachedFolders;
+				}
+				else {
+					throw new IOException("Invalid path segment");
+				}
+				RecordNode child = children.get(name);
+				if (child == null) {
+					child = new RecordNode(kind);
+					children.put(name, child);
+				}
+				return child;
+			}
+
+			@SuppressWarnings("unchecked")
+			public void load(@NotNull Folder<?, ?> folder) throws IOException {
+				loadChildren((F) folder, this);
+			}
+		}
+
+		private final TreeIndex<D, F> index;
+		private final F rootFolder;
+		private final RecordNode rootNode = new RecordNode(SUBFOLDER);
+
+		public Loader(@NotNull TreeIndex<D, F> index) {
+			this.index = index;
+			this.rootFolder = index.getRootFolder();
+		}
+
+		// The given decoder must be positioned after the serialized index
+		public void addEntry(@NotNull Decoder in) throws IOException {
+			in.setStrings(new StringTable(in));
+			int recordCount = in.readVarInt();
+			List<RecordNode> nodes = new ArrayList<RecordNode>(recordCount);
+			for (int i = 0; i < recordCount; i++) {
+				int length = in.readVarInt();
+				Decoder record = in.slice(length);
+				RecordNode node = readKey(record, nodes);
+				node.record = record;
+				nodes.add(node);
+			}
+		}
+
+		// Reads the key of the given record and returns the node it refers to
+		@NotNull
+		private RecordNode readKey(	@NotNull Decoder in,
+									@NotNull List<RecordNode> nodes)
+				throws IOException {
+			int parentRef = in.readVarInt();
+			if (parentRef > 0) {
+				if (parentRef > nodes.size())
+					throw new IOException("Invalid parent reference");
+				RecordNode parent = nodes.get(parentRef - 1);
+				return parent.getOrAddChild(in.readByte(), in.readNotNullString());
+			}
+			RecordNode current = rootNode;
+			for (int i = in.readVarInt(); i > 0; i--)
+				current = current.getOrAddChild(in.readByte(), in.readNotNullString());
+			return current;
+		}
+
+		// Must be called after all entries have been added
+		public void attachRootFolder() throws IOException {
+			if (rootNode.record == null)
+				throw new IOException("Missing record of root folder");
+			attach(rootFolder, rootNode, 0);
+		}
+
+		/*
+		 * The record is now the only place where the children are stored, so
+		 * the folder counts as stored, although its hash is only computed when
+		 * the children are loaded. Until then, the folder is skipped on saving
+		 * unless it is modified or moved.
+		 */
+		private void attach(@NotNull F folder,
+							@NotNull RecordNode node,
+							long keyHash) {
+			folder.storedHash = UNLOADED_HASH;
+			folder.storedKeyHash = keyHash;
+			folder.changed = false;
+			folder.pendingChildren = node;
+		}
+
+		/*
+		 * Creates the folder of the given record node without its children
+		 * and attaches it to the given parent folder, or, for an attached
+		 * folder, to the given document of the parent folder.
+		 */
+		private void createFolder(	@NotNull F parent,
+									@Nullable D doc,
+									@NotNull String name,
+									@NotNull RecordNode node)
+				throws IOException {
+			Decoder in = node.record.copy();
+			String path = in.readString();
+			F folder;
+			if (doc == null) {
+				folder = index.createDetachedFolder(name);
+				parent.attachSubFolder(folder);
+			}
+			else {
+				if (path == null)
+					throw new IOException("Missing path of attached folder");
+				Path attachedPath = new Path(path);
+				folder = index.createDetachedFolder(attachedPath.getName());
+				folder.setPath(attachedPath);
+				index.setAttachedFolder(doc, folder);
+			}
+			folder.setDisplayName(in.readString());
+			folder.setLastModified(in.readBoolean() ? in.readSignedVarLong() : null);
+			folder.setChecked((in.readVarInt() & FLAG_CHECKED) != 0);
+			index.setFolderFlags(folder, in.readVarInt());
+			folder.setErrors(readErrors(in, folder));
+			attach(folder, node, keyHash(parent.storedKeyHash, node.kind, name));
+		}
+
+		/*
+		 * Creates the documents and subfolders of the given folder from its
+		 * record. The fields of the folder were already applied when it was
+		 * created, and are ignored for the root folder.
+		 */
+		private void loadChildren(	@NotNull F folder,
+									@NotNull RecordNode node)
+				throws IOException {
+			boolean wasChanged = folder.changed;
+			Decoder in = node.record.copy();
+			node.record = null;
+			in.readString(); // Path of attached folders
+			in.readString(); // Display name
+			if (in.readBoolean())
+				in.readSignedVarLong(); // Last-modified field
+			in.readVarInt(); // Flags
+			in.readVarInt(); // Folder flags
+			skipErrors(in);
+
+			int docCount = in.readVarInt();
+			for (int i = 0; i < docCount; i++) {
+				String docName = in.readNotNullString();
+				String docDisplayName = in.readString();
+				long docLastModified = in.readSignedVarLong();
+				boolean hasAttachedFolder = in.readBoolean();
+				D doc = index.createDocument(folder, docName, docLastModified);
+				doc.setDisplayName(docDisplayName);
+				doc.setErrors(readErrors(in, doc));
+				RecordNode child = getChild(node.attachedFolders, docName);
+				if (hasAttachedFolder && child != null)
+					createFolder(folder, doc, docName, child);
+			}
+
+			int subFolderCount = in.readVarInt();
+			for (int i = 0; i < subFolderCount; i++) {
+				String name = in.readNotNullString();
+				RecordNode child = getChild(node.subFolders, name);
+				if (child != null)
+					createFolder(folder, null, name, child);
+			}
+
+			/*
+			 * Creating the children has marked the folder as changed. If it
+			 * hadn't been changed before, its record is still up to date, and
+			 * its hash is set accordingly, so that it isn't written again.
+			 */
+			folder.storedHash = wasChanged
+				? 0
+				: new Saver<D, F>(index).computeHash(folder, node.kind, folder.storedKeyHash);
+		}
+
+		// Returns the child with the given name if it has a record, or null
+		@Nullable
+		private RecordNode getChild(@Nullable Map<String, RecordNode> children,
+									@NotNull String name) {
+			if (children == null)
+				return null;
+			RecordNode child = children.get(name);
+			return child == null || child.record == null ? null : child;
+		}
+
+		@Nullable
+		private static List<IndexingError> readErrors(	@NotNull Decoder in,
+														@NotNull TreeNode treeNode)
+				throws IOException {
+			int count = in.readVarInt();
+			if (count == 0)
+				return null;
+			List<IndexingError> errors = new ArrayList<IndexingError>(count);
+			for (int i = 0; i < count; i++) {
+				String typeName = in.readNotNullString();
+				byte[] errorNode = in.readBlob();
+				byte[] throwable = in.readBlob();
+				ErrorType errorType;
+				try {
+					errorType = ErrorType.valueOf(typeName);
+				}
+				catch (IllegalArgumentException e) {
+					continue; // Error type no longer exists
+				}
+				Object node = deserializeQuietly(errorNode);
+				Object cause = deserializeQuietly(throwable);
+				errors.add(new IndexingError(
+					errorType,
+					node instanceof TreeNode ? (TreeNode) node : treeNode,
+					cause instanceof Throwable ? (Throwable) cause : null));
+			}
+			return errors.isEmpty() ? null : errors;
+		}
+
+		private static void skipErrors(@NotNull Decoder in) throws IOException {
+			for (int i = in.readVarInt(); i > 0; i--) {
+				in.readVarInt(); // Error type
+				in.skipBlob();
+				in.skipBlob();
+			}
+		}
+
+		@Nullable
+		private static Object deserializeQuietly(@Nullable byte[] bytes) {
+			if (bytes == null)
+				return null;
+			try {
+				return deserialize(bytes);
+			}
+			catch (Exception e) {
+				return null;
+			}
+		}
+	}
+
+	/**
+	 * Encodes records and computes a hash of the encoded values on the fly. If
+	 * a string table is given, strings are encoded as indices into the table,
+	 * and new strings are added to it. Without a string table, strings are
+	 * encoded inline, or, if the encoder only computes hashes, not at all.
+	 */
+	private static final class Encoder {
+		private static final long FNV_OFFSET = 0xcbf29ce484222325L;
+		private static final long FNV_PRIME = 0x100000001b3L;
+
+		@Nullable private final Map<String, Integer> strings;
+		@Nullable private final ByteArrayOutputStream buffer;
+		private long hash = FNV_OFFSET;
+
+		// Creates an encoder that only computes hashes, unless a string table is given
+		public Encoder(@Nullable Map<String, Integer> strings) {
+			this(strings, strings != null);
+		}
+
+		public Encoder(@Nullable Map<String, Integer> strings, boolean output) {
+			this.strings = strings;
+			this.buffer = output ? new ByteArrayOutputStream() : null;
+		}
+
+		public void resetHash() {
+			hash = FNV_OFFSET;
+		}
+
+		public long getHash() {
+			return hash;
+		}
+
+		public void reset() {
+			if (buffer != null)
+				buffer.reset();
+		}
+
+		public int size() {
+			return buffer == null ? 0 : buffer.size();
+		}
+
+		@NotNull
+		public byte[] toByteArray() {
+			return buffer == null ? new byte[0] : buffer.toByteArray();
+		}
+
+		public void writeByte(int value) {
+			hash = (hash ^ (value & 0xFF)) * FNV_PRIME;
+			if (buffer != null)
+				buffer.write(value);
+		}
+
+		public void writeBoolean(boolean value) {
+			writeByte(value ? 1 : 0);
+		}
+
+		public void writeBytes(@NotNull byte[] bytes) {
+			for (byte b : bytes)
+				hash = (hash ^ (b & 0xFF)) * FNV_PRIME;
+			if (buffer != null)
+				buffer.write(bytes, 0, bytes.length);
+		}
+
+		// Writes the given value as an unsigned variable-length number
+		public void writeVarLong(long value) {
+			while ((value & ~0x7FL) != 0) {
+				writeByte((int) (value & 0x7F) | 0x80);
+				value >>>= 7;
+			}
+			writeByte((int) value);
+		}
+
+		public void writeSignedVarLong(long value) {
+			writeVarLong((value << 1) ^ (value >> 63));
+		}
+
+		public void writeBlob(@Nullable byte[] bytes) {
+			if (bytes == null) {
+				writeVarLong(0);
+				return;
+			}
+			writeVarLong(bytes.length + 1L);
+			writeBytes(bytes);
+		}
+
+		/*
+		 * With a string table, strings are written as their index into the
+		 * table plus one, and null as zero. Without one, they're written
+		 * inline as UTF-8 bytes preceded by their length. Null can't be
+		 * written inline.
+		 */
+		public void writeString(@Nullable String value) {
+			if (strings != null) {
+				if (value == null) {
+					writeVarLong(0);
+					return;
+				}
+				Integer id = strings.get(value);
+				if (id == null) {
+					id = strings.size();
+					strings.put(value, id);
+				}
+				writeVarLong(id + 1L);
+			}
+			else if (buffer != null) {
+				byte[] bytes = value.getBytes(StandardCharsets.UTF_8);
+				writeVarLong(bytes.length);
+				writeBytes(bytes);
+			}
+			else if (value == null) {
+				writeVarLong(0);
+			}
+			else {
+				writeVarLong(value.length() + 1L);
+				for (int i = 0; i < value.length(); i++) {
+					char c = value.charAt(i);
+					writeByte(c);
+					writeByte(c >>> 8);
+				}
+			}
+		}
+	}
+
+	private static final class Decoder {
+		private final byte[] bytes;
+		private final int end;
+		private int pos;
+		@Nullable private StringTable strings;
+
+		public Decoder(@NotNull byte[] bytes, int offset, int length) {
+			this.bytes = bytes;
+			this.pos = offset;
+			this.end = offset + length;
+		}
+
+		public void setStrings(@NotNull StringTable strings) {
+			this.strings = strings;
+		}
+
+		// Returns a decoder for the remaining bytes that has its own position
+		@NotNull
+		public Decoder copy() {
+			Decoder copy = new Decoder(bytes, pos, end - pos);
+			copy.strings = strings;
+			return copy;
+		}
+
+		public void skip(int length) throws IOException {
+			if (length > end - pos)
+				throw new EOFException();
+			pos += length;
+		}
+
+		// Returns a decoder for the next bytes and skips them in this decoder
+		@NotNull
+		public Decoder slice(int length) throws IOException {
+			if (length > end - pos)
+				throw new EOFException();
+			Decoder slice = new Decoder(bytes, pos, length);
+			slice.strings = strings;
+			pos += length;
+			return slice;
+		}
+
+		public int readByte() throws IOException {
+			if (pos >= end)
+				throw new EOFException();
+			return bytes[pos++] & 0xFF;
+		}
+
+		public boolean readBoolean() throws IOException {
+			return readByte() != 0;
+		}
+
+		public long readVarLong() throws IOException {
+			long value = 0;
+			for (int shift = 0; shift < 64; shift += 7) {
+				int b = readByte();
+				value |= (long) (b & 0x7F) << shift;
+				if ((b & 0x80) == 0)
+					return value;
+			}
+			throw new IOException("Malformed number");
+		}
+
+		public long readSignedVarLong() throws IOException {
+			long value = readVarLong();
+			return (value >>> 1) ^ -(value & 1);
+		}
+
+		public int readVarInt() throws IOException {
+			long value = readVarLong();
+			if (value > Integer.MAX_VALUE)
+				throw new IOException("Number too large: " + value);
+			return (int) value;
+		}
+
+		@Nullable
+		public byte[] readBlob() throws IOException {
+			int length = readVarInt();
+			if (length == 0)
+				return null;
+			length--;
+			if (length > end - pos)
+				throw new EOFException();
+			byte[] blob = Arrays.copyOfRange(bytes, pos, pos + length);
+			pos += length;
+			return blob;
+		}
+
+		public void skipBlob() throws IOException {
+			int length = readVarInt();
+			if (length > 0)
+				skip(length - 1);
+		}
+
+		@NotNull
+		public String readUtf8() throws IOException {
+			int length = readVarInt();
+			if (length > end - pos)
+				throw new EOFException();
+			String value = new String(bytes, pos, length, StandardCharsets.UTF_8);
+			pos += length;
+			return value;
+		}
+
+		@Nullable
+		public String readString() throws IOException {
+			int id = readVarInt();
+			if (id == 0)
+				return null;
+			if (strings == null || id > strings.size())
+				throw new IOException("Invalid string reference");
+			return strings.get(id - 1);
+		}
+
+		@NotNull
+		public String readNotNullString() throws IOException {
+			String value = readString();
+			if (value == null)
+				throw new IOException("Unexpected null string");
+			return value;
+		}
+	}
+
+	// Returns the hash of the position of a folder in the tree
+	private static long keyHash(long parentKeyHash, int kind, @NotNull String name) {
+		return mix(mix(parentKeyHash, kind), name.hashCode());
+	}
+
+	/**
+	 * The string table of an entry. The strings are only decoded when they're
+	 * first read, since most of them are names of documents and folders that
+	 * may never be loaded.
+	 */
+	private static final class StringTable {
+		private final byte[] bytes;
+		private final int[] offsets; // Positions of the encoded strings
+		private final String[] strings; // guarded by 'this' lock
+
+		// Reads the offsets of the strings and skips them in the given decoder
+		public StringTable(@NotNull Decoder in) throws IOException {
+			bytes = in.bytes;
+			int count = in.readVarInt();
+			offsets = new int[count];
+			strings = new String[count];
+			for (int i = 0; i < count; i++) {
+				offsets[i] = in.pos;
+				in.skip(in.readVarInt());
+			}
+		}
+
+		public int size() {
+			return offsets.length;
+		}
+
+		@NotNull
+		public synchronized String get(int index) throws IOException {
+			String value = strings[index];
+			if (value == null) {
+				int offset = offsets[index];
+				value = new Decoder(bytes, offset, bytes.length - offset).readUtf8();
+				strings[index] = value;
+			}
+			return value;
+		}
+	}
+
+	private static long mix(long hash, long value) {
+		hash ^= value + 0x9E3779B97F4A7C15L + (hash << 6) + (hash >>> 2);
+		return hash * 0x100000001B3L;
+	}
+
+	@NotNull
+	private static byte[] serialize(@NotNull Object object) throws IOException {
+		boolean isOuterCall = writingShell.get() == null;
+		writingShell.set(Boolean.TRUE);
+		try {
+			ByteArrayOutputStream bytes = new ByteArrayOutputStream();
+			ObjectOutputStream out = new ObjectOutputStream(bytes);
+			out.writeObject(object);
+			out.close();
+			return bytes.toByteArray();
+		}
+		finally {
+			if (isOuterCall)
+				writingShell.remove();
+		}
+	}
+
+	@NotNull
+	private static Object deserialize(@Nullable byte[] bytes)
+			throws IOException, ClassNotFoundException {
+		if (bytes == null)
+			throw new IOException("Missing serialized object");
+		ObjectInputStream in = new ObjectInputStream(new ByteArrayInputStream(bytes));
+		try {
+			return in.readObject();
+		}
+		finally {
+			Closeables.closeQuietly(in);
+		}
+	}
+
+	@NotNull
+	private static byte[] readFully(@NotNull File file) throws IOException {
+		FileInputStream in = new FileInputStream(file);
+		try {
+			FileChannel channel = in.getChannel();
+			FileLock lock = channel.lock(0, Long.MAX_VALUE, true);
+			try {
+				long size = channel.size();
+				if (size > Integer.MAX_VALUE)
+					throw new IOException("File too large: " + file);
+				ByteBuffer buffer = ByteBuffer.allocate((int) size);
+				while (buffer.hasRemaining()) {
+					if (channel.read(buffer) < 0)
+						break;
+				}
+				return buffer.hasRemaining()
+					? Arrays.copyOf(buffer.array(), buffer.position())
+					: buffer.array();
+			}
+			finally {
+				lock.release();
+			}
+		}
+		finally {
+			Closeables.closeQuietly(in);
+		}
+	}
+
+	// Returns the snapshot ID
+	private static long readHeader(@NotNull byte[] bytes, int magic)
+			throws IOException {
+		ByteBuffer buffer = ByteBuffer.wrap(bytes);
+		if (bytes.length < HEADER_SIZE || buffer.getInt() != magic)
+			throw new IOException("Not a tree index file");
+		int version = buffer.getInt();
+		if (version > VERSION)
+			throw new IOException("Unsupported tree index version: " + version);
+		return buffer.getLong();
+	}
+
+	/**
+	 * Adds a decoder for each complete and intact entry following the header
+	 * to the given list and returns the end position of the last such entry.
+	 */
+	private static int readEntries(	@NotNull byte[] bytes,
+									@NotNull List<Decoder> entries) {
+		ByteBuffer buffer = ByteBuffer.wrap(bytes);
+		int pos = HEADER_SIZE;
+		while (bytes.length - pos >= FRAME_HEADER_SIZE) {
+			buffer.position(pos);
+			int length = buffer.getInt();
+			int checksum = buffer.getInt();
+			int start = pos + FRAME_HEADER_SIZE;
+			if (length < 0 || length > bytes.length - start)
+				break;
+			CRC32 crc = new CRC32();
+			crc.update(bytes, start, length);
+			if ((int) crc.getValue() != checksum)
+				break;
+			entries.add(new Decoder(bytes, start, length));
+			pos = start + length;
+		}
+		return pos;
+	}
+
+	private static void writeHeader(@NotNull DataOutputStream out,
+									int magic,
+									long snapshotId) throws IOException {
+		out.writeInt(magic);
+		out.writeInt(VERSION);
+		out.writeLong(snapshotId);
+	}
+
+	private static void writeFrame(	@NotNull DataOutputStream out,
+									@NotNull byte[] entry) throws IOException {
+		CRC32 crc = new CRC32();
+		crc.update(entry);
+		out.writeInt(entry.length);
+		out.writeInt((int) crc.getValue());
+		out.write(entry);
+	}
+
+	// Returns null if there's no valid snapshot file
+	@Nullable
+	private static Long readSnapshotId(@NotNull File snapshotFile) {
+		if (!snapshotFile.isFile())
+			return null;
+		byte[] header = new byte[HEADER_SIZE];
+		FileInputStream in = null;
+		try {
+			in = new FileInputStream(snapshotFile);
+			int count = 0;
+			while (count < HEADER_SIZE) {
+				int n = in.read(header, count, HEADER_SIZE - count);
+				if (n < 0)
+					return null;
+				count += n;
+			}
+			return readHeader(header, SNAPSHOT_MAGIC);
+		}
+		catch (IOException e) {
+			return null;
+		}
+		finally {
+			Closeables.closeQuietly(in);
+		}
+	}
+
+	private static void appendToJournal(@NotNull File journalFile,
+										long snapshotId,
+										@NotNull byte[] entry) throws IOException {
+		RandomAccessFile file = new RandomAccessFile(journalFile, "rw");
+		boolean success = false;
+		try {
+			FileLock lock = file.getChannel().lock();
+			try {
+				ByteArrayOutputStream bytes = new ByteArrayOutputStream(
+					HEADER_SIZE + FRAME_HEADER_SIZE + entry.length);
+				DataOutputStream out = new DataOutputStream(bytes);
+
+				// Start a new journal if the existing one belongs to another snapshot
+				boolean isValid = false;
+				if (file.length() >= HEADER_SIZE) {
+					file.seek(0);
+					isValid = file.readInt() == JOURNAL_MAGIC
+							&& file.readInt() == VERSION
+							&& file.readLong() == snapshotId;
+				}
+				if (!isValid) {
+					file.setLength(0);
+					writeHeader(out, JOURNAL_MAGIC, snapshotId);
+				}
+				writeFrame(out, entry);
+				file.seek(file.length());
+				file.write(bytes.toByteArray());
+				success = true;
+			}
+			finally {
+				lock.release();
+			}
+		}
+		finally {
+			Closeables.close(file, !success);
+		}
+	}
+
+	// Removes a partially written entry from the end of the journal
+	private static void truncate(@NotNull File journalFile, long length) {
+		RandomAccessFile file = null;
+		try {
+			file = new RandomAccessFile(journalFile, "rw");
+			FileLock lock = file.getChannel().lock();
+			try {
+				file.setLength(length);
+			}
+			finally {
+				lock.release();
+			}
+		}
+		catch (IOException e) {
+			Util.printErr(e); // The journal might be read-only
+		}
+		finally {
+			Closeables.closeQuietly(file);
+		}
+	}
+
+}
@@ -0,0 +1,174 @@
+/*******************************************************************************
+ * Copyright (c) 2021 Tran Nam Quang.
+ * All rights reserved. This program and the accompanying materials
+ * are made available under the terms of the Eclipse Public License v1.0
+ * which accompanies this distribution, and is available at
+ * http://www.eclipse.org/legal/epl-v10.html
+ *
+ * Contributors:
+ *    Tran Nam Quang - initial API and implementation
+ *******************************************************************************/
+
+package net.sourceforge.docfetcher.model;
+
+import static org.junit.Assert.assertEquals;
+import static org.junit.Assert.assertNotNull;
+import static org.junit.Assert.assertNull;
+import static org.junit.Assert.assertTrue;
+
+import java.io.File;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.util.Collections;
+import java.util.List;
+
+import net.sourceforge.docfetcher.model.index.file.FileDocument;
+import net.sourceforge.docfetcher.model.index.file.FileFolder;
+import net.sourceforge.docfetcher.model.index.file.FileIndex;
+import net.sourceforge.docfetcher.util.AppUtil;
+import net.sourceforge.docfetcher.util.Util;
+
+import org.junit.Test;
+
+import com.google.common.collect.Lists;
+
+/**
+ * @author Tran Nam Quang
+ */
+public final class TreeIndexStoreTest {
+
+	static {
+		AppUtil.Const.autoInit();
+	}
+
+	@Test
+	public void testSaveAndLoad() throws Exception {
+		File tempDir = Util.createTempDir();
+		try {
+			File rootDir = new File(tempDir, "root");
+			File indexDir = new File(tempDir, "index");
+			rootDir.mkdirs();
+			indexDir.mkdirs();
+
+			FileIndex index = new FileIndex(null, rootDir);
+			FileFolder root = index.getRootFolder();
+			FileFolder sub1 = new FileFolder(root, "sub1", null);
+			FileFolder sub2 = new FileFolder(sub1, "sub2", 123L);
+			sub2.setChecked(false);
+			new FileDocument(root, "a.txt", 1);
+			new FileDocument(sub2, "b.txt", 2);
+			FileDocument htmlDoc = new FileDocument(sub1, "page.html", 3);
+			FileFolder htmlFolder = new FileFolder(
+				new Path(new File(rootDir, "sub1/page_files")), null);
+			new FileDocument(htmlFolder, "image.txt", 4);
+			htmlDoc.setHtmlFolder(htmlFolder);
+
+			TreeIndexStore.save(index, indexDir);
+			assertEquals(dump(root), dump(load(indexDir)));
+
+			// Saving after small changes only appends to the journal
+			File snapshotFile = new File(indexDir, TreeIndexStore.SNAPSHOT_FILENAME);
+			File journalFile = new File(indexDir, TreeIndexStore.JOURNAL_FILENAME);
+			long snapshotLength = snapshotFile.length();
+			sub1.removeSubFolder(sub2);
+			new FileDocument(new FileFolder(root, "sub3", null), "c.txt", 5);
+			root.getDocument("a.txt").setLastModified(6);
+			TreeIndexStore.save(index, indexDir);
+			assertEquals(snapshotLength, snapshotFile.length());
+			assertTrue(journalFile.isFile());
+			assertEquals(dump(root), dump(load(indexDir)));
+
+			// Changes below unchanged folders are found, including changes in
+			// attached folders and folders that were moved
+			htmlFolder.getDocument("image.txt").setLastModified(7);
+			TreeIndexStore.save(index, indexDir);
+			assertEquals(dump(root), dump(load(indexDir)));
+			FileFolder sub4 = new FileFolder(sub1, "sub4", null);
+			new FileDocument(new FileFolder(sub4, "sub5", null), "d.txt", 8);
+			TreeIndexStore.save(index, indexDir);
+			root.putSubFolder(sub4);
+			TreeIndexStore.save(index, indexDir);
+			assertEquals(snapshotLength, snapshotFile.length());
+			assertEquals(dump(root), dump(load(indexDir)));
+
+			// A partially written journal entry is ignored
+			long journalLength = journalFile.length();
+			FileOutputStream out = new FileOutputStream(journalFile, true);
+			out.write(new byte[] { 0, 0, 1, 0, 42, 42 });
+			out.close();
+			assertEquals(dump(root), dump(load(indexDir)));
+			assertEquals(journalLength, journalFile.length());
+		}
+		finally {
+			Util.deleteRecursively(tempDir);
+		}
+	}
+
+	@Test
+	public void testLazyLoading() throws Exception {
+		File tempDir = Util.createTempDir();
+		try {
+			File rootDir = new File(tempDir, "root");
+			File indexDir = new File(tempDir, "index");
+			rootDir.mkdirs();
+			indexDir.mkdirs();
+
+			FileIndex index = new FileIndex(null, rootDir);
+			FileFolder root = index.getRootFolder();
+			FileFolder sub1 = new FileFolder(root, "sub1", null);
+			new FileDocument(new FileFolder(sub1, "sub2", null), "a.txt", 1);
+			new FileDocument(new FileFolder(root, "sub3", null), "b.txt", 2);
+			TreeIndexStore.save(index, indexDir);
+
+			// Children are only created when they're accessed
+			FileIndex loadedIndex = (FileIndex) TreeIndexStore.load(indexDir);
+			FileFolder loadedRoot = loadedIndex.getRootFolder();
+			assertNotNull(loadedRoot.pendingChildren);
+			FileFolder loadedSub1 = loadedRoot.getSubFolder("sub1");
+			assertNull(loadedRoot.pendingChildren);
+			assertNotNull(loadedSub1.pendingChildren);
+
+			// Saving a partially loaded tree skips the folders not yet loaded
+			sub1.setLastModified(3L);
+			loadedSub1.setLastModified(3L);
+			TreeIndexStore.save(loadedIndex, indexDir);
+			assertNotNull(loadedRoot.getSubFolder("sub3").pendingChildren);
+			assertEquals(dump(root), dump(load(indexDir)));
+			assertEquals(dump(root), dump(loadedRoot));
+		}
+		finally {
+			Util.deleteRecursively(tempDir);
+		}
+	}
+
+	private static FileFolder load(File indexDir)
+			throws IOException, ClassNotFoundException {
+		return ((FileIndex) TreeIndexStore.load(indexDir)).getRootFolder();
+	}
+
+	private static String dump(FileFolder folder) {
+		StringBuilder sb = new StringBuilder();
+		dump(folder, sb);
+		return sb.toString();
+	}
+
+	private static void dump(FileFolder folder, StringBuilder sb) {
+		sb.append(folder.getPath()).append(' ');
+		sb.append(folder.getLastModified()).append(' ');
+		sb.append(folder.isChecked()).append(Util.LS);
+		List<String> docNames = Lists.newArrayList(folder.getDocumentMap().keySet());
+		Collections.sort(docNames);
+		for (String docName : docNames) {
+			FileDocument doc = folder.getDocument(docName);
+			sb.append(doc.getPath()).append(' ');
+			sb.append(doc.getLastModified()).append(Util.LS);
+			if (doc.getHtmlFolder() != null)
+				dump(doc.getHtmlFolder(), sb);
+		}
+		List<String> subFolderNames = Lists.newArrayList(folder.getSubFolderMap().keySet());
+		Collections.sort(subFolderNames);
+		for (String subFolderName : subFolderNames)
+			dump(folder.getSubFolder(subFolderName), sb);
+	}
+
+}
@@ -22,6 +22,7 @@ import net.sourceforge.docfetcher.util.annotations.NotNull;
 import net.sourceforge.docfetcher.util.annotations.Nullable;
 import net.sourceforge.docfetcher.util.annotations.VisibleForPackageGroup;
 
+import com.google.common.base.Objects;
 import com.google.common.collect.ImmutableList;
 
 /**
@@ -70,7 +71,10 @@ public abstract class TreeNode implements Serializable {
 	
 	@NotNull
 	public final void setDisplayName(String displayName) {
+		if (Objects.equal(this.displayName, displayName))
+			return;
 		this.displayName = displayName;
+		markChanged();
 	}
 	
 	@NotNull
@@ -94,11 +98,25 @@ public abstract class TreeNode implements Serializable {
 	}
 	
 	public synchronized final void setError(@Nullable IndexingError error) {
+		if (error == null && this.errors == null)
+			return;
 		this.errors = error == null ? null : Collections.singletonList(error);
+		markChanged();
 	}
 
 	public synchronized final void setErrors(@Nullable List<IndexingError> errors) {
+		if (errors == null && this.errors == null)
+			return;
 		this.errors = errors == null ? null : ImmutableList.copyOf(errors);
+		markChanged();
+	}
+	
+	/**
+	 * Called after a field of the receiver has changed that is stored by
+	 * {@link TreeIndexStore}, so that the store can skip unchanged folders
+	 * when saving the index.
+	 */
+	protected void markChanged() {
 	}
 	
 }
\ No newline at end of file
@@ -0,0 +1,371 @@
+/*******************************************************************************
+ * Copyright (c) 2021 Tran Nam Quang.
+ * All rights reserved. This program and the accompanying materials
+ * are made available under the terms of the Eclipse Public License v1.0
+ * which accompanies this distribution, and is available at
+ * http://www.eclipse.org/legal/epl-v10.html
+ *
+ * Contributors:
+ *    Tran Nam Quang - initial API and implementation
+ *******************************************************************************/
+
+package net.sourceforge.docfetcher.model.index;
+
+import java.io.ByteArrayOutputStream;
+import java.io.DataOutputStream;
+import java.io.IOException;
+import java.nio.charset.StandardCharsets;
+import java.util.ArrayDeque;
+import java.util.ArrayList;
+import java.util.Collection;
+import java.util.Collections;
+import java.util.Deque;
+import java.util.LinkedHashSet;
+import java.util.List;
+import java.util.Set;
+
+import net.sourceforge.docfetcher.model.LuceneIndex;
+import net.sourceforge.docfetcher.util.Util;
+import net.sourceforge.docfetcher.util.annotations.ImmutableCopy;
+import net.sourceforge.docfetcher.util.annotations.NotNull;
+import net.sourceforge.docfetcher.util.annotations.NotThreadSafe;
+import net.sourceforge.docfetcher.util.annotations.ThreadSafe;
+
+import com.google.common.collect.ImmutableList;
+
+/**
+ * A feed of the document changes made to the registered indexes. Each time an
+ * index is saved after indexing, or removed from the registry, a batch with the
+ * UIDs of the added, updated and removed documents is appended to the feed and
+ * given the next sequence number. A bounded number of recent batches is kept
+ * in memory, so that clients can catch up on the changes since the last batch
+ * they've seen via {@link #getBatchesSince(long, int)}.
+ * <p>
+ * The sequence numbers of each program session start above the current time in
+ * milliseconds, so they keep increasing across program restarts. If a client
+ * asks for batches that are no longer available, e.g. after a restart, the
+ * feed reports a gap, and the client must resynchronize by other means.
+ *
+ * @author Tran Nam Quang
+ */
+@ThreadSafe
+public final class ChangeFeed {
+
+	public enum ChangeType {
+		ADDED, UPDATED, REMOVED
+	}
+
+	public enum BatchType {
+		/** Documents were added to, updated in or removed from the index. */
+		UPDATE,
+		/**
+		 * The index was created or rebuilt. All documents previously seen for
+		 * this index should be discarded, and the index now contains exactly
+		 * the added documents.
+		 */
+		RESET,
+		/** The index was removed from the registry. */
+		INDEX_REMOVED,
+	}
+
+	/**
+	 * Collects the document changes of a single indexing run. Adding and
+	 * subsequently removing the same document cancels out.
+	 */
+	@NotThreadSafe
+	public static final class ChangeSet {
+		private final Set<String> added = new LinkedHashSet<String>();
+		private final Set<String> updated = new LinkedHashSet<String>();
+		private final Set<String> removed = new LinkedHashSet<String>();
+
+		public void add(@NotNull ChangeType type, @NotNull String uid) {
+			Util.checkNotNull(type, uid);
+			switch (type) {
+			case ADDED:
+				if (removed.remove(uid))
+					updated.add(uid);
+				else
+					added.add(uid);
+				break;
+			case UPDATED:
+				if (!added.contains(uid))
+					updated.add(uid);
+				break;
+			case REMOVED:
+				if (!added.remove(uid)) {
+					updated.remove(uid);
+					removed.add(uid);
+				}
+				break;
+			}
+		}
+
+		public boolean isEmpty() {
+			return added.isEmpty() && updated.isEmpty() && removed.isEmpty();
+		}
+	}
+
+	public static final class Batch {
+		private final long sequence;
+		private final BatchType type;
+		private final String indexId;
+		private final String rootPath;
+		private final List<String> added;
+		private final List<String> updated;
+		private final List<String> removed;
+
+		private Batch(	long sequence,
+						@NotNull BatchType type,
+						@NotNull LuceneIndex index,
+						@NotNull Collection<String> added,
+						@NotNull Collection<String> updated,
+						@NotNull Collection<String> removed) {
+			this.sequence = sequence;
+			this.type = type;
+			this.indexId = index.getIndexDirPath().getName();
+			this.rootPath = Util.getSystemAbsPath(index.getCanonicalRootFile());
+			this.added = ImmutableList.copyOf(added);
+			this.updated = ImmutableList.copyOf(updated);
+			this.removed = ImmutableList.copyOf(removed);
+		}
+
+		public long getSequence() {
+			return sequence;
+		}
+
+		@NotNull
+		public BatchType getType() {
+			return type;
+		}
+
+		// The name of the index folder, which identifies the index
+		@NotNull
+		public String getIndexId() {
+			return indexId;
+		}
+
+		@NotNull
+		public String getRootPath() {
+			return rootPath;
+		}
+
+		@NotNull
+		public List<String> getAdded() {
+			return added;
+		}
+
+		@NotNull
+		public List<String> getUpdated() {
+			return updated;
+		}
+
+		@NotNull
+		public List<String> getRemoved() {
+			return removed;
+		}
+	}
+
+	/**
+	 * The batches encoded by {@link ChangeFeed#encodeBatchesSince(long, int)},
+	 * together with the sequence number to pass on the next call.
+	 */
+	public static final class EncodedBatches {
+		private final byte[] data;
+		private final long nextSequence;
+
+		private EncodedBatches(@NotNull byte[] data, long nextSequence) {
+			this.data = data;
+			this.nextSequence = nextSequence;
+		}
+
+		@NotNull
+		public byte[] getData() {
+			return data;
+		}
+
+		public long getNextSequence() {
+			return nextSequence;
+		}
+	}
+
+	private final int capacity;
+	private final Deque<Batch> batches = new ArrayDeque<Batch>(); // guarded by 'this' lock
+	private long lastSequence = System.currentTimeMillis(); // guarded by 'this' lock
+
+	/**
+	 * Creates a new feed that keeps at most the given number of recent batches
+	 * in memory.
+	 */
+	public ChangeFeed(int capacity) {
+		Util.checkThat(capacity >= 0);
+		this.capacity = capacity;
+	}
+
+	/**
+	 * Returns the sequence number of the last published batch. Clients can
+	 * pass this number to {@link #getBatchesSince(long, int)} later to receive
+	 * only subsequent batches.
+	 */
+	public synchronized long getLastSequence() {
+		return lastSequence;
+	}
+
+	/**
+	 * Publishes the given changes of the given index, unless there are none.
+	 * Batches of type {@link BatchType#RESET} are always published.
+	 */
+	public void publish(@NotNull LuceneIndex index,
+						@NotNull BatchType type,
+						@NotNull ChangeSet changes) {
+		Util.checkNotNull(index, type, changes);
+		if (type == BatchType.UPDATE && changes.isEmpty())
+			return;
+		append(type, index, changes.added, changes.updated, changes.removed);
+	}
+
+	public void publishRemoval(@NotNull LuceneIndex index) {
+		Util.checkNotNull(index);
+		List<String> empty = ImmutableList.of();
+		append(BatchType.INDEX_REMOVED, index, empty, empty, empty);
+	}
+
+	private synchronized void append(	@NotNull BatchType type,
+										@NotNull LuceneIndex index,
+										@NotNull Collection<String> added,
+										@NotNull Collection<String> updated,
+										@NotNull Collection<String> removed) {
+		lastSequence++;
+		notifyAll();
+		if (capacity == 0)
+			return;
+		batches.addLast(new Batch(
+			lastSequence, type, index, added, updated, removed));
+		while (batches.size() > capacity)
+			batches.removeFirst();
+	}
+
+	/**
+	 * Returns whether the batches following the given sequence number are
+	 * still available, i.e. whether no batch was discarded or lost between the
+	 * given sequence number and the first available batch.
+	 */
+	public synchronized boolean isAvailable(long sequence) {
+		if (sequence > lastSequence)
+			return false;
+		long first = batches.isEmpty()
+			? lastSequence + 1
+			: batches.getFirst().getSequence();
+		return sequence >= first - 1;
+	}
+
+	/**
+	 * Returns at most <tt>max</tt> batches with sequence numbers higher than
+	 * the given one, in ascending order.
+	 */
+	@ImmutableCopy
+	@NotNull
+	public synchronized List<Batch> getBatchesSince(long sequence, int max) {
+		List<Batch> result = new ArrayList<Batch>();
+		for (Batch batch : batches) {
+			if (result.size() >= max)
+				break;
+			if (batch.getSequence() > sequence)
+				result.add(batch);
+		}
+		return result;
+	}
+
+	/**
+	 * Waits up to the given number of milliseconds until a batch with a
+	 * sequence number higher than the given one has been published. Returns
+	 * whether there is such a batch.
+	 */
+	public synchronized boolean awaitChangesSince(long sequence, long timeout)
+			throws InterruptedException {
+		long end = System.currentTimeMillis() + timeout;
+		while (lastSequence <= sequence) {
+			long remaining = end - System.currentTimeMillis();
+			if (remaining <= 0)
+				return false;
+			wait(remaining);
+		}
+		return true;
+	}
+
+	/**
+	 * Encodes at most <tt>max</tt> batches following the given sequence number
+	 * for scripting clients. Layout (all integers are big-endian, strings are
+	 * encoded as int32 length plus UTF-8 bytes):
+	 * <ul>
+	 * <li>int32: number of bytes following this field</li>
+	 * <li>one byte: 1 if some of the requested batches are no longer
+	 * available, otherwise 0. In the former case, no batches are returned, and
+	 * the client must resynchronize by other means.</li>
+	 * <li>int64: the sequence number to pass on the next call</li>
+	 * <li>int32: number of batches</li>
+	 * <li>for each batch: int64 sequence number, string batch type, string
+	 * index ID, string root path, and for the added, updated and removed
+	 * documents: int32 count followed by the UIDs</li>
+	 * </ul>
+	 * The decoder for this format is in the search.py script.
+	 */
+	@NotNull
+	public synchronized EncodedBatches encodeBatchesSince(long sequence, int max) {
+		boolean gap = !isAvailable(sequence);
+		List<Batch> batches = gap
+			? Collections.<Batch>emptyList()
+			: getBatchesSince(sequence, max);
+		long nextSequence;
+		if (gap)
+			nextSequence = lastSequence;
+		else if (batches.isEmpty())
+			nextSequence = sequence;
+		else
+			nextSequence = batches.get(batches.size() - 1).getSequence();
+
+		ByteArrayOutputStream bytes = new ByteArrayOutputStream();
+		DataOutputStream out = new DataOutputStream(bytes);
+		try {
+			out.writeInt(0); // Placeholder for payload length
+			out.writeBoolean(gap);
+			out.writeLong(nextSequence);
+			out.writeInt(batches.size());
+			for (Batch batch : batches) {
+				out.writeLong(batch.sequence);
+				writeString(out, batch.type.name());
+				writeString(out, batch.indexId);
+				writeString(out, batch.rootPath);
+				writeStrings(out, batch.added);
+				writeStrings(out, batch.updated);
+				writeStrings(out, batch.removed);
+			}
+			out.flush();
+		}
+		catch (IOException e) {
+			throw new IllegalStateException(e); // Can't happen
+		}
+		byte[] result = bytes.toByteArray();
+		int length = result.length - 4;
+		result[0] = (byte) (length >>> 24);
+		result[1] = (byte) (length >>> 16);
+		result[2] = (byte) (length >>> 8);
+		result[3] = (byte) length;
+		return new EncodedBatches(result, nextSequence);
+	}
+
+	private static void writeStrings(	@NotNull DataOutputStream out,
+										@NotNull List<String> values)
+			throws IOException {
+		out.writeInt(values.size());
+		for (String value : values)
+			writeString(out, value);
+	}
+
+	private static void writeString(@NotNull DataOutputStream out,
+									@NotNull String value) throws IOException {
+		byte[] bytes = value.getBytes(StandardCharsets.UTF_8);
+		out.writeInt(bytes.length);
+		out.write(bytes);
+	}
+
+}
@@ -15,6 +15,7 @@ import org.apache.lucene.index.IndexReader;
 import org.apache.lucene.index.MultiReader;
 
 import java.io.IOException;
+import java.util.List;
 
 /**
  * Created by huzhengmian on 2018/5/7.
@@ -31,4 +32,12 @@ public class DecoratedMultiReader extends MultiReader {
     public final int decoratedReaderIndex(int docID) {
         return super.readerIndex(docID);
     }
+
+    public final int decoratedReaderBase(int readerIndex) {
+        return super.readerBase(readerIndex);
+    }
+
+    public final List<? extends IndexReader> getDecoratedSubReaders() {
+        return getSequentialSubReaders();
+    }
 }
@@ -14,6 +14,8 @@ package net.sourceforge.docfetcher.model.index;
 import java.util.ArrayList;
 import java.util.List;
 
+import net.sourceforge.docfetcher.model.index.ChangeFeed.ChangeSet;
+import net.sourceforge.docfetcher.model.index.ChangeFeed.ChangeType;
 import net.sourceforge.docfetcher.util.Util;
 import net.sourceforge.docfetcher.util.annotations.MutableCopy;
 import net.sourceforge.docfetcher.util.annotations.NotNull;
@@ -33,6 +35,7 @@ public final class DelegatingReporter extends IndexingReporter {
 	@Nullable private IndexingReporter delegate;
 	private final BoundedList<IndexingInfo> infos;
 	private final List<IndexingError> errors;
+	private final ChangeSet changes = new ChangeSet();
 	@Nullable private Long start;
 	@Nullable private Long end;
 
@@ -94,5 +97,16 @@ public final class DelegatingReporter extends IndexingReporter {
 		if (delegate != null)
 			delegate.fail(error);
 	}
+	
+	// The document changes are collected, but not passed on to the delegate
+	public synchronized void documentChanged(	@NotNull ChangeType type,
+												@NotNull String uid) {
+		changes.add(type, uid);
+	}
+	
+	@NotNull
+	synchronized ChangeSet getChanges() {
+		return changes;
+	}
 
 }
\ No newline at end of file
@@ -16,7 +16,9 @@ import java.io.IOException;
 
 import net.sourceforge.docfetcher.model.Fields;
 import net.sourceforge.docfetcher.model.IndexRegistry;
+import net.sourceforge.docfetcher.model.index.ChangeFeed.ChangeType;
 import net.sourceforge.docfetcher.util.CheckedOutOfMemoryError;
+import net.sourceforge.docfetcher.util.Metrics;
 import net.sourceforge.docfetcher.util.annotations.NotNull;
 import net.sourceforge.docfetcher.util.annotations.VisibleForPackageGroup;
 
@@ -39,18 +41,32 @@ public final class IndexWriterAdapter implements Closeable {
 	public static final Term idTerm = new Term(Fields.UID.key());
 	
 	@NotNull private IndexWriter writer;
+	@NotNull private final IndexingReporter reporter;
 
 	public IndexWriterAdapter(@NotNull Directory luceneDir) throws IOException {
+		this(luceneDir, IndexingReporter.nullReporter);
+	}
+
+	// The given reporter is notified of each added, updated and deleted document
+	public IndexWriterAdapter(	@NotNull Directory luceneDir,
+								@NotNull IndexingReporter reporter)
+			throws IOException {
 		IndexWriterConfig config
 				= new IndexWriterConfig(IndexRegistry.getAnalyzer());
 		writer = new IndexWriter(luceneDir, config);
+		this.reporter = reporter;
 	}
 
 	// may throw OutOfMemoryError
 	public void add(@NotNull Document document) throws IOException,
 			CheckedOutOfMemoryError {
+		long start = Metrics.start();
 		try {
 			writer.addDocument(document);
+			String uid = document.get(idTerm.field());
+			if (uid != null)
+				reporter.documentChanged(ChangeType.ADDED, uid);
+			Metrics.timer("index.add").stop(start);
 		}
 		catch (OutOfMemoryError e) {
 			reopenWriterAndThrow(e);
@@ -67,8 +83,11 @@ public final class IndexWriterAdapter implements Closeable {
 	// may throw OutOfMemoryError
 	public void update(@NotNull String uid, @NotNull Document document)
 			throws IOException, CheckedOutOfMemoryError {
+		long start = Metrics.start();
 		try {
 			writer.updateDocument(new Term(idTerm.field(), uid), document);
+			reporter.documentChanged(ChangeType.UPDATED, uid);
+			Metrics.timer("index.update").stop(start);
 		}
 		catch (OutOfMemoryError e) {
 			reopenWriterAndThrow(e);
@@ -98,11 +117,17 @@ public final class IndexWriterAdapter implements Closeable {
 	}
 
 	public void delete(@NotNull String uid) throws IOException {
+		long start = Metrics.start();
 		writer.deleteDocuments(new Term(idTerm.field(),uid));
+		reporter.documentChanged(ChangeType.REMOVED, uid);
+		Metrics.timer("index.delete").stop(start);
 	}
 	
+	// Commits all changes
 	public void close() throws IOException {
+		long start = Metrics.start();
 		writer.close();
+		Metrics.timer("index.commit").stop(start);
 	}
 
 }
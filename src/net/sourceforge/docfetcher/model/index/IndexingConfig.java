@@ -94,6 +94,7 @@ public class IndexingConfig implements Serializable {
 	private boolean storeRelativePaths = false;
 	private boolean watchFolders = true;
 	private boolean skipTarArchives = false;
+	private boolean storeOffsets = ProgramConf.Bool.StoreOffsets.get();
 	
 	public final boolean isDetectExecutableArchives() {
 		return detectExecutableArchives;
@@ -392,5 +393,19 @@ public class IndexingConfig implements Serializable {
 	public void setSkipTarArchives(boolean skipTarArchives) {
 		this.skipTarArchives = skipTarArchives;
 	}
+	
+	/**
+	 * Returns whether the extracted texts are stored in the index along with
+	 * the offsets of their words, which allows creating snippets for search
+	 * results quickly, at the expense of a larger index. Changing this setting
+	 * only affects documents that are indexed afterwards.
+	 */
+	public final boolean isStoreOffsets() {
+		return storeOffsets;
+	}
+	
+	public final void setStoreOffsets(boolean storeOffsets) {
+		this.storeOffsets = storeOffsets;
+	}
 
 }
@@ -19,17 +19,22 @@ import java.util.List;
 import java.util.concurrent.locks.Condition;
 import java.util.concurrent.locks.Lock;
 
+import net.sourceforge.docfetcher.enums.ProgramConf;
+import net.sourceforge.docfetcher.model.ChangeJournal.Changes;
 import net.sourceforge.docfetcher.model.IndexRegistry;
 import net.sourceforge.docfetcher.model.LuceneIndex;
 import net.sourceforge.docfetcher.model.PendingDeletion;
 import net.sourceforge.docfetcher.model.TreeIndex.IndexingResult;
+import net.sourceforge.docfetcher.model.index.ChangeFeed.BatchType;
 import net.sourceforge.docfetcher.model.index.Task.CancelAction;
 import net.sourceforge.docfetcher.model.index.Task.CancelHandler;
 import net.sourceforge.docfetcher.model.index.Task.IndexAction;
 import net.sourceforge.docfetcher.model.index.Task.TaskState;
 import net.sourceforge.docfetcher.model.index.file.FileIndex;
 import net.sourceforge.docfetcher.model.index.outlook.OutlookIndex;
+import net.sourceforge.docfetcher.model.search.Searcher;
 import net.sourceforge.docfetcher.util.Event;
+import net.sourceforge.docfetcher.util.Metrics;
 import net.sourceforge.docfetcher.util.Util;
 import net.sourceforge.docfetcher.util.annotations.NotNull;
 import net.sourceforge.docfetcher.util.annotations.NotThreadSafe;
@@ -75,6 +80,7 @@ public final class IndexingQueue {
 	final Lock writeLock;
 	private final Condition readyTaskAvailable;
 	final int reporterCapacity;
+	private volatile int parseThreads = ProgramConf.Int.ParseThreads.get();
 
 	public IndexingQueue(	@NotNull final IndexRegistry indexRegistry,
 							int reporterCapacity) {
@@ -113,6 +119,19 @@ public final class IndexingQueue {
 			}
 		});
 		
+		// Number of tasks in the queue, including the running task
+		Metrics.setGauge("index.queue_depth", new Metrics.Gauge() {
+			public long getValue() {
+				readLock.lock();
+				try {
+					return tasks.size();
+				}
+				finally {
+					readLock.unlock();
+				}
+			}
+		});
+		
 		thread = new Thread(IndexingQueue.class.getName()) {
 			public void run() {
 				while (threadLoop());
@@ -185,16 +204,22 @@ public final class IndexingQueue {
 			 * underlying index at this point, since it doesn't care whether the
 			 * index was removed from the registry or not. Therefore, before
 			 * clearing the index, we must signal the searcher to let go of it
-			 * by refreshing the searcher's internal Lucene searcher.
+			 * by refreshing the searcher's internal Lucene searcher. Search
+			 * cursors opened on the index hold their own reference to it, so
+			 * they must be closed as well.
 			 */
-			indexRegistry.getSearcher().replaceLuceneSearcher();
+			Searcher searcher = indexRegistry.getSearcher();
+			searcher.replaceLuceneSearcher();
+			searcher.closeCursors(luceneIndex);
 			luceneIndex.clear();
 		}
-		IndexingResult result = task.update(); // Long-running process
+		IndexingResult result = task.update(indexRegistry.getChangeJournal()); // Long-running process
 		boolean hasErrors = luceneIndex.hasErrorsDeep();
 
 		boolean doDelete = false;
 		boolean fireRemoved = false;
+		boolean doRefresh = false;
+		boolean consumeJournal = false;
 		
 		// Post-processing
 		writeLock.lock();
@@ -226,7 +251,9 @@ public final class IndexingQueue {
 					 */
 					if (indexRegistry.getIndexes().contains(luceneIndex)) {
 						indexRegistry.save(luceneIndex);
-						indexRegistry.getSearcher().replaceLuceneSearcher();
+						doRefresh = true;
+						consumeJournal = result != IndexingResult.FAILURE
+							&& task.cancelAction == null;
 					}
 					
 					// Output for index updates from the command-line
@@ -249,6 +276,9 @@ public final class IndexingQueue {
 				indexRegistry.addIndex(luceneIndex);
 				if (result == IndexingResult.SUCCESS_CHANGED)
 					indexRegistry.save(luceneIndex);
+				indexRegistry.getChangeFeed().publish(
+					luceneIndex, BatchType.RESET, task.getChanges());
+				consumeJournal = task.cancelAction == null;
 				boolean keep = task.is(CancelAction.KEEP);
 				if (keep || shutdown || !hasErrors)
 					fireRemoved = tasks.remove(task);
@@ -259,6 +289,25 @@ public final class IndexingQueue {
 			writeLock.unlock();
 		}
 		
+		/*
+		 * Reopening the updated index is done without holding the lock, so
+		 * that searches can continue on the old Lucene searcher in the
+		 * meantime. Clients are notified of the changes only afterwards, so
+		 * that the changes are visible to searches made in response.
+		 */
+		if (doRefresh) {
+			indexRegistry.getSearcher().refreshLuceneSearcher();
+			indexRegistry.getChangeFeed().publish(
+				luceneIndex, BatchType.UPDATE, task.getChanges());
+		}
+		
+		// Drop the recorded changes only after the index has been saved
+		if (consumeJournal) {
+			Changes journalChanges = task.getJournalChanges();
+			if (journalChanges != null)
+				indexRegistry.getChangeJournal().remove(journalChanges);
+		}
+		
 		if (fireRemoved)
 			evtRemoved.fire(task);
 		
@@ -291,6 +340,25 @@ public final class IndexingQueue {
 		return true;
 	}
 
+	/**
+	 * Returns the number of threads used for text extraction during indexing.
+	 * The value 0 means: As many threads as there are processor cores.
+	 */
+	@ThreadSafe
+	public int getParseThreads() {
+		return parseThreads;
+	}
+
+	/**
+	 * Sets the number of threads used for text extraction. The new value takes
+	 * effect with the next indexing task. See {@link #getParseThreads()}.
+	 */
+	@ThreadSafe
+	public void setParseThreads(int parseThreads) {
+		Util.checkThat(parseThreads >= 0);
+		this.parseThreads = parseThreads;
+	}
+
 	@NotThreadSafe
 	@Nullable
 	private Task getReadyTask() {
@@ -315,11 +383,31 @@ public final class IndexingQueue {
 	@ThreadSafe
 	public Rejection addTask(	@NotNull LuceneIndex index,
 								@NotNull IndexAction action) {
+		return addTask(index, action, false);
+	}
+
+	/**
+	 * Enqueues an update of the given index that only rescans the files and
+	 * folders recorded for the index in the registry's change journal, rather
+	 * than the entire index. The return value is the same as for
+	 * {@link #addTask(LuceneIndex, IndexAction)}.
+	 */
+	@Nullable
+	@ThreadSafe
+	public Rejection addJournaledUpdate(@NotNull LuceneIndex index) {
+		return addTask(index, IndexAction.UPDATE, true);
+	}
+
+	@Nullable
+	@ThreadSafe
+	private Rejection addTask(	@NotNull LuceneIndex index,
+								@NotNull IndexAction action,
+								boolean journaled) {
 		Util.checkNotNull(index, action);
 		Util.checkThat(index instanceof FileIndex
 				|| index instanceof OutlookIndex);
 		
-		Task task = new Task(this, index, action);
+		Task task = new Task(this, index, action, journaled);
 
 		// Check that the given index has the right index directory
 		File taskIndexDir = task.getLuceneIndex().getIndexDirPath().getCanonicalFile();
@@ -373,10 +461,15 @@ public final class IndexingQueue {
 				 * should work well enough, assuming that it is very unlikely
 				 * that the user will cancel ready tasks.
 				 */
-				for (Task queueTask : tasks)
+				for (Task queueTask : tasks) {
 					if (queueTask.is(TaskState.READY)
-							&& sameTarget(queueTask, task))
+							&& sameTarget(queueTask, task)) {
+						// A full update covers a journaled one, but not vice versa
+						if (!journaled)
+							queueTask.journaled = false;
 						return Rejection.REDUNDANT_UPDATE;
+					}
+				}
 			}
 			else if (index instanceof OutlookIndex) {
 				/*
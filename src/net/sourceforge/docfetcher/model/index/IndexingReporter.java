@@ -11,6 +11,7 @@
 
 package net.sourceforge.docfetcher.model.index;
 
+import net.sourceforge.docfetcher.model.index.ChangeFeed.ChangeType;
 import net.sourceforge.docfetcher.util.annotations.NotNull;
 
 /**
@@ -30,4 +31,7 @@ public class IndexingReporter {
 	
 	public void fail(@NotNull IndexingError error) {}
 	
+	// Called after a document was written to or deleted from the Lucene index
+	public void documentChanged(@NotNull ChangeType type, @NotNull String uid) {}
+	
 }
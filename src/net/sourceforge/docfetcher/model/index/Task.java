@@ -12,9 +12,12 @@
 package net.sourceforge.docfetcher.model.index;
 
 import net.sourceforge.docfetcher.model.Cancelable;
+import net.sourceforge.docfetcher.model.ChangeJournal;
+import net.sourceforge.docfetcher.model.ChangeJournal.Changes;
 import net.sourceforge.docfetcher.model.LuceneIndex;
 import net.sourceforge.docfetcher.model.PendingDeletion;
 import net.sourceforge.docfetcher.model.TreeIndex.IndexingResult;
+import net.sourceforge.docfetcher.model.index.ChangeFeed.ChangeSet;
 import net.sourceforge.docfetcher.model.index.DelegatingReporter.ExistingMessagesHandler;
 import net.sourceforge.docfetcher.util.Event;
 import net.sourceforge.docfetcher.util.Util;
@@ -62,14 +65,18 @@ public final class Task {
 	@Nullable private volatile PendingDeletion deletion;
 	private final DelegatingReporter reporter;
 	@Nullable volatile CancelAction cancelAction;
+	volatile boolean journaled; // guarded by queue lock
+	@Nullable private volatile Changes journalChanges;
 
 	Task(	@NotNull IndexingQueue queue,
 			@NotNull LuceneIndex index,
-			@NotNull IndexAction indexAction) {
+			@NotNull IndexAction indexAction,
+			boolean journaled) {
 		Util.checkNotNull(queue, index, indexAction);
 		this.queue = queue;
 		this.index = index;
 		this.indexAction = indexAction;
+		this.journaled = journaled;
 		state = is(IndexAction.UPDATE) ? TaskState.READY : TaskState.NOT_READY;
 		reporter = new DelegatingReporter(queue.reporterCapacity);
 	}
@@ -94,12 +101,37 @@ public final class Task {
 	}
 
 	@NotNull
-	IndexingResult update() {
+	IndexingResult update(@NotNull ChangeJournal changeJournal) {
+		int parseThreads = queue.getParseThreads();
+		if (parseThreads == 0)
+			parseThreads = Runtime.getRuntime().availableProcessors();
+		
+		/*
+		 * The recorded changes are retrieved before the update, so that
+		 * changes recorded during the update are kept for the next one. Only
+		 * journaled updates are restricted to the recorded changes. All other
+		 * updates rescan the entire index and thereby process the recorded
+		 * changes as well.
+		 */
+		Changes changes = changeJournal.getChanges(index.getCanonicalRootFile());
+		journalChanges = changes;
 		return index.update(reporter, new Cancelable() {
 			public boolean isCanceled() {
 				return cancelAction != null;
 			}
-		});
+		}, parseThreads, journaled ? changes : null);
+	}
+
+	// The journal entries processed by the update; null if the update hasn't run
+	@Nullable
+	Changes getJournalChanges() {
+		return journalChanges;
+	}
+
+	// The document changes made by the update
+	@NotNull
+	ChangeSet getChanges() {
+		return reporter.getChanges();
 	}
 
 	@NotNull
@@ -39,7 +39,8 @@ final class AppendingContext extends FileContext {
 				context.getOriginalPath(),
 				context.getStopper(),
 				context.getFileCount(),
-				context.getIndexParentDir()
+				context.getIndexParentDir(),
+				null
 		);
 		this.outerContext = context;
 	}
@@ -46,7 +46,8 @@ final class AppendingDocWriter extends LuceneDocWriter {
 
 	public void update(	@NotNull FileDocument doc,
 						@NotNull File file,
-						@NotNull ParseResult parseResult) throws IOException {
+						@NotNull ParseResult parseResult,
+						boolean storeOffsets) throws IOException {
 		throw new UnsupportedOperationException();
 	}
 
@@ -49,6 +49,7 @@ class FileContext {
 	private final Cancelable cancelable;
 	private final MutableInt fileCount;
 	@Nullable private final File indexParentDir; // null if index only exists in RAM
+	@Nullable private final ParseQueue parseQueue; // null if parsing is done in the current thread
 
 	protected FileContext(	@NotNull IndexingConfig config,
 							@NotNull TArchiveDetector zipDetector,
@@ -57,7 +58,8 @@ class FileContext {
 							@Nullable Path originalPath,
 							@NotNull Cancelable cancelable,
 							@NotNull MutableInt fileCount,
-							@Nullable File indexParentDir) {
+							@Nullable File indexParentDir,
+							@Nullable ParseQueue parseQueue) {
 		Util.checkNotNull(config, zipDetector, writer, cancelable, fileCount);
 		this.config = config;
 		this.zipDetector = zipDetector;
@@ -66,6 +68,7 @@ class FileContext {
 		this.cancelable = cancelable;
 		this.fileCount = fileCount;
 		this.indexParentDir = indexParentDir;
+		this.parseQueue = parseQueue;
 		setReporter(reporter);
 	}
 	
@@ -79,7 +82,8 @@ class FileContext {
 				originalPath,
 				superContext.cancelable,
 				superContext.fileCount,
-				superContext.indexParentDir
+				superContext.indexParentDir,
+				superContext.parseQueue
 		);
 	}
 	
@@ -134,6 +138,11 @@ class FileContext {
 		return indexParentDir;
 	}
 	
+	@Nullable
+	protected final ParseQueue getParseQueue() {
+		return parseQueue;
+	}
+	
 	// returns success
 	// if the indexing is canceled before or during the execution of this method,
 	// the last-modified value of the given document will be set to -1.
@@ -141,26 +150,131 @@ class FileContext {
 								@NotNull File file,
 								boolean isAdded) throws IndexingException {
 		info(InfoType.EXTRACTING, doc);
+		ParseResult parseResult;
 		try {
 			// Text extraction; may throw OutOfMemoryErrors
-			ParseResult parseResult = ParseService.parse(
+			parseResult = ParseService.parse(
 				config, file, doc.getName(), doc.getPath(), reporter, cancelable);
+		}
+		catch (ParseException e) {
+			fail(ErrorType.PARSING, doc, e);
+			return false;
+		}
+		catch (CheckedOutOfMemoryError e) {
+			fail(ErrorType.OUT_OF_MEMORY, doc, e.getCause());
+			return false;
+		}
+		return write(doc, file, isAdded, parseResult);
+	}
+	
+	/**
+	 * Same as {@link #index(FileDocument, File, boolean)}, except that the
+	 * text extraction may run in a worker thread if the receiver has a parse
+	 * queue, in which case the extracted text is written to the index at a
+	 * later point, in the current thread. If <tt>deleteFile</tt> is true, the
+	 * given file is deleted afterwards. If <tt>deleteOnFailure</tt> is true
+	 * and the indexing fails, the document is removed from the index.
+	 * <p>
+	 * If the text extraction runs in a worker thread, the extraction info is
+	 * reported when the document is written, and no page progress is
+	 * reported for it.
+	 * <p>
+	 * Files inside zip archives are always indexed immediately, since the
+	 * enclosing archive may be unmounted as soon as the caller is done with it.
+	 */
+	public final void indexLater(	@NotNull final FileDocument doc,
+									@NotNull final File file,
+									final boolean isAdded,
+									final boolean deleteFile,
+									final boolean deleteOnFailure)
+			throws IndexingException {
+		boolean isZipEntry = file instanceof TFile
+				&& ((TFile) file).getEnclArchive() != null;
+		if (parseQueue == null || isZipEntry) {
+			try {
+				if (!index(doc, file, isAdded) && deleteOnFailure)
+					deleteFromIndex(doc.getUniqueId());
+			}
+			finally {
+				if (deleteFile)
+					file.delete();
+			}
+			return;
+		}
+		
+		parseQueue.submit(new ParseQueue.Job() {
+			@Nullable private ParseResult parseResult;
+			@Nullable private ParseException parseException;
+			@Nullable private CheckedOutOfMemoryError outOfMemoryError;
 			
-			/*
-			 * If we detect a cancel request at this point, the request probably
-			 * came in during the parsing step above. In that case, we'll keep
-			 * the partially extracted text and feed it to Lucene, but set the
-			 * stored last-modified value to -1 so that the next index update
-			 * will see the file as "modified" and therefore reindex it.
-			 */
-			if (cancelable.isCanceled())
-				doc.setLastModified(-1);
-
+			public void run() {
+				/*
+				 * The page progress of the parsers is not reported here: It
+				 * would be attributed to whatever file was reported last, and
+				 * the workers run concurrently with each other.
+				 */
+				try {
+					parseResult = ParseService.parse(
+						config, file, doc.getName(), doc.getPath(),
+						IndexingReporter.nullReporter, cancelable);
+				}
+				catch (ParseException e) {
+					parseException = e;
+				}
+				catch (CheckedOutOfMemoryError e) {
+					outOfMemoryError = e;
+				}
+			}
+			
+			protected void complete() throws IndexingException {
+				// Reported here so that the infos appear in completion order
+				info(InfoType.EXTRACTING, doc);
+				try {
+					boolean success = false;
+					if (parseException != null)
+						fail(ErrorType.PARSING, doc, parseException);
+					else if (outOfMemoryError != null)
+						fail(ErrorType.OUT_OF_MEMORY, doc, outOfMemoryError.getCause());
+					else
+						success = write(doc, file, isAdded, parseResult);
+					if (!success && deleteOnFailure)
+						deleteFromIndex(doc.getUniqueId());
+				}
+				finally {
+					if (deleteFile)
+						file.delete();
+				}
+			}
+			
+			protected void discard() {
+				if (deleteFile)
+					file.delete();
+			}
+		});
+	}
+	
+	// returns success
+	private boolean write(	@NotNull FileDocument doc,
+							@NotNull File file,
+							boolean isAdded,
+							@NotNull ParseResult parseResult)
+			throws IndexingException {
+		/*
+		 * If we detect a cancel request at this point, the request probably
+		 * came in during the parsing step. In that case, we'll keep the
+		 * partially extracted text and feed it to Lucene, but set the stored
+		 * last-modified value to -1 so that the next index update will see the
+		 * file as "modified" and therefore reindex it.
+		 */
+		if (cancelable.isCanceled())
+			doc.setLastModified(-1);
+		
+		try {
 			// Add to index or update in index; may also throw OutOfMemoryErrors
 			if (isAdded)
-				writer.add(doc, file, parseResult);
+				writer.add(doc, file, parseResult, config.isStoreOffsets());
 			else
-				writer.update(doc, file, parseResult);
+				writer.update(doc, file, parseResult, config.isStoreOffsets());
 			
 			// Clear errors from previous indexing operations
 			doc.setError(null);
@@ -170,15 +284,22 @@ class FileContext {
 		catch (IOException e) {
 			throw new IndexingException(e);
 		}
-		catch (ParseException e) {
-			fail(ErrorType.PARSING, doc, e);
-		}
 		catch (CheckedOutOfMemoryError e) {
 			fail(ErrorType.OUT_OF_MEMORY, doc, e.getCause());
 		}
 		return false;
 	}
 	
+	/**
+	 * Writes the extracted text of all files passed to
+	 * {@link #indexLater(FileDocument, File, boolean, boolean, boolean)} so
+	 * far to the index.
+	 */
+	public final void flushParseQueue() throws IndexingException {
+		if (parseQueue != null)
+			parseQueue.flush();
+	}
+	
 	public final boolean indexAndDeleteFile(@NotNull FileDocument doc,
 											@NotNull File file,
 											boolean added)
@@ -52,7 +52,10 @@ public final class FileDocument extends Document<FileDocument, FileFolder> {
 	}
 	
 	public void setHtmlFolder(@Nullable FileFolder htmlFolder) {
+		if (this.htmlFolder == htmlFolder)
+			return;
 		this.htmlFolder = htmlFolder;
+		markChanged();
 	}
 	
 	public boolean isModified(	@NotNull FileContext context,
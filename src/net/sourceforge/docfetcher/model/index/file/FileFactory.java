@@ -16,9 +16,15 @@ import java.io.FileNotFoundException;
 import java.io.FileOutputStream;
 import java.io.IOException;
 import java.io.OutputStream;
+import java.util.Collection;
+import java.util.Collections;
 import java.util.List;
+import java.util.Map;
+import java.util.Map.Entry;
+import java.util.Set;
 
 import net.sourceforge.docfetcher.enums.Msg;
+import net.sourceforge.docfetcher.model.ExtractionCache;
 import net.sourceforge.docfetcher.model.FileResource;
 import net.sourceforge.docfetcher.model.HotColdFileCache;
 import net.sourceforge.docfetcher.model.HotColdFileCache.PermanentFileResource;
@@ -33,12 +39,15 @@ import net.sourceforge.docfetcher.model.index.file.FileFolder.FileFolderVisitor;
 import net.sourceforge.docfetcher.model.parse.ParseException;
 import net.sourceforge.docfetcher.util.Util;
 import net.sourceforge.docfetcher.util.annotations.NotNull;
+import net.sourceforge.docfetcher.util.annotations.Nullable;
 import net.sourceforge.docfetcher.util.annotations.ThreadSafe;
 import SevenZip.Archive.IInArchive;
 import SevenZip.Archive.SevenZipEntry;
 import SevenZip.Archive.SevenZip.Handler;
 
 import com.google.common.base.Predicate;
+import com.google.common.collect.Maps;
+import com.google.common.collect.Sets;
 import com.google.common.io.Closeables;
 import com.google.common.io.NullOutputStream;
 
@@ -55,9 +64,34 @@ import de.schlichtherle.truezip.fs.FsSyncException;
 public final class FileFactory {
 	
 	private final HotColdFileCache unpackCache;
+	@Nullable private final ExtractionCache extractionCache;
 	
 	public FileFactory(@NotNull HotColdFileCache unpackCache) {
+		this(unpackCache, null);
+	}
+	
+	/**
+	 * If an extraction cache is given, files unpacked from 7z and rar archives
+	 * are kept in it across program sessions, rather than in the given unpack
+	 * cache.
+	 */
+	public FileFactory(	@NotNull HotColdFileCache unpackCache,
+						@Nullable ExtractionCache extractionCache) {
 		this.unpackCache = Util.checkNotNull(unpackCache);
+		this.extractionCache = extractionCache;
+	}
+	
+	/**
+	 * Returns the counters of the extraction cache, see
+	 * {@link ExtractionCache#getStats()}, or an empty map if the extraction
+	 * cache is disabled.
+	 */
+	@NotNull
+	@ThreadSafe
+	public Map<String, Long> getExtractionCacheStats() {
+		if (extractionCache == null)
+			return Collections.emptyMap();
+		return extractionCache.getStats();
 	}
 	
 	// thrown parse exception has localized error message
@@ -122,6 +156,109 @@ public final class FileFactory {
 		}
 	}
 	
+	/**
+	 * Unpacks the given archive entries into the extraction cache, so that
+	 * subsequent calls to {@link #createFile(IndexingConfig, Path)} for them
+	 * return quickly. All entries of the same 7z or rar archive are unpacked
+	 * in a single pass over the archive, rather than one pass per entry, which
+	 * makes a big difference for large solid archives. Paths that don't point
+	 * into such archives, HTML files and entries that are already cached are
+	 * skipped, as well as archives that can't be unpacked. Does nothing if the
+	 * extraction cache is disabled.
+	 */
+	@ThreadSafe
+	public void prefetch(	@NotNull IndexingConfig config,
+							@NotNull Collection<Path> paths) {
+		Util.checkNotNull(config, paths);
+		if (extractionCache == null)
+			return;
+		
+		// Group entry paths by archive
+		Map<File, Set<String>> archiveEntries = Maps.newLinkedHashMap();
+		for (Path path : paths) {
+			try {
+				PathParts pathParts = path.splitAtExistingFile();
+				String entryPath = pathParts.getRight();
+				if (entryPath.isEmpty() || Util.hasExtension(entryPath, config.getHtmlExtensions()))
+					continue;
+				File archiveFile = pathParts.getLeft().getCanonicalFile();
+				Set<String> entryPaths = archiveEntries.get(archiveFile);
+				if (entryPaths == null) {
+					entryPaths = Sets.newLinkedHashSet();
+					archiveEntries.put(archiveFile, entryPaths);
+				}
+				entryPaths.add(entryPath);
+			}
+			catch (FileNotFoundException e) {
+				continue;
+			}
+		}
+		
+		for (Entry<File, Set<String>> entry : archiveEntries.entrySet()) {
+			try {
+				prefetchFromSolidArchive(config, entry.getKey(), entry.getValue());
+			}
+			catch (ArchiveEncryptedException e) {
+				continue;
+			}
+			catch (Exception e) {
+				Util.printErr(e);
+			}
+		}
+	}
+	
+	private void prefetchFromSolidArchive(	@NotNull IndexingConfig config,
+											@NotNull File archiveFile,
+											@NotNull Set<String> entryPaths)
+			throws ArchiveEncryptedException, DiskSpaceException, IOException {
+		assert extractionCache != null;
+		String archiveExt = Util.splitFilename(archiveFile)[1];
+		SolidArchiveTree<?> archive;
+		if (archiveExt.equals("exe") || archiveExt.equals("7z")) {
+			// Self-extracting archives may also be zip archives
+			TFile tzFile = new TFile(archiveFile, config.createZipDetector());
+			if (tzFile.isDirectory())
+				return;
+			archive = new SevenZipTree(archiveFile, config, false, null, null);
+		}
+		else if (archiveExt.equals("rar")) {
+			archive = new RarTree(archiveFile, config, false, null, null);
+		}
+		else {
+			return;
+		}
+		
+		try {
+			/*
+			 * Collect the uncached entries. For files inside inner archives,
+			 * the inner archives are unpacked.
+			 */
+			Map<String, TreeNode> unpackEntries = Maps.newLinkedHashMap();
+			for (String entryPath : entryPaths) {
+				TreeNode treeNode = archive.findEntry(entryPath);
+				if (treeNode == null)
+					continue;
+				String innerPath = archive.getArchiveEntryPath(treeNode);
+				if (!extractionCache.contains(archiveFile, innerPath))
+					unpackEntries.put(innerPath, treeNode);
+			}
+			if (unpackEntries.isEmpty())
+				return;
+			
+			archive.unpack(unpackEntries.values(), null);
+			for (Entry<String, TreeNode> entry : unpackEntries.entrySet()) {
+				File file = archive.getFile(entry.getValue());
+				if (file != null)
+					extractionCache.put(archiveFile, entry.getKey(), file);
+			}
+		}
+		finally {
+			// Deletes the unpacked files that weren't moved into the cache
+			archive.deleteUnpackedFiles();
+			Closeables.closeQuietly(archive);
+		}
+	}
+	
 	@NotNull
 	private FileResource unpackFromArchive(	@NotNull IndexingConfig config,
 											@NotNull Path originalArchivePath,
@@ -148,6 +285,38 @@ public final class FileFactory {
 		File archiveFile = archiveResource.getFile();
 		String archiveExt = Util.splitFilename(archiveFile)[1];
 		
+		/*
+		 * Look for the archive entry or an enclosing inner archive in the
+		 * extraction cache. The enclosing paths are only checked for presence,
+		 * so that each lookup counts as a single hit or miss.
+		 */
+		boolean isSolidArchive = archiveExt.equals("exe")
+				|| archiveExt.equals("7z") || archiveExt.equals("rar");
+		if (isSolidArchive && extractionCache != null
+				&& archiveResource instanceof PermanentFileResource) {
+			int end = entryPath.length();
+			for (; end > 0; end = entryPath.lastIndexOf('/', end - 1)) {
+				String currentPath = entryPath.substring(0, end);
+				if (end < entryPath.length() && !config.isArchive(currentPath))
+					continue;
+				if (extractionCache.contains(archiveFile, currentPath))
+					break;
+			}
+			if (end <= 0)
+				end = entryPath.length();
+			String currentPath = entryPath.substring(0, end);
+			File cachedFile = extractionCache.get(archiveFile, currentPath);
+			if (cachedFile != null) {
+				archiveResource.dispose();
+				FileResource cachedResource = new PermanentFileResource(cachedFile);
+				if (end == entryPath.length())
+					return cachedResource;
+				Path cacheKey = originalArchivePath.createSubPath(currentPath);
+				String remainingPath = entryPath.substring(end + 1);
+				return unpackFromArchive(config, cacheKey, cachedResource, remainingPath);
+			}
+		}
+		
 		if (! Util.hasExtension(entryPath, config.getHtmlExtensions())) { // Without HTML pairing
 			if (archiveExt.equals("exe") || archiveExt.equals("7z"))
 				return unpackFrom7zArchive(config, originalArchivePath, archiveResource, entryPath);
@@ -361,7 +530,7 @@ public final class FileFactory {
 				if (entryPath.equals(currentPath)) { // Exact match
 					File unpackedFile = unpack7zEntry(config, archive, currentPath, i);
 					Path cacheKey = originalArchivePath.createSubPath(currentPath);
-					return unpackCache.putIfAbsent(cacheKey, unpackedFile);
+					return putUnpackedFile(archiveResource, currentPath, cacheKey, unpackedFile);
 				}
 				else if (entryPath.startsWith(currentPath + "/")
 						&& config.isArchive(currentPath)) { // Partial match
@@ -374,7 +543,7 @@ public final class FileFactory {
 					}
 					Path cacheKey = originalArchivePath.createSubPath(currentPath);
 					String remainingPath = entryPath.substring(currentPath.length() + 1);
-					FileResource innerArchive = unpackCache.putIfAbsent(cacheKey, innerArchiveFile);
+					FileResource innerArchive = putUnpackedFile(archiveResource, currentPath, cacheKey, innerArchiveFile);
 					return unpackFromArchive(config, cacheKey, innerArchive, remainingPath);
 				}
 			}
@@ -481,7 +650,7 @@ public final class FileFactory {
 				if (entryPath.equals(currentPath)) { // Exact match
 					Path cacheKey = originalArchivePath.createSubPath(currentPath);
 					File unpackedFile = unpackRarEntry(config, archive, fh, entryPath);
-					return unpackCache.putIfAbsent(cacheKey, unpackedFile);
+					return putUnpackedFile(archiveResource, currentPath, cacheKey, unpackedFile);
 				}
 				else if (entryPath.startsWith(currentPath + "/")
 						&& config.isArchive(currentPath)) { // Partial match
@@ -493,7 +662,7 @@ public final class FileFactory {
 						archiveResource.dispose();
 					}
 					Path cacheKey = originalArchivePath.createSubPath(currentPath);
-					FileResource innerArchive = unpackCache.putIfAbsent(cacheKey, innerArchiveFile);
+					FileResource innerArchive = putUnpackedFile(archiveResource, currentPath, cacheKey, innerArchiveFile);
 					String remainingPath = entryPath.substring(currentPath.length() + 1);
 					return unpackFromArchive(config, cacheKey, innerArchive, remainingPath);
 				}
@@ -597,7 +766,9 @@ public final class FileFactory {
 				File innerArchiveFile = archive.getFile(treeNode);
 				if (innerArchiveFile == null)
 					throw new IOException(); // Unpacking failed for some reason
-				FileResource innerArchive = unpackCache.putIfAbsent(cacheKey, innerArchiveFile);
+				FileResource innerArchive = putUnpackedFile(
+					archiveResource, archive.getArchiveEntryPath(treeNode),
+					cacheKey, innerArchiveFile);
 				return unpackFromArchive(
 					config, cacheKey, innerArchive, remainingPath[0]);
 			}
@@ -628,6 +799,27 @@ public final class FileFactory {
 		}
 	}
 
+	/*
+	 * Moves the given file unpacked from the given archive entry into the
+	 * extraction cache if possible, and into the unpack cache otherwise.
+	 * Entries of archives that were themselves unpacked to temporary files are
+	 * not stored in the extraction cache, since their cache keys would change
+	 * with each unpacking.
+	 */
+	@NotNull
+	private FileResource putUnpackedFile(	@NotNull FileResource archiveResource,
+											@NotNull String entryPath,
+											@NotNull Path cacheKey,
+											@NotNull File unpackedFile) {
+		if (extractionCache != null && archiveResource instanceof PermanentFileResource) {
+			File archiveFile = archiveResource.getFile();
+			File cachedFile = extractionCache.put(archiveFile, entryPath, unpackedFile);
+			if (cachedFile != null)
+				return new PermanentFileResource(cachedFile);
+		}
+		return unpackCache.putIfAbsent(cacheKey, unpackedFile);
+	}
+	
 	private static boolean noTrailingSlash(@NotNull String path) {
 		int length = path.length();
 		if (length == 0)
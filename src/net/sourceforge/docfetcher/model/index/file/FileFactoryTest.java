@@ -15,10 +15,12 @@ import static org.junit.Assert.assertEquals;
 import static org.junit.Assert.assertTrue;
 
 import java.io.File;
+import java.util.Collections;
 import java.util.HashSet;
 import java.util.Set;
 
 import net.sourceforge.docfetcher.TestFiles;
+import net.sourceforge.docfetcher.model.ExtractionCache;
 import net.sourceforge.docfetcher.model.FileResource;
 import net.sourceforge.docfetcher.model.HotColdFileCache;
 import net.sourceforge.docfetcher.model.Path;
@@ -101,6 +103,40 @@ public final class FileFactoryTest {
 		}
 	}
 	
+	@Test
+	public void testExtractionCache() throws Exception {
+		File tempDir = Util.createTempDir();
+		try {
+			File archiveCopy = new File(tempDir, "test.7z");
+			Files.copy(TestFiles.simple_7z.get(), archiveCopy);
+			Path path = new Path(Util.joinPath(Util.getAbsPath(archiveCopy), "test.txt"));
+			File cacheDir = new File(tempDir, ExtractionCache.DIRNAME);
+			IndexingConfig config = new IndexingConfig();
+			
+			ExtractionCache extractionCache = new ExtractionCache(cacheDir, 1024 * 1024);
+			FileFactory fileFactory = new FileFactory(new HotColdFileCache(20), extractionCache);
+			fileFactory.prefetch(config, Collections.singleton(path));
+			assertEquals(1L, (long) extractionCache.getStats().get("size"));
+			File file = fileFactory.createFile(config, path).getFile();
+			assertEquals("test.txt", file.getName());
+			assertEquals(1L, (long) extractionCache.getStats().get("hits"));
+			
+			// The unpacked file survives a restart
+			extractionCache = new ExtractionCache(cacheDir, 1024 * 1024);
+			fileFactory = new FileFactory(new HotColdFileCache(20), extractionCache);
+			assertEquals(file, fileFactory.createFile(config, path).getFile());
+			
+			// Modifying the archive invalidates the unpacked file
+			archiveCopy.setLastModified(archiveCopy.lastModified() - 10000);
+			assertTrue(fileFactory.createFile(config, path).getFile().isFile());
+			assertEquals(2L, (long) extractionCache.getStats().get("size"));
+			assertEquals(1L, (long) extractionCache.getStats().get("misses"));
+		}
+		finally {
+			Util.deleteRecursively(tempDir);
+		}
+	}
+	
 	@Test
 	public void testUnpackSfxArchives() throws Exception {
 		HotColdFileCache unpackCache = new HotColdFileCache(20);
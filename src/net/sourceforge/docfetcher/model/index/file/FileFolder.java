@@ -46,6 +46,10 @@ public class FileFolder extends Folder<FileDocument, FileFolder> {
 	public FileFolder(@NotNull Path path, @Nullable Long lastModified) {
 		super(path, lastModified);
 	}
+
+	FileFolder(@NotNull String name) {
+		super(name);
+	}
 	
 	public final boolean isArchive() {
 		return getLastModified() != null;
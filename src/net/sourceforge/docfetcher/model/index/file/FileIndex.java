@@ -18,6 +18,7 @@ import java.util.Map;
 
 import net.sourceforge.docfetcher.enums.Msg;
 import net.sourceforge.docfetcher.model.Cancelable;
+import net.sourceforge.docfetcher.model.ChangeJournal;
 import net.sourceforge.docfetcher.model.DocumentType;
 import net.sourceforge.docfetcher.model.Path;
 import net.sourceforge.docfetcher.model.TreeIndex;
@@ -109,6 +110,28 @@ public final class FileIndex extends TreeIndex<FileDocument, FileFolder> {
 		return new FileFolder(path, null);
 	}
 
+	@NotNull
+	protected FileFolder createDetachedFolder(@NotNull String name) {
+		return new FileFolder(name);
+	}
+
+	@NotNull
+	protected FileDocument createDocument(	@NotNull FileFolder parent,
+											@NotNull String name,
+											long lastModified) {
+		return new FileDocument(parent, name, lastModified);
+	}
+
+	@Nullable
+	protected FileFolder getAttachedFolder(@NotNull FileDocument document) {
+		return document.getHtmlFolder();
+	}
+
+	protected void setAttachedFolder(	@NotNull FileDocument document,
+										@Nullable FileFolder folder) {
+		document.setHtmlFolder(folder);
+	}
+
 	public boolean isEmailIndex() {
 		return false;
 	}
@@ -118,12 +141,17 @@ public final class FileIndex extends TreeIndex<FileDocument, FileFolder> {
 	}
 
 	public IndexingResult doUpdate(	@NotNull IndexingReporter reporter,
-									@NotNull Cancelable cancelable) {
+									@NotNull Cancelable cancelable,
+									int parseThreads,
+									@Nullable ChangeJournal.Changes changes) {
 		reporter.setStartTime(System.currentTimeMillis());
 		IndexingConfig config = getConfig();
 		FileFolder rootFolder = getRootFolder();
 		rootFolder.setError(null);
 		SimpleDocWriter writer = null;
+		ParseQueue parseQueue = parseThreads > 1
+			? new ParseQueue(parseThreads)
+			: null;
 
 		/*
 		 * Wrap the stored root file in a TFile to enable zip archive support.
@@ -152,11 +180,16 @@ public final class FileIndex extends TreeIndex<FileDocument, FileFolder> {
 					return IndexingResult.SUCCESS_UNCHANGED;
 				rootFolder.setLastModified(newLastModified);
 				
-				writer = new SimpleDocWriter(getLuceneDir());
+				// Rescan everything if the root itself has changed
+				if (changes != null && changes.isChanged(rootFile))
+					changes = null;
+				
+				writer = new SimpleDocWriter(getLuceneDir(), reporter);
 				FileContext context = new FileContext(
 					config, zipDetector, writer, reporter, null, cancelable,
-					new MutableInt(0), getIndexParentDir());
-				visitDirOrZip(context, rootFolder, rootFile);
+					new MutableInt(0), getIndexParentDir(), parseQueue);
+				visitDirOrZip(context, rootFolder, rootFile, changes);
+				context.flushParseQueue();
 			}
 			else {
 				// Return immediately if the root file wasn't modified
@@ -179,10 +212,10 @@ public final class FileIndex extends TreeIndex<FileDocument, FileFolder> {
 					return IndexingResult.FAILURE;
 				}
 				
-				writer = new SimpleDocWriter(getLuceneDir());
+				writer = new SimpleDocWriter(getLuceneDir(), reporter);
 				SolidArchiveContext context = new SolidArchiveContext(
 					config, zipDetector, writer, reporter, null, cancelable,
-					new MutableInt(0), false, getIndexParentDir());
+					new MutableInt(0), false, getIndexParentDir(), parseQueue);
 				SolidArchiveTree<?> archiveTree = factory.createSolidArchiveTree(
 					context, rootFile);
 				visitSolidArchive(context, rootFolder, archiveTree);
@@ -206,6 +239,8 @@ public final class FileIndex extends TreeIndex<FileDocument, FileFolder> {
 			report(ErrorType.STACK_OVERFLOW, reporter, e);
 		}
 		finally {
+			if (parseQueue != null)
+				parseQueue.close();
 			Closeables.closeQuietly(writer);
 			reporter.setEndTime(System.currentTimeMillis());
 		}
@@ -249,11 +284,17 @@ public final class FileIndex extends TreeIndex<FileDocument, FileFolder> {
 		return new FileDocument(parentFolder, file.getName(), file.lastModified());
 	}
 
-	// Will clean up temporary zip files
+	/*
+	 * Will clean up temporary zip files. If the given changes are not null,
+	 * only the files and folders that have changed according to them are
+	 * rescanned. In that case, the given directory itself must not have
+	 * changed.
+	 */
 	@RecursiveMethod
 	private static void visitDirOrZip(	@NotNull final FileContext context,
 										@NotNull final FileFolder folder,
-										@NotNull final File dirOrZip)
+										@NotNull final File dirOrZip,
+										@Nullable final ChangeJournal.Changes changes)
 			throws IndexingException {
 		assert !folder.hasErrors();
 		
@@ -283,6 +324,14 @@ public final class FileIndex extends TreeIndex<FileDocument, FileFolder> {
 			dirOrZip, context.getConfig(), context.getReporter()) {
 			protected void handleFile(@NotNull File file) {
 				if (context.isStopped()) stop();
+				
+				// Skip known files and solid archives that haven't changed
+				if (changes != null && !changes.isChanged(file)) {
+					String name = file.getName();
+					if (unseenDocs.remove(name) != null
+							|| unseenSubFolders.remove(name) != null)
+						return;
+				}
 				try {
 					if (switchDirZipToSolid(context, folder, file)) {
 						unseenSubFolders.remove(file.getName());
@@ -292,7 +341,7 @@ public final class FileIndex extends TreeIndex<FileDocument, FileFolder> {
 					// File added
 					if (doc == null) {
 						doc = createFileDoc(folder, file);
-						context.index(doc, file, true);
+						context.indexLater(doc, file, true, false, false);
 					}
 					// File modified
 					else if (doc.isModified(context, file, null)) {
@@ -304,8 +353,7 @@ public final class FileIndex extends TreeIndex<FileDocument, FileFolder> {
 						 * the Lucene index, but keep it in the tree so we won't
 						 * index it again on the next index update.
 						 */
-						if (!context.index(doc, file, false))
-							context.deleteFromIndex(doc.getUniqueId());
+						context.indexLater(doc, file, false, false, true);
 					}
 				}
 				catch (IndexingException e) {
@@ -316,6 +364,13 @@ public final class FileIndex extends TreeIndex<FileDocument, FileFolder> {
 			protected void handleHtmlPair(	@NotNull File htmlFile,
 											@Nullable File htmlDir) {
 				if (context.isStopped()) stop();
+				
+				// Skip known HTML pairs that haven't changed
+				if (changes != null && !changes.isChanged(htmlFile)
+						&& (htmlDir == null || !changes.isChanged(htmlDir)
+							&& !changes.containsChanges(htmlDir))
+						&& unseenDocs.remove(htmlFile.getName()) != null)
+					return;
 				try {
 					FileDocument doc = unseenDocs.remove(htmlFile.getName());
 					// HTML pair added
@@ -332,7 +387,7 @@ public final class FileIndex extends TreeIndex<FileDocument, FileFolder> {
 						if (htmlDir != null) {
 							subContext.setReporter(null);
 							visitDirOrZip(
-								subContext, doc.getHtmlFolder(), htmlDir);
+								subContext, doc.getHtmlFolder(), htmlDir, null);
 						}
 						subContext.appendToOuter(doc, true);
 					}
@@ -356,7 +411,7 @@ public final class FileIndex extends TreeIndex<FileDocument, FileFolder> {
 							if (htmlDir != null) {
 								subContext.setReporter(null);
 								visitDirOrZip(
-									subContext, doc.getHtmlFolder(), htmlDir);
+									subContext, doc.getHtmlFolder(), htmlDir, null);
 							}
 							subContext.appendToOuter(doc, false);
 						}
@@ -378,6 +433,19 @@ public final class FileIndex extends TreeIndex<FileDocument, FileFolder> {
 				 * unmodified zip archives.
 				 */
 				FileFolder subFolder = unseenSubFolders.remove(dir.getName());
+				
+				/*
+				 * Skip known folders and zip archives that haven't changed, and
+				 * only descend into those that contain changes.
+				 */
+				ChangeJournal.Changes subChanges = null;
+				if (changes != null && subFolder != null
+						&& !changes.isChanged(dir)) {
+					if (!changes.containsChanges(dir))
+						return;
+					subChanges = changes;
+				}
+				
 				Long newLastModified = getZipArchiveLastModified(
 					context.getConfig(), dir);
 				if (subFolder == null) { // Folder added
@@ -390,7 +458,7 @@ public final class FileIndex extends TreeIndex<FileDocument, FileFolder> {
 					subFolder.setError(null);
 				}
 				try {
-					visitDirOrZip(context, subFolder, dir);
+					visitDirOrZip(context, subFolder, dir, subChanges);
 				}
 				catch (StackOverflowError e) {
 					/*
@@ -573,6 +641,7 @@ public final class FileIndex extends TreeIndex<FileDocument, FileFolder> {
 		// Process unpacked documents
 		indexUnpackedDocs(context, archiveTree, true);
 		indexUnpackedDocs(context, archiveTree, false);
+		context.flushParseQueue();
 
 		/*
 		 * Note: Processing the unpacked archives after all unpacked documents
@@ -749,7 +818,7 @@ public final class FileIndex extends TreeIndex<FileDocument, FileFolder> {
 
 			FileFolder htmlFolder = doc.getHtmlFolder();
 			if (htmlFolder == null) {
-				context.indexAndDeleteFile(doc, mainFile, added);
+				context.indexLater(doc, mainFile, added, true, false);
 				continue;
 			}
 
@@ -824,7 +893,7 @@ public final class FileIndex extends TreeIndex<FileDocument, FileFolder> {
 		if (unpackedFile.isDirectory()) { // Zip file
 			FileContext subContext = new FileContext(context, archive.getPath());
 			try {
-				visitDirOrZip(subContext, archive, unpackedFile);
+				visitDirOrZip(subContext, archive, unpackedFile, null);
 			}
 			finally {
 				unpackedFile.delete();
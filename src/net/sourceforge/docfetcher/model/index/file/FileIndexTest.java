@@ -21,6 +21,9 @@ import java.util.Collections;
 import java.util.List;
 
 import net.sourceforge.docfetcher.TestFiles;
+import net.sourceforge.docfetcher.model.ChangeJournal;
+import net.sourceforge.docfetcher.model.ChangeJournal.ChangeType;
+import net.sourceforge.docfetcher.model.ChangeJournal.Changes;
 import net.sourceforge.docfetcher.model.TreeIndex.IndexingResult;
 import net.sourceforge.docfetcher.model.UtilModel;
 import net.sourceforge.docfetcher.model.index.IndexingError;
@@ -32,6 +35,8 @@ import net.sourceforge.docfetcher.util.Util;
 import net.sourceforge.docfetcher.util.collect.ListMap;
 import net.sourceforge.docfetcher.util.collect.ListMap.Entry;
 
+import org.apache.lucene.index.DirectoryReader;
+import org.apache.lucene.index.IndexReader;
 import org.apache.lucene.store.Directory;
 import org.junit.Test;
 
@@ -225,6 +230,46 @@ public final class FileIndexTest {
 		Util.deleteRecursively(tempDir);
 	}
 	
+	/**
+	 * Checks that an index update restricted to the changes in a change journal
+	 * only rescans the changed files and folders.
+	 */
+	@Test
+	public void testJournaledIndexUpdate() throws Exception {
+		File tempDir = Util.createTempDir();
+		File rootDir = new File(tempDir, "root");
+		File subDir1 = new File(rootDir, "sub1");
+		File subDir2 = new File(rootDir, "sub2");
+		subDir1.mkdirs();
+		subDir2.mkdirs();
+		Files.write("Hello World", new File(subDir1, "a.txt"), Charsets.UTF_8);
+		Files.write("Hello World", new File(subDir2, "b.txt"), Charsets.UTF_8);
+		
+		FileIndex index = new FileIndex(null, rootDir);
+		index.update(null, null);
+		UtilModel.assertDocCount(index.getLuceneDir(), 2);
+		
+		// Only the change in the first subfolder is recorded
+		File newFile1 = new File(subDir1, "c.txt");
+		Files.write("Hello World", newFile1, Charsets.UTF_8);
+		Files.write("Hello World", new File(subDir2, "d.txt"), Charsets.UTF_8);
+		ChangeJournal journal = new ChangeJournal(
+			new File(tempDir, ChangeJournal.FILENAME), 100);
+		journal.record(newFile1, ChangeType.CREATED);
+		
+		Changes changes = journal.getChanges(rootDir);
+		index.update(null, null, 1, changes);
+		UtilModel.assertDocCount(index.getLuceneDir(), 3);
+		journal.remove(changes);
+		assertTrue(journal.getChanges(rootDir).isEmpty());
+		
+		// A full update picks up the unrecorded change
+		index.update(null, null);
+		UtilModel.assertDocCount(index.getLuceneDir(), 4);
+		
+		Util.deleteRecursively(tempDir);
+	}
+	
 	/**
 	 * Checks that the index update works correctly after a file is renamed.
 	 */
@@ -333,6 +378,30 @@ public final class FileIndexTest {
 		System.setErr(stdErr);
 	}
 	
+	@Test
+	public void testParallelParsing() throws Exception {
+		File[] files = {
+				TestFiles.lorem_ipsum_pdf.get().getParentFile(),
+				TestFiles.multiple_dirs_7z.get(),
+		};
+		for (File file : files) {
+			FileIndex index1 = new FileIndex(null, file);
+			CountingReporter reporter1 = new CountingReporter();
+			index1.update(reporter1, null, 1);
+			
+			FileIndex index2 = new FileIndex(null, file);
+			CountingReporter reporter2 = new CountingReporter();
+			index2.update(reporter2, null, 4);
+			
+			assertEquals(reporter1.extractCount, reporter2.extractCount);
+			assertEquals(reporter1.errorCount, reporter2.errorCount);
+			IndexReader reader = DirectoryReader.open(index1.getLuceneDir());
+			int docCount = reader.numDocs();
+			reader.close();
+			UtilModel.assertDocCount(index2.getLuceneDir(), docCount);
+		}
+	}
+	
 	// This test should not crash. See bug #3465544.
 	@Test
 	public void testFakeZipInsideSolid() {
@@ -30,24 +30,27 @@ abstract class LuceneDocWriter {
 	
 	public final void add(	@NotNull FileDocument doc,
 							@NotNull File file,
-							@NotNull ParseResult parseResult)
+							@NotNull ParseResult parseResult,
+							boolean storeOffsets)
 			throws IOException, CheckedOutOfMemoryError {
-		Document luceneDoc = createLuceneDoc(doc, file, parseResult);
+		Document luceneDoc = createLuceneDoc(doc, file, parseResult, storeOffsets);
 		write(doc, luceneDoc, true);
 	}
 	
 	public void update(	@NotNull FileDocument doc,
 						@NotNull File file,
-						@NotNull ParseResult parseResult)
+						@NotNull ParseResult parseResult,
+						boolean storeOffsets)
 			throws IOException, CheckedOutOfMemoryError {
-		Document luceneDoc = createLuceneDoc(doc, file, parseResult);
+		Document luceneDoc = createLuceneDoc(doc, file, parseResult, storeOffsets);
 		write(doc, luceneDoc, false);
 	}
 
 	@NotNull
 	private Document createLuceneDoc(	@NotNull FileDocument doc,
 										@NotNull File file,
-										@NotNull ParseResult parseResult) {
+										@NotNull ParseResult parseResult,
+										boolean storeOffsets) {
 		/*
 		 * The given file might be a temporary one, so we'll have to get the
 		 * original filename and last-modified value from the document.
@@ -82,7 +85,7 @@ abstract class LuceneDocWriter {
 		 * user wouldn't find the file if we store only the full filename and
 		 * the user searches for the filename without extension.
 		 */
-		luceneDoc.add(Fields.createContent(parseResult.getContent()));
+		luceneDoc.add(Fields.createIndexedContent(parseResult.getContent(), storeOffsets));
 		StringBuilder metadata = parseResult.getMetadata();
 		metadata.append(filename);
 		String basename = Util.splitFilename(filename)[0];
@@ -90,7 +93,7 @@ abstract class LuceneDocWriter {
 			metadata.append(" ");
 			metadata.append(basename);
 		}
-		luceneDoc.add(Fields.createContent(metadata));
+		luceneDoc.add(Fields.createIndexedContent(metadata, storeOffsets));
 		return luceneDoc;
 	}
 	
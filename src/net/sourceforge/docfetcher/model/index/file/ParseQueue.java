@@ -0,0 +1,156 @@
+/*******************************************************************************
+ * Copyright (c) 2021 Tran Nam Quang.
+ * All rights reserved. This program and the accompanying materials
+ * are made available under the terms of the Eclipse Public License v1.0
+ * which accompanies this distribution, and is available at
+ * http://www.eclipse.org/legal/epl-v10.html
+ *
+ * Contributors:
+ *    Tran Nam Quang - initial API and implementation
+ *******************************************************************************/
+
+package net.sourceforge.docfetcher.model.index.file;
+
+import java.io.Closeable;
+import java.util.LinkedList;
+import java.util.concurrent.ExecutionException;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.Future;
+import java.util.concurrent.ThreadFactory;
+import java.util.concurrent.atomic.AtomicInteger;
+
+import net.sourceforge.docfetcher.model.index.IndexingException;
+import net.sourceforge.docfetcher.util.Util;
+import net.sourceforge.docfetcher.util.annotations.NotNull;
+import net.sourceforge.docfetcher.util.annotations.NotThreadSafe;
+import net.sourceforge.docfetcher.util.annotations.Nullable;
+
+import com.google.common.base.Throwables;
+import com.google.common.util.concurrent.Uninterruptibles;
+
+/**
+ * Runs the text extraction of an index update on a pool of worker threads,
+ * while the results are written to the Lucene index one at a time in the
+ * thread that submitted the jobs. The jobs are completed in the order in which
+ * they were submitted. To limit memory usage, submitting a job blocks while
+ * more than twice as many jobs as there are worker threads are pending.
+ *
+ * @author Tran Nam Quang
+ */
+@NotThreadSafe
+final class ParseQueue implements Closeable {
+
+	static abstract class Job implements Runnable {
+		@Nullable private Future<?> future;
+
+		/**
+		 * Runs the text extraction. Called in a worker thread.
+		 */
+		public abstract void run();
+
+		/**
+		 * Writes the result of the text extraction to the index. Called in the
+		 * thread that submitted the job.
+		 */
+		protected abstract void complete() throws IndexingException;
+
+		/**
+		 * Called instead of {@link #complete()} if the queue is closed before
+		 * the job was completed.
+		 */
+		protected void discard() {
+		}
+	}
+
+	private final int threadCount;
+	private final int maxPending;
+	private final LinkedList<Job> pending = new LinkedList<Job>();
+	@Nullable private ExecutorService executor;
+
+	public ParseQueue(int threadCount) {
+		Util.checkThat(threadCount > 0);
+		this.threadCount = threadCount;
+		this.maxPending = threadCount * 2;
+	}
+
+	/**
+	 * Submits the given job, then completes all jobs at the head of the queue
+	 * whose text extraction has finished.
+	 */
+	public void submit(@NotNull Job job) throws IndexingException {
+		Util.checkNotNull(job);
+		job.future = getExecutor().submit(job);
+		pending.addLast(job);
+		while (!pending.isEmpty() && (pending.size() > maxPending
+				|| pending.getFirst().future.isDone()))
+			completeFirst();
+	}
+
+	/**
+	 * Waits for the text extraction of all pending jobs and completes them.
+	 */
+	public void flush() throws IndexingException {
+		while (!pending.isEmpty())
+			completeFirst();
+	}
+
+	private void completeFirst() throws IndexingException {
+		Job job = pending.removeFirst();
+		await(job);
+		job.complete();
+	}
+
+	/**
+	 * Discards all pending jobs and shuts down the worker threads. Jobs whose
+	 * text extraction is still running are waited for, so that the jobs can
+	 * safely clean up after themselves.
+	 */
+	public void close() {
+		try {
+			while (!pending.isEmpty()) {
+				Job job = pending.removeFirst();
+				try {
+					await(job);
+				}
+				catch (RuntimeException e) {
+					Util.printErr(e);
+				}
+				job.discard();
+			}
+		}
+		finally {
+			if (executor != null)
+				executor.shutdown();
+		}
+	}
+
+	@NotNull
+	private ExecutorService getExecutor() {
+		if (executor == null) {
+			executor = Executors.newFixedThreadPool(threadCount, new ThreadFactory() {
+				private final AtomicInteger count = new AtomicInteger(0);
+				public Thread newThread(Runnable r) {
+					String name = ParseQueue.class.getName() + " (Parse thread "
+						+ count.incrementAndGet() + ")";
+					Thread thread = new Thread(r, name);
+					thread.setDaemon(true);
+					return thread;
+				}
+			});
+		}
+		return executor;
+	}
+
+	private static void await(@NotNull Job job) {
+		try {
+			Uninterruptibles.getUninterruptibly(job.future);
+		}
+		catch (ExecutionException e) {
+			// Unchecked exceptions and errors are rethrown as if the text
+			// extraction had run in the current thread
+			throw Throwables.propagate(e.getCause());
+		}
+	}
+
+}
@@ -15,6 +15,7 @@ import java.io.Closeable;
 import java.io.IOException;
 
 import net.sourceforge.docfetcher.model.index.IndexWriterAdapter;
+import net.sourceforge.docfetcher.model.index.IndexingReporter;
 import net.sourceforge.docfetcher.util.CheckedOutOfMemoryError;
 import net.sourceforge.docfetcher.util.annotations.NotNull;
 
@@ -28,8 +29,10 @@ final class SimpleDocWriter extends LuceneDocWriter implements Closeable {
 	
 	private final IndexWriterAdapter writer;
 	
-	public SimpleDocWriter(@NotNull Directory luceneDir) throws IOException {
-		writer = new IndexWriterAdapter(luceneDir);
+	public SimpleDocWriter(	@NotNull Directory luceneDir,
+							@NotNull IndexingReporter reporter)
+			throws IOException {
+		writer = new IndexWriterAdapter(luceneDir, reporter);
 	}
 	
 	protected boolean appendMetadata() {
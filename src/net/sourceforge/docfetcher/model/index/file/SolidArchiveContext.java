@@ -53,9 +53,10 @@ final class SolidArchiveContext extends FileContext implements FailReporter {
 	                              	@NotNull Cancelable cancelable,
 	                              	@NotNull MutableInt fileCount,
 	                              	boolean isTempArchive,
-	                              	@Nullable File indexParentDir) {
+	                              	@Nullable File indexParentDir,
+	                              	@Nullable ParseQueue parseQueue) {
 		super(config, zipDetector, writer, reporter, originalPath, cancelable,
-			fileCount, indexParentDir);
+			fileCount, indexParentDir, parseQueue);
 		this.isTempArchive = isTempArchive;
 	}
 	
@@ -72,7 +73,8 @@ final class SolidArchiveContext extends FileContext implements FailReporter {
 				superContext.getStopper(),
 				superContext.getFileCount(),
 				isTempArchive,
-				indexParentDir
+				indexParentDir,
+				superContext.getParseQueue()
 		);
 	}
 	
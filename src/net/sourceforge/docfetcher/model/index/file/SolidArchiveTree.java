@@ -470,6 +470,36 @@ abstract class SolidArchiveTree<E> implements Closeable {
 		return entryData.file;
 	}
 	
+	/**
+	 * Returns the archive entry with the given path relative to the archive
+	 * root, or null if there is no such entry. If the path points to a file
+	 * inside an inner archive, the inner archive is returned.
+	 */
+	@Nullable
+	public final TreeNode findEntry(@NotNull String innerPath) {
+		FileFolder folder = archiveFolder;
+		Iterator<String> it = Util.splitPath(innerPath).iterator();
+		while (it.hasNext()) {
+			String innerPart = it.next();
+			FileFolder subFolder = folder.getSubFolder(innerPart);
+			if (subFolder == null) {
+				if (it.hasNext())
+					return null;
+				FileDocument doc = folder.getDocument(innerPart);
+				if (doc == null || entryDataMap.getValue(doc.getPath()) == null)
+					return null;
+				return doc;
+			}
+			if (subFolder.isArchive()) {
+				if (entryDataMap.getValue(subFolder.getPath()) == null)
+					return null;
+				return subFolder;
+			}
+			folder = subFolder;
+		}
+		return null;
+	}
+	
 	public final boolean isEncrypted(@NotNull TreeNode treeNode) {
 		EntryData entryData = entryDataMap.getValue(treeNode.getPath());
 		if (entryData == null)
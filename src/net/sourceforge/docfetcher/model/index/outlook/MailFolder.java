@@ -35,9 +35,16 @@ final class MailFolder extends Folder<MailDocument, MailFolder> {
 	public MailFolder(@NotNull Path path) {
 		super(path, null);
 	}
+
+	MailFolder(@NotNull String name) {
+		super(name);
+	}
 	
 	public void setHasDeepContent(boolean hasDeepContent) {
+		if (this.hasDeepContent == hasDeepContent)
+			return;
 		this.hasDeepContent = hasDeepContent;
+		markChanged();
 	}
 	
 	public boolean hasDeepContent() {
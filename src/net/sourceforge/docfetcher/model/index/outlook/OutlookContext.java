@@ -127,7 +127,7 @@ final class OutlookContext {
 		contents.append(sender).append(" ");
 		contents.append(recipients).append(" ");
 		contents.append(body).append(" ");
-		luceneDoc.add(Fields.createContent(contents));
+		luceneDoc.add(Fields.createIndexedContent(contents, config.isStoreOffsets()));
 		
 		// Parse and append attachments
 		new AttachmentVisitor(config, email, true) {
@@ -146,10 +146,11 @@ final class OutlookContext {
 				Path path = doc.getPath().createSubPath(filename);
 				ParseResult parseResult = ParseService.parse(
 					config, tempFile, filename, path, reporter, cancelable);
-				luceneDoc.add(Fields.createContent(parseResult.getContent()));
+				boolean storeOffsets = config.isStoreOffsets();
+				luceneDoc.add(Fields.createIndexedContent(parseResult.getContent(), storeOffsets));
 				StringBuilder metadata = parseResult.getMetadata();
 				metadata.append(filename);
-				luceneDoc.add(Fields.createContent(metadata));
+				luceneDoc.add(Fields.createIndexedContent(metadata, storeOffsets));
 			}
 			protected void handleException(	String filename,
 											Throwable t) {
@@ -20,6 +20,7 @@ import java.util.List;
 import java.util.Map;
 
 import net.sourceforge.docfetcher.model.Cancelable;
+import net.sourceforge.docfetcher.model.ChangeJournal;
 import net.sourceforge.docfetcher.model.DocumentType;
 import net.sourceforge.docfetcher.model.Path;
 import net.sourceforge.docfetcher.model.TreeIndex;
@@ -60,7 +61,7 @@ public final class OutlookIndex extends TreeIndex<MailDocument, MailFolder> {
 	
 	private static final long serialVersionUID = 1L;
 	
-	private MailFolder simplifiedRootFolder;
+	private transient MailFolder simplifiedRootFolder;
 	
 	public OutlookIndex(@Nullable File indexParentDir, @NotNull File pstFile) {
 		super(indexParentDir, pstFile);
@@ -75,6 +76,26 @@ public final class OutlookIndex extends TreeIndex<MailDocument, MailFolder> {
 	protected MailFolder createRootFolder(@NotNull Path path) {
 		return new MailFolder(path);
 	}
+
+	@NotNull
+	protected MailFolder createDetachedFolder(@NotNull String name) {
+		return new MailFolder(name);
+	}
+
+	@NotNull
+	protected MailDocument createDocument(	@NotNull MailFolder parent,
+											@NotNull String name,
+											long lastModified) {
+		return new MailDocument(parent, name, name, lastModified);
+	}
+
+	protected int getFolderFlags(@NotNull MailFolder folder) {
+		return folder.hasDeepContent() ? 1 : 0;
+	}
+
+	protected void setFolderFlags(@NotNull MailFolder folder, int flags) {
+		folder.setHasDeepContent((flags & 1) != 0);
+	}
 	
 	public boolean isEmailIndex() {
 		return true;
@@ -84,8 +105,13 @@ public final class OutlookIndex extends TreeIndex<MailDocument, MailFolder> {
 		return DocumentType.OUTLOOK;
 	}
 	
+	// The emails are always extracted in the current thread, since they're
+	// read sequentially from the PST file. The PST file is always rescanned
+	// entirely, so the given changes are ignored.
 	public IndexingResult doUpdate(	@NotNull IndexingReporter reporter,
-									@NotNull Cancelable cancelable) {
+									@NotNull Cancelable cancelable,
+									int parseThreads,
+									@Nullable ChangeJournal.Changes changes) {
 		reporter.setStartTime(System.currentTimeMillis());
 		MailFolder rootFolder = getRootFolder();
 		rootFolder.setError(null);
@@ -103,7 +129,7 @@ public final class OutlookIndex extends TreeIndex<MailDocument, MailFolder> {
 				return IndexingResult.SUCCESS_UNCHANGED;
 			rootFolder.setLastModified(newLastModified);
 			
-			writer = new IndexWriterAdapter(getLuceneDir());
+			writer = new IndexWriterAdapter(getLuceneDir(), reporter);
 			OutlookContext context = new OutlookContext(
 					getConfig(), writer, reporter, cancelable
 			);
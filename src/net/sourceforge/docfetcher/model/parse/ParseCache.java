@@ -0,0 +1,253 @@
+/*******************************************************************************
+ * Copyright (c) 2021 Tran Nam Quang.
+ * All rights reserved. This program and the accompanying materials
+ * are made available under the terms of the Eclipse Public License v1.0
+ * which accompanies this distribution, and is available at
+ * http://www.eclipse.org/legal/epl-v10.html
+ *
+ * Contributors:
+ *    Tran Nam Quang - initial API and implementation
+ *******************************************************************************/
+
+package net.sourceforge.docfetcher.model.parse;
+
+import java.io.BufferedInputStream;
+import java.io.BufferedOutputStream;
+import java.io.DataInputStream;
+import java.io.DataOutputStream;
+import java.io.File;
+import java.io.FileInputStream;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.InputStream;
+import java.security.MessageDigest;
+import java.security.NoSuchAlgorithmException;
+import java.util.List;
+import java.util.Map;
+import java.util.zip.GZIPInputStream;
+import java.util.zip.GZIPOutputStream;
+
+import net.sourceforge.docfetcher.enums.SystemConf;
+import net.sourceforge.docfetcher.model.LruFileStore;
+import net.sourceforge.docfetcher.util.Metrics;
+import net.sourceforge.docfetcher.util.Util;
+import net.sourceforge.docfetcher.util.annotations.NotNull;
+import net.sourceforge.docfetcher.util.annotations.Nullable;
+import net.sourceforge.docfetcher.util.annotations.ThreadSafe;
+
+import com.google.common.base.Charsets;
+import com.google.common.io.Closeables;
+
+import de.schlichtherle.truezip.file.TFile;
+import de.schlichtherle.truezip.file.TFileInputStream;
+
+/**
+ * A persistent cache of parse results, used by the {@link ParseService} to
+ * avoid extracting the text of unchanged files again, e.g. when an index is
+ * rebuilt, or when a file was touched or copied to another indexed folder.
+ * <p>
+ * The cache keys are hashes of the file contents, the parser, the file
+ * extension and the program version, so that a new program version won't
+ * reuse results of older parsers. Each cache entry is stored as a compressed
+ * file in the cache folder. The total size of the entry files is limited by
+ * the capacity of the cache; if it is exceeded, the least recently used
+ * entries are deleted. The usage order is kept across program sessions via
+ * the modification dates of the entry files.
+ *
+ * @see LruFileStore
+ * @author Tran Nam Quang
+ */
+@ThreadSafe
+public final class ParseCache {
+
+	public static final String DIRNAME = ".parsecache";
+
+	// Must be incremented whenever the entry file format changes
+	private static final int FORMAT_VERSION = 1;
+
+	private final LruFileStore store;
+
+	/**
+	 * Creates a cache that is stored in the given folder, with the given
+	 * capacity in bytes. Entries that were previously stored in the folder
+	 * are kept, up to the capacity.
+	 */
+	public ParseCache(@NotNull File dir, long capacity) {
+		store = new LruFileStore(dir, capacity, "parse.cache", new LruFileStore.SizeReader() {
+			public long getSize(File file) {
+				// Temporary files are left behind by a terminated program
+				if (file.getName().endsWith(".tmp"))
+					return -1;
+				return file.length();
+			}
+		});
+	}
+
+	/**
+	 * Returns the key under which the parse result of the given file and
+	 * parser is stored, or null if the file could not be read. Reading the
+	 * entire file for computing the key is much faster than parsing it for
+	 * most file types. This method accepts TrueZIP files.
+	 */
+	@Nullable
+	public String createKey(@NotNull File file,
+							@NotNull Parser parser,
+							@NotNull String filename) {
+		long start = Metrics.start();
+		InputStream in = null;
+		try {
+			MessageDigest digest = MessageDigest.getInstance("SHA-1");
+			String header = FORMAT_VERSION + "|"
+					+ SystemConf.Str.ProgramVersion.get() + "|"
+					+ SystemConf.Str.BuildDate.get() + "|"
+					+ parser.getClass().getName() + "|"
+					+ Util.getExtension(filename) + "|";
+			digest.update(header.getBytes(Charsets.UTF_8));
+			if (file instanceof TFile)
+				in = new TFileInputStream(file);
+			else
+				in = new FileInputStream(file);
+			byte[] buffer = new byte[64 * 1024];
+			for (int n; (n = in.read(buffer)) != -1;)
+				digest.update(buffer, 0, n);
+			StringBuilder sb = new StringBuilder(40);
+			for (byte b : digest.digest())
+				sb.append(String.format("%02x", b & 0xff));
+			return sb.toString();
+		}
+		catch (NoSuchAlgorithmException e) {
+			throw new IllegalStateException(e);
+		}
+		catch (IOException e) {
+			return null;
+		}
+		finally {
+			Closeables.closeQuietly(in);
+			Metrics.timer("parse.cache_hash").stop(start);
+		}
+	}
+
+	/**
+	 * Returns the parse result stored under the given key, or null if there
+	 * is no such entry or if the entry could not be read.
+	 */
+	@Nullable
+	public ParseResult get(@NotNull String key) {
+		if (!store.touch(key)) {
+			store.countMiss();
+			return null;
+		}
+		File file = store.getEntry(key);
+		DataInputStream in = null;
+		try {
+			in = new DataInputStream(new BufferedInputStream(
+				new GZIPInputStream(new FileInputStream(file))));
+			if (in.readInt() != FORMAT_VERSION)
+				throw new IOException("Unknown format: " + file);
+			String parserName = readString(in);
+			ParseResult result = new ParseResult(readString(in));
+			result.setTitle(readString(in));
+			for (int i = in.readInt(); i > 0; i--)
+				result.addAuthor(readString(in));
+			for (int i = in.readInt(); i > 0; i--)
+				result.addMiscMetadata(readString(in));
+			if (parserName != null)
+				result.setParserName(parserName);
+			store.countHit(key);
+			return result;
+		}
+		catch (IOException e) {
+			// The entry is corrupted or was deleted in the meantime
+			store.remove(key);
+			store.countMiss();
+			return null;
+		}
+		finally {
+			Closeables.closeQuietly(in);
+		}
+	}
+
+	/**
+	 * Stores the given parse result under the given key. Results that are
+	 * larger than the capacity of the cache are not stored.
+	 */
+	public void put(@NotNull String key, @NotNull ParseResult result) {
+		File file = store.getEntry(key);
+		File tempFile = store.getEntry(key + "." + Thread.currentThread().getId() + ".tmp");
+		DataOutputStream out = null;
+		try {
+			out = new DataOutputStream(new GZIPOutputStream(
+				new BufferedOutputStream(new FileOutputStream(tempFile))));
+			out.writeInt(FORMAT_VERSION);
+			writeString(out, result.getParserName());
+			writeString(out, result.getContent().toString());
+			writeString(out, result.getTitle());
+			writeStrings(out, result.getAuthors());
+			writeStrings(out, result.getMiscMetadata());
+			out.close();
+			long size = tempFile.length();
+			if (size > store.getCapacity())
+				return;
+			synchronized (store) {
+				store.remove(key);
+				if (!tempFile.renameTo(file))
+					return;
+				store.add(key, size);
+			}
+		}
+		catch (IOException e) {
+			Util.printErr(e);
+		}
+		finally {
+			Closeables.closeQuietly(out);
+			tempFile.delete();
+		}
+	}
+
+	/**
+	 * Returns the current values of the cache counters, keyed by "hits",
+	 * "misses", "evictions", "size", "bytes" and "capacity". The size is the
+	 * number of entries, the capacity is given in bytes.
+	 */
+	@NotNull
+	public Map<String, Long> getStats() {
+		return store.getStats();
+	}
+
+	private static void writeStrings(	@NotNull DataOutputStream out,
+										@Nullable List<String> strings)
+			throws IOException {
+		if (strings == null) {
+			out.writeInt(0);
+			return;
+		}
+		out.writeInt(strings.size());
+		for (String string : strings)
+			writeString(out, string);
+	}
+
+	// DataOutputStream.writeUTF can't be used since it is limited to 64 KB
+	private static void writeString(@NotNull DataOutputStream out,
+									@Nullable String string)
+			throws IOException {
+		if (string == null) {
+			out.writeInt(-1);
+			return;
+		}
+		byte[] bytes = string.getBytes(Charsets.UTF_8);
+		out.writeInt(bytes.length);
+		out.write(bytes);
+	}
+
+	@Nullable
+	private static String readString(@NotNull DataInputStream in)
+			throws IOException {
+		int length = in.readInt();
+		if (length < 0)
+			return null;
+		byte[] bytes = new byte[length];
+		in.readFully(bytes);
+		return new String(bytes, Charsets.UTF_8);
+	}
+
+}
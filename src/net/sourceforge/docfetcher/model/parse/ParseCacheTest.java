@@ -0,0 +1,99 @@
+/*******************************************************************************
+ * Copyright (c) 2021 Tran Nam Quang.
+ * All rights reserved. This program and the accompanying materials
+ * are made available under the terms of the Eclipse Public License v1.0
+ * which accompanies this distribution, and is available at
+ * http://www.eclipse.org/legal/epl-v10.html
+ *
+ * Contributors:
+ *    Tran Nam Quang - initial API and implementation
+ *******************************************************************************/
+
+package net.sourceforge.docfetcher.model.parse;
+
+import static org.junit.Assert.assertEquals;
+import static org.junit.Assert.assertNotNull;
+import static org.junit.Assert.assertNull;
+
+import java.io.File;
+import java.util.Arrays;
+
+import net.sourceforge.docfetcher.util.Util;
+
+import org.junit.Test;
+
+import com.google.common.base.Charsets;
+import com.google.common.io.Files;
+
+/**
+ * @author Tran Nam Quang
+ */
+public final class ParseCacheTest {
+
+	@Test
+	public void testPutAndGet() throws Exception {
+		File tempDir = Util.createTempDir();
+		try {
+			File file1 = new File(tempDir, "file1.pdf");
+			File file2 = new File(tempDir, "file2.pdf");
+			File file3 = new File(tempDir, "file3.doc");
+			Files.write("same contents", file1, Charsets.UTF_8);
+			Files.write("same contents", file2, Charsets.UTF_8);
+			Files.write("same contents", file3, Charsets.UTF_8);
+
+			File cacheDir = new File(tempDir, ParseCache.DIRNAME);
+			ParseCache cache = new ParseCache(cacheDir, 1024 * 1024);
+			Parser parser = new PdfParser();
+			String key = cache.createKey(file1, parser, file1.getName());
+			assertNull(cache.get(key));
+			cache.put(key, new ParseResult("contents")
+				.setTitle("title")
+				.addAuthor("author1")
+				.addAuthor("author2")
+				.setParserName("PdfParser"));
+
+			// Files with equal contents and extensions share the same entry
+			assertEquals(key, cache.createKey(file2, parser, file2.getName()));
+			assertNull(cache.get(cache.createKey(file3, parser, file3.getName())));
+
+			// The cache survives a restart
+			cache = new ParseCache(cacheDir, 1024 * 1024);
+			ParseResult result = cache.get(key);
+			assertNotNull(result);
+			assertEquals("contents", result.getContent().toString());
+			assertEquals("title", result.getTitle());
+			assertEquals(Arrays.asList("author1", "author2"), result.getAuthors());
+			assertNull(result.getMiscMetadata());
+			assertEquals("PdfParser", result.getParserName());
+			assertEquals(1L, (long) cache.getStats().get("hits"));
+		}
+		finally {
+			Util.deleteRecursively(tempDir);
+		}
+	}
+
+	@Test
+	public void testEviction() throws Exception {
+		File tempDir = Util.createTempDir();
+		try {
+			ParseCache cache = new ParseCache(tempDir, 1024 * 1024);
+			cache.put("key1", new ParseResult("contents1"));
+			long entrySize = cache.getStats().get("bytes");
+
+			// Room for two entries
+			cache = new ParseCache(tempDir, entrySize * 2 + entrySize / 2);
+			cache.put("key2", new ParseResult("contents2"));
+			assertNotNull(cache.get("key1")); // key2 is now least recently used
+			cache.put("key3", new ParseResult("contents3"));
+			assertNull(cache.get("key2"));
+			assertNotNull(cache.get("key1"));
+			assertNotNull(cache.get("key3"));
+			assertEquals(1L, (long) cache.getStats().get("evictions"));
+			assertEquals(2L, (long) cache.getStats().get("size"));
+		}
+		finally {
+			Util.deleteRecursively(tempDir);
+		}
+	}
+
+}
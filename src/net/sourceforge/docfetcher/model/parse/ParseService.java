@@ -22,6 +22,7 @@ import java.util.Collections;
 import java.util.Comparator;
 import java.util.List;
 import java.util.Locale;
+import java.util.Map;
 import java.util.Set;
 
 import net.sourceforge.docfetcher.enums.Msg;
@@ -45,6 +46,7 @@ import net.sourceforge.docfetcher.model.parse.OpenOfficeParser.OpenOfficeImpress
 import net.sourceforge.docfetcher.model.parse.OpenOfficeParser.OpenOfficeWriterParser;
 import net.sourceforge.docfetcher.util.AppUtil;
 import net.sourceforge.docfetcher.util.CheckedOutOfMemoryError;
+import net.sourceforge.docfetcher.util.Metrics;
 import net.sourceforge.docfetcher.util.Util;
 import net.sourceforge.docfetcher.util.annotations.Immutable;
 import net.sourceforge.docfetcher.util.annotations.MutableCopy;
@@ -109,8 +111,30 @@ public final class ParseService {
 		new MSPowerPoint2007Parser()
 	);
 	
+	@Nullable private static volatile ParseCache cache;
+	
 	private ParseService() {}
 	
+	/**
+	 * Sets the cache of parse results that is consulted before files are
+	 * parsed. A null value disables caching.
+	 */
+	public static void setCache(@Nullable ParseCache cache) {
+		ParseService.cache = cache;
+	}
+	
+	/**
+	 * Returns the counters of the parse cache, see
+	 * {@link ParseCache#getStats()}, or an empty map if the cache is disabled.
+	 */
+	@NotNull
+	public static Map<String, Long> getCacheStats() {
+		ParseCache cache = ParseService.cache;
+		if (cache == null)
+			return Collections.emptyMap();
+		return cache.getStats();
+	}
+	
 	@Immutable
 	@NotNull
 	public static List<Parser> getParsers() {
@@ -249,6 +273,22 @@ public final class ParseService {
 										@NotNull final File file,
 										@NotNull ParseContext context)
 			throws ParseException, CheckedOutOfMemoryError {
+		/*
+		 * Text files are not cached, since computing the cache key would take
+		 * about as long as parsing them.
+		 */
+		ParseCache cache = ParseService.cache;
+		String cacheKey = null;
+		if (cache != null && parser != textParser && !ProgramConf.Bool.DryRun.get()) {
+			cacheKey = cache.createKey(file, parser, context.getFilename());
+			if (cacheKey != null) {
+				ParseResult cachedResult = cache.get(cacheKey);
+				if (cachedResult != null)
+					return cachedResult;
+			}
+		}
+		
+		long start = Metrics.start();
 		try {
 			ParseResult result = null;
 			if (ProgramConf.Bool.DryRun.get()) {
@@ -313,7 +353,12 @@ public final class ParseService {
 				throw new IllegalStateException();
 			}
 			String parserName = parser.getClass().getSimpleName();
-			return result.setParserName(parserName);
+			result.setParserName(parserName);
+			
+			// Parse results of canceled parsers may be incomplete
+			if (cacheKey != null && !context.getCancelable().isCanceled())
+				cache.put(cacheKey, result);
+			return result;
 		}
 		catch (final RuntimeException e) {
 			// Show stacktrace, but keep indexing. Referencing the GUI from here
@@ -330,6 +375,10 @@ public final class ParseService {
 		catch (OutOfMemoryError e) {
 			throw new CheckedOutOfMemoryError(e);
 		}
+		finally {
+			// Includes failed attempts, which can take as long as successful ones
+			Metrics.timer("parse." + parser.getClass().getSimpleName()).stop(start);
+		}
 	}
 	
 	private static boolean isZipEntry(@NotNull File file) {
@@ -11,9 +11,12 @@
 
 package net.sourceforge.docfetcher.model.search;
 
+import java.io.IOException;
+import java.text.BreakIterator;
 import java.util.ArrayList;
 import java.util.LinkedList;
 import java.util.List;
+import java.util.Locale;
 
 import net.sourceforge.docfetcher.model.Fields;
 import net.sourceforge.docfetcher.model.IndexRegistry;
@@ -28,12 +31,17 @@ import org.apache.lucene.analysis.Token;
 import org.apache.lucene.document.Document;
 import org.apache.lucene.index.DirectoryReader;
 import org.apache.lucene.index.IndexReader;
+import org.apache.lucene.search.IndexSearcher;
 import org.apache.lucene.search.Query;
 import org.apache.lucene.search.highlight.Formatter;
 import org.apache.lucene.search.highlight.Highlighter;
 import org.apache.lucene.search.highlight.NullFragmenter;
 import org.apache.lucene.search.highlight.QueryScorer;
 import org.apache.lucene.search.highlight.TokenGroup;
+import org.apache.lucene.search.uhighlight.LengthGoalBreakIterator;
+import org.apache.lucene.search.uhighlight.Passage;
+import org.apache.lucene.search.uhighlight.PassageFormatter;
+import org.apache.lucene.search.uhighlight.UnifiedHighlighter;
 import org.apache.lucene.search.vectorhighlight.FastVectorHighlighter;
 import org.apache.lucene.search.vectorhighlight.FieldPhraseList;
 import org.apache.lucene.search.vectorhighlight.FieldPhraseList.WeightedPhraseInfo;
@@ -184,4 +192,138 @@ public final class HighlightService {
 		return ranges;
 	}
 	
+	/**
+	 * Creates up to <tt>maxSnippets</tt> highlighted snippets for each of the
+	 * given documents of the given searcher. The snippets are created from the
+	 * texts and offsets stored in the index, see
+	 * {@link net.sourceforge.docfetcher.model.index.IndexingConfig#isStoreOffsets()
+	 * IndexingConfig.isStoreOffsets()}, so the original files are not needed.
+	 * <p>
+	 * Each snippet is cut from one of the best matching passages of the text,
+	 * with at most <tt>contextChars</tt> characters before the first and after
+	 * the last match. The returned list contains one list of snippets per
+	 * document, in the same order as the given document IDs. The snippet list
+	 * is empty for documents without a stored text.
+	 */
+	@MutableCopy
+	@NotNull
+	@SuppressWarnings("unchecked")
+	public static List<List<HighlightedString>> getSnippets(@NotNull IndexSearcher searcher,
+															@NotNull Query query,
+															@NotNull int[] docIds,
+															int maxSnippets,
+															int contextChars)
+			throws IOException, CheckedOutOfMemoryError {
+		SnippetHighlighter highlighter = new SnippetHighlighter(searcher, contextChars);
+		highlighter.setMaxLength(Integer.MAX_VALUE - 1); // The default is 10,000 characters
+		try {
+			// This might throw an OutOfMemoryError
+			Object[] docSnippets = highlighter.highlightSnippets(
+				query, docIds, maxSnippets);
+			
+			List<List<HighlightedString>> snippets = new ArrayList<List<HighlightedString>> (docIds.length);
+			for (Object object : docSnippets) {
+				if (object == null)
+					snippets.add(new ArrayList<HighlightedString> (0));
+				else
+					snippets.add((List<HighlightedString>) object);
+			}
+			return snippets;
+		}
+		catch (OutOfMemoryError e) {
+			throw new CheckedOutOfMemoryError(e);
+		}
+	}
+	
+	/**
+	 * A unified highlighter that creates {@link HighlightedString} snippets of
+	 * the content field instead of formatted strings.
+	 */
+	private static final class SnippetHighlighter extends UnifiedHighlighter {
+		private final int contextChars;
+		
+		public SnippetHighlighter(@NotNull IndexSearcher searcher, int contextChars) {
+			super(searcher, IndexRegistry.getAnalyzer());
+			this.contextChars = contextChars;
+		}
+		
+		// Returns one list of HighlightedStrings or null per document
+		@NotNull
+		public Object[] highlightSnippets(	@NotNull Query query,
+											@NotNull int[] docIds,
+											int maxSnippets)
+				throws IOException {
+			String key = Fields.CONTENT.key();
+			return highlightFieldsAsObjects(
+				new String[] { key }, query, docIds, new int[] { maxSnippets }).get(key);
+		}
+		
+		protected BreakIterator getBreakIterator(String field) {
+			return LengthGoalBreakIterator.createClosestToLength(
+				BreakIterator.getSentenceInstance(Locale.ROOT),
+				2 * contextChars);
+		}
+		
+		protected PassageFormatter getFormatter(String field) {
+			return new SnippetFormatter(contextChars);
+		}
+	}
+	
+	private static final class SnippetFormatter extends PassageFormatter {
+		private final int contextChars;
+		
+		public SnippetFormatter(int contextChars) {
+			this.contextChars = contextChars;
+		}
+		
+		public Object format(Passage[] passages, String content) {
+			List<HighlightedString> snippets = new ArrayList<HighlightedString> (passages.length);
+			for (Passage passage : passages) {
+				int numMatches = passage.getNumMatches();
+				int[] matchStarts = passage.getMatchStarts();
+				int[] matchEnds = passage.getMatchEnds();
+				
+				// Cut the passage down to the matches and their context
+				int passageStart = passage.getStartOffset();
+				int passageEnd = passage.getEndOffset();
+				int start = passageStart;
+				int end = passageEnd;
+				if (numMatches == 0) {
+					end = Math.min(end, start + 2 * contextChars);
+				}
+				else {
+					int firstStart = Integer.MAX_VALUE;
+					int lastEnd = 0;
+					for (int i = 0; i < numMatches; i++) {
+						firstStart = Math.min(firstStart, matchStarts[i]);
+						lastEnd = Math.max(lastEnd, matchEnds[i]);
+					}
+					start = Math.max(start, firstStart - contextChars);
+					end = Math.min(end, lastEnd + contextChars);
+				}
+				
+				// Don't cut words in half
+				while (start > passageStart && Character.isLetterOrDigit(content.charAt(start - 1)))
+					start--;
+				while (end < passageEnd && Character.isLetterOrDigit(content.charAt(end)))
+					end++;
+				
+				// Matches are in ascending order, but may overlap
+				List<Range> ranges = new ArrayList<Range> (numMatches);
+				int prevEnd = start;
+				for (int i = 0; i < numMatches; i++) {
+					int matchStart = matchStarts[i];
+					int matchEnd = Math.min(matchEnds[i], end);
+					if (matchStart < prevEnd || matchStart >= matchEnd)
+						continue;
+					ranges.add(new Range(matchStart - start, matchEnd - matchStart));
+					prevEnd = matchEnd;
+				}
+				snippets.add(new HighlightedString(
+					content.substring(start, end), ranges));
+			}
+			return snippets;
+		}
+	}
+	
 }
@@ -14,8 +14,10 @@ package net.sourceforge.docfetcher.model.search;
 import static org.junit.Assert.assertEquals;
 
 import java.util.LinkedList;
+import java.util.List;
 
 import net.sourceforge.docfetcher.model.FieldTypes;
+import net.sourceforge.docfetcher.model.Fields;
 import net.sourceforge.docfetcher.model.IndexRegistry;
 import net.sourceforge.docfetcher.model.index.IndexWriterAdapter;
 
@@ -121,4 +123,44 @@ public final class HighlightServiceTest {
 			Closeables.closeQuietly(searcher.getIndexReader());
 		}
 	}
+	
+	@Test
+	public void testSnippets() throws Exception {
+		Directory directory = new RAMDirectory();
+		IndexWriterAdapter writer = new IndexWriterAdapter(directory);
+		String[] contents = {
+			"The first sentence is long enough. The second one mentions a keyword.",
+			"No match here.",
+			"Another keyword, and the keyword again."
+		};
+		for (String content : contents) {
+			Document doc = new Document();
+			doc.add(Fields.createIndexedContent(content, true));
+			writer.add(doc);
+		}
+		Closeables.closeQuietly(writer); // flush unwritten documents into index
+		
+		QueryParser queryParser = new QueryParser("content", IndexRegistry.getAnalyzer());
+		Query query = queryParser.parse("keyword");
+		IndexSearcher searcher = null;
+		try {
+			searcher = new IndexSearcher(DirectoryReader.open(directory));
+			List<List<HighlightedString>> snippets = HighlightService.getSnippets(
+				searcher, query, new int[] { 2, 0 }, 2, 10);
+			assertEquals(2, snippets.size());
+			
+			HighlightedString snippet = snippets.get(0).get(0);
+			assertEquals("Another keyword, and the keyword again.", snippet.getString());
+			assertEquals(2, snippet.getRangeCount());
+			assertEquals(8, snippet.getRanges().get(0).start);
+			assertEquals(7, snippet.getRanges().get(0).length);
+			
+			snippet = snippets.get(1).get(0);
+			assertEquals("mentions a keyword.", snippet.getString());
+			assertEquals(11, snippet.getRanges().get(0).start);
+		} finally {
+			Closeables.closeQuietly(searcher.getIndexReader());
+		}
+	}
+
 }
@@ -0,0 +1,154 @@
+/*******************************************************************************
+ * Copyright (c) 2021 Tran Nam Quang.
+ * All rights reserved. This program and the accompanying materials
+ * are made available under the terms of the Eclipse Public License v1.0
+ * which accompanies this distribution, and is available at
+ * http://www.eclipse.org/legal/epl-v10.html
+ *
+ * Contributors:
+ *    Tran Nam Quang - initial API and implementation
+ *******************************************************************************/
+
+package net.sourceforge.docfetcher.model.search;
+
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Map;
+
+import net.sourceforge.docfetcher.util.Util;
+import net.sourceforge.docfetcher.util.annotations.NotNull;
+import net.sourceforge.docfetcher.util.annotations.Nullable;
+import net.sourceforge.docfetcher.util.annotations.ThreadSafe;
+
+import com.google.common.collect.ImmutableList;
+
+/**
+ * A bounded LRU cache for search results, used by the {@link Searcher}. The
+ * cache keys consist of the normalized query, the searched indexes and the
+ * generation of the cache at the time of the search. Calling
+ * {@link #invalidate()} clears the cache and starts a new generation, so that
+ * results of searches that were running during the invalidation won't be
+ * stored afterwards.
+ *
+ * @author Tran Nam Quang
+ */
+@ThreadSafe
+final class ResultCache {
+
+	static final class Key {
+		private final String query;
+		private final List<String> indexes;
+		private final long generation;
+
+		private Key(@NotNull String query,
+					@NotNull List<String> indexes,
+					long generation) {
+			this.query = query;
+			this.indexes = indexes;
+			this.generation = generation;
+		}
+
+		public boolean equals(Object obj) {
+			if (this == obj)
+				return true;
+			if (!(obj instanceof Key))
+				return false;
+			Key other = (Key) obj;
+			return generation == other.generation
+				&& query.equals(other.query)
+				&& indexes.equals(other.indexes);
+		}
+
+		public int hashCode() {
+			int result = query.hashCode();
+			result = 31 * result + indexes.hashCode();
+			return 31 * result + (int) (generation ^ (generation >>> 32));
+		}
+	}
+
+	private final int capacity;
+	private final Map<Key, List<ResultDocument>> map; // guarded by 'this' lock
+	private long generation = 0; // guarded by 'this' lock
+	private long hits = 0; // guarded by 'this' lock
+	private long misses = 0; // guarded by 'this' lock
+	private long evictions = 0; // guarded by 'this' lock
+
+	/**
+	 * Creates a new cache with the given capacity. A capacity of zero disables
+	 * the cache.
+	 */
+	public ResultCache(int capacity) {
+		Util.checkThat(capacity >= 0);
+		this.capacity = capacity;
+		map = new LinkedHashMap<Key, List<ResultDocument>>(16, 0.75f, true) {
+			private static final long serialVersionUID = 1L;
+
+			protected boolean removeEldestEntry(Map.Entry<Key, List<ResultDocument>> eldest) {
+				if (size() <= ResultCache.this.capacity)
+					return false;
+				evictions++;
+				return true;
+			}
+		};
+	}
+
+	public boolean isEnabled() {
+		return capacity > 0;
+	}
+
+	/**
+	 * Creates a key for the current generation of the cache.
+	 */
+	@NotNull
+	public synchronized Key createKey(	@NotNull String query,
+										@NotNull List<String> indexes) {
+		return new Key(query, ImmutableList.copyOf(indexes), generation);
+	}
+
+	@Nullable
+	public synchronized List<ResultDocument> get(@NotNull Key key) {
+		List<ResultDocument> results = map.get(key);
+		if (results == null)
+			misses++;
+		else
+			hits++;
+		return results;
+	}
+
+	/**
+	 * Stores the given results under the given key, unless the cache has been
+	 * invalidated since the key was created.
+	 */
+	public synchronized void put(	@NotNull Key key,
+									@NotNull List<ResultDocument> results) {
+		if (key.generation != generation || !isEnabled())
+			return;
+		map.put(key, results);
+	}
+
+	public synchronized void invalidate() {
+		map.clear();
+		generation++;
+	}
+
+	public synchronized long getGeneration() {
+		return generation;
+	}
+
+	/**
+	 * Returns the current values of the cache counters, keyed by "hits",
+	 * "misses", "evictions", "size", "capacity" and "generation".
+	 */
+	@NotNull
+	public synchronized Map<String, Long> getStats() {
+		Map<String, Long> stats = new LinkedHashMap<String, Long>();
+		stats.put("hits", hits);
+		stats.put("misses", misses);
+		stats.put("evictions", evictions);
+		stats.put("size", (long) map.size());
+		stats.put("capacity", (long) capacity);
+		stats.put("generation", generation);
+		return stats;
+	}
+
+}
@@ -0,0 +1,72 @@
+/*******************************************************************************
+ * Copyright (c) 2021 Tran Nam Quang.
+ * All rights reserved. This program and the accompanying materials
+ * are made available under the terms of the Eclipse Public License v1.0
+ * which accompanies this distribution, and is available at
+ * http://www.eclipse.org/legal/epl-v10.html
+ *
+ * Contributors:
+ *    Tran Nam Quang - initial API and implementation
+ *******************************************************************************/
+
+package net.sourceforge.docfetcher.model.search;
+
+import static org.junit.Assert.assertEquals;
+import static org.junit.Assert.assertNotNull;
+import static org.junit.Assert.assertNull;
+
+import java.util.Arrays;
+import java.util.Collections;
+import java.util.List;
+
+import org.junit.Test;
+
+/**
+ * @author Tran Nam Quang
+ */
+public final class ResultCacheTest {
+
+	private static final List<String> indexes = Arrays.asList("index1", "index2");
+	private static final List<ResultDocument> results = Collections.emptyList();
+
+	@Test
+	public void testEviction() {
+		ResultCache cache = new ResultCache(2);
+		ResultCache.Key key1 = cache.createKey("a", indexes);
+		ResultCache.Key key2 = cache.createKey("b", indexes);
+		ResultCache.Key key3 = cache.createKey("c", indexes);
+		cache.put(key1, results);
+		cache.put(key2, results);
+		assertNotNull(cache.get(key1)); // key2 is now least recently used
+		cache.put(key3, results);
+		assertNull(cache.get(key2));
+		assertNotNull(cache.get(key1));
+		assertNotNull(cache.get(key3));
+
+		assertEquals(3L, (long) cache.getStats().get("hits"));
+		assertEquals(1L, (long) cache.getStats().get("misses"));
+		assertEquals(1L, (long) cache.getStats().get("evictions"));
+	}
+
+	@Test
+	public void testIndexesArePartOfKey() {
+		ResultCache cache = new ResultCache(2);
+		cache.put(cache.createKey("a", indexes), results);
+		assertNull(cache.get(cache.createKey("a", indexes.subList(0, 1))));
+		assertNotNull(cache.get(cache.createKey("a", indexes)));
+	}
+
+	@Test
+	public void testInvalidation() {
+		ResultCache cache = new ResultCache(2);
+		ResultCache.Key oldKey = cache.createKey("a", indexes);
+		cache.put(oldKey, results);
+		cache.invalidate();
+		assertNull(cache.get(cache.createKey("a", indexes)));
+
+		// Results of searches started before the invalidation are discarded
+		cache.put(oldKey, results);
+		assertNull(cache.get(cache.createKey("a", indexes)));
+	}
+
+}
@@ -0,0 +1,247 @@
+/*******************************************************************************
+ * Copyright (c) 2021 Tran Nam Quang.
+ * All rights reserved. This program and the accompanying materials
+ * are made available under the terms of the Eclipse Public License v1.0
+ * which accompanies this distribution, and is available at
+ * http://www.eclipse.org/legal/epl-v10.html
+ *
+ * Contributors:
+ *    Tran Nam Quang - initial API and implementation
+ *******************************************************************************/
+
+package net.sourceforge.docfetcher.model.search;
+
+import java.io.ByteArrayOutputStream;
+import java.io.DataOutputStream;
+import java.io.IOException;
+import java.nio.charset.StandardCharsets;
+import java.util.ArrayList;
+import java.util.List;
+
+import net.sourceforge.docfetcher.util.Metrics;
+import net.sourceforge.docfetcher.util.Util;
+import net.sourceforge.docfetcher.util.annotations.NotNull;
+
+/**
+ * Packs selected attributes of a list of result documents into a single
+ * columnar byte array, so that scripting clients can fetch all results with
+ * one call instead of one call per getter and result document.
+ * <p>
+ * Layout of the encoded data (all integers are big-endian):
+ * <ul>
+ * <li>int32: number of bytes following this field</li>
+ * <li>int32: number of rows</li>
+ * <li>int32: number of columns</li>
+ * <li>for each column: int32 name length, UTF-8 name, one-byte type code</li>
+ * <li>for each column, for each row: the value, encoded according to the
+ * column type: 's' = int32 length plus UTF-8 bytes, 'i' = int64, 'b' = one
+ * byte (0 or 1)</li>
+ * </ul>
+ * The decoder for this format is in the search.py script.
+ *
+ * @author Tran Nam Quang
+ */
+public final class ResultColumns {
+
+	public static enum Column {
+		TITLE ("title", 's') {
+			Object get(ResultDocument doc) { return doc.getTitle(); }
+		},
+		FILENAME ("filename", 's') {
+			Object get(ResultDocument doc) { return doc.getFilename(); }
+		},
+		PATH ("path", 's') {
+			Object get(ResultDocument doc) { return doc.getPathStr(); }
+		},
+		TYPE ("type", 's') {
+			Object get(ResultDocument doc) { return doc.getType(); }
+		},
+		AUTHORS ("authors", 's') {
+			Object get(ResultDocument doc) { return doc.getAuthors(); }
+		},
+		SENDER ("sender", 's') {
+			Object get(ResultDocument doc) { return doc.getSender(); }
+		},
+		LAST_MODIFIED ("lastModified", 's') {
+			Object get(ResultDocument doc) { return doc.getLastModifiedStr(); }
+		},
+		DATE ("date", 's') {
+			Object get(ResultDocument doc) { return doc.getDateStr(); }
+		},
+		PARSER ("parser", 's') {
+			Object get(ResultDocument doc) { return doc.getParserName(); }
+		},
+		SCORE ("score", 'i') {
+			Object get(ResultDocument doc) { return (long) doc.getScore(); }
+		},
+		SIZE ("size", 'i') {
+			Object get(ResultDocument doc) { return doc.getSizeInKB(); }
+		},
+		IS_EMAIL ("isEmail", 'b') {
+			Object get(ResultDocument doc) { return doc.isEmail(); }
+		},
+		UID ("uid", 's') {
+			Object get(ResultDocument doc) { return doc.getUniqueId(); }
+		},
+		;
+
+		public final String key;
+		private final char typeCode;
+
+		Column(@NotNull String key, char typeCode) {
+			this.key = key;
+			this.typeCode = typeCode;
+		}
+
+		abstract Object get(@NotNull ResultDocument doc);
+	}
+
+	private ResultColumns() {}
+
+	/**
+	 * Parses a comma-separated list of column keys, e.g.
+	 * "filename,path,score". Surrounding whitespace is ignored. An empty string
+	 * yields all columns.
+	 *
+	 * @throws IllegalArgumentException
+	 *             if one of the given keys is unknown
+	 */
+	@NotNull
+	public static List<Column> parseColumns(@NotNull String keys) {
+		List<Column> columns = new ArrayList<Column>();
+		for (String key : keys.split(",")) {
+			key = key.trim();
+			if (key.isEmpty())
+				continue;
+			columns.add(getColumn(key));
+		}
+		if (columns.isEmpty())
+			for (Column column : Column.values())
+				columns.add(column);
+		return columns;
+	}
+
+	@NotNull
+	private static Column getColumn(@NotNull String key) {
+		for (Column column : Column.values())
+			if (column.key.equals(key))
+				return column;
+		throw new IllegalArgumentException("Unknown result column: " + key);
+	}
+
+	@NotNull
+	public static byte[] encode(@NotNull List<ResultDocument> docs,
+								@NotNull List<Column> columns) {
+		Util.checkNotNull(docs, columns);
+		long start = Metrics.start();
+		ByteArrayOutputStream bytes = new ByteArrayOutputStream(
+			64 + docs.size() * columns.size() * 32);
+		DataOutputStream out = new DataOutputStream(bytes);
+		try {
+			out.writeInt(0); // Placeholder for payload length
+			out.writeInt(docs.size());
+			writeColumnHeader(out, columns);
+			for (Column column : columns)
+				for (ResultDocument doc : docs)
+					writeValue(out, column, doc);
+			out.flush();
+		}
+		catch (IOException e) {
+			throw new IllegalStateException(e); // Can't happen
+		}
+		byte[] result = bytes.toByteArray();
+		int length = result.length - 4;
+		result[0] = (byte) (length >>> 24);
+		result[1] = (byte) (length >>> 16);
+		result[2] = (byte) (length >>> 8);
+		result[3] = (byte) length;
+		Metrics.timer("search.encode").stop(start);
+		return result;
+	}
+
+	/**
+	 * Packs the given snippets, as returned by
+	 * {@link Searcher#getSnippets(List, int, int)}, into a single byte array.
+	 * <p>
+	 * Layout of the encoded data (all integers are big-endian):
+	 * <ul>
+	 * <li>int32: number of bytes following this field</li>
+	 * <li>int32: number of results</li>
+	 * <li>for each result: int32 number of snippets, and for each snippet:
+	 * int32 length plus UTF-8 text, int32 number of highlighted ranges, and for
+	 * each range: int32 start and int32 length</li>
+	 * </ul>
+	 * The ranges are given in Unicode code points rather than Java characters,
+	 * so that they can be applied directly to Python strings.
+	 */
+	@NotNull
+	public static byte[] encodeSnippets(@NotNull List<List<HighlightedString>> snippets) {
+		Util.checkNotNull(snippets);
+		long start = Metrics.start();
+		ByteArrayOutputStream bytes = new ByteArrayOutputStream(
+			64 + snippets.size() * 256);
+		DataOutputStream out = new DataOutputStream(bytes);
+		try {
+			out.writeInt(0); // Placeholder for payload length
+			out.writeInt(snippets.size());
+			for (List<HighlightedString> docSnippets : snippets) {
+				out.writeInt(docSnippets.size());
+				for (HighlightedString snippet : docSnippets) {
+					String text = snippet.getString();
+					writeString(out, text);
+					List<Range> ranges = snippet.getRanges();
+					out.writeInt(ranges.size());
+					for (Range range : ranges) {
+						int rangeStart = text.codePointCount(0, range.start);
+						out.writeInt(rangeStart);
+						out.writeInt(text.codePointCount(
+							range.start, range.start + range.length));
+					}
+				}
+			}
+			out.flush();
+		}
+		catch (IOException e) {
+			throw new IllegalStateException(e); // Can't happen
+		}
+		byte[] result = bytes.toByteArray();
+		int length = result.length - 4;
+		result[0] = (byte) (length >>> 24);
+		result[1] = (byte) (length >>> 16);
+		result[2] = (byte) (length >>> 8);
+		result[3] = (byte) length;
+		Metrics.timer("search.encode").stop(start);
+		return result;
+	}
+
+	// Writes the number of columns, followed by the key and type code of each column
+	static void writeColumnHeader(	@NotNull DataOutputStream out,
+									@NotNull List<Column> columns)
+			throws IOException {
+		out.writeInt(columns.size());
+		for (Column column : columns) {
+			writeString(out, column.key);
+			out.writeByte(column.typeCode);
+		}
+	}
+
+	static void writeValue(	@NotNull DataOutputStream out,
+							@NotNull Column column,
+							@NotNull ResultDocument doc) throws IOException {
+		Object value = column.get(doc);
+		switch (column.typeCode) {
+		case 's': writeString(out, (String) value); break;
+		case 'i': out.writeLong((Long) value); break;
+		case 'b': out.writeBoolean((Boolean) value); break;
+		default: throw new IllegalStateException();
+		}
+	}
+
+	static void writeString(@NotNull DataOutputStream out,
+							String value) throws IOException {
+		byte[] bytes = (value == null ? "" : value).getBytes(StandardCharsets.UTF_8);
+		out.writeInt(bytes.length);
+		out.write(bytes);
+	}
+
+}
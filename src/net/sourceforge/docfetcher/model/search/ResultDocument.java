@@ -116,6 +116,21 @@ public final class ResultDocument {
 		return Util.splitFilename(getFilename())[0];
 	}
 	
+	@NotNull
+	String getUniqueId() {
+		return uid;
+	}
+	
+	@NotNull
+	Query getQuery() {
+		return query;
+	}
+	
+	@NotNull
+	IndexingConfig getConfig() {
+		return config;
+	}
+	
 	// score from 0 to 100
 	public int getScore() {
 		return Math.round(score * 100);
@@ -280,6 +295,27 @@ public final class ResultDocument {
 		return HighlightService.highlight(query, isPhraseQuery, getText());
 	}
 	
+	/**
+	 * Returns the extracted text of the receiver without highlighting, i.e.
+	 * the file contents for files and the message body for emails.
+	 * <p>
+	 * This operation may take a long time, so it should be run in a non-GUI
+	 * thread.
+	 */
+	@NotNull
+	public String getPlainText() throws ParseException, FileNotFoundException,
+			CheckedOutOfMemoryError {
+		if (!isEmail)
+			return getText();
+		MailResource mailResource = getMailResource();
+		try {
+			return mailResource.getBody().getString();
+		}
+		finally {
+			mailResource.dispose();
+		}
+	}
+	
 	// should be run in a thread
 	public void readPages(@NotNull final PreviewPageHandler pageHandler)
 			throws ParseException, FileNotFoundException,
@@ -0,0 +1,190 @@
+/*******************************************************************************
+ * Copyright (c) 2021 Tran Nam Quang.
+ * All rights reserved. This program and the accompanying materials
+ * are made available under the terms of the Eclipse Public License v1.0
+ * which accompanies this distribution, and is available at
+ * http://www.eclipse.org/legal/epl-v10.html
+ *
+ * Contributors:
+ *    Tran Nam Quang - initial API and implementation
+ *******************************************************************************/
+
+package net.sourceforge.docfetcher.model.search;
+
+import java.io.IOException;
+import java.util.Arrays;
+import java.util.Collection;
+import java.util.Collections;
+import java.util.List;
+
+import net.sourceforge.docfetcher.model.LuceneIndex;
+import net.sourceforge.docfetcher.util.CheckedOutOfMemoryError;
+import net.sourceforge.docfetcher.util.Util;
+import net.sourceforge.docfetcher.util.annotations.ImmutableCopy;
+import net.sourceforge.docfetcher.util.annotations.NotNull;
+import net.sourceforge.docfetcher.util.annotations.Nullable;
+import net.sourceforge.docfetcher.util.annotations.ThreadSafe;
+
+import org.apache.lucene.index.IndexReader;
+import org.apache.lucene.search.IndexSearcher;
+import org.apache.lucene.search.Query;
+import org.apache.lucene.search.ScoreDoc;
+
+/**
+ * A server-side cursor over the hits of a query, as returned by
+ * {@link Searcher#openCursor(String)}. The hits are fetched in chunks via
+ * {@link #next(int)}, and the stored fields of each hit are only loaded when
+ * its chunk is fetched.
+ * <p>
+ * The cursor holds a reference to the index reader the query was run on, so
+ * that the hits remain valid even if the searcher is replaced in the meantime.
+ * Therefore, the cursor must be closed after usage. Cursors that haven't been
+ * used for longer than the time given by the program setting
+ * "CursorIdleTimeout", as well as cursors over indexes that are being removed
+ * or rebuilt, are closed by the searcher.
+ *
+ * @author Tran Nam Quang
+ */
+@ThreadSafe
+public final class SearchCursor {
+
+	private final Searcher searcher;
+	private final IndexSearcher luceneSearcher;
+	private final List<LuceneIndex> indexes;
+	private final ScoreDoc[] scoreDocs;
+	private final Query query;
+	private final boolean isPhraseQuery;
+
+	private int position = 0; // guarded by 'this' lock
+	private boolean closed = false; // guarded by 'this' lock
+	private long lastAccess = System.currentTimeMillis(); // guarded by 'this' lock
+	private boolean idleTimeoutDisabled = false; // guarded by 'this' lock
+	@Nullable private String closeReason; // guarded by 'this' lock
+
+	// Must be called while holding the searcher's read lock
+	SearchCursor(	@NotNull Searcher searcher,
+					@NotNull IndexSearcher luceneSearcher,
+					@NotNull List<LuceneIndex> indexes,
+					@NotNull ScoreDoc[] scoreDocs,
+					@NotNull Query query,
+					boolean isPhraseQuery) {
+		Util.checkNotNull(searcher, luceneSearcher, indexes, scoreDocs, query);
+		this.searcher = searcher;
+		this.luceneSearcher = luceneSearcher;
+		this.indexes = indexes;
+		this.scoreDocs = scoreDocs;
+		this.query = query;
+		this.isPhraseQuery = isPhraseQuery;
+		luceneSearcher.getIndexReader().incRef();
+	}
+
+	/**
+	 * Returns the total number of hits of this cursor.
+	 */
+	@ThreadSafe
+	public int getHitCount() {
+		return scoreDocs.length;
+	}
+
+	/**
+	 * Returns the number of hits that haven't been fetched yet.
+	 */
+	@ThreadSafe
+	public synchronized int getRemaining() {
+		return scoreDocs.length - position;
+	}
+
+	/**
+	 * Returns the next chunk of at most <tt>count</tt> result documents. An
+	 * empty list is returned if the cursor is exhausted or has been closed via
+	 * {@link #close()}. If the cursor was instead closed by the searcher, a
+	 * {@link SearchException} is thrown.
+	 */
+	@ImmutableCopy
+	@NotNull
+	@ThreadSafe
+	public synchronized List<ResultDocument> next(int count)
+			throws SearchException, CheckedOutOfMemoryError {
+		Util.checkThat(count >= 0);
+		if (closed) {
+			if (closeReason != null)
+				throw new SearchException(closeReason);
+			return Collections.emptyList();
+		}
+		lastAccess = System.currentTimeMillis();
+		int end = Math.min(scoreDocs.length, position + count);
+		ResultDocument[] results = new ResultDocument[end - position];
+		try {
+			for (int i = position; i < end; i++) {
+				results[i - position] = searcher.createResultDocument(
+					luceneSearcher, indexes, scoreDocs[i], query, isPhraseQuery);
+			}
+		}
+		catch (IOException e) {
+			throw new SearchException(e.getMessage()); // TODO i18n
+		}
+		catch (OutOfMemoryError e) {
+			throw new CheckedOutOfMemoryError(e);
+		}
+		position = end;
+		return Arrays.asList(results);
+	}
+
+	/**
+	 * Releases the index reader held by this cursor. Calling this method more
+	 * than once has no effect.
+	 */
+	@ThreadSafe
+	public void close() {
+		close(null);
+	}
+
+	/**
+	 * Closes the cursor on behalf of the searcher. Subsequent calls to
+	 * {@link #next(int)} will throw a {@link SearchException} with the given
+	 * message.
+	 */
+	@ThreadSafe
+	void close(@Nullable String reason) {
+		synchronized (this) {
+			if (closed)
+				return;
+			closed = true;
+			closeReason = reason;
+		}
+		IndexReader reader = luceneSearcher.getIndexReader();
+		try {
+			reader.decRef();
+		}
+		catch (IOException e) {
+			Util.printErr(e);
+		}
+		searcher.cursorClosed(this);
+	}
+
+	/*
+	 * Exempts the cursor from being closed by the searcher for being idle.
+	 * For cursors whose owner closes them itself, even if fetching the next
+	 * chunk may be delayed for a long time.
+	 */
+	@ThreadSafe
+	synchronized void disableIdleTimeout() {
+		idleTimeoutDisabled = true;
+	}
+
+	// Returns whether the cursor hasn't been used for the given time
+	@ThreadSafe
+	synchronized boolean isIdle(long now, long timeout) {
+		return !closed && !idleTimeoutDisabled && now - lastAccess >= timeout;
+	}
+
+	// Returns whether the cursor searches in any of the given indexes
+	@ThreadSafe
+	boolean usesAny(@NotNull Collection<LuceneIndex> removedIndexes) {
+		for (LuceneIndex index : indexes)
+			if (removedIndexes.contains(index))
+				return true;
+		return false;
+	}
+
+}
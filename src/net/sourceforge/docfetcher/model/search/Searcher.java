@@ -15,16 +15,35 @@ import java.io.File;
 import java.io.IOException;
 import java.util.ArrayList;
 import java.util.Arrays;
+import java.util.Collection;
+import java.util.Collections;
 import java.util.Comparator;
+import java.util.HashMap;
+import java.util.HashSet;
+import java.util.IdentityHashMap;
 import java.util.List;
+import java.util.Map;
 import java.util.Set;
+import java.util.TreeMap;
 import java.util.concurrent.BlockingQueue;
+import java.util.concurrent.Callable;
+import java.util.concurrent.ExecutionException;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.Future;
 import java.util.concurrent.LinkedBlockingQueue;
+import java.util.concurrent.RejectedExecutionException;
+import java.util.concurrent.ScheduledExecutorService;
+import java.util.concurrent.ThreadFactory;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.atomic.AtomicBoolean;
+import java.util.concurrent.atomic.AtomicLong;
 import java.util.concurrent.locks.Lock;
 
 import net.sourceforge.docfetcher.enums.Msg;
 import net.sourceforge.docfetcher.enums.ProgramConf;
 import net.sourceforge.docfetcher.enums.SettingsConf;
+import net.sourceforge.docfetcher.model.Cancelable;
 import net.sourceforge.docfetcher.model.Fields;
 import net.sourceforge.docfetcher.model.IndexLoadingProblems.CorruptedIndex;
 import net.sourceforge.docfetcher.model.IndexRegistry;
@@ -39,15 +58,16 @@ import net.sourceforge.docfetcher.model.index.outlook.OutlookMailFactory;
 import net.sourceforge.docfetcher.model.parse.Parser;
 import net.sourceforge.docfetcher.util.CheckedOutOfMemoryError;
 import net.sourceforge.docfetcher.util.Event;
+import net.sourceforge.docfetcher.util.Metrics;
 import net.sourceforge.docfetcher.util.Util;
 import net.sourceforge.docfetcher.util.annotations.ImmutableCopy;
+import net.sourceforge.docfetcher.util.annotations.MutableCopy;
 import net.sourceforge.docfetcher.util.annotations.NotNull;
 import net.sourceforge.docfetcher.util.annotations.NotThreadSafe;
 import net.sourceforge.docfetcher.util.annotations.Nullable;
 import net.sourceforge.docfetcher.util.annotations.ThreadSafe;
 import net.sourceforge.docfetcher.util.annotations.VisibleForPackageGroup;
 import net.sourceforge.docfetcher.util.collect.AlphanumComparator;
-import net.sourceforge.docfetcher.util.collect.LazyList;
 
 import org.apache.lucene.document.Document;
 import org.apache.lucene.index.DirectoryReader;
@@ -58,7 +78,10 @@ import org.apache.lucene.queryparser.classic.ParseException;
 import org.apache.lucene.queryparser.classic.QueryParser;
 import org.apache.lucene.search.*;
 import org.apache.lucene.search.MultiTermQuery.RewriteMethod;
+import org.apache.lucene.store.AlreadyClosedException;
 
+import com.google.common.base.Throwables;
+import com.google.common.collect.ImmutableList;
 import com.google.common.io.Closeables;
 
 /**
@@ -102,19 +125,70 @@ public final class Searcher {
 		}
 	}
 	
+	/**
+	 * A Lucene searcher together with the indexes it was created from, in the
+	 * order of its sub-readers. Searches take a reference on the reader of the
+	 * current state, so that a refresh can swap in a new state at any time
+	 * without waiting for running searches to finish.
+	 */
+	private static final class SearcherState {
+		public final IndexSearcher luceneSearcher;
+		@ImmutableCopy
+		public final List<LuceneIndex> indexes;
+
+		private SearcherState(	@NotNull IndexSearcher luceneSearcher,
+								@NotNull List<LuceneIndex> indexes) {
+			this.luceneSearcher = Util.checkNotNull(luceneSearcher);
+			this.indexes = ImmutableList.copyOf(indexes);
+		}
+
+		@NotNull
+		public IndexReader getReader() {
+			return luceneSearcher.getIndexReader();
+		}
+	}
+	
 	private static final int PAGE_SIZE = 50;
 	public static final int MAX_RESULTS = ProgramConf.Int.MaxResultsTotal.get();
 	
+	/*
+	 * The stored fields loaded for result documents. The content field is
+	 * excluded, since it may be stored for creating snippets.
+	 */
+	private static final Set<String> RESULT_FIELDS = new HashSet<String>();
+	
+	static {
+		for (Fields field : Fields.values())
+			if (!field.key().equals(Fields.CONTENT.key()))
+				RESULT_FIELDS.add(field.key());
+	}
+	
 	private final IndexRegistry indexRegistry;
 	private final FileFactory fileFactory;
 	private final OutlookMailFactory outlookMailFactory;
 	private final Event.Listener<LuceneIndex> addedListener;
+	private final Event.Listener<List<LuceneIndex>> removedListener;
+	private final ResultCache resultCache = new ResultCache(
+		ProgramConf.Int.SearchCacheCapacity.get());
 	
 	private final BlockingQueue<List<PendingDeletion>> deletionQueue = new LinkedBlockingQueue<List<PendingDeletion>>(); // guarded by 'this' lock
 	private final Thread deletionThread; // guarded by 'this' lock
+	private final Set<SearchCursor> openCursors = new HashSet<SearchCursor>(); // guarded by itself
+	@Nullable private ExecutorService searchExecutor; // guarded by 'this' lock
+	private boolean executorClosed = false; // guarded by 'this' lock
+	@Nullable private ScheduledExecutorService cursorReaper; // guarded by 'this' lock
 	
-	@NotNull private IndexSearcher luceneSearcher; // guarded by read-write lock
-	@NotNull private List<LuceneIndex> indexes; // guarded by read-write lock
+	/*
+	 * The current state is replaced by refreshes without holding the
+	 * read-write lock. The per-index readers are shared between successive
+	 * states, so that unchanged indexes don't have to be reopened.
+	 */
+	@NotNull private volatile SearcherState state;
+	private final Object refreshLock = new Object();
+	private final Map<LuceneIndex, DirectoryReader> readers = new HashMap<LuceneIndex, DirectoryReader>(); // guarded by refresh lock
+	private final AtomicLong refreshRequests = new AtomicLong();
+	private long lastRefreshRequest = 0; // guarded by refresh lock
+	private boolean closed = false; // guarded by refresh lock
 	@Nullable private volatile IOException ioException;
 	
 	private final Lock readLock;
@@ -147,7 +221,18 @@ public final class Searcher {
 		// Handler for index additions
 		addedListener = new Event.Listener<LuceneIndex>() {
 			public void update(LuceneIndex eventData) {
-				replaceLuceneSearcher();
+				refreshLuceneSearcher();
+			}
+		};
+		
+		/*
+		 * Handler for index removals. Removed indexes are not dropped from the
+		 * Lucene searcher until the next replacement, but cached results must
+		 * not outlive them.
+		 */
+		removedListener = new Event.Listener<List<LuceneIndex>>() {
+			public void update(List<LuceneIndex> eventData) {
+				resultCache.invalidate();
 			}
 		};
 		
@@ -160,14 +245,16 @@ public final class Searcher {
 			indexRegistry.addListeners(new ExistingIndexesHandler() {
 				// Handle existing indexes
 				public void handleExistingIndexes(List<LuceneIndex> indexes) {
-					try {
-						corruptedIndexes.addAll(setLuceneSearcher(indexes));
-					}
-					catch (IOException e) {
-						ioException = e;
+					synchronized (refreshLock) {
+						try {
+							updateLuceneSearcher(indexes, corruptedIndexes);
+						}
+						catch (IOException e) {
+							ioException = e;
+						}
 					}
 				}
-			}, addedListener, null); // removedListener is null, see deletion thread below
+			}, addedListener, removedListener); // removedListener only clears the result cache, see deletion thread below
 		}
 		finally {
 			writeLock.unlock();
@@ -183,6 +270,7 @@ public final class Searcher {
 					try {
 						List<PendingDeletion> deletions = deletionQueue.take();
 						replaceLuceneSearcher();
+						closeCursors(deletions);
 						for (PendingDeletion deletion : deletions)
 							deletion.setApprovedBySearcher();
 					}
@@ -199,44 +287,167 @@ public final class Searcher {
 	
 	/**
 	 * Updates the cached indexes and replaces the current Lucene searcher with
-	 * a new one.
+	 * a new one, then waits until all searches running on the old Lucene
+	 * searcher have finished. Search cursors opened before the replacement
+	 * may still hold on to the old Lucene searcher; the cursors over removed
+	 * indexes are closed before the deletion of the latter is approved.
 	 */
 	@ThreadSafe
 	@VisibleForPackageGroup
 	public void replaceLuceneSearcher() {
+		refreshLuceneSearcher();
+		
+		// Searches hold the read lock while using the Lucene searcher
 		writeLock.lock();
-		try {
-			Closeables.close(luceneSearcher.getIndexReader(), false);
-			setLuceneSearcher(indexRegistry.getIndexes());
+		writeLock.unlock();
+	}
+	
+	/**
+	 * Updates the cached indexes and replaces the current Lucene searcher with
+	 * a new one if any of the indexes have changed. Only indexes that have
+	 * changed are reopened, and of those, only the changed segments are
+	 * loaded. The new Lucene searcher is warmed up with the queries given by
+	 * the program setting "SearcherWarmingQueries" before it replaces the old
+	 * one. Searches that are already running are neither blocked nor affected
+	 * by the replacement.
+	 */
+	@ThreadSafe
+	@VisibleForPackageGroup
+	public void refreshLuceneSearcher() {
+		/*
+		 * The indexes are retrieved before acquiring the refresh lock, since
+		 * the latter may be acquired while holding the registry's write lock.
+		 * A refresh that is overtaken by a later one is skipped, because the
+		 * later refresh has retrieved the indexes more recently.
+		 */
+		long request = refreshRequests.incrementAndGet();
+		List<LuceneIndex> indexes = indexRegistry.getIndexes();
+		synchronized (refreshLock) {
+			if (request < lastRefreshRequest)
+				return;
+			lastRefreshRequest = request;
+			try {
+				updateLuceneSearcher(indexes, null);
+			}
+			catch (IOException e) {
+				ioException = e; // Will be thrown later
+			}
 		}
-		catch (IOException e) {
-			ioException = e; // Will be thrown later
+	}
+	
+	/*
+	 * Must be called while holding the refresh lock. Indexes that can't be
+	 * opened are left out of the new Lucene searcher and, if the given list is
+	 * not null, added to it.
+	 */
+	@NotThreadSafe
+	private void updateLuceneSearcher(	@NotNull List<LuceneIndex> indexes,
+										@Nullable List<CorruptedIndex> corrupted)
+			throws IOException {
+		Util.checkNotNull(indexes);
+		if (closed)
+			return;
+		long refreshStart = Metrics.start();
+		boolean changed = state == null;
+		
+		// Open new indexes and reopen changed ones
+		Map<LuceneIndex, DirectoryReader> newReaders = new HashMap<LuceneIndex, DirectoryReader>();
+		List<DirectoryReader> obsoleteReaders = new ArrayList<DirectoryReader>();
+		List<LuceneIndex> openIndexes = new ArrayList<LuceneIndex>(indexes.size());
+		List<IndexReader> subReaders = new ArrayList<IndexReader>(indexes.size());
+		for (LuceneIndex index : indexes) {
+			DirectoryReader reader = readers.get(index);
+			try {
+				if (reader == null) {
+					reader = DirectoryReader.open(index.getLuceneDir());
+					changed = true;
+				}
+				else {
+					DirectoryReader newReader = DirectoryReader.openIfChanged(reader);
+					if (newReader != null) {
+						obsoleteReaders.add(reader);
+						reader = newReader;
+						changed = true;
+					}
+				}
+			}
+			catch (IOException e) {
+				Util.printErr(e);
+				if (corrupted != null)
+					corrupted.add(new CorruptedIndex(index, e));
+				if (reader != null) {
+					obsoleteReaders.add(reader);
+					changed = true;
+				}
+				continue;
+			}
+			newReaders.put(index, reader);
+			openIndexes.add(index);
+			subReaders.add(reader);
 		}
-		finally {
-			writeLock.unlock();
+		for (Map.Entry<LuceneIndex, DirectoryReader> entry : readers.entrySet()) {
+			if (!newReaders.containsKey(entry.getKey())) {
+				obsoleteReaders.add(entry.getValue());
+				changed = true;
+			}
 		}
+		if (!changed)
+			return;
+		
+		// The new multi-reader takes its own references on the sub-readers
+		IndexSearcher newSearcher = new IndexSearcher(new DecoratedMultiReader(
+			subReaders.toArray(new IndexReader[subReaders.size()]), false));
+		warm(newSearcher);
+		
+		// Swap, then release the old state and the obsolete readers
+		SearcherState oldState = state;
+		state = new SearcherState(newSearcher, openIndexes);
+		resultCache.invalidate();
+		readers.clear();
+		readers.putAll(newReaders);
+		if (oldState != null)
+			oldState.getReader().decRef();
+		for (DirectoryReader reader : obsoleteReaders)
+			reader.decRef();
+		Metrics.timer("search.refresh").stop(refreshStart);
 	}
 	
-	// Caller must close returned searcher
-	@NotNull
+	// Runs the configured warming queries on the given Lucene searcher
 	@NotThreadSafe
-	private List<CorruptedIndex> setLuceneSearcher(@NotNull List<LuceneIndex> indexes)
-			throws IOException {
-		this.indexes = Util.checkNotNull(indexes);
-		ArrayList<IndexReader> readers = new ArrayList<IndexReader>(indexes.size());
-        LazyList<CorruptedIndex> corrupted = new LazyList<CorruptedIndex>();
-		for (int i = 0; i < indexes.size(); i++) {
-			LuceneIndex index = indexes.get(i);
-            try {
-				readers.add(DirectoryReader.open(index.getLuceneDir()));
-            }
-            catch (IOException e) {
-            	Util.printErr(e);
-                corrupted.add(new CorruptedIndex(index, e));
-            }
-        }
-        luceneSearcher = new IndexSearcher(new DecoratedMultiReader(readers.toArray(new IndexReader[readers.size()])));
-        return corrupted;
+	private static void warm(@NotNull IndexSearcher luceneSearcher) {
+		for (String queryString : ProgramConf.StrList.SearcherWarmingQueries.get()) {
+			if (queryString.trim().isEmpty())
+				continue;
+			long warmStart = Metrics.start();
+			try {
+				luceneSearcher.search(createQuery(queryString).query, 10);
+			}
+			catch (SearchException e) {
+				Util.printErr(e);
+			}
+			catch (IOException e) {
+				Util.printErr(e);
+			}
+			Metrics.timer("search.warm").stop(warmStart);
+		}
+	}
+	
+	/*
+	 * Returns the current state after taking a reference on its reader. The
+	 * caller must release the reference when done.
+	 */
+	@NotNull
+	@ThreadSafe
+	private SearcherState acquireState() {
+		while (true) {
+			SearcherState current = state;
+			if (current.getReader().tryIncRef())
+				return current;
+			
+			// The reader was released by a refresh or by shutdown
+			if (current == state)
+				throw new AlreadyClosedException("Searcher has been shut down.");
+		}
 	}
 
 	private class StoppedSearcherException extends RuntimeException{
@@ -247,13 +458,33 @@ public final class Searcher {
 	@ThreadSafe
 	public List<ResultDocument> search(@NotNull String queryString)
 			throws SearchException, CheckedOutOfMemoryError {
+		stopped = false;
+		return search(queryString, new Cancelable() {
+			public boolean isCanceled() {
+				return stopped;
+			}
+		});
+	}
+	
+	/**
+	 * Same as {@link #search(String)}, but the search is stopped via the given
+	 * cancelable instead of {@link #stopSearch()}, so that it neither affects
+	 * nor is affected by other searches running at the same time. A stopped
+	 * search returns the results found so far.
+	 */
+	@ImmutableCopy
+	@NotNull
+	@ThreadSafe
+	public List<ResultDocument> search(	@NotNull String queryString,
+										@Nullable final Cancelable cancelable)
+			throws SearchException, CheckedOutOfMemoryError {
 		/*
 		 * Note: For the desktop interface, we'll always search in all available
 		 * indexes, even those which are unchecked on the filter panel. This
 		 * allows the user to re-check the unchecked indexes and see previously
 		 * hidden results without starting another search.
 		 */
-		stopped = false;
+		long searchStart = Metrics.start();
 		
 		// Create Lucene query
 		QueryWrapper queryWrapper = createQuery(queryString);
@@ -274,38 +505,69 @@ public final class Searcher {
 		 */
 
 		readLock.lock();
+		SearcherState current = null;
 		try {
-			checkIndexesExist();
+			current = acquireState();
+			checkIndexesExist(current.indexes);
+			
+			/*
+			 * The key is created after acquiring the state, so that a refresh
+			 * in between will invalidate it. If a refresh happened before,
+			 * results from the outdated state must not be cached.
+			 */
+			ResultCache.Key cacheKey = null;
+			if (resultCache.isEnabled()) {
+				cacheKey = resultCache.createKey(
+					isPhraseQuery + ":" + query.toString(),
+					getIndexKeys(current.indexes));
+				if (current != state)
+					cacheKey = null;
+			}
+			if (cacheKey != null) {
+				List<ResultDocument> cachedResults = resultCache.get(cacheKey);
+				if (cachedResults != null) {
+					Metrics.counter("search.cache_hits").increment();
+					return cachedResults;
+				}
+			}
 			
 			// Perform search; might throw OutOfMemoryError
+			boolean completed = true;
+			long collectStart = Metrics.start();
 			DelegatingCollector collector = new DelegatingCollector(){
 				@Override
 				public void collect(int doc) throws IOException {
 					leafDelegate.collect(doc);
-					if(stopped){
+					if(cancelable != null && cancelable.isCanceled()){
 						throw new StoppedSearcherException();
 					}
 				}
 			};
 			collector.setDelegate(TopScoreDocCollector.create(MAX_RESULTS, null));
 			try{
-				luceneSearcher.search(query, collector);
+				current.luceneSearcher.search(query, collector);
+			}
+			catch (StoppedSearcherException e) {
+				completed = false;
 			}
-			catch (StoppedSearcherException e) {}
 			ScoreDoc[] scoreDocs = ((TopScoreDocCollector)collector.getDelegate()).topDocs().scoreDocs;
+			Metrics.timer("search.collect").stop(collectStart);
 
 			// Create result documents
 			ResultDocument[] results = new ResultDocument[scoreDocs.length];
 			for (int i = 0; i < scoreDocs.length; i++) {
-				Document doc = luceneSearcher.doc(scoreDocs[i].doc);
-				float score = scoreDocs[i].score;
-				LuceneIndex index = indexes.get(((DecoratedMultiReader) luceneSearcher.getIndexReader()).decoratedReaderIndex(i));
-				IndexingConfig config = index.getConfig();
-				results[i] = new ResultDocument(
-					doc, score, query, isPhraseQuery, config, fileFactory,
-					outlookMailFactory);
+				results[i] = createResultDocument(
+					current.luceneSearcher, current.indexes, scoreDocs[i],
+					query, isPhraseQuery);
 			}
-			return Arrays.asList(results);
+			List<ResultDocument> resultList = Collections.unmodifiableList(
+				Arrays.asList(results));
+			
+			// Don't cache incomplete results of stopped searches
+			if (cacheKey != null && completed)
+				resultCache.put(cacheKey, resultList);
+			Metrics.timer("search.total").stop(searchStart);
+			return resultList;
 		}
 		catch (IOException e) {
 			throw new SearchException(e.getMessage()); // TODO i18n
@@ -314,10 +576,292 @@ public final class Searcher {
 			throw new CheckedOutOfMemoryError(e);
 		}
 		finally {
+			if (current != null)
+				releaseState(current);
 			readLock.unlock();
 		}
 	}
 
+	/**
+	 * Returns up to <tt>maxSnippets</tt> highlighted snippets for each of the
+	 * given results, in the same order as the results. The snippets are
+	 * created in one pass per index and query, see
+	 * {@link HighlightService#getSnippets(IndexSearcher, Query, int[], int, int)}.
+	 * <p>
+	 * Snippets are only available for results from indexes that store the
+	 * extracted texts, see {@link IndexingConfig#isStoreOffsets()}. For other
+	 * results, and for results that have been removed from the indexes in the
+	 * meantime, the returned snippet lists are empty.
+	 */
+	@ImmutableCopy
+	@NotNull
+	@ThreadSafe
+	public List<List<HighlightedString>> getSnippets(	@NotNull List<ResultDocument> results,
+														int maxSnippets,
+														int contextChars)
+			throws SearchException, CheckedOutOfMemoryError {
+		Util.checkNotNull(results);
+		Util.checkThat(maxSnippets > 0 && contextChars >= 0);
+		long start = Metrics.start();
+		List<List<HighlightedString>> snippets = new ArrayList<List<HighlightedString>>(results.size());
+		for (int i = 0; i < results.size(); i++)
+			snippets.add(Collections.<HighlightedString>emptyList());
+		
+		readLock.lock();
+		SearcherState current = null;
+		try {
+			current = acquireState();
+			DecoratedMultiReader reader = (DecoratedMultiReader) current.getReader();
+			
+			/*
+			 * Look up the current document IDs of the results and group the
+			 * results by index and query. Document IDs are relative to the
+			 * index.
+			 */
+			int[] docIds = new int[results.size()];
+			Map<Integer, Map<Query, List<Integer>>> groups = new TreeMap<Integer, Map<Query, List<Integer>>>();
+			for (int i = 0; i < results.size(); i++) {
+				ResultDocument result = results.get(i);
+				Term uidTerm = new Term(Fields.UID.key(), result.getUniqueId());
+				ScoreDoc[] scoreDocs = current.luceneSearcher.search(
+					new TermQuery(uidTerm), 1).scoreDocs;
+				if (scoreDocs.length == 0)
+					continue;
+				int readerIndex = reader.decoratedReaderIndex(scoreDocs[0].doc);
+				docIds[i] = scoreDocs[0].doc - reader.decoratedReaderBase(readerIndex);
+				Map<Query, List<Integer>> queryGroups = groups.get(readerIndex);
+				if (queryGroups == null) {
+					queryGroups = new IdentityHashMap<Query, List<Integer>>();
+					groups.put(readerIndex, queryGroups);
+				}
+				List<Integer> positions = queryGroups.get(result.getQuery());
+				if (positions == null) {
+					positions = new ArrayList<Integer>();
+					queryGroups.put(result.getQuery(), positions);
+				}
+				positions.add(i);
+			}
+			
+			List<? extends IndexReader> subReaders = reader.getDecoratedSubReaders();
+			for (Map.Entry<Integer, Map<Query, List<Integer>>> group : groups.entrySet()) {
+				IndexSearcher subSearcher = new IndexSearcher(subReaders.get(group.getKey()));
+				for (Map.Entry<Query, List<Integer>> queryGroup : group.getValue().entrySet()) {
+					List<Integer> positions = queryGroup.getValue();
+					int[] groupDocIds = new int[positions.size()];
+					for (int i = 0; i < groupDocIds.length; i++)
+						groupDocIds[i] = docIds[positions.get(i)];
+					List<List<HighlightedString>> groupSnippets = HighlightService.getSnippets(
+						subSearcher, queryGroup.getKey(), groupDocIds,
+						maxSnippets, contextChars);
+					for (int i = 0; i < groupDocIds.length; i++)
+						snippets.set(positions.get(i), groupSnippets.get(i));
+				}
+			}
+			Metrics.timer("search.snippets").stop(start);
+			return Collections.unmodifiableList(snippets);
+		}
+		catch (IOException e) {
+			throw new SearchException(e.getMessage()); // TODO i18n
+		}
+		catch (OutOfMemoryError e) {
+			throw new CheckedOutOfMemoryError(e);
+		}
+		finally {
+			if (current != null)
+				releaseState(current);
+			readLock.unlock();
+		}
+	}
+
+	/**
+	 * Returns the extracted text of the given file result as stored in the
+	 * index, so that the file doesn't have to be parsed again. Returns null if
+	 * the result is an email, if its index doesn't store the extracted texts
+	 * (see {@link IndexingConfig#isStoreOffsets()}), or if the result has
+	 * been removed from the indexes in the meantime.
+	 */
+	@Nullable
+	@ThreadSafe
+	public String getStoredText(@NotNull ResultDocument result)
+			throws SearchException, CheckedOutOfMemoryError {
+		Util.checkNotNull(result);
+		if (result.isEmail())
+			return null; // The stored text of emails includes the headers
+		
+		readLock.lock();
+		SearcherState current = null;
+		try {
+			current = acquireState();
+			Term uidTerm = new Term(Fields.UID.key(), result.getUniqueId());
+			ScoreDoc[] scoreDocs = current.luceneSearcher.search(
+				new TermQuery(uidTerm), 1).scoreDocs;
+			if (scoreDocs.length == 0)
+				return null;
+			
+			// The first content value is the text, the second the metadata
+			String key = Fields.CONTENT.key();
+			Document doc = current.luceneSearcher.doc(
+				scoreDocs[0].doc, Collections.singleton(key));
+			return doc.get(key);
+		}
+		catch (IOException e) {
+			throw new SearchException(e.getMessage()); // TODO i18n
+		}
+		catch (OutOfMemoryError e) {
+			throw new CheckedOutOfMemoryError(e);
+		}
+		finally {
+			if (current != null)
+				releaseState(current);
+			readLock.unlock();
+		}
+	}
+
+	/**
+	 * Returns the hit, miss and eviction counters of the result cache, along
+	 * with its current size and capacity.
+	 */
+	@NotNull
+	@ThreadSafe
+	public Map<String, Long> getCacheStats() {
+		return resultCache.getStats();
+	}
+
+	/**
+	 * Returns the counters of the cache of files unpacked from archives, see
+	 * {@link FileFactory#getExtractionCacheStats()}.
+	 */
+	@NotNull
+	@ThreadSafe
+	public Map<String, Long> getExtractionCacheStats() {
+		return fileFactory.getExtractionCacheStats();
+	}
+
+	/**
+	 * Unpacks the files of the given results that are archive entries into the
+	 * extraction cache, so that their file resources can be obtained quickly
+	 * afterwards. Entries of the same archive are unpacked in a single pass,
+	 * see {@link FileFactory#prefetch(IndexingConfig, Collection)}. This
+	 * operation may take a long time, so it should be run in a non-GUI thread.
+	 */
+	@ThreadSafe
+	public void prefetchFiles(@NotNull List<ResultDocument> results) {
+		Map<IndexingConfig, List<Path>> configPaths = new IdentityHashMap<IndexingConfig, List<Path>>();
+		for (ResultDocument result : results) {
+			if (result.isEmail())
+				continue;
+			List<Path> paths = configPaths.get(result.getConfig());
+			if (paths == null) {
+				paths = new ArrayList<Path>();
+				configPaths.put(result.getConfig(), paths);
+			}
+			paths.add(result.getPath());
+		}
+		for (Map.Entry<IndexingConfig, List<Path>> entry : configPaths.entrySet())
+			fileFactory.prefetch(entry.getKey(), entry.getValue());
+	}
+	
+	// Returns keys identifying the given searched indexes
+	@NotNull
+	@ThreadSafe
+	private static List<String> getIndexKeys(@NotNull List<LuceneIndex> indexes) {
+		List<String> keys = new ArrayList<String>(indexes.size());
+		for (LuceneIndex index : indexes)
+			keys.add(index.getIndexDirPath().getPath());
+		return keys;
+	}
+	
+	/**
+	 * Runs the given queries in parallel and returns their results in the
+	 * same order as the queries. The number of queries run at the same time
+	 * is limited by the program setting "SearchThreads". If one of the queries
+	 * fails, the remaining ones are canceled and the failure is rethrown.
+	 * <p>
+	 * The queries are not affected by {@link #stopSearch()}, and they don't
+	 * affect other searches running at the same time.
+	 */
+	@ImmutableCopy
+	@NotNull
+	@ThreadSafe
+	public List<List<ResultDocument>> searchMany(@NotNull List<String> queryStrings)
+			throws SearchException, CheckedOutOfMemoryError {
+		Util.checkNotNull(queryStrings);
+		ExecutorService executor = getSearchExecutor();
+		List<Future<List<ResultDocument>>> futures = new ArrayList<Future<List<ResultDocument>>>(queryStrings.size());
+		final AtomicBoolean canceled = new AtomicBoolean(false);
+		final Cancelable cancelable = new Cancelable() {
+			public boolean isCanceled() {
+				return canceled.get();
+			}
+		};
+		boolean completed = false;
+		try {
+			for (final String queryString : queryStrings) {
+				futures.add(executor.submit(new Callable<List<ResultDocument>>() {
+					public List<ResultDocument> call() throws Exception {
+						return search(queryString, cancelable);
+					}
+				}));
+			}
+			List<List<ResultDocument>> results = new ArrayList<List<ResultDocument>>(futures.size());
+			for (Future<List<ResultDocument>> future : futures)
+				results.add(future.get());
+			completed = true;
+			return Collections.unmodifiableList(results);
+		}
+		catch (RejectedExecutionException e) {
+			throw new SearchException("Searcher has been shut down."); // TODO i18n
+		}
+		catch (InterruptedException e) {
+			Thread.currentThread().interrupt();
+			throw new SearchException("Search was interrupted."); // TODO i18n
+		}
+		catch (ExecutionException e) {
+			Throwable cause = e.getCause();
+			if (cause instanceof SearchException)
+				throw (SearchException) cause;
+			if (cause instanceof CheckedOutOfMemoryError)
+				throw (CheckedOutOfMemoryError) cause;
+			Throwables.propagateIfPossible(cause);
+			throw new IllegalStateException(cause);
+		}
+		finally {
+			// Stops the queries that are still running
+			if (!completed)
+				canceled.set(true);
+			/*
+			 * Removes the queries that haven't started yet; a no-op for the
+			 * other queries. Running queries must not be interrupted, since
+			 * an interrupt during I/O closes the file channels of the shared
+			 * index readers if the indexes aren't memory-mapped.
+			 */
+			for (Future<List<ResultDocument>> future : futures)
+				future.cancel(false);
+		}
+	}
+	
+	@NotNull
+	@ThreadSafe
+	private synchronized ExecutorService getSearchExecutor()
+			throws SearchException {
+		if (executorClosed)
+			throw new SearchException("Searcher has been shut down."); // TODO i18n
+		if (searchExecutor == null) {
+			int threadCount = ProgramConf.Int.SearchThreads.get();
+			if (threadCount <= 0)
+				threadCount = Runtime.getRuntime().availableProcessors();
+			searchExecutor = Executors.newFixedThreadPool(threadCount, new ThreadFactory() {
+				private int count = 0;
+				public synchronized Thread newThread(Runnable r) {
+					Thread thread = new Thread(r, Searcher.class.getName() + " (Search thread " + ++count + ")");
+					thread.setDaemon(true);
+					return thread;
+				}
+			});
+		}
+		return searchExecutor;
+	}
+	
 	@ThreadSafe
 	public void stopSearch(){
 		stopped =true;
@@ -340,23 +884,21 @@ public final class Searcher {
 		Query query = new MatchAllDocsQuery();
 		
 		readLock.lock();
+		SearcherState current = null;
 		try {
-			checkIndexesExist();
+			current = acquireState();
+			checkIndexesExist(current.indexes);
 			
 			// Perform search; might throw OutOfMemoryError
 			builder.add(query,BooleanClause.Occur.MUST);
-			ScoreDoc[] scoreDocs = luceneSearcher.search(builder.build(), MAX_RESULTS).scoreDocs;
+			ScoreDoc[] scoreDocs = current.luceneSearcher.search(builder.build(), MAX_RESULTS).scoreDocs;
 			
 			// Create result documents
 			ResultDocument[] results = new ResultDocument[scoreDocs.length];
 			for (int i = 0; i < results.length; i++) {
-				Document doc = luceneSearcher.doc(scoreDocs[i].doc);
-				float score = scoreDocs[i].score;
-				LuceneIndex index = indexes.get(((DecoratedMultiReader) luceneSearcher.getIndexReader()).decoratedReaderIndex(i));
-				IndexingConfig config = index.getConfig();
-				results[i] = new ResultDocument(
-					doc, score, query, true, config, fileFactory,
-					outlookMailFactory);
+				results[i] = createResultDocument(
+					current.luceneSearcher, current.indexes, scoreDocs[i],
+					query, true);
 			}
 			
 			// Sort results by title
@@ -376,6 +918,8 @@ public final class Searcher {
 			throw new CheckedOutOfMemoryError(e);
 		}
 		finally {
+			if (current != null)
+				releaseState(current);
 			readLock.unlock();
 		}
 	}
@@ -435,13 +979,15 @@ public final class Searcher {
 		boolean isPhraseQuery = queryWrapper.isPhraseQuery;
 		
 		readLock.lock();
+		SearcherState current = null;
 		try {
-			checkIndexesExist();
+			current = acquireState();
+			checkIndexesExist(current.indexes);
 			
 			// Perform search; might throw OutOfMemoryError
 			int maxResults = (webQuery.pageIndex + 1) * PAGE_SIZE;
 			builder.add(query, BooleanClause.Occur.MUST);
-			TopDocs topDocs = luceneSearcher.search(builder.build(), maxResults);
+			TopDocs topDocs = current.luceneSearcher.search(builder.build(), maxResults);
 			ScoreDoc[] scoreDocs = topDocs.scoreDocs;
 			
 			// Compute start and end indices of returned page
@@ -458,13 +1004,9 @@ public final class Searcher {
 			// Create and fill list of result documents to return
 			ResultDocument[] results = new ResultDocument[end - start];
 			for (int i = start; i < end; i++) {
-				Document doc = luceneSearcher.doc(scoreDocs[i].doc);
-				float score = scoreDocs[i].score;
-				LuceneIndex index = indexes.get(((DecoratedMultiReader) luceneSearcher.getIndexReader()).decoratedReaderIndex(i));
-				IndexingConfig config = index.getConfig();
-				results[i - start] = new ResultDocument(
-					doc, score, query, isPhraseQuery, config, fileFactory,
-					outlookMailFactory);
+				results[i - start] = createResultDocument(
+					current.luceneSearcher, current.indexes, scoreDocs[i],
+					query, isPhraseQuery);
 			}
 			
 			int hitCount = topDocs.totalHits;
@@ -478,10 +1020,171 @@ public final class Searcher {
 			throw new CheckedOutOfMemoryError(e);
 		}
 		finally {
+			if (current != null)
+				releaseState(current);
 			readLock.unlock();
 		}
 	}
 	
+	/**
+	 * Runs the given query and returns a cursor over the hits. Unlike
+	 * {@link #search(String)}, this method does not load any stored fields;
+	 * the result documents are created page by page as they are requested
+	 * from the cursor.
+	 * <p>
+	 * The returned cursor keeps the underlying index readers open, so it
+	 * <b>must</b> be closed after usage. Cursors that are still open when the
+	 * receiver is shut down will be closed automatically.
+	 */
+	@NotNull
+	@ThreadSafe
+	public SearchCursor openCursor(@NotNull String queryString)
+			throws SearchException, CheckedOutOfMemoryError {
+		QueryWrapper queryWrapper = createQuery(queryString);
+		
+		readLock.lock();
+		SearcherState current = null;
+		try {
+			current = acquireState();
+			checkIndexesExist(current.indexes);
+			
+			// Perform search; might throw OutOfMemoryError
+			long collectStart = Metrics.start();
+			ScoreDoc[] scoreDocs = current.luceneSearcher.search(
+				queryWrapper.query, MAX_RESULTS).scoreDocs;
+			Metrics.timer("search.collect").stop(collectStart);
+			
+			/*
+			 * The cursor must be created while holding a reference to the
+			 * Lucene searcher, so that the latter isn't closed before the
+			 * cursor has acquired its own reference.
+			 */
+			SearchCursor cursor = new SearchCursor(
+				this, current.luceneSearcher, current.indexes, scoreDocs,
+				queryWrapper.query, queryWrapper.isPhraseQuery);
+			synchronized (openCursors) {
+				openCursors.add(cursor);
+			}
+			startCursorReaper();
+			return cursor;
+		}
+		catch (IOException e) {
+			throw new SearchException(e.getMessage()); // TODO i18n
+		}
+		catch (OutOfMemoryError e) {
+			throw new CheckedOutOfMemoryError(e);
+		}
+		finally {
+			if (current != null)
+				releaseState(current);
+			readLock.unlock();
+		}
+	}
+	
+	// Called by the cursor after it has released its reference to the reader
+	@ThreadSafe
+	void cursorClosed(@NotNull SearchCursor cursor) {
+		synchronized (openCursors) {
+			openCursors.remove(cursor);
+		}
+	}
+	
+	/*
+	 * Starts closing the cursors abandoned by their clients, e.g. by Python
+	 * API clients that crashed, since each open cursor prevents the index
+	 * files it was opened on from being deleted.
+	 */
+	@ThreadSafe
+	private synchronized void startCursorReaper() {
+		final int timeout = ProgramConf.Int.CursorIdleTimeout.get();
+		if (timeout <= 0 || cursorReaper != null || executorClosed)
+			return;
+		cursorReaper = Executors.newSingleThreadScheduledExecutor(new ThreadFactory() {
+			public Thread newThread(Runnable r) {
+				Thread thread = new Thread(r, Searcher.class.getName() + " (Close idle cursors)");
+				thread.setDaemon(true);
+				return thread;
+			}
+		});
+		long period = Math.max(1, timeout / 2);
+		cursorReaper.scheduleWithFixedDelay(new Runnable() {
+			public void run() {
+				long now = System.currentTimeMillis();
+				for (SearchCursor cursor : getOpenCursors())
+					if (cursor.isIdle(now, timeout * 1000L))
+						cursor.close(String.format(
+							"Cursor was closed after being idle for %d seconds.", // TODO i18n
+							timeout));
+			}
+		}, period, period, TimeUnit.SECONDS);
+	}
+	
+	/**
+	 * Closes the search cursors over the given index, so that the index can be
+	 * cleared, e.g. before it is rebuilt. Unlike removed indexes, indexes that
+	 * are rebuilt have no pending deletion whose approval would close the
+	 * cursors. Subsequent calls to {@link SearchCursor#next(int)} on the
+	 * closed cursors will throw a {@link SearchException}.
+	 */
+	@ThreadSafe
+	@VisibleForPackageGroup
+	public void closeCursors(@NotNull LuceneIndex luceneIndex) {
+		Util.checkNotNull(luceneIndex);
+		closeCursorsOver(Collections.singleton(luceneIndex));
+	}
+	
+	// Closes the cursors over the given indexes, which are about to be deleted
+	@ThreadSafe
+	private void closeCursors(@NotNull List<PendingDeletion> deletions) {
+		Set<LuceneIndex> removedIndexes = new HashSet<LuceneIndex>();
+		for (PendingDeletion deletion : deletions)
+			removedIndexes.add(deletion.getLuceneIndex());
+		closeCursorsOver(removedIndexes);
+	}
+	
+	@ThreadSafe
+	private void closeCursorsOver(@NotNull Collection<LuceneIndex> removedIndexes) {
+		for (SearchCursor cursor : getOpenCursors())
+			if (cursor.usesAny(removedIndexes))
+				cursor.close("Cursor was closed because one of its indexes was removed or rebuilt."); // TODO i18n
+	}
+	
+	@MutableCopy
+	@NotNull
+	@ThreadSafe
+	private List<SearchCursor> getOpenCursors() {
+		synchronized (openCursors) {
+			return new ArrayList<SearchCursor>(openCursors);
+		}
+	}
+	
+	/**
+	 * Loads the stored fields of the given hit from the given Lucene searcher
+	 * and wraps them in a result document. The given list of indexes must be
+	 * the one the Lucene searcher was created from.
+	 */
+	@NotNull
+	@ThreadSafe
+	ResultDocument createResultDocument(@NotNull IndexSearcher luceneSearcher,
+										@NotNull List<LuceneIndex> indexes,
+										@NotNull ScoreDoc scoreDoc,
+										@NotNull Query query,
+										boolean isPhraseQuery)
+			throws IOException {
+		long loadStart = Metrics.start();
+		Document doc = luceneSearcher.doc(scoreDoc.doc, RESULT_FIELDS);
+		Metrics.timer("search.load").stop(loadStart);
+		DecoratedMultiReader reader = (DecoratedMultiReader) luceneSearcher.getIndexReader();
+		LuceneIndex index = indexes.get(reader.decoratedReaderIndex(scoreDoc.doc));
+		IndexingConfig config = index.getConfig();
+		long createStart = Metrics.start();
+		ResultDocument resultDocument = new ResultDocument(
+			doc, scoreDoc.score, query, isPhraseQuery, config, fileFactory,
+			outlookMailFactory);
+		Metrics.timer("search.create_result").stop(createStart);
+		return resultDocument;
+	}
+	
 	@NotNull
 	@ThreadSafe
 	private static QueryWrapper createQuery(@NotNull String queryString)
@@ -495,8 +1198,10 @@ public final class Searcher {
 			queryParser.setDefaultOperator(QueryParser.AND_OPERATOR);
 		
 		try {
+			long parseStart = Metrics.start();
 			Query query = queryParser.parse(queryString);
 			boolean isPhraseQuery = queryParser.isPhraseQuery();
+			Metrics.timer("search.parse_query").stop(parseStart);
 			return new QueryWrapper(query, isPhraseQuery);
 		}
 		catch (IllegalArgumentException e) {
@@ -513,10 +1218,10 @@ public final class Searcher {
 		}
 	}
 	
-	// Checks that all indexes still exist
-	@NotNull
-	@NotThreadSafe
-	private void checkIndexesExist() throws SearchException {
+	// Checks that all given indexes still exist
+	@ThreadSafe
+	private static void checkIndexesExist(@NotNull List<LuceneIndex> indexes)
+			throws SearchException {
 		if (indexes.isEmpty())
 			throw new SearchException("Nothing to search in: No indexes have been created yet."); // TODO i18n
 		for (LuceneIndex index : indexes) {
@@ -529,6 +1234,17 @@ public final class Searcher {
 		}
 	}
 	
+	// Releases the reference taken by acquireState()
+	@ThreadSafe
+	private static void releaseState(@NotNull SearcherState current) {
+		try {
+			current.getReader().decRef();
+		}
+		catch (IOException e) {
+			Util.printErr(e);
+		}
+	}
+	
 	// Given deletions should not be in the registry anymore, since the receiver
 	// will retrieve a fresh set of indexes from the registry before approval
 	@ThreadSafe
@@ -546,6 +1262,7 @@ public final class Searcher {
 		 */
 		synchronized (this) {
 			if (deletionThread.isInterrupted()) {
+				closeCursors(deletions);
 				for (PendingDeletion pendingDeletion : deletions)
 					pendingDeletion.setApprovedBySearcher();
 			}
@@ -566,13 +1283,24 @@ public final class Searcher {
 		
 		writeLock.lock();
 		try {
-			indexRegistry.removeListeners(addedListener, null);
-			Closeables.closeQuietly(luceneSearcher.getIndexReader());
+			indexRegistry.removeListeners(addedListener, removedListener);
+			synchronized (refreshLock) {
+				if (!closed) {
+					closed = true;
+					releaseState(state);
+					for (DirectoryReader reader : readers.values())
+						Closeables.closeQuietly(reader);
+					readers.clear();
+				}
+			}
 		}
 		finally {
 			writeLock.unlock();
 		}
 		
+		for (SearchCursor cursor : getOpenCursors())
+			cursor.close();
+		
 		/*
 		 * This should be done after closing the Lucene searcher in order to
 		 * ensure that no indexes will be deleted outside the deletion queue
@@ -580,6 +1308,11 @@ public final class Searcher {
 		 */
 		synchronized (this) {
 			deletionThread.interrupt();
+			executorClosed = true;
+			if (searchExecutor != null)
+				searchExecutor.shutdownNow();
+			if (cursorReaper != null)
+				cursorReaper.shutdownNow();
 		}
 	}
 	
@@ -0,0 +1,238 @@
+/*******************************************************************************
+ * Copyright (c) 2021 Tran Nam Quang.
+ * All rights reserved. This program and the accompanying materials
+ * are made available under the terms of the Eclipse Public License v1.0
+ * which accompanies this distribution, and is available at
+ * http://www.eclipse.org/legal/epl-v10.html
+ *
+ * Contributors:
+ *    Tran Nam Quang - initial API and implementation
+ *******************************************************************************/
+
+package net.sourceforge.docfetcher.model.search;
+
+import java.io.ByteArrayOutputStream;
+import java.io.DataOutputStream;
+import java.io.FileNotFoundException;
+import java.io.IOException;
+import java.nio.ByteBuffer;
+import java.nio.channels.ClosedChannelException;
+import java.nio.channels.ReadableByteChannel;
+import java.util.Collections;
+import java.util.List;
+
+import net.sourceforge.docfetcher.model.parse.ParseException;
+import net.sourceforge.docfetcher.model.search.ResultColumns.Column;
+import net.sourceforge.docfetcher.util.CheckedOutOfMemoryError;
+import net.sourceforge.docfetcher.util.Metrics;
+import net.sourceforge.docfetcher.util.Util;
+import net.sourceforge.docfetcher.util.annotations.NotNull;
+import net.sourceforge.docfetcher.util.annotations.NotThreadSafe;
+import net.sourceforge.docfetcher.util.annotations.Nullable;
+
+/**
+ * A channel that streams the unique IDs, selected attributes and extracted
+ * texts of a list of result documents to scripting clients, one framed record
+ * per document. The records are created lazily while the channel is read, so
+ * that the texts of all documents are never held in memory at the same time,
+ * and a slow reader automatically slows down the text extraction. If the
+ * documents come from a {@link SearchCursor}, they are also fetched from the
+ * cursor page by page while the channel is read, and the cursor is closed when
+ * the channel is exhausted or closed, rather than after an idle timeout.
+ * <p>
+ * The texts of files from indexes that store the extracted texts are taken
+ * from the index (see {@link Searcher#getStoredText(ResultDocument)}). All
+ * other files are parsed again.
+ * <p>
+ * Layout of the stream (all integers are big-endian):
+ * <ul>
+ * <li>int32: number of columns, and for each column: int32 name length, UTF-8
+ * name, one-byte type code, as in {@link ResultColumns}</li>
+ * <li>for each document: int32 number of bytes of the record following this
+ * field, int32 length plus UTF-8 unique ID, the column values encoded as in
+ * {@link ResultColumns}, one byte that is 1 if the text could be extracted and
+ * 0 otherwise, and int32 length plus UTF-8 text or error message</li>
+ * <li>int32: -1, marking the end of the stream</li>
+ * </ul>
+ * The decoder for this format is in the search.py script.
+ *
+ * @author Tran Nam Quang
+ */
+@NotThreadSafe
+public final class TextExportChannel implements ReadableByteChannel {
+
+	private static final int PAGE_SIZE = 100;
+
+	private final Searcher searcher;
+	@Nullable private final SearchCursor cursor;
+	private final List<Column> columns;
+	private List<ResultDocument> docs;
+	private ByteBuffer buffer;
+	private int nextDoc = 0;
+	private boolean finished = false;
+	private boolean open = true;
+
+	/**
+	 * Creates a channel that exports the given documents.
+	 */
+	public TextExportChannel(	@NotNull Searcher searcher,
+								@NotNull List<ResultDocument> docs,
+								@NotNull List<Column> columns) {
+		this(searcher, null, docs, columns);
+	}
+
+	/**
+	 * Creates a channel that exports the remaining documents of the given
+	 * cursor. The channel takes ownership of the cursor.
+	 */
+	public TextExportChannel(	@NotNull Searcher searcher,
+								@NotNull SearchCursor cursor,
+								@NotNull List<Column> columns) {
+		this(searcher, cursor, Collections.<ResultDocument>emptyList(), columns);
+		Util.checkNotNull(cursor);
+		/*
+		 * Exporting a page of documents may take longer than the idle timeout
+		 * of the cursor, e.g. if the files must be parsed or the client reads
+		 * slowly. The cursor is closed by this channel instead.
+		 */
+		cursor.disableIdleTimeout();
+	}
+
+	private TextExportChannel(	@NotNull Searcher searcher,
+								@Nullable SearchCursor cursor,
+								@NotNull List<ResultDocument> docs,
+								@NotNull List<Column> columns) {
+		Util.checkNotNull(searcher, docs, columns);
+		this.searcher = searcher;
+		this.cursor = cursor;
+		this.docs = docs;
+		this.columns = columns;
+		ByteArrayOutputStream bytes = new ByteArrayOutputStream();
+		try {
+			ResultColumns.writeColumnHeader(new DataOutputStream(bytes), columns);
+		}
+		catch (IOException e) {
+			throw new IllegalStateException(e); // Can't happen
+		}
+		buffer = ByteBuffer.wrap(bytes.toByteArray());
+	}
+
+	/**
+	 * Fills the given buffer with the remaining bytes of the current record.
+	 * The next record is only created if the current record has been read
+	 * completely.
+	 */
+	public int read(@NotNull ByteBuffer dst) throws IOException {
+		if (!open)
+			throw new ClosedChannelException();
+		if (!dst.hasRemaining())
+			return 0;
+		while (!buffer.hasRemaining()) {
+			if (nextDoc < docs.size() || fetchPage()) {
+				buffer = ByteBuffer.wrap(encodeRecord(docs.get(nextDoc++)));
+			}
+			else if (!finished) {
+				buffer = ByteBuffer.allocate(4);
+				buffer.putInt(0, -1);
+				finished = true;
+				closeCursor();
+			}
+			else {
+				return -1;
+			}
+		}
+		int count = Math.min(dst.remaining(), buffer.remaining());
+		int limit = buffer.limit();
+		buffer.limit(buffer.position() + count);
+		dst.put(buffer);
+		buffer.limit(limit);
+		return count;
+	}
+
+	public boolean isOpen() {
+		return open;
+	}
+
+	public void close() {
+		open = false;
+		closeCursor();
+	}
+
+	// Returns whether the cursor returned another page of documents
+	private boolean fetchPage() throws IOException {
+		if (cursor == null)
+			return false;
+		try {
+			docs = cursor.next(PAGE_SIZE);
+		}
+		catch (SearchException e) {
+			throw new IOException(e.getMessage());
+		}
+		catch (CheckedOutOfMemoryError e) {
+			throw new IOException(e.getMessage());
+		}
+		nextDoc = 0;
+		return !docs.isEmpty();
+	}
+
+	private void closeCursor() {
+		if (cursor != null)
+			cursor.close();
+	}
+
+	@NotNull
+	private byte[] encodeRecord(@NotNull ResultDocument doc) throws IOException {
+		long start = Metrics.start();
+		boolean success = true;
+		String text;
+		try {
+			text = getStoredText(doc);
+			if (text == null)
+				text = doc.getPlainText();
+		}
+		catch (ParseException e) {
+			success = false;
+			text = e.getMessage();
+		}
+		catch (FileNotFoundException e) {
+			success = false;
+			text = e.getMessage();
+		}
+		catch (CheckedOutOfMemoryError e) {
+			success = false;
+			text = e.getMessage();
+		}
+		Metrics.timer("export.text").stop(start);
+
+		ByteArrayOutputStream bytes = new ByteArrayOutputStream(
+			256 + (text == null ? 0 : text.length()));
+		DataOutputStream out = new DataOutputStream(bytes);
+		out.writeInt(0); // Placeholder for record length
+		ResultColumns.writeString(out, doc.getUniqueId());
+		for (Column column : columns)
+			ResultColumns.writeValue(out, column, doc);
+		out.writeBoolean(success);
+		ResultColumns.writeString(out, text);
+		out.flush();
+		byte[] result = bytes.toByteArray();
+		int length = result.length - 4;
+		result[0] = (byte) (length >>> 24);
+		result[1] = (byte) (length >>> 16);
+		result[2] = (byte) (length >>> 8);
+		result[3] = (byte) length;
+		return result;
+	}
+
+	// Returns null if the text isn't stored or can't be read from the index
+	@Nullable
+	private String getStoredText(@NotNull ResultDocument doc)
+			throws CheckedOutOfMemoryError {
+		try {
+			return searcher.getStoredText(doc);
+		}
+		catch (SearchException e) {
+			return null;
+		}
+	}
+
+}
@@ -0,0 +1,382 @@
+/*******************************************************************************
+ * Copyright (c) 2021 Tran Nam Quang.
+ * All rights reserved. This program and the accompanying materials
+ * are made available under the terms of the Eclipse Public License v1.0
+ * which accompanies this distribution, and is available at
+ * http://www.eclipse.org/legal/epl-v10.html
+ *
+ * Contributors:
+ *    Tran Nam Quang - initial API and implementation
+ *******************************************************************************/
+
+package net.sourceforge.docfetcher.util;
+
+import java.io.File;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.OutputStreamWriter;
+import java.io.Writer;
+import java.nio.charset.StandardCharsets;
+import java.util.Map;
+import java.util.Map.Entry;
+import java.util.TreeMap;
+import java.util.concurrent.ConcurrentHashMap;
+import java.util.concurrent.ConcurrentMap;
+import java.util.concurrent.Executors;
+import java.util.concurrent.ScheduledExecutorService;
+import java.util.concurrent.ThreadFactory;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.atomic.AtomicLong;
+import java.util.concurrent.atomic.AtomicLongArray;
+
+import net.sourceforge.docfetcher.util.annotations.NotNull;
+import net.sourceforge.docfetcher.util.annotations.Nullable;
+import net.sourceforge.docfetcher.util.annotations.ThreadSafe;
+
+import com.google.common.io.Closeables;
+
+/**
+ * A global registry of in-memory performance metrics, so that the time spent in
+ * the various stages of searching and indexing can be monitored without
+ * attaching a profiler. There are three kinds of metrics:
+ * <ul>
+ * <li>{@link Timer}: Records durations in a histogram with logarithmic buckets,
+ * from which the count, total, maximum and approximate percentiles can be
+ * computed.</li>
+ * <li>{@link Counter}: A monotonically increasing number.</li>
+ * <li>{@link Gauge}: A value that is computed on demand, such as the length of a
+ * queue.</li>
+ * </ul>
+ * Metrics are identified by dot-separated names and are created on first use.
+ * Recording a duration or incrementing a counter is cheap and lock-free.
+ *
+ * @author Tran Nam Quang
+ */
+@ThreadSafe
+public final class Metrics {
+
+	public interface Gauge {
+		public long getValue();
+	}
+
+	public static final class Counter {
+		private final AtomicLong count = new AtomicLong();
+
+		private Counter() {
+		}
+
+		public void increment() {
+			count.incrementAndGet();
+		}
+
+		public void add(long delta) {
+			count.addAndGet(delta);
+		}
+
+		public long get() {
+			return count.get();
+		}
+	}
+
+	/**
+	 * A histogram of durations with microsecond resolution. Each power of two
+	 * is split into four buckets, so the reported percentiles are accurate to
+	 * within 25%.
+	 */
+	public static final class Timer {
+		private static final int SUB_BUCKETS = 4;
+		private static final int BUCKET_COUNT = 64 * SUB_BUCKETS;
+
+		private final AtomicLong count = new AtomicLong();
+		private final AtomicLong totalMicros = new AtomicLong();
+		private final AtomicLong maxMicros = new AtomicLong();
+		private final AtomicLongArray buckets = new AtomicLongArray(BUCKET_COUNT);
+
+		private Timer() {
+		}
+
+		/**
+		 * Records the time that has passed since the given start time, which
+		 * must have been obtained from {@link Metrics#start()}.
+		 */
+		public void stop(long startNanos) {
+			record(System.nanoTime() - startNanos);
+		}
+
+		public void record(long nanos) {
+			long micros = Math.max(0, nanos / 1000);
+			count.incrementAndGet();
+			totalMicros.addAndGet(micros);
+			buckets.incrementAndGet(getBucket(micros));
+			while (true) {
+				long max = maxMicros.get();
+				if (micros <= max || maxMicros.compareAndSet(max, micros))
+					break;
+			}
+		}
+
+		/**
+		 * Returns the count, total, mean, maximum and the 50th, 95th and 99th
+		 * percentiles of the recorded durations, with the durations in
+		 * microseconds. The values may be slightly inconsistent if durations
+		 * are recorded at the same time.
+		 */
+		@NotNull
+		public Map<String, Long> getSnapshot() {
+			long[] counts = new long[BUCKET_COUNT];
+			long bucketTotal = 0;
+			for (int i = 0; i < BUCKET_COUNT; i++) {
+				counts[i] = buckets.get(i);
+				bucketTotal += counts[i];
+			}
+			long n = count.get();
+			long total = totalMicros.get();
+			Map<String, Long> snapshot = new TreeMap<String, Long>();
+			snapshot.put("count", n);
+			snapshot.put("total_us", total);
+			snapshot.put("mean_us", n == 0 ? 0 : total / n);
+			snapshot.put("max_us", maxMicros.get());
+			snapshot.put("p50_us", getPercentile(counts, bucketTotal, 50));
+			snapshot.put("p95_us", getPercentile(counts, bucketTotal, 95));
+			snapshot.put("p99_us", getPercentile(counts, bucketTotal, 99));
+			return snapshot;
+		}
+
+		private void reset() {
+			count.set(0);
+			totalMicros.set(0);
+			maxMicros.set(0);
+			for (int i = 0; i < BUCKET_COUNT; i++)
+				buckets.set(i, 0);
+		}
+
+		// Returns the upper bound of the bucket containing the percentile
+		private static long getPercentile(	@NotNull long[] counts,
+											long total,
+											int percentile) {
+			if (total == 0)
+				return 0;
+			long rank = (total * percentile + 99) / 100;
+			long seen = 0;
+			for (int i = 0; i < counts.length; i++) {
+				seen += counts[i];
+				if (seen >= rank)
+					return getUpperBound(i);
+			}
+			return getUpperBound(counts.length - 1);
+		}
+
+		/*
+		 * Values below 4 get a bucket of their own. For larger values, the
+		 * bucket is determined by the position of the highest bit and the two
+		 * bits following it.
+		 */
+		static int getBucket(long micros) {
+			if (micros < SUB_BUCKETS)
+				return (int) micros;
+			int exponent = 63 - Long.numberOfLeadingZeros(micros);
+			int mantissa = (int) (micros >>> (exponent - 2)) & (SUB_BUCKETS - 1);
+			return SUB_BUCKETS * (exponent - 1) + mantissa;
+		}
+
+		static long getUpperBound(int bucket) {
+			if (bucket < SUB_BUCKETS)
+				return bucket;
+			int exponent = bucket / SUB_BUCKETS + 1;
+			int mantissa = bucket % SUB_BUCKETS;
+			return ((SUB_BUCKETS + mantissa + 1L) << (exponent - 2)) - 1;
+		}
+	}
+
+	private static final ConcurrentMap<String, Timer> timers = new ConcurrentHashMap<String, Timer>();
+	private static final ConcurrentMap<String, Counter> counters = new ConcurrentHashMap<String, Counter>();
+	private static final ConcurrentMap<String, Gauge> gauges = new ConcurrentHashMap<String, Gauge>();
+	@Nullable private static ScheduledExecutorService dumpExecutor; // guarded by class lock
+
+	private Metrics() {
+	}
+
+	/**
+	 * Returns the current time in nanoseconds, to be passed to
+	 * {@link Timer#stop(long)} later.
+	 */
+	public static long start() {
+		return System.nanoTime();
+	}
+
+	@NotNull
+	public static Timer timer(@NotNull String name) {
+		Timer timer = timers.get(name);
+		if (timer == null) {
+			timer = new Timer();
+			Timer existing = timers.putIfAbsent(name, timer);
+			if (existing != null)
+				timer = existing;
+		}
+		return timer;
+	}
+
+	@NotNull
+	public static Counter counter(@NotNull String name) {
+		Counter counter = counters.get(name);
+		if (counter == null) {
+			counter = new Counter();
+			Counter existing = counters.putIfAbsent(name, counter);
+			if (existing != null)
+				counter = existing;
+		}
+		return counter;
+	}
+
+	/**
+	 * Registers the given gauge under the given name, replacing any gauge
+	 * previously registered under that name.
+	 */
+	public static void setGauge(@NotNull String name, @NotNull Gauge gauge) {
+		Util.checkNotNull(name, gauge);
+		gauges.put(name, gauge);
+	}
+
+	/**
+	 * Returns the current values of all metrics, sorted by name. Timers are
+	 * described by the values of {@link Timer#getSnapshot()}, counters by a
+	 * "count" entry and gauges by a "value" entry.
+	 */
+	@NotNull
+	public static Map<String, Map<String, Long>> getSnapshot() {
+		Map<String, Map<String, Long>> snapshot = new TreeMap<String, Map<String, Long>>();
+		for (Entry<String, Timer> entry : timers.entrySet())
+			snapshot.put(entry.getKey(), entry.getValue().getSnapshot());
+		for (Entry<String, Counter> entry : counters.entrySet()) {
+			Map<String, Long> values = new TreeMap<String, Long>();
+			values.put("count", entry.getValue().get());
+			snapshot.put(entry.getKey(), values);
+		}
+		for (Entry<String, Gauge> entry : gauges.entrySet()) {
+			Map<String, Long> values = new TreeMap<String, Long>();
+			try {
+				values.put("value", entry.getValue().getValue());
+			}
+			catch (RuntimeException e) {
+				Util.printErr(e);
+				continue;
+			}
+			snapshot.put(entry.getKey(), values);
+		}
+		return snapshot;
+	}
+
+	/**
+	 * Resets all timers and counters. Gauges are not affected.
+	 */
+	public static void reset() {
+		for (Timer timer : timers.values())
+			timer.reset();
+		for (Counter counter : counters.values())
+			counter.count.set(0);
+	}
+
+	/**
+	 * Writes the current values of all metrics as a JSON object to the given
+	 * file every <tt>intervalSecs</tt> seconds, replacing the previous
+	 * contents of the file. The file is written by a daemon thread. Calling
+	 * this method again stops the previous periodic dump.
+	 */
+	public static synchronized void startDump(	@NotNull final File file,
+												int intervalSecs) {
+		Util.checkNotNull(file);
+		Util.checkThat(intervalSecs > 0);
+		stopDump();
+		dumpExecutor = Executors.newSingleThreadScheduledExecutor(new ThreadFactory() {
+			public Thread newThread(Runnable r) {
+				Thread thread = new Thread(r, Metrics.class.getName() + " (Dump)");
+				thread.setDaemon(true);
+				return thread;
+			}
+		});
+		dumpExecutor.scheduleWithFixedDelay(new Runnable() {
+			public void run() {
+				try {
+					dump(file);
+				}
+				catch (IOException e) {
+					Util.printErr(e);
+				}
+			}
+		}, intervalSecs, intervalSecs, TimeUnit.SECONDS);
+	}
+
+	public static synchronized void stopDump() {
+		if (dumpExecutor != null) {
+			dumpExecutor.shutdownNow();
+			dumpExecutor = null;
+		}
+	}
+
+	/**
+	 * Writes the current values of all metrics as a JSON object to the given
+	 * file. The file is replaced atomically where the platform allows it, so
+	 * that readers never see a partially written file.
+	 */
+	public static void dump(@NotNull File file) throws IOException {
+		File tempFile = new File(file.getPath() + ".tmp");
+		Writer writer = new OutputStreamWriter(
+			new FileOutputStream(tempFile), StandardCharsets.UTF_8);
+		boolean success = false;
+		try {
+			writer.write(toJson(getSnapshot(), System.currentTimeMillis()));
+			success = true;
+		}
+		finally {
+			Closeables.close(writer, !success);
+		}
+		if (!tempFile.renameTo(file)) {
+			file.delete();
+			if (!tempFile.renameTo(file))
+				throw new IOException("Cannot write file: " + file);
+		}
+	}
+
+	@NotNull
+	static String toJson(	@NotNull Map<String, Map<String, Long>> snapshot,
+							long timestamp) {
+		String lineSep = Util.LS;
+		StringBuilder sb = new StringBuilder();
+		sb.append("{").append(lineSep);
+		sb.append("  \"timestamp\": ").append(timestamp);
+		for (Entry<String, Map<String, Long>> metric : snapshot.entrySet()) {
+			sb.append(",").append(lineSep);
+			sb.append("  ");
+			appendJsonString(sb, metric.getKey());
+			sb.append(": {");
+			boolean first = true;
+			for (Entry<String, Long> value : metric.getValue().entrySet()) {
+				if (!first)
+					sb.append(", ");
+				first = false;
+				appendJsonString(sb, value.getKey());
+				sb.append(": ");
+				sb.append(value.getValue());
+			}
+			sb.append("}");
+		}
+		sb.append(lineSep).append("}").append(lineSep);
+		return sb.toString();
+	}
+
+	private static void appendJsonString(	@NotNull StringBuilder sb,
+											@NotNull String value) {
+		sb.append('"');
+		for (int i = 0; i < value.length(); i++) {
+			char c = value.charAt(i);
+			if (c == '"' || c == '\\')
+				sb.append('\\').append(c);
+			else if (c < 0x20)
+				sb.append(String.format("\\u%04x", (int) c));
+			else
+				sb.append(c);
+		}
+		sb.append('"');
+	}
+
+}
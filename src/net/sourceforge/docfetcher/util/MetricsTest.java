@@ -0,0 +1,60 @@
+/*******************************************************************************
+ * Copyright (c) 2021 Tran Nam Quang.
+ * All rights reserved. This program and the accompanying materials
+ * are made available under the terms of the Eclipse Public License v1.0
+ * which accompanies this distribution, and is available at
+ * http://www.eclipse.org/legal/epl-v10.html
+ *
+ * Contributors:
+ *    Tran Nam Quang - initial API and implementation
+ *******************************************************************************/
+
+package net.sourceforge.docfetcher.util;
+
+import static org.junit.Assert.assertEquals;
+import static org.junit.Assert.assertTrue;
+
+import java.util.Map;
+
+import org.junit.Test;
+
+/**
+ * @author Tran Nam Quang
+ */
+public final class MetricsTest {
+
+	@Test
+	public void testBuckets() {
+		long[] values = {0, 1, 3, 4, 7, 8, 9, 10, 1000, 123456789L, Long.MAX_VALUE / 1000};
+		int lastBucket = -1;
+		for (long value : values) {
+			int bucket = Metrics.Timer.getBucket(value);
+			assertTrue(bucket >= lastBucket);
+			assertTrue(value <= Metrics.Timer.getUpperBound(bucket));
+			if (bucket > 0)
+				assertTrue(value > Metrics.Timer.getUpperBound(bucket - 1));
+			lastBucket = bucket;
+		}
+	}
+
+	@Test
+	public void testPercentiles() {
+		Metrics.Timer timer = Metrics.timer(MetricsTest.class.getName());
+		for (int i = 1; i <= 100; i++)
+			timer.record(i * 1000000L); // 1 to 100 ms
+		Map<String, Long> snapshot = timer.getSnapshot();
+		assertEquals(100L, (long) snapshot.get("count"));
+		assertEquals(100000L, (long) snapshot.get("max_us"));
+		assertEquals(50500L, (long) snapshot.get("mean_us"));
+
+		// The percentiles are accurate to within 25%
+		long p50 = snapshot.get("p50_us");
+		long p99 = snapshot.get("p99_us");
+		assertTrue(p50 >= 50000 && p50 <= 62500);
+		assertTrue(p99 >= 99000 && p99 <= 123750);
+
+		Metrics.reset();
+		assertEquals(0L, (long) timer.getSnapshot().get("count"));
+	}
+
+}
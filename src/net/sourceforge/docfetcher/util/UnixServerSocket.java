@@ -0,0 +1,486 @@
+/*******************************************************************************
+ * Copyright (c) 2021 Tran Nam Quang.
+ * All rights reserved. This program and the accompanying materials
+ * are made available under the terms of the Eclipse Public License v1.0
+ * which accompanies this distribution, and is available at
+ * http://www.eclipse.org/legal/epl-v10.html
+ *
+ * Contributors:
+ *    Tran Nam Quang - initial API and implementation
+ *******************************************************************************/
+
+package net.sourceforge.docfetcher.util;
+
+import java.io.File;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.OutputStream;
+import java.net.BindException;
+import java.net.InetAddress;
+import java.net.ServerSocket;
+import java.net.Socket;
+import java.net.SocketAddress;
+import java.net.SocketException;
+import java.nio.ByteBuffer;
+import java.nio.ByteOrder;
+import java.nio.file.Files;
+import java.nio.file.LinkOption;
+import java.nio.file.NoSuchFileException;
+import java.util.Random;
+
+import javax.net.ServerSocketFactory;
+
+import net.sourceforge.docfetcher.util.annotations.NotNull;
+import net.sourceforge.docfetcher.util.annotations.ThreadSafe;
+
+import com.google.common.base.Charsets;
+import com.sun.jna.LastErrorException;
+import com.sun.jna.Library;
+import com.sun.jna.Native;
+import com.sun.jna.NativeLong;
+import com.sun.jna.Pointer;
+
+/**
+ * A server socket that listens on a Unix domain socket file instead of a TCP
+ * port. Compared to a TCP socket on the loopback interface, connecting and
+ * sending data is cheaper, and the socket is not reachable by other users:
+ * The socket file is only accessible by the user running the program.
+ * <p>
+ * Java 7 has no support for Unix domain sockets, so the system calls are made
+ * via JNA. Only the part of the {@link ServerSocket} and {@link Socket} API
+ * that is needed by Py4J's gateway server is implemented; the socket address
+ * passed to the bind methods is ignored, and timeouts and socket options are
+ * not supported. This class works on Linux and Mac OS X.
+ *
+ * @author Tran Nam Quang
+ */
+@ThreadSafe
+public final class UnixServerSocket extends ServerSocket {
+
+	private static final int AF_UNIX = 1;
+	private static final int SOCK_STREAM = 1;
+	private static final int SHUT_RDWR = 2;
+	private static final int EINTR = 4;
+	private static final int ECONNREFUSED = Util.IS_MAC_OS_X ? 61 : 111;
+	private static final int S_IFMT = 0170000;
+	private static final int S_IFSOCK = 0140000;
+
+	private interface CLibrary extends Library {
+		public int socket(int domain, int type, int protocol) throws LastErrorException;
+		public int bind(int fd, byte[] address, int addressLength) throws LastErrorException;
+		public int connect(int fd, byte[] address, int addressLength) throws LastErrorException;
+		public int listen(int fd, int backlog) throws LastErrorException;
+		public int accept(int fd, Pointer address, Pointer addressLength) throws LastErrorException;
+		public NativeLong read(int fd, byte[] buffer, NativeLong count) throws LastErrorException;
+		public NativeLong write(int fd, byte[] buffer, NativeLong count) throws LastErrorException;
+		public int shutdown(int fd, int how) throws LastErrorException;
+		public int close(int fd) throws LastErrorException;
+		public int mkdir(String path, int mode) throws LastErrorException;
+		public int chmod(String path, int mode) throws LastErrorException;
+		public int rename(String oldPath, String newPath) throws LastErrorException;
+		public int unlink(String path) throws LastErrorException;
+		public int rmdir(String path) throws LastErrorException;
+	}
+
+	private static CLibrary lib = null;
+	private static final Random random = new Random();
+
+	private static synchronized CLibrary getLib() {
+		if (lib == null)
+			lib = (CLibrary) Native.loadLibrary("c", CLibrary.class);
+		return lib;
+	}
+
+	/**
+	 * Returns a factory for Py4J's gateway server that creates server sockets
+	 * listening on the given socket file.
+	 */
+	@NotNull
+	public static ServerSocketFactory createFactory(@NotNull final File socketFile) {
+		Util.checkNotNull(socketFile);
+		return new ServerSocketFactory() {
+			public ServerSocket createServerSocket() throws IOException {
+				return new UnixServerSocket(socketFile);
+			}
+			public ServerSocket createServerSocket(int port) throws IOException {
+				return createServerSocket();
+			}
+			public ServerSocket createServerSocket(int port, int backlog)
+					throws IOException {
+				return createServerSocket();
+			}
+			public ServerSocket createServerSocket(	int port,
+													int backlog,
+													InetAddress address)
+					throws IOException {
+				return createServerSocket();
+			}
+		};
+	}
+
+	private final File socketFile;
+	private final Object lock = new Object();
+	private int fd = -1; // guarded by lock
+	private boolean closed = false; // guarded by lock
+
+	public UnixServerSocket(@NotNull File socketFile) throws IOException {
+		Util.checkNotNull(socketFile);
+		if (Util.IS_WINDOWS)
+			throw new SocketException("Unix domain sockets are not supported on Windows.");
+		this.socketFile = socketFile.getAbsoluteFile();
+	}
+
+	/**
+	 * Creates the socket file and starts listening on it. A socket file left
+	 * behind by a terminated program is replaced, but if the path is taken by
+	 * anything else, including a socket some other program is listening on, a
+	 * {@link BindException} is thrown. The given socket address is ignored.
+	 */
+	public void bind(SocketAddress endpoint, int backlog) throws IOException {
+		String path = socketFile.getPath();
+		createAddress(path); // Fail early if the path is too long
+		File parentDir = socketFile.getParentFile();
+		parentDir.mkdirs();
+		CLibrary lib = getLib();
+		synchronized (lock) {
+			if (closed)
+				throw new SocketException("Socket is closed");
+			if (fd != -1)
+				throw new SocketException("Already bound");
+			removeStaleSocket();
+
+			/*
+			 * The socket file is created in a directory only accessible by the
+			 * current user, so that no other user can connect before the chmod
+			 * call. It is then moved to its final location. Unlike changing
+			 * the umask, this does not affect files created concurrently by
+			 * other threads.
+			 */
+			String privateDir = new File(parentDir, "."
+					+ Long.toHexString(random.nextLong() & Long.MAX_VALUE)).getPath();
+			String tempPath = privateDir + "/s";
+			byte[] tempAddress = createAddress(tempPath);
+			try {
+				lib.mkdir(privateDir, 0700);
+			}
+			catch (LastErrorException e) {
+				throw new SocketException("Cannot create directory " + privateDir + ": " + e.getMessage());
+			}
+			int newFd = -1;
+			try {
+				newFd = lib.socket(AF_UNIX, SOCK_STREAM, 0);
+				lib.bind(newFd, tempAddress, tempAddress.length);
+				lib.chmod(tempPath, 0600);
+				lib.listen(newFd, backlog < 1 ? 50 : backlog);
+				lib.rename(tempPath, path);
+			}
+			catch (LastErrorException e) {
+				if (newFd != -1)
+					closeQuietly(newFd);
+				unlinkQuietly(tempPath);
+				throw new SocketException("Cannot listen on " + path + ": " + e.getMessage());
+			}
+			finally {
+				try {
+					lib.rmdir(privateDir);
+				}
+				catch (LastErrorException e) {
+					// Ignore
+				}
+			}
+			fd = newFd;
+		}
+	}
+
+	/**
+	 * Deletes the socket file if it was left behind by a terminated program,
+	 * i.e. if it is a socket and nobody is listening on it. Throws a
+	 * {@link BindException} if anything else exists at the path.
+	 */
+	private void removeStaleSocket() throws IOException {
+		String path = socketFile.getPath();
+		int mode;
+		try {
+			mode = (Integer) Files.getAttribute(
+				socketFile.toPath(), "unix:mode", LinkOption.NOFOLLOW_LINKS);
+		}
+		catch (NoSuchFileException e) {
+			return;
+		}
+		catch (UnsupportedOperationException e) {
+			throw new BindException("Address already in use: " + path);
+		}
+		if ((mode & S_IFMT) != S_IFSOCK)
+			throw new BindException("Address already in use: " + path);
+
+		byte[] address = createAddress(path);
+		CLibrary lib = getLib();
+		int testFd;
+		try {
+			testFd = lib.socket(AF_UNIX, SOCK_STREAM, 0);
+		}
+		catch (LastErrorException e) {
+			throw new SocketException("Cannot create socket: " + e.getMessage());
+		}
+		try {
+			lib.connect(testFd, address, address.length);
+		}
+		catch (LastErrorException e) {
+			if (e.getErrorCode() == ECONNREFUSED) {
+				unlinkQuietly(path);
+				return;
+			}
+		}
+		finally {
+			closeQuietly(testFd);
+		}
+		throw new BindException("Address already in use: " + path);
+	}
+
+	public Socket accept() throws IOException {
+		int listenFd;
+		synchronized (lock) {
+			if (closed)
+				throw new SocketException("Socket is closed");
+			if (fd == -1)
+				throw new SocketException("Socket is not bound yet");
+			listenFd = fd;
+		}
+		while (true) {
+			try {
+				return new UnixSocket(getLib().accept(listenFd, null, null));
+			}
+			catch (LastErrorException e) {
+				if (isClosed())
+					throw new SocketException("Socket is closed");
+				if (e.getErrorCode() != EINTR)
+					throw new SocketException("Cannot accept connection: " + e.getMessage());
+			}
+		}
+	}
+
+	/**
+	 * Stops listening and deletes the socket file. Threads blocked in
+	 * {@link #accept()} will receive a {@link SocketException}.
+	 */
+	public void close() throws IOException {
+		int oldFd;
+		synchronized (lock) {
+			if (closed)
+				return;
+			closed = true;
+			oldFd = fd;
+			fd = -1;
+		}
+		if (oldFd != -1) {
+			try {
+				// Wakes up the threads blocked in accept
+				getLib().shutdown(oldFd, SHUT_RDWR);
+			}
+			catch (LastErrorException e) {
+				// Ignore
+			}
+			closeQuietly(oldFd);
+			unlinkQuietly(socketFile.getPath());
+		}
+		super.close();
+	}
+
+	public boolean isBound() {
+		synchronized (lock) {
+			return fd != -1;
+		}
+	}
+
+	public boolean isClosed() {
+		synchronized (lock) {
+			return closed;
+		}
+	}
+
+	public int getLocalPort() {
+		return -1;
+	}
+
+	public void setSoTimeout(int timeout) {
+		// Not supported
+	}
+
+	public void setReuseAddress(boolean on) {
+		// Not applicable
+	}
+
+	public String toString() {
+		return "UnixServerSocket[" + socketFile.getPath() + "]";
+	}
+
+	// Creates a sockaddr_un structure for the given path
+	@NotNull
+	private static byte[] createAddress(@NotNull String path)
+			throws SocketException {
+		byte[] pathBytes = path.getBytes(Charsets.UTF_8);
+		int maxLength = Util.IS_MAC_OS_X ? 104 : 108;
+		if (pathBytes.length >= maxLength)
+			throw new SocketException("Socket path too long: " + path);
+		byte[] address = new byte[2 + maxLength];
+		if (Util.IS_MAC_OS_X) {
+			address[0] = (byte) address.length;
+			address[1] = AF_UNIX;
+		}
+		else {
+			ByteBuffer.wrap(address).order(ByteOrder.nativeOrder()).putShort(
+				(short) AF_UNIX);
+		}
+		System.arraycopy(pathBytes, 0, address, 2, pathBytes.length);
+		return address;
+	}
+
+	private static void closeQuietly(int fd) {
+		try {
+			getLib().close(fd);
+		}
+		catch (LastErrorException e) {
+			// Ignore
+		}
+	}
+
+	private static void unlinkQuietly(@NotNull String path) {
+		try {
+			getLib().unlink(path);
+		}
+		catch (LastErrorException e) {
+			// Ignore
+		}
+	}
+
+	/**
+	 * A connection accepted by a {@link UnixServerSocket}.
+	 */
+	private static final class UnixSocket extends Socket {
+		private final int fd;
+		private final InputStream in;
+		private final OutputStream out;
+		private volatile boolean closed = false;
+
+		public UnixSocket(int fd) {
+			this.fd = fd;
+			in = new InputStream() {
+				public int read() throws IOException {
+					byte[] b = new byte[1];
+					return read(b, 0, 1) == -1 ? -1 : b[0] & 0xff;
+				}
+				public int read(byte[] b, int off, int len) throws IOException {
+					if (len == 0)
+						return 0;
+					byte[] buffer = off == 0 ? b : new byte[len];
+					int count = UnixSocket.this.read(buffer, len);
+					if (count <= 0)
+						return -1;
+					if (buffer != b)
+						System.arraycopy(buffer, 0, b, off, count);
+					return count;
+				}
+				public void close() throws IOException {
+					UnixSocket.this.close();
+				}
+			};
+			out = new OutputStream() {
+				public void write(int b) throws IOException {
+					write(new byte[] {(byte) b}, 0, 1);
+				}
+				public void write(byte[] b, int off, int len) throws IOException {
+					byte[] buffer = b;
+					while (len > 0) {
+						if (off != 0) {
+							buffer = new byte[len];
+							System.arraycopy(b, off, buffer, 0, len);
+							b = buffer;
+							off = 0;
+						}
+						int count = UnixSocket.this.write(buffer, len);
+						off += count;
+						len -= count;
+					}
+				}
+				public void close() throws IOException {
+					UnixSocket.this.close();
+				}
+			};
+		}
+
+		private int read(@NotNull byte[] buffer, int len) throws IOException {
+			while (true) {
+				if (closed)
+					throw new SocketException("Socket closed");
+				try {
+					return getLib().read(fd, buffer, new NativeLong(len)).intValue();
+				}
+				catch (LastErrorException e) {
+					if (e.getErrorCode() != EINTR)
+						throw new SocketException("Read failed: " + e.getMessage());
+				}
+			}
+		}
+
+		private int write(@NotNull byte[] buffer, int len) throws IOException {
+			while (true) {
+				if (closed)
+					throw new SocketException("Socket closed");
+				try {
+					return getLib().write(fd, buffer, new NativeLong(len)).intValue();
+				}
+				catch (LastErrorException e) {
+					if (e.getErrorCode() != EINTR)
+						throw new SocketException("Write failed: " + e.getMessage());
+				}
+			}
+		}
+
+		public InputStream getInputStream() {
+			return in;
+		}
+
+		public OutputStream getOutputStream() {
+			return out;
+		}
+
+		public synchronized void close() {
+			if (closed)
+				return;
+			closed = true;
+			try {
+				// Wakes up the threads blocked in read
+				getLib().shutdown(fd, SHUT_RDWR);
+			}
+			catch (LastErrorException e) {
+				// Ignore
+			}
+			closeQuietly(fd);
+		}
+
+		public boolean isConnected() {
+			return true;
+		}
+
+		public boolean isClosed() {
+			return closed;
+		}
+
+		public void setSoTimeout(int timeout) {
+			// Not supported
+		}
+
+		public void setSoLinger(boolean on, int linger) {
+			// Not supported
+		}
+
+		public void setTcpNoDelay(boolean on) {
+			// Not applicable
+		}
+
+		public String toString() {
+			return "UnixSocket[fd=" + fd + "]";
+		}
+	}
+
+}
@@ -0,0 +1,98 @@
+/*******************************************************************************
+ * Copyright (c) 2021 Tran Nam Quang.
+ * All rights reserved. This program and the accompanying materials
+ * are made available under the terms of the Eclipse Public License v1.0
+ * which accompanies this distribution, and is available at
+ * http://www.eclipse.org/legal/epl-v10.html
+ *
+ * Contributors:
+ *    Tran Nam Quang - initial API and implementation
+ *******************************************************************************/
+
+package net.sourceforge.docfetcher.util;
+
+import static org.junit.Assert.assertEquals;
+import static org.junit.Assert.assertFalse;
+import static org.junit.Assert.assertTrue;
+import static org.junit.Assert.fail;
+
+import java.io.File;
+import java.net.BindException;
+import java.nio.file.Files;
+import java.nio.file.attribute.PosixFilePermissions;
+
+import org.junit.Test;
+
+/**
+ * @author Tran Nam Quang
+ */
+public final class UnixServerSocketTest {
+
+	@Test
+	public void testBindAndClose() throws Exception {
+		if (Util.IS_WINDOWS)
+			return;
+		File tempDir = Util.createTempDir();
+		try {
+			File socketFile = new File(tempDir, "test.sock");
+			UnixServerSocket serverSocket = new UnixServerSocket(socketFile);
+			serverSocket.bind(null);
+			assertTrue(serverSocket.isBound());
+			assertTrue(socketFile.exists());
+
+			// The temporary directory used for binding is gone
+			assertEquals(1, tempDir.list().length);
+
+			// Only the current user can connect
+			assertEquals(
+				PosixFilePermissions.fromString("rw-------"),
+				Files.getPosixFilePermissions(socketFile.toPath()));
+
+			// The socket file is deleted on close
+			serverSocket.close();
+			assertTrue(serverSocket.isClosed());
+			assertFalse(socketFile.exists());
+		}
+		finally {
+			Util.deleteRecursively(tempDir);
+		}
+	}
+
+	@Test
+	public void testAddressInUse() throws Exception {
+		if (Util.IS_WINDOWS)
+			return;
+		File tempDir = Util.createTempDir();
+		try {
+			// Regular files are not replaced
+			File file = new File(tempDir, "test.txt");
+			file.createNewFile();
+			try {
+				new UnixServerSocket(file).bind(null);
+				fail();
+			}
+			catch (BindException e) {
+				assertTrue(file.isFile());
+			}
+
+			// Sockets that are still listened on are not replaced
+			File socketFile = new File(tempDir, "test.sock");
+			UnixServerSocket serverSocket = new UnixServerSocket(socketFile);
+			serverSocket.bind(null);
+			try {
+				new UnixServerSocket(socketFile).bind(null);
+				fail();
+			}
+			catch (BindException e) {
+				assertTrue(socketFile.exists());
+			}
+			finally {
+				serverSocket.close();
+			}
+		}
+		finally {
+			Util.deleteRecursively(tempDir);
+		}
+	}
+
+}